@@ -0,0 +1,55 @@
+"""Add email_outbox for queued email delivery
+
+EmailService writes outgoing mail here in the caller's transaction; the
+email_outbox scheduler job delivers it with retries. The partial index covers
+only undelivered rows.
+
+Revision ID: 2026_10_18_email_outbox
+Revises: 2026_10_18_settled_at_idx
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2026_10_18_email_outbox"
+down_revision: Union[str, None] = "2026_10_18_settled_at_idx"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+STATUS_ENUM = postgresql.ENUM(
+    "PENDING", "SENDING", "SENT", "FAILED", name="emailoutboxstatus", create_type=False
+)
+
+
+def upgrade() -> None:
+    STATUS_ENUM.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("to_email", sa.String(255), nullable=False),
+        sa.Column("from_email", sa.String(255), nullable=True),
+        sa.Column("subject", sa.String(500), nullable=False),
+        sa.Column("html", sa.Text(), nullable=False),
+        sa.Column("status", STATUS_ENUM, nullable=False, server_default="PENDING"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("provider", sa.String(20), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_email_outbox_next_attempt_at",
+        "email_outbox",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status IN ('PENDING', 'SENDING')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_next_attempt_at", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    STATUS_ENUM.drop(op.get_bind(), checkfirst=True)
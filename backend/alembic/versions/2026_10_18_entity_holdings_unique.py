@@ -0,0 +1,55 @@
+"""Unique (entity_id, asset_type) on entity_holdings
+
+Conflict target for the atomic INSERT ... ON CONFLICT DO UPDATE balance
+upserts in services/balance_utils.py. Duplicate rows, if any, are merged
+into the oldest one first.
+
+Revision ID: 2026_10_18_holdings_uq
+Revises: 2026_10_18_mm_balances
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+from alembic import op
+
+revision: str = "2026_10_18_holdings_uq"
+down_revision: Union[str, None] = "2026_10_18_mm_balances"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT id, entity_id, asset_type,
+                   row_number() OVER (
+                       PARTITION BY entity_id, asset_type ORDER BY created_at, id
+                   ) AS rn,
+                   sum(quantity) OVER (PARTITION BY entity_id, asset_type) AS merged
+            FROM entity_holdings
+        ),
+        kept AS (
+            UPDATE entity_holdings h
+            SET quantity = r.merged
+            FROM ranked r
+            WHERE h.id = r.id AND r.rn = 1
+              AND EXISTS (
+                  SELECT 1 FROM ranked d
+                  WHERE d.entity_id = r.entity_id AND d.asset_type = r.asset_type AND d.rn > 1
+              )
+        )
+        DELETE FROM entity_holdings h
+        USING ranked r
+        WHERE h.id = r.id AND r.rn > 1
+        """
+    )
+    op.create_unique_constraint(
+        "uq_entity_holdings_entity_asset",
+        "entity_holdings",
+        ["entity_id", "asset_type"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_entity_holdings_entity_asset", "entity_holdings", type_="unique")
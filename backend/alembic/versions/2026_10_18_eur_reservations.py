@@ -0,0 +1,32 @@
+"""Add EUR reservations for client BUY orders
+
+entity_holdings.reserved holds EUR committed to open limit BUY orders;
+orders.reserved_eur is each order's share. Orders placed before this
+migration hold no reservation and are settled as before.
+
+Revision ID: 2026_10_18_eur_reservations
+Revises: 2026_10_18_holdings_uq
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "2026_10_18_eur_reservations"
+down_revision: Union[str, None] = "2026_10_18_holdings_uq"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "entity_holdings",
+        sa.Column("reserved", sa.Numeric(18, 2), nullable=False, server_default="0"),
+    )
+    op.add_column("orders", sa.Column("reserved_eur", sa.Numeric(18, 2), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("orders", "reserved_eur")
+    op.drop_column("entity_holdings", "reserved")
@@ -0,0 +1,33 @@
+"""Composite indexes for keyset pagination of audit tables
+
+Ticket, activity-log and entity-transaction listings page newest first on
+(timestamp, id); these indexes serve the `(timestamp, id) < cursor` scans.
+
+Revision ID: 2026_10_18_keyset_pagination_idx
+Revises: 2026_10_18_email_outbox
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+from alembic import op
+
+revision: str = "2026_10_18_keyset_pagination_idx"
+down_revision: Union[str, None] = "2026_10_18_email_outbox"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ticket_logs_timestamp_id", "ticket_logs", ["timestamp", "id"])
+    op.create_index("ix_activity_logs_created_at_id", "activity_logs", ["created_at", "id"])
+    op.create_index(
+        "ix_asset_transactions_entity_created_at_id",
+        "asset_transactions",
+        ["entity_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_asset_transactions_entity_created_at_id", table_name="asset_transactions")
+    op.drop_index("ix_activity_logs_created_at_id", table_name="activity_logs")
+    op.drop_index("ix_ticket_logs_timestamp_id", table_name="ticket_logs")
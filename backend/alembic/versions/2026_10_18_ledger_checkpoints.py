@@ -0,0 +1,44 @@
+"""Add ledger_checkpoints for incremental ledger reconciliation
+
+One row per (owner, asset) holding the ledger sum up to its last reconciled
+transaction. The first reconciliation run builds them from the full ledger;
+later runs only read transactions after the checkpoints.
+
+Revision ID: 2026_10_18_ledger_checkpoints
+Revises: 2026_10_18_eur_reservations
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2026_10_18_ledger_checkpoints"
+down_revision: Union[str, None] = "2026_10_18_eur_reservations"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_checkpoints",
+        sa.Column("owner_type", sa.String(20), primary_key=True),
+        sa.Column("owner_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "asset_type",
+            postgresql.ENUM(name="assettype", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("ledger_balance", sa.Numeric(24, 6), nullable=False, server_default="0"),
+        sa.Column("last_transaction_at", sa.DateTime(), nullable=True),
+        sa.Column("last_transaction_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("balance", sa.Numeric(24, 6), nullable=False, server_default="0"),
+        sa.Column("drift", sa.Numeric(24, 6), nullable=False, server_default="0"),
+        sa.Column("drift_detected_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ledger_checkpoints")
@@ -0,0 +1,82 @@
+"""Add materialized market_maker_balances table
+
+One (total, locked, available) row per market maker and asset, kept in step
+with the ledger by services/market_maker_balances.py. Backfilled from
+asset_transactions, open orders and market_maker_clients.eur_balance.
+
+Revision ID: 2026_10_18_mm_balances
+Revises: fe405e6fd550
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2026_10_18_mm_balances"
+down_revision: Union[str, None] = "fe405e6fd550"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_maker_balances",
+        sa.Column(
+            "market_maker_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("market_maker_clients.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "asset_type",
+            postgresql.ENUM(name="assettype", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("total", sa.Numeric(24, 6), nullable=False, server_default="0"),
+        sa.Column("locked", sa.Numeric(24, 6), nullable=False, server_default="0"),
+        sa.Column("available", sa.Numeric(24, 6), sa.Computed("total - locked", persisted=True)),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+    )
+
+    op.execute(
+        """
+        INSERT INTO market_maker_balances (market_maker_id, asset_type, total, locked, updated_at)
+        SELECT
+            mm.id,
+            a.asset::assettype,
+            CASE
+                WHEN a.asset = 'EUR' THEN COALESCE(mm.eur_balance, 0)
+                ELSE COALESCE((
+                    SELECT SUM(t.amount) FROM asset_transactions t
+                    WHERE t.market_maker_id = mm.id
+                      AND t.certificate_type::text = a.asset
+                ), 0)
+            END,
+            CASE
+                WHEN a.asset = 'EUR' THEN COALESCE((
+                    SELECT SUM(o.price * (o.quantity - COALESCE(o.filled_quantity, 0)))
+                    FROM orders o
+                    WHERE o.market_maker_id = mm.id
+                      AND o.side = 'BUY'
+                      AND o.status IN ('OPEN', 'PARTIALLY_FILLED')
+                ), 0)
+                ELSE COALESCE((
+                    SELECT SUM(o.quantity - COALESCE(o.filled_quantity, 0))
+                    FROM orders o
+                    WHERE o.market_maker_id = mm.id
+                      AND o.side = 'SELL'
+                      AND o.certificate_type::text = a.asset
+                      AND o.status IN ('OPEN', 'PARTIALLY_FILLED')
+                ), 0)
+            END,
+            now() AT TIME ZONE 'utc'
+        FROM market_maker_clients mm
+        CROSS JOIN (VALUES ('CEA'), ('EUA'), ('EUR')) AS a(asset)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("market_maker_balances")
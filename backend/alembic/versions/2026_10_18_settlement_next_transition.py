@@ -0,0 +1,36 @@
+"""Add settlement_batches.next_transition_at with a partial index
+
+The settlement processor selects only batches whose next_transition_at is
+due instead of scanning every non-final batch. Existing batches start with
+NULL; the processor schedules them on its first run.
+
+Revision ID: 2026_10_18_settle_next_at
+Revises: 2026_10_18_ledger_checkpoints
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "2026_10_18_settle_next_at"
+down_revision: Union[str, None] = "2026_10_18_ledger_checkpoints"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "settlement_batches", sa.Column("next_transition_at", sa.DateTime(), nullable=True)
+    )
+    op.create_index(
+        "ix_settlement_batches_next_transition_at",
+        "settlement_batches",
+        ["next_transition_at"],
+        postgresql_where=sa.text("status NOT IN ('SETTLED', 'FAILED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_settlement_batches_next_transition_at", table_name="settlement_batches")
+    op.drop_column("settlement_batches", "next_transition_at")
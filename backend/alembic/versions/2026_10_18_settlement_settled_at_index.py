@@ -0,0 +1,29 @@
+"""Index settlement_batches.actual_settlement_date
+
+Settlement metrics only read open/failed batches and those settled in the
+recent window; this index serves the recently-settled part.
+
+Revision ID: 2026_10_18_settled_at_idx
+Revises: 2026_10_18_settle_next_at
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+from alembic import op
+
+revision: str = "2026_10_18_settled_at_idx"
+down_revision: Union[str, None] = "2026_10_18_settle_next_at"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_settlement_batches_actual_settlement_date",
+        "settlement_batches",
+        ["actual_settlement_date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_settlement_batches_actual_settlement_date", table_name="settlement_batches")
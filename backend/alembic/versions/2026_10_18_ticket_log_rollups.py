@@ -0,0 +1,53 @@
+"""Add ticket_log_rollups for the audit dashboard statistics
+
+Daily ticket counts per (day, action_type, status, user_id). The
+ticket_rollup_compaction job fills them from ticket_logs (all history on its
+first run); until then the dashboard counts ticket_logs live.
+
+Revision ID: 2026_10_18_ticket_log_rollups
+Revises: 2026_10_18_ticket_search
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2026_10_18_ticket_log_rollups"
+down_revision: Union[str, None] = "2026_10_18_ticket_search"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_log_rollups",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("action_type", sa.String(100), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="ticketstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "uq_ticket_log_rollups_day_action_status_user",
+        "ticket_log_rollups",
+        ["day", "action_type", "status", "user_id"],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_ticket_log_rollups_day_action_status_user", table_name="ticket_log_rollups")
+    op.drop_table("ticket_log_rollups")
@@ -0,0 +1,75 @@
+"""Indexed search over ticket_logs (pg_trgm, tsvector, JSONB GIN)
+
+- pg_trgm GIN indexes on ticket_id, action_type and entity_type serve the
+  substring (ILIKE '%term%'), prefix and similarity searches
+- search_vector: stored generated tsvector of the names plus every string and
+  number in request_payload/response_data, with a GIN index
+- GIN indexes on request_payload/response_data serve payload key (?) and
+  key/value containment (@>) queries
+
+Adding the stored column rewrites ticket_logs; on a large table run this in a
+maintenance window.
+
+Revision ID: 2026_10_18_ticket_search
+Revises: 2026_10_18_keyset_pagination_idx
+Create Date: 2026-10-18
+"""
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "2026_10_18_ticket_search"
+down_revision: Union[str, None] = "2026_10_18_keyset_pagination_idx"
+branch_labels: Union[str, None] = None
+depends_on: Union[str, None] = None
+
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple'::regconfig, ticket_id || ' ' || action_type || ' ' || entity_type)"
+    " || jsonb_to_tsvector('simple'::regconfig, coalesce(request_payload, '{}'::jsonb),"
+    " '[\"string\", \"numeric\"]'::jsonb)"
+    " || jsonb_to_tsvector('simple'::regconfig, coalesce(response_data, '{}'::jsonb),"
+    " '[\"string\", \"numeric\"]'::jsonb)"
+)
+
+TRIGRAM_COLUMNS = ("ticket_id", "action_type", "entity_type")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "ticket_logs",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_SQL, persisted=True),
+        ),
+    )
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(
+            f"ix_ticket_logs_{column}_trgm",
+            "ticket_logs",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+    op.create_index(
+        "ix_ticket_logs_search_vector", "ticket_logs", ["search_vector"], postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_ticket_logs_request_payload", "ticket_logs", ["request_payload"], postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_ticket_logs_response_data", "ticket_logs", ["response_data"], postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ticket_logs_response_data", table_name="ticket_logs")
+    op.drop_index("ix_ticket_logs_request_payload", table_name="ticket_logs")
+    op.drop_index("ix_ticket_logs_search_vector", table_name="ticket_logs")
+    for column in TRIGRAM_COLUMNS:
+        op.drop_index(f"ix_ticket_logs_{column}_trgm", table_name="ticket_logs")
+    op.drop_column("ticket_logs", "search_vector")
+    # pg_trgm is left installed; other objects may depend on it
@@ -79,10 +79,12 @@ from ...schemas.schemas import (
     UserRoleUpdate,
     UserSessionResponse,
 )
-from ...services.email_service import TEMPLATE_SAMPLE_DATA, email_service
-from ...services.settlement_service import SettlementService, calculate_settlement_progress
+from ...services.balance_loader import EntityBalanceLoader
+from ...services.email_service import TEMPLATE_SAMPLE_DATA, email_service, mail_config_from_row
+from ...services.pagination import COUNT_MODE_PATTERN, paginate
+from ...services.settlement_finalizer import DEFAULT_CHUNK_SIZE, FinalizeResult, settle_batches
+from ...services.settlement_service import calculate_settlement_progress
 from ...services.ticket_service import TicketService
-from ...services.ws_utils import get_entity_user_ids
 from .backoffice import backoffice_ws_manager
 from .client_ws import client_ws_manager
 
@@ -600,6 +602,9 @@ async def get_entities(
     result = await db.execute(query)
     entities = result.scalars().all()
 
+    # All balances of the page in one batch
+    balances = await EntityBalanceLoader(db).load_many([e.id for e in entities])
+
     return {
         "data": [
             {
@@ -610,8 +615,9 @@ async def get_entities(
                 "verified": e.verified,
                 "kyc_status": e.kyc_status.value,
                 "created_at": e.created_at.isoformat(),
+                **b.as_dict(),
             }
-            for e in entities
+            for e, b in zip(entities, balances)
         ]
     }
 
@@ -714,27 +720,35 @@ async def get_users(
     result = await db.execute(query)
     users = result.scalars().all()
 
+    # Entities and balances of the whole page in one batch each
+    entity_ids = {u.entity_id for u in users if u.entity_id}
+    entities = {}
+    if entity_ids:
+        entity_result = await db.execute(select(Entity).where(Entity.id.in_(entity_ids)))
+        entities = {e.id: e for e in entity_result.scalars().all()}
+    balance_loader = EntityBalanceLoader(db)
+    balance_loader.queue(*entities)
+
     # Get entity names and approval timestamps
     user_list = []
     for user in users:
         entity_name = None
         kyc_approved_at = None
-        if user.entity_id:
-            entity_result = await db.execute(
-                select(Entity).where(Entity.id == user.entity_id)
+        balances = None
+        entity = entities.get(user.entity_id)
+        if entity:
+            entity_name = entity.name
+            kyc_approved_at = (
+                entity.kyc_approved_at.isoformat()
+                if entity.kyc_approved_at
+                else None
             )
-            entity = entity_result.scalar_one_or_none()
-            if entity:
-                entity_name = entity.name
-                kyc_approved_at = (
-                    entity.kyc_approved_at.isoformat()
-                    if entity.kyc_approved_at
-                    else None
-                )
+            balances = (await balance_loader.load(entity.id)).as_dict()
 
         user_data = UserResponse.model_validate(user).model_dump()
         user_data["entity_name"] = entity_name
         user_data["kyc_approved_at"] = kyc_approved_at
+        user_data["balances"] = balances
         user_list.append(user_data)
 
     return {
@@ -1001,8 +1015,9 @@ async def get_user_full_details(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get entity name
+    # Get entity name and balances
     entity_name = None
+    balances = {}
     if user.entity_id:
         entity_result = await db.execute(
             select(Entity).where(Entity.id == user.entity_id)
@@ -1010,6 +1025,7 @@ async def get_user_full_details(
         entity = entity_result.scalar_one_or_none()
         if entity:
             entity_name = entity.name
+            balances = (await EntityBalanceLoader(db).load(entity.id)).as_dict()
 
     # Get auth attempts
     auth_query = (
@@ -1073,6 +1089,7 @@ async def get_user_full_details(
         last_login=user.last_login,
         created_at=user.created_at,
         entity_name=entity_name,
+        **balances,
         password_set=user.password_hash is not None,
         login_count=login_count,
         last_login_ip=last_login_ip,
@@ -1291,60 +1308,73 @@ async def get_activity_logs(
     action: Optional[str] = None,
     page: int = Query(1, ge=1),  # noqa: B008
     per_page: int = Query(50, ge=1, le=100),  # noqa: B008
+    cursor: Optional[str] = Query(  # noqa: B008
+        None, description="next_cursor of the previous page (overrides page)"
+    ),
+    count: str = Query(  # noqa: B008
+        "auto", pattern=COUNT_MODE_PATTERN, description="Total: auto, exact, estimate or none"
+    ),
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
 ):
     """
     Get activity logs with optional filters.
+    Newest first, keyset-paginated on (created_at, id).
     Admin only.
     """
-    query = select(ActivityLog).order_by(ActivityLog.created_at.desc())
+    query = select(ActivityLog)
 
     if user_id:
         query = query.where(ActivityLog.user_id == UUID(user_id))
     if action:
         query = query.where(ActivityLog.action == action)
 
-    # Count total
-    count_query = select(func.count()).select_from(ActivityLog)
-    if user_id:
-        count_query = count_query.where(ActivityLog.user_id == UUID(user_id))
-    if action:
-        count_query = count_query.where(ActivityLog.action == action)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    # Paginate
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    result = await db.execute(query)
-    logs = result.scalars().all()
-
-    # Get user info for each log
-    logs_with_user = []
-    for log in logs:
-        user_result = await db.execute(select(User).where(User.id == log.user_id))
-        user = user_result.scalar_one_or_none()
+    try:
+        result = await paginate(
+            db,
+            query,
+            ActivityLog.created_at,
+            ActivityLog.id,
+            per_page=per_page,
+            page=page,
+            cursor=cursor,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    logs = result.items
+
+    # User emails of the whole page in one query
+    user_ids = {log.user_id for log in logs}
+    emails = {}
+    if user_ids:
+        user_result = await db.execute(
+            select(User.id, User.email).where(User.id.in_(user_ids))
+        )
+        emails = dict(user_result.all())
 
-        log_data = {
+    logs_with_user = [
+        {
             "id": str(log.id),
             "user_id": str(log.user_id),
-            "user_email": user.email if user else None,
+            "user_email": emails.get(log.user_id),
             "action": log.action,
             "details": log.details,
             "ip_address": log.ip_address,
             "created_at": log.created_at.isoformat(),
         }
-        logs_with_user.append(log_data)
+        for log in logs
+    ]
 
     return {
         "data": logs_with_user,
         "pagination": {
             "page": page,
             "per_page": per_page,
-            "total": total,
-            "total_pages": (total + per_page - 1) // per_page if total else 0,
+            "total": result.total,
+            "total_is_estimate": result.total_is_estimate,
+            "total_pages": result.total_pages(per_page),
+            "next_cursor": result.next_cursor,
         },
     }
 
@@ -2027,24 +2057,7 @@ async def send_test_email(
     )
     mail_row = result.scalar_one_or_none()
 
-    mail_cfg = None
-    if mail_row:
-        mail_cfg = {
-            "provider": mail_row.provider.value,
-            "use_env_credentials": mail_row.use_env_credentials,
-            "from_email": mail_row.from_email,
-            "resend_api_key": (
-                mail_row.resend_api_key
-                if not mail_row.use_env_credentials
-                and mail_row.provider == MailProvider.RESEND
-                else None
-            ),
-            "smtp_host": mail_row.smtp_host,
-            "smtp_port": mail_row.smtp_port,
-            "smtp_use_tls": mail_row.smtp_use_tls,
-            "smtp_username": mail_row.smtp_username,
-            "smtp_password": mail_row.smtp_password,
-        }
+    mail_cfg = mail_config_from_row(mail_row) if mail_row else None
 
     success = await email_service.send_test_email(test_email, mail_config=mail_cfg)
     if success:
@@ -2417,29 +2430,11 @@ async def refresh_cea_market(
     """
     import random
     from sqlalchemy import and_
+    from app.services.ladder_service import MAX_ORDERS_PER_LEVEL, LadderService, build_ladder
     from app.services.price_scraper import price_scraper
 
     try:
-        # 1. Cancel all OPEN/PARTIALLY_FILLED CEA_CASH MM orders
-        cancel_result = await db.execute(
-            select(Order).where(
-                and_(
-                    Order.market == MarketType.CEA_CASH,
-                    Order.market_maker_id.isnot(None),
-                    Order.status.in_([OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]),
-                )
-            )
-        )
-        orders_to_cancel = list(cancel_result.scalars().all())
-        orders_cancelled = len(orders_to_cancel)
-
-        for order in orders_to_cancel:
-            order.status = OrderStatus.CANCELLED
-            order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-
-        await db.flush()
-
-        # 2. Fetch scraped CEA price
+        # 1. Fetch scraped CEA price
         prices = await price_scraper.get_current_prices()
         cea_price_raw = Decimal(str(prices["cea"]["price"]))
         # Round to nearest 0.1
@@ -2478,7 +2473,7 @@ async def refresh_cea_market(
         best_bid = mid_price
         best_ask = mid_price + Decimal("0.1")
 
-        # 3. Load market settings for CEA_BID and CEA_ASK
+        # 2. Load market settings for CEA_BID and CEA_ASK
         bid_settings_result = await db.execute(
             select(AutoTradeMarketSettings).where(AutoTradeMarketSettings.market_key == "CEA_BID")
         )
@@ -2492,7 +2487,7 @@ async def refresh_cea_market(
         if not bid_settings or not ask_settings:
             raise HTTPException(status_code=404, detail="CEA_BID or CEA_ASK settings not found")
 
-        # 4. Get active market makers
+        # 3. Get active market makers
         buyer_result = await db.execute(
             select(MarketMakerClient).where(
                 and_(
@@ -2516,138 +2511,60 @@ async def refresh_cea_market(
         if not buyers or not sellers:
             raise HTTPException(status_code=400, detail="No active CEA_BUYER or CEA_SELLER market makers")
 
-        bid_orders_created = 0
-        ask_orders_created = 0
         price_step = Decimal("0.1")
 
-        MAX_ORDERS_PER_LEVEL = 3  # hard cap per price level
-
-        # Helper: random volume uniformly between min_eur and max_eur
-        def random_volume_eur(min_eur, max_eur):
-            """Random EUR value between min and max. Gives true diversity."""
-            lo = float(min_eur) if min_eur else 1.0
-            hi = float(max_eur) if max_eur else lo * 10
-            if hi <= lo:
-                hi = lo * 2
-            return Decimal(str(round(random.uniform(lo, hi), 2)))
-
-        # 5. Create BID orders (from best_bid downward)
-        bid_min_vol = bid_settings.min_order_volume_eur
-        bid_max_vol = bid_settings.max_order_volume_eur
-        bid_target = bid_settings.target_liquidity or Decimal("50000000")
-        bid_max_orders = int(bid_settings.avg_order_count or 200) * 2  # safety cap
-
-        current_price = best_bid
-        orders_at_level = 0
-        max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-        buyer_idx = 0
-        bid_liquidity_eur = Decimal("0")
-
-        for _ in range(bid_max_orders):
-            if current_price <= Decimal("0.1") or bid_liquidity_eur >= bid_target:
-                break
-
-            if orders_at_level >= max_at_this_level:
-                current_price -= price_step
-                current_price = current_price.quantize(Decimal("0.1"))
-                orders_at_level = 0
-                max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-                if current_price <= Decimal("0"):
-                    break
-
-            # Cap max volume by remaining budget
-            remaining = bid_target - bid_liquidity_eur
-            effective_max = min(bid_max_vol, remaining) if bid_max_vol else remaining
-            if effective_max < bid_min_vol:
-                break  # Can't even fit one min-size order
-
-            order_value_eur = random_volume_eur(bid_min_vol, effective_max)
-            quantity = (order_value_eur / current_price).quantize(Decimal("1"))
-            if quantity < 1:
-                quantity = Decimal("1")
-
-            mm = buyers[buyer_idx % len(buyers)]
-            buyer_idx += 1
-
-            order = Order(
-                market=MarketType.CEA_CASH,
-                market_maker_id=mm.id,
-                certificate_type=CertificateType.CEA,
-                side=OrderSide.BUY,
-                price=current_price,
-                quantity=quantity,
-                filled_quantity=Decimal("0"),
-                status=OrderStatus.OPEN,
-            )
-            db.add(order)
-            bid_orders_created += 1
-            orders_at_level += 1
-            bid_liquidity_eur += current_price * quantity
-
-        # 6. Create ASK orders (from best_ask upward)
-        ask_min_vol = ask_settings.min_order_volume_eur
-        ask_max_vol = ask_settings.max_order_volume_eur
-        ask_target = ask_settings.target_liquidity or Decimal("90000000")
-        ask_max_orders = int(ask_settings.avg_order_count or 200) * 2  # safety cap
-
-        current_price = best_ask
-        orders_at_level = 0
-        max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-        seller_idx = 0
-        ask_liquidity_eur = Decimal("0")
-
-        for _ in range(ask_max_orders):
-            if ask_liquidity_eur >= ask_target:
-                break
-
-            if orders_at_level >= max_at_this_level:
-                current_price += price_step
-                current_price = current_price.quantize(Decimal("0.1"))
-                orders_at_level = 0
-                max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-
-            # Cap max volume by remaining budget
-            remaining = ask_target - ask_liquidity_eur
-            effective_max = min(ask_max_vol, remaining) if ask_max_vol else remaining
-            if effective_max < ask_min_vol:
-                break
-
-            order_value_eur = random_volume_eur(ask_min_vol, effective_max)
-            quantity = (order_value_eur / current_price).quantize(Decimal("1"))
-            if quantity < 1:
-                quantity = Decimal("1")
-
-            mm = sellers[seller_idx % len(sellers)]
-            seller_idx += 1
+        # 4. Build BID ladder (from best_bid downward) and ASK ladder (from best_ask upward)
+        bid_ladder = build_ladder(
+            side=OrderSide.BUY,
+            start_price=best_bid,
+            price_step=-price_step,
+            target_liquidity_eur=bid_settings.target_liquidity or Decimal("50000000"),
+            min_volume_eur=bid_settings.min_order_volume_eur,
+            max_volume_eur=bid_settings.max_order_volume_eur,
+            max_orders=int(bid_settings.avg_order_count or 200) * 2,  # safety cap
+            max_orders_per_level=bid_settings.max_orders_per_price_level or MAX_ORDERS_PER_LEVEL,
+            market_maker_ids=[mm.id for mm in buyers],
+            min_price=price_step * 2,  # No BID at or below 0.1 EUR
+        )
+        ask_ladder = build_ladder(
+            side=OrderSide.SELL,
+            start_price=best_ask,
+            price_step=price_step,
+            target_liquidity_eur=ask_settings.target_liquidity or Decimal("90000000"),
+            min_volume_eur=ask_settings.min_order_volume_eur,
+            max_volume_eur=ask_settings.max_order_volume_eur,
+            max_orders=int(ask_settings.avg_order_count or 200) * 2,  # safety cap
+            max_orders_per_level=ask_settings.max_orders_per_price_level or MAX_ORDERS_PER_LEVEL,
+            market_maker_ids=[mm.id for mm in sellers],
+        )
 
-            order = Order(
-                market=MarketType.CEA_CASH,
-                market_maker_id=mm.id,
-                certificate_type=CertificateType.CEA,
-                side=OrderSide.SELL,
-                price=current_price,
-                quantity=quantity,
-                filled_quantity=Decimal("0"),
-                status=OrderStatus.OPEN,
-            )
-            db.add(order)
-            ask_orders_created += 1
-            orders_at_level += 1
-            ask_liquidity_eur += current_price * quantity
+        # 5. Cancel the current MM book and insert the new ladder (set-based)
+        rebuild = await LadderService.rebuild(
+            db,
+            market=MarketType.CEA_CASH,
+            certificate_type=CertificateType.CEA,
+            ladder=bid_ladder + ask_ladder,
+            admin_user_id=current_user.id,
+            summary={
+                "cea_price_eur": str(cea_price),
+                "mid_price_eur": str(mid_price),
+                "price_deviation_pct": str(round(deviation_pct * 100, 1)),
+            },
+        )
 
         await db.commit()
 
         return {
             "success": True,
-            "orders_cancelled": orders_cancelled,
+            "orders_cancelled": rebuild["orders_cancelled"],
             "cea_price_eur": str(cea_price),
-            "new_best_bid": str(best_bid),
             "mid_price_eur": str(mid_price),
             "price_deviation_pct": str(round(deviation_pct * 100, 1)),
             "new_best_bid": str(best_bid),
             "new_best_ask": str(best_ask),
-            "bid_orders_created": bid_orders_created,
-            "ask_orders_created": ask_orders_created,
+            "bid_orders_created": len(bid_ladder),
+            "ask_orders_created": len(ask_ladder),
+            "diff": rebuild["diff"],
         }
 
     except HTTPException:
@@ -2676,31 +2593,12 @@ async def refresh_swap_market(
     - Respects target_liquidity (90M EUR cap), min/max order volume
     - Liquidity measured as: remaining_eua_qty * eua_price_eur
     """
-    import random
     from sqlalchemy import and_
+    from app.services.ladder_service import MAX_ORDERS_PER_LEVEL, LadderService, build_ladder
     from app.services.price_scraper import price_scraper
 
     try:
-        # 1. Cancel all OPEN/PARTIALLY_FILLED SWAP MM orders
-        cancel_result = await db.execute(
-            select(Order).where(
-                and_(
-                    Order.market == MarketType.SWAP,
-                    Order.market_maker_id.isnot(None),
-                    Order.status.in_([OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]),
-                )
-            )
-        )
-        orders_to_cancel = list(cancel_result.scalars().all())
-        orders_cancelled = len(orders_to_cancel)
-
-        for order in orders_to_cancel:
-            order.status = OrderStatus.CANCELLED
-            order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-
-        await db.flush()
-
-        # 2. Fetch scraped prices
+        # 1. Fetch scraped prices
         prices = await price_scraper.get_current_prices()
         cea_price = Decimal(str(prices["cea"]["price"]))
         eua_price = Decimal(str(prices["eua"]["price"]))
@@ -2710,11 +2608,11 @@ async def refresh_swap_market(
 
         base_ratio = (cea_price / eua_price).quantize(Decimal("0.0001"))
 
-        # 3. Structured ratio band: best = base +15%, worst = best -25%
+        # 2. Structured ratio band: best = base +15%, worst = best -25%
         best_ratio = (base_ratio * Decimal("1.15")).quantize(Decimal("0.0001"))
         worst_ratio = (best_ratio * Decimal("0.75")).quantize(Decimal("0.0001"))
 
-        # 4. Load EUA_SWAP market settings
+        # 3. Load EUA_SWAP market settings
         settings_result = await db.execute(
             select(AutoTradeMarketSettings).where(AutoTradeMarketSettings.market_key == "EUA_SWAP")
         )
@@ -2722,7 +2620,7 @@ async def refresh_swap_market(
         if not swap_settings:
             raise HTTPException(status_code=404, detail="EUA_SWAP settings not found")
 
-        # 5. Load active EUA_OFFER market makers
+        # 4. Load active EUA_OFFER market makers
         mm_result = await db.execute(
             select(MarketMakerClient).where(
                 and_(
@@ -2735,83 +2633,54 @@ async def refresh_swap_market(
         if not eua_mms:
             raise HTTPException(status_code=400, detail="No active EUA_OFFER market makers")
 
-        # 6. Create ASK orders from best_ratio DOWNWARD to worst_ratio
+        # 5. Build ASK ladder from best_ratio DOWNWARD to worst_ratio
+        # (EUR volume -> EUA quantity at the scraped EUA price)
         target_liquidity_eur = swap_settings.target_liquidity or Decimal("90000000")
-        min_vol = swap_settings.min_order_volume_eur or Decimal("200000")
-        max_vol = swap_settings.max_order_volume_eur or Decimal("5000000")
-        max_orders = int(swap_settings.avg_order_count or 100) * 2  # safety cap
-        ratio_step = Decimal("0.0001")
-        MAX_ORDERS_PER_LEVEL = 3
-
-        def random_volume_eur(lo, hi):
-            lo_f = float(lo) if lo else 1.0
-            hi_f = float(hi) if hi else lo_f * 10
-            if hi_f <= lo_f:
-                hi_f = lo_f * 2
-            return Decimal(str(round(random.uniform(lo_f, hi_f), 2)))
-
-        current_ratio = best_ratio
-        orders_at_level = 0
-        max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-        mm_idx = 0
-        liquidity_eur = Decimal("0")
-        orders_created = 0
-
-        for _ in range(max_orders):
-            if liquidity_eur >= target_liquidity_eur:
-                break
-            if current_ratio < worst_ratio:
-                break
-
-            if orders_at_level >= max_at_this_level:
-                current_ratio -= ratio_step
-                current_ratio = current_ratio.quantize(Decimal("0.0001"))
-                orders_at_level = 0
-                max_at_this_level = random.randint(1, MAX_ORDERS_PER_LEVEL)
-
-            # Cap max volume by remaining budget
-            remaining = target_liquidity_eur - liquidity_eur
-            effective_max = min(max_vol, remaining) if max_vol else remaining
-            if effective_max < min_vol:
-                break
-
-            order_value_eur = random_volume_eur(min_vol, effective_max)
-            # eua_quantity = volume_eur / eua_price_eur (whole certificates)
-            eua_quantity = (order_value_eur / eua_price).quantize(Decimal("1"))
-            if eua_quantity < 1:
-                eua_quantity = Decimal("1")
-
-            mm = eua_mms[mm_idx % len(eua_mms)]
-            mm_idx += 1
+        ask_ladder = build_ladder(
+            side=OrderSide.SELL,
+            start_price=best_ratio,
+            price_step=-Decimal("0.0001"),
+            target_liquidity_eur=target_liquidity_eur,
+            min_volume_eur=swap_settings.min_order_volume_eur or Decimal("200000"),
+            max_volume_eur=swap_settings.max_order_volume_eur or Decimal("5000000"),
+            max_orders=int(swap_settings.avg_order_count or 100) * 2,  # safety cap
+            max_orders_per_level=swap_settings.max_orders_per_price_level or MAX_ORDERS_PER_LEVEL,
+            market_maker_ids=[mm.id for mm in eua_mms],
+            unit_price_eur=eua_price,
+            min_price=worst_ratio,
+        )
+        liquidity_eur = sum((o.quantity * eua_price for o in ask_ladder), Decimal("0"))
 
-            order = Order(
-                market=MarketType.SWAP,
-                market_maker_id=mm.id,
-                certificate_type=CertificateType.EUA,
-                side=OrderSide.SELL,
-                price=current_ratio,
-                quantity=eua_quantity,
-                filled_quantity=Decimal("0"),
-                status=OrderStatus.OPEN,
-            )
-            db.add(order)
-            orders_created += 1
-            orders_at_level += 1
-            liquidity_eur += eua_quantity * eua_price
+        # 6. Cancel the current MM swap book and insert the new ladder (set-based)
+        rebuild = await LadderService.rebuild(
+            db,
+            market=MarketType.SWAP,
+            certificate_type=CertificateType.EUA,
+            ladder=ask_ladder,
+            admin_user_id=current_user.id,
+            unit_price_eur=eua_price,
+            summary={
+                "cea_price_eur": str(cea_price),
+                "eua_price_eur": str(eua_price),
+                "best_ratio": str(best_ratio),
+                "worst_ratio": str(worst_ratio),
+            },
+        )
 
         await db.commit()
 
         return {
             "success": True,
-            "orders_cancelled": orders_cancelled,
+            "orders_cancelled": rebuild["orders_cancelled"],
             "cea_price_eur": str(cea_price),
             "eua_price_eur": str(eua_price),
             "base_ratio": str(base_ratio),
             "best_ratio": str(best_ratio),
             "worst_ratio": str(worst_ratio),
-            "orders_created": orders_created,
+            "orders_created": rebuild["orders_created"],
             "liquidity_eur": str(liquidity_eur.quantize(Decimal("1"))),
             "target_liquidity_eur": str(target_liquidity_eur),
+            "diff": rebuild["diff"],
         }
 
     except HTTPException:
@@ -4213,6 +4082,153 @@ async def get_admin_pending_settlements(
         raise handle_database_error(e, "get admin pending settlements") from e
 
 
+class BulkSettleRequest(BaseModel):
+    """Batches to settle: explicit ids, or a filter over unsettled batches"""
+    batch_ids: Optional[list[UUID]] = Field(None, max_length=5000)
+    settlement_type: Optional[SettlementType] = None
+    asset_type: Optional[CertificateType] = None
+    entity_id: Optional[UUID] = None
+    status: Optional[SettlementStatus] = None
+    expected_before: Optional[datetime] = None
+    limit: int = Field(500, ge=1, le=5000)
+    chunk_size: int = Field(DEFAULT_CHUNK_SIZE, ge=1, le=1000)
+
+
+def _notify_settled(results: list[FinalizeResult], settled_by: UUID, user_ids_by_entity: dict):
+    """Client and backoffice WebSocket pushes for committed settlements."""
+    for r in results:
+        if r.result != "settled":
+            continue
+        user_ids = user_ids_by_entity.get(r.entity_id)
+        if user_ids:
+            asyncio.create_task(client_ws_manager.broadcast_to_users(
+                user_ids,
+                {
+                    "type": "settlement_updated",
+                    "data": {
+                        "batch_id": str(r.batch_id),
+                        "status": "SETTLED",
+                        "batch_reference": r.batch_reference,
+                    },
+                },
+            ))
+        asyncio.create_task(backoffice_ws_manager.broadcast(
+            "settlement_settled",
+            {
+                "batch_id": str(r.batch_id),
+                "batch_reference": r.batch_reference,
+                "entity_id": str(r.entity_id),
+                "settled_by": str(settled_by),
+            },
+        ))
+    # One balance refresh per entity, however many of its batches settled
+    for entity_id in {r.entity_id for r in results if r.result == "settled"}:
+        user_ids = user_ids_by_entity.get(entity_id)
+        if user_ids:
+            asyncio.create_task(client_ws_manager.broadcast_to_users(
+                user_ids,
+                {"type": "balance_updated", "data": {"source": "settlement_completed"}},
+            ))
+
+
+async def _entity_user_ids(db: AsyncSession, results: list[FinalizeResult]) -> dict:
+    """User ids of each entity with a settled batch (one query, see get_entity_user_ids)."""
+    entity_ids = {r.entity_id for r in results if r.result == "settled"}
+    if not entity_ids:
+        return {}
+    rows = await db.execute(
+        select(User.entity_id, User.id).where(User.entity_id.in_(entity_ids))
+    )
+    user_ids: dict[UUID, list[UUID]] = {}
+    for entity_id, user_id in rows.all():
+        user_ids.setdefault(entity_id, []).append(user_id)
+    return user_ids
+
+
+@router.post("/settlements/settle")
+async def settle_batches_bulk(
+    request: BulkSettleRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_admin_user),
+):
+    """
+    Settle many settlement batches at once (Admin only).
+
+    Takes explicit batch_ids or a filter over unsettled batches (oldest
+    expected settlement first, up to limit). Batches are settled in chunks
+    of chunk_size, each committed on its own: holdings are credited with
+    grouped per-entity deltas and role transitions run once per entity.
+    Returns a result per batch (settled, skipped, locked, not_found, error).
+    """
+    filters = [
+        request.settlement_type, request.asset_type, request.entity_id,
+        request.status, request.expected_before,
+    ]
+    if request.batch_ids is None and all(f is None for f in filters):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide batch_ids or at least one filter",
+        )
+
+    try:
+        if request.batch_ids is not None:
+            batch_ids = request.batch_ids
+        else:
+            query = select(SettlementBatch.id).where(
+                SettlementBatch.status.notin_([SettlementStatus.SETTLED, SettlementStatus.FAILED])
+            )
+            if request.settlement_type:
+                query = query.where(SettlementBatch.settlement_type == request.settlement_type)
+            if request.asset_type:
+                query = query.where(SettlementBatch.asset_type == request.asset_type)
+            if request.entity_id:
+                query = query.where(SettlementBatch.entity_id == request.entity_id)
+            if request.status:
+                query = query.where(SettlementBatch.status == request.status)
+            if request.expected_before:
+                query = query.where(
+                    SettlementBatch.expected_settlement_date < request.expected_before
+                )
+            query = query.order_by(
+                SettlementBatch.expected_settlement_date, SettlementBatch.id
+            ).limit(request.limit)
+            batch_ids = list((await db.execute(query)).scalars().all())
+            # Release the read transaction before the engine takes row locks
+            await db.rollback()
+
+        results, roles_changed = await settle_batches(
+            db,
+            batch_ids,
+            current_user.id,
+            chunk_size=request.chunk_size,
+        )
+
+        try:
+            _notify_settled(results, current_user.id, await _entity_user_ids(db, results))
+        except Exception as ws_err:
+            logger.warning(f"Failed to send settlement WS notification: {ws_err}")
+
+        counts: dict[str, int] = {}
+        for r in results:
+            counts[r.result] = counts.get(r.result, 0) + 1
+        msg = f"Bulk settle: {counts.get('settled', 0)}/{len(results)} batches settled"
+        if roles_changed:
+            msg += f", {roles_changed} user role(s) advanced"
+
+        return {
+            "message": msg,
+            "counts": counts,
+            "roles_changed": roles_changed,
+            "results": [r.as_dict() for r in results],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise handle_database_error(e, "bulk settle batches") from e
+
+
 @router.post("/settlements/{batch_id}/settle")
 async def settle_batch_now(
     batch_id: UUID,
@@ -4223,106 +4239,44 @@ async def settle_batch_now(
     Instantly settle a single settlement batch (Admin only).
 
     - Sets status to SETTLED with audit trail
-    - Credits EntityHolding via finalize_settlement
+    - Credits EntityHolding (settlement_finalizer)
     - Triggers role transitions (CEA_SETTLE→SWAP or EUA_SETTLE→EUA)
     """
     try:
-        result = await db.execute(
-            select(SettlementBatch).where(SettlementBatch.id == batch_id)
+        results, roles_changed = await settle_batches(
+            db,
+            [batch_id],
+            current_user.id,
+            notes="Instant settle by admin (was {old_status})",
         )
-        batch = result.scalar_one_or_none()
+        r = results[0]
 
-        if not batch:
+        if r.result == "not_found":
             raise HTTPException(status_code=404, detail="Settlement batch not found")
-
-        if batch.status in (SettlementStatus.SETTLED, SettlementStatus.FAILED):
+        if r.result == "skipped":
             raise HTTPException(
                 status_code=400,
-                detail=f"Batch already {batch.status.value} — cannot settle"
+                detail=f"Batch already {r.old_status.value} — cannot settle"
             )
+        if r.result == "locked":
+            raise HTTPException(status_code=409, detail=r.message)
+        if r.result == "error":
+            raise HTTPException(status_code=500, detail="Failed to settle batch")
 
-        old_status = batch.status.value
-
-        # 1. Update status to SETTLED
-        batch.status = SettlementStatus.SETTLED
-        batch.actual_settlement_date = datetime.now(timezone.utc).replace(tzinfo=None)
-        batch.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-
-        # 2. Add audit trail
-        db.add(SettlementStatusHistory(
-            settlement_batch_id=batch.id,
-            status=SettlementStatus.SETTLED,
-            notes=f"Instant settle by admin (was {old_status})",
-            updated_by=current_user.id,
-        ))
-
-        # 3. Finalize — credit EntityHolding + create AssetTransaction
-        await SettlementService.finalize_settlement(db, batch, current_user.id)
-
-        # Flush so role transition queries see the SETTLED status
-        await db.flush()
-
-        # 4. Trigger role transitions
-        from ...services.role_transitions import (
-            transition_cea_settle_to_swap_if_all_cea_settled,
-            transition_eua_settle_to_eua_if_all_swap_settled,
-            transition_swap_to_eua_settle_if_cea_zero,
-        )
-
-        entity_id = batch.entity_id
-        roles_changed = 0
-        if batch.settlement_type == SettlementType.CEA_PURCHASE:
-            roles_changed += await transition_cea_settle_to_swap_if_all_cea_settled(
-                db, entity_id
-            )
-        elif batch.settlement_type == SettlementType.SWAP_CEA_TO_EUA:
-            roles_changed += await transition_swap_to_eua_settle_if_cea_zero(
-                db, entity_id
-            )
-            roles_changed += await transition_eua_settle_to_eua_if_all_swap_settled(
-                db, entity_id
-            )
-
-        await db.commit()
-
-        # Notify entity users via WebSocket
         try:
-            user_ids = await get_entity_user_ids(db, entity_id)
-            if user_ids:
-                asyncio.create_task(client_ws_manager.broadcast_to_users(
-                    user_ids,
-                    {
-                        "type": "settlement_updated",
-                        "data": {
-                            "batch_id": str(batch.id),
-                            "status": "SETTLED",
-                            "batch_reference": batch.batch_reference,
-                        },
-                    },
-                ))
-                asyncio.create_task(client_ws_manager.broadcast_to_users(
-                    user_ids,
-                    {"type": "balance_updated", "data": {"source": "settlement_completed"}},
-                ))
-            # Notify backoffice admins
-            asyncio.create_task(backoffice_ws_manager.broadcast(
-                "settlement_settled",
-                {
-                    "batch_id": str(batch.id),
-                    "batch_reference": batch.batch_reference,
-                    "entity_id": str(entity_id),
-                    "settled_by": str(current_user.id),
-                },
-            ))
+            _notify_settled(results, current_user.id, await _entity_user_ids(db, results))
         except Exception as ws_err:
             logger.warning(f"Failed to send settlement WS notification: {ws_err}")
 
-        msg = f"Settlement {batch.batch_reference} settled instantly ({old_status} → SETTLED)"
+        msg = (
+            f"Settlement {r.batch_reference} settled instantly "
+            f"({r.old_status.value} → SETTLED)"
+        )
         if roles_changed:
             msg += f", {roles_changed} user role(s) advanced"
 
         logger.info(msg)
-        return {"message": msg, "batch_reference": batch.batch_reference}
+        return {"message": msg, "batch_reference": r.batch_reference}
 
     except HTTPException:
         raise
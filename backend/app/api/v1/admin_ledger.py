@@ -0,0 +1,50 @@
+"""
+Admin Ledger Reconciliation API
+
+Lists balances that disagree with the AssetTransaction ledger, as found by
+the ledger_reconciliation scheduler job. ADMIN access required.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.database import get_db
+from ...core.security import get_admin_user
+from ...models.models import User
+from ...services.ledger_reconciliation import list_drift
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/ledger", tags=["Ledger"])
+
+
+@router.get("/drift", response_model=List[Dict[str, Any]])
+async def get_ledger_drift(
+    owner_type: Optional[str] = Query(None, pattern="^(entity|market_maker)$"),  # noqa: B008
+    _admin: User = Depends(get_admin_user),  # noqa: B008
+    db: AsyncSession = Depends(get_db),  # noqa: B008
+):
+    """
+    Balances whose actual value differed from the ledger at the last
+    reconciliation run, largest drift first. ADMIN only.
+    """
+    return [
+        {
+            "owner_type": checkpoint.owner_type,
+            "owner_id": str(checkpoint.owner_id),
+            "asset_type": checkpoint.asset_type.value,
+            "balance": float(checkpoint.balance),
+            "ledger_balance": float(checkpoint.balance - checkpoint.drift),
+            "drift": float(checkpoint.drift),
+            "drift_detected_at": (
+                checkpoint.drift_detected_at.isoformat() if checkpoint.drift_detected_at else None
+            ),
+            "last_transaction_at": (
+                checkpoint.last_transaction_at.isoformat() if checkpoint.last_transaction_at else None
+            ),
+        }
+        for checkpoint in await list_drift(db, owner_type)
+    ]
@@ -1,25 +1,65 @@
 """Logging and Audit Trail API endpoints"""
 
 import logging
-from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, desc, func, or_, select
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from ...core.database import get_db
 from ...core.security import get_admin_user
-from ...models.models import Entity, MarketMakerClient, TicketLog, TicketStatus, User
+from ...models.models import TicketLog, TicketStatus, User
 from ...schemas.schemas import TicketLogResponse, TicketLogStats
+from ...services.pagination import COUNT_MODE_PATTERN, Page, paginate
+from ...services.ticket_enrichment import enrich_tickets
+from ...services.ticket_search import SEARCH_MODE_PATTERN, payload_filter, search_filter
+from ...services.ticket_stats import get_ticket_stats
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/logging", tags=["Logging & Audit"])
 
 
+async def _paginate_tickets(
+    db: AsyncSession,
+    query,
+    page: int,
+    per_page: int,
+    cursor: Optional[str],
+    count: str,
+) -> Page:
+    try:
+        return await paginate(
+            db,
+            query,
+            TicketLog.timestamp,
+            TicketLog.id,
+            per_page=per_page,
+            page=page,
+            cursor=cursor,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _tickets_response(
+    tickets_data: List[Any], result: Page, page: int, per_page: int
+) -> Dict[str, Any]:
+    return {
+        "tickets": tickets_data,
+        "total": result.total,
+        "total_is_estimate": result.total_is_estimate,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": result.total_pages(per_page),
+        "next_cursor": result.next_cursor,
+    }
+
+
 @router.get("/tickets", response_model=Dict[str, Any])
 async def list_tickets(
     # Date range filters
@@ -48,12 +88,27 @@ async def list_tickets(
     ),
     # Search filters
     search: Optional[str] = Query(  # noqa: B008
-        None, description="Search in ticket_id, action_type, entity_type"
+        None, description="Search in ticket_id, action_type, entity_type (text mode: also payloads)"
+    ),
+    search_mode: str = Query(  # noqa: B008
+        "contains", pattern=SEARCH_MODE_PATTERN, description="contains, prefix, fuzzy or text"
+    ),
+    payload_key: Optional[str] = Query(  # noqa: B008
+        None, description="Only tickets whose request/response payload has this key"
+    ),
+    payload_value: Optional[str] = Query(  # noqa: B008
+        None, description="Value payload_key must have"
     ),
     tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),  # noqa: B008
     # Pagination
     page: int = Query(1, ge=1),  # noqa: B008
     per_page: int = Query(50, ge=1, le=100),  # noqa: B008
+    cursor: Optional[str] = Query(  # noqa: B008
+        None, description="next_cursor of the previous page (overrides page)"
+    ),
+    count: str = Query(  # noqa: B008
+        "auto", pattern=COUNT_MODE_PATTERN, description="Total: auto, exact, estimate or none"
+    ),
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
 ):
@@ -66,16 +121,13 @@ async def list_tickets(
     - Entity type and ID
     - User or Market Maker
     - Status (SUCCESS/FAILED)
-    - Text search
+    - Text search (substring, prefix, fuzzy, or full-text including payloads)
+    - Payload key (and value) in request_payload/response_data
     - Tags
 
     Returns paginated results with total count.
     """
-    # Build base query with eager loading for user/entity/MM enrichment
-    query = select(TicketLog).options(
-        selectinload(TicketLog.user).selectinload(User.entity),
-        selectinload(TicketLog.market_maker),
-    )
+    query = select(TicketLog)
     filters = []
 
     # Date range filters
@@ -102,16 +154,11 @@ async def list_tickets(
     if status:
         filters.append(TicketLog.status == status)
 
-    # Search filter - search in ticket_id, action_type, entity_type
-    if search:
-        search_pattern = f"%{search}%"
-        filters.append(
-            or_(
-                TicketLog.ticket_id.ilike(search_pattern),
-                TicketLog.action_type.ilike(search_pattern),
-                TicketLog.entity_type.ilike(search_pattern),
-            )
-        )
+    # Search filters (trigram / full-text / JSONB indexed, see ticket_search)
+    if search and search.strip():
+        filters.append(search_filter(search, search_mode))
+    if payload_key:
+        filters.append(payload_filter(payload_key, payload_value))
 
     # Tags filter
     if tags:
@@ -123,74 +170,14 @@ async def list_tickets(
     if filters:
         query = query.where(and_(*filters))
 
-    # Order by timestamp descending (most recent first)
-    query = query.order_by(desc(TicketLog.timestamp))
-
-    # Get total count
-    count_query = select(func.count()).select_from(TicketLog)
-    if filters:
-        count_query = count_query.where(and_(*filters))
-
-    result = await db.execute(count_query)
-    total = result.scalar()
+    # Newest first, keyset-paginated on (timestamp, id)
+    result = await _paginate_tickets(db, query, page, per_page, cursor, count)
+    tickets = result.items
 
-    # Pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    result = await db.execute(query)
-    tickets = result.scalars().all()
-
-    # Build enriched response with user/entity/MM info
-    tickets_data = []
-    for ticket in tickets:
-        base = TicketLogResponse.model_validate(ticket).model_dump()
-        # Enrich with user info
-        user = ticket.user
-        if user:
-            base["user_email"] = user.email
-            base["user_role"] = user.role.value if user.role else None
-            entity = user.entity
-            base["user_company"] = entity.name if entity else None
-            full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
-            base["user_full_name"] = full_name or user.email
-        else:
-            base["user_email"] = None
-            base["user_role"] = None
-            base["user_company"] = None
-            base["user_full_name"] = None
-        # Enrich with market maker info
-        mm = ticket.market_maker
-        base["mm_name"] = mm.name if mm else None
-
-        # For TRADE_EXECUTED tickets, resolve buyer/seller MM names
-        if ticket.action_type == "TRADE_EXECUTED" and ticket.response_data:
-            buyer_mm_id = ticket.response_data.get("buyer_mm_id")
-            seller_mm_id = ticket.response_data.get("seller_mm_id")
-            if buyer_mm_id:
-                bmm = await db.execute(
-                    select(MarketMakerClient.name).where(
-                        MarketMakerClient.id == buyer_mm_id
-                    )
-                )
-                base["buyer_mm_name"] = bmm.scalar()
-            if seller_mm_id:
-                smm = await db.execute(
-                    select(MarketMakerClient.name).where(
-                        MarketMakerClient.id == seller_mm_id
-                    )
-                )
-                base["seller_mm_name"] = smm.scalar()
-
-        tickets_data.append(base)
+    # Enrich with user/entity/MM info (constant number of queries per page)
+    tickets_data = await enrich_tickets(db, tickets)
 
-    return {
-        "tickets": tickets_data,
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": (total + per_page - 1) // per_page if total > 0 else 0,
-    }
+    return _tickets_response(tickets_data, result, page, per_page)
 
 
 @router.get("/tickets/{ticket_id}", response_model=TicketLogResponse)
@@ -235,117 +222,19 @@ async def get_logging_stats(
     - Breakdown by action type
     - Top users by action count
     - Actions over time (daily aggregation)
-    """
-    # Build base query with date filters
-    filters = []
-    if start_date:
-        filters.append(TicketLog.timestamp >= start_date)
-    if end_date:
-        filters.append(TicketLog.timestamp <= end_date)
-
-    # Total actions
-    count_query = select(func.count()).select_from(TicketLog)
-    if filters:
-        count_query = count_query.where(and_(*filters))
-
-    result = await db.execute(count_query)
-    total_actions = result.scalar()
-
-    # Success/failure counts
-    success_query = (
-        select(func.count())
-        .select_from(TicketLog)
-        .where(TicketLog.status == TicketStatus.SUCCESS)
-    )
-    failed_query = (
-        select(func.count())
-        .select_from(TicketLog)
-        .where(TicketLog.status == TicketStatus.FAILED)
-    )
 
-    if filters:
-        success_query = success_query.where(and_(*filters))
-        failed_query = failed_query.where(and_(*filters))
-
-    result = await db.execute(success_query)
-    success_count = result.scalar()
-
-    result = await db.execute(failed_query)
-    failed_count = result.scalar()
-
-    # Breakdown by action type
-    action_type_query = (
-        select(TicketLog.action_type, func.count().label("count"))
-        .group_by(TicketLog.action_type)
-        .order_by(desc("count"))
-    )
-
-    if filters:
-        action_type_query = action_type_query.where(and_(*filters))
-
-    result = await db.execute(action_type_query)
-    by_action_type = {row.action_type: row.count for row in result}
-
-    # Top users by action count (join with Entity for company name)
-    user_query = (
-        select(
-            TicketLog.user_id,
-            User.email,
-            Entity.name.label("company_name"),
-            func.count().label("action_count"),
-        )
-        .join(User, TicketLog.user_id == User.id, isouter=True)
-        .join(Entity, User.entity_id == Entity.id, isouter=True)
-        .group_by(TicketLog.user_id, User.email, Entity.name)
-        .order_by(desc("action_count"))
-        .limit(10)
-    )
-
-    if filters:
-        user_query = user_query.where(and_(*filters))
-
-    result = await db.execute(user_query)
-    by_user = [
-        {
-            "user_id": str(row.user_id) if row.user_id else None,
-            "email": row.email,
-            "company_name": row.company_name,
-            "action_count": row.action_count,
-        }
-        for row in result
-    ]
-
-    # Actions over time (daily aggregation for last 30 days if no date range specified)
-    # Use naive UTC for DB query
-    if not start_date:
-        time_start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=30)
-    else:
-        time_start = start_date
-
-    time_query = (
-        select(
-            func.date(TicketLog.timestamp).label("date"), func.count().label("count")
-        )
-        .where(TicketLog.timestamp >= time_start)
-        .group_by(func.date(TicketLog.timestamp))
-        .order_by("date")
-    )
-
-    if end_date:
-        time_query = time_query.where(TicketLog.timestamp <= end_date)
-
-    result = await db.execute(time_query)
-    actions_over_time = [
-        {"date": row.date.isoformat(), "count": row.count} for row in result
-    ]
+    Read from the daily ticket rollups plus a live count of tickets since the
+    last compaction (see ticket_stats), so the cost does not grow with the log.
+    """
+    stats = await get_ticket_stats(db, start_date, end_date)
 
     return TicketLogStats(
-        total_actions=total_actions,
-        success_count=success_count,
-        failed_count=failed_count,
-        by_action_type=by_action_type,
-        by_user=by_user,
-        actions_over_time=actions_over_time,
+        total_actions=stats.total_actions,
+        success_count=stats.success_count,
+        failed_count=stats.failed_count,
+        by_action_type=stats.by_action_type,
+        by_user=stats.by_user,
+        actions_over_time=stats.actions_over_time,
     )
 
 
@@ -357,6 +246,12 @@ async def list_market_maker_actions(
     status: Optional[TicketStatus] = Query(None, description="Filter by status"),  # noqa: B008
     page: int = Query(1, ge=1),  # noqa: B008
     per_page: int = Query(50, ge=1, le=100),  # noqa: B008
+    cursor: Optional[str] = Query(  # noqa: B008
+        None, description="next_cursor of the previous page (overrides page)"
+    ),
+    count: str = Query(  # noqa: B008
+        "auto", pattern=COUNT_MODE_PATTERN, description="Total: auto, exact, estimate or none"
+    ),
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
 ):
@@ -382,30 +277,13 @@ async def list_market_maker_actions(
 
     # Apply filters
     query = query.where(and_(*filters))
-    query = query.order_by(desc(TicketLog.timestamp))
 
-    # Get total count
-    count_query = select(func.count()).select_from(TicketLog).where(and_(*filters))
-    result = await db.execute(count_query)
-    total = result.scalar()
-
-    # Pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    result = await db.execute(query)
-    tickets = result.scalars().all()
+    result = await _paginate_tickets(db, query, page, per_page, cursor, count)
 
     # Convert to response format
-    tickets_data = [TicketLogResponse.model_validate(ticket) for ticket in tickets]
+    tickets_data = [TicketLogResponse.model_validate(ticket) for ticket in result.items]
 
-    return {
-        "tickets": tickets_data,
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": (total + per_page - 1) // per_page if total > 0 else 0,
-    }
+    return _tickets_response(tickets_data, result, page, per_page)
 
 
 @router.get("/failed-actions", response_model=Dict[str, Any])
@@ -416,6 +294,12 @@ async def list_failed_actions(
     entity_type: Optional[str] = Query(None, description="Filter by entity type"),  # noqa: B008
     page: int = Query(1, ge=1),  # noqa: B008
     per_page: int = Query(50, ge=1, le=100),  # noqa: B008
+    cursor: Optional[str] = Query(  # noqa: B008
+        None, description="next_cursor of the previous page (overrides page)"
+    ),
+    count: str = Query(  # noqa: B008
+        "auto", pattern=COUNT_MODE_PATTERN, description="Total: auto, exact, estimate or none"
+    ),
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
 ):
@@ -440,27 +324,10 @@ async def list_failed_actions(
 
     # Apply filters
     query = select(TicketLog).where(and_(*filters))
-    query = query.order_by(desc(TicketLog.timestamp))
-
-    # Get total count
-    count_query = select(func.count()).select_from(TicketLog).where(and_(*filters))
-    result = await db.execute(count_query)
-    total = result.scalar()
 
-    # Pagination
-    offset = (page - 1) * per_page
-    query = query.offset(offset).limit(per_page)
-
-    result = await db.execute(query)
-    tickets = result.scalars().all()
+    result = await _paginate_tickets(db, query, page, per_page, cursor, count)
 
     # Convert to response format
-    tickets_data = [TicketLogResponse.model_validate(ticket) for ticket in tickets]
+    tickets_data = [TicketLogResponse.model_validate(ticket) for ticket in result.items]
 
-    return {
-        "tickets": tickets_data,
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": (total + per_page - 1) // per_page if total > 0 else 0,
-    }
+    return _tickets_response(tickets_data, result, page, per_page)
@@ -0,0 +1,36 @@
+"""
+Admin Background Scheduler API
+
+Shows which worker holds the scheduler leader lease and when each periodic
+job last ran. ADMIN access required.
+"""
+
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ...core.security import get_admin_user
+from ...models.models import User
+from ...services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/scheduler", tags=["Scheduler"])
+
+
+@router.get("/status", response_model=Dict[str, Any])
+async def get_scheduler_status(
+    _admin: User = Depends(get_admin_user),  # noqa: B008
+):
+    """
+    Get the current scheduler lease holder and last-run times per job.
+    ADMIN only.
+    """
+    try:
+        return await scheduler.status()
+    except Exception as e:
+        logger.error(f"Scheduler status unavailable: {e}")
+        raise HTTPException(
+            status_code=503, detail="Scheduler status unavailable (Redis unreachable)"
+        ) from e
@@ -11,6 +11,7 @@ from fastapi import (
     Depends,
     HTTPException,
     Query,
+    Response,
     WebSocket,
     WebSocketDisconnect,
 )
@@ -35,6 +36,7 @@ from ...models.models import (
     HoldType,
     KYCDocument,
     KYCStatus,
+    MarketType,
     TicketStatus,
     Trade,
     TransactionType,
@@ -54,8 +56,12 @@ from ...schemas.schemas import (
     MessageResponse,
     UserApprovalRequest,
 )
+from ...services import eur_reservations
 from ...services.email_service import email_service
-from ...services.balance_utils import get_entity_eur_balance, update_entity_balance
+from ...services.order_matching import get_effective_fee_rate
+from ...services.pagination import paginate
+from ...services.balance_loader import EntityBalanceLoader, get_balance_loader
+from ...services.balance_utils import update_entity_balance
 from ...services.ticket_service import TicketService
 from ...services.ws_utils import get_entity_user_ids
 
@@ -1000,6 +1006,7 @@ async def get_entity_balance(
     entity_id: str,
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
+    balance_loader: EntityBalanceLoader = Depends(get_balance_loader),  # noqa: B008
 ):
     """
     Get an entity's balance and deposit history.
@@ -1020,10 +1027,12 @@ async def get_entity_balance(
         )
     )
     deposit_count = deposit_count_result.scalar()
+    balances = await balance_loader.load(entity.id)
 
     return {
         "entity_id": str(entity.id),
         "entity_name": entity.name,
+        **balances.as_dict(),
         "balance_amount": float(entity.balance_amount or 0),
         "balance_currency": entity.balance_currency.value
         if entity.balance_currency
@@ -1107,12 +1116,15 @@ async def add_asset_to_entity(
     }
     model_asset_type = asset_type_map[asset_request.asset_type]
 
-    # Get or create EntityHolding record
+    # Get or create EntityHolding record; locked so reservations by open
+    # orders can't change between the availability check and the update
     holding_result = await db.execute(
-        select(EntityHolding).where(
+        select(EntityHolding)
+        .where(
             EntityHolding.entity_id == UUID(entity_id),
             EntityHolding.asset_type == model_asset_type,
         )
+        .with_for_update()
     )
     holding = holding_result.scalar_one_or_none()
 
@@ -1139,15 +1151,17 @@ async def add_asset_to_entity(
     is_withdraw = asset_request.operation == "withdraw"
 
     if is_withdraw:
+        # Only what open orders don't reserve can be withdrawn
+        available = balance_before - Decimal(str(holding.reserved or 0))
         # For CEA/EUA, the displayed balance is floor(actual), so if the user
         # withdraws the full displayed amount, it may be slightly more than the
         # fractional holding (e.g. withdraw 608808 when holding is 608807.89).
         # In that case, withdraw the entire actual balance instead of failing.
         if model_asset_type in (AssetType.CEA, AssetType.EUA):
-            displayed_balance = Decimal(str(int(float(balance_before))))
-            if amount_abs == displayed_balance or amount_abs >= balance_before:
-                # Full withdrawal — drain the actual holding (including dust)
-                amount_debit = -balance_before
+            displayed_balance = Decimal(str(int(float(available))))
+            if amount_abs == displayed_balance or amount_abs >= available:
+                # Full withdrawal — drain the available holding (including dust)
+                amount_debit = -available
             elif amount_abs > displayed_balance:
                 raise HTTPException(
                     status_code=400, detail="Insufficient balance"
@@ -1156,7 +1170,7 @@ async def add_asset_to_entity(
                 amount_debit = -amount_abs
         else:
             amount_debit = -amount_abs
-            if balance_before + amount_debit < 0:
+            if available + amount_debit < 0:
                 raise HTTPException(
                     status_code=400, detail="Insufficient balance"
                 )
@@ -1258,6 +1272,7 @@ async def get_entity_assets(
     entity_id: str,
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
+    balance_loader: EntityBalanceLoader = Depends(get_balance_loader),  # noqa: B008
 ):
     """
     Get all asset balances for an entity (EUR, CEA, EUA) plus recent_transactions
@@ -1271,25 +1286,8 @@ async def get_entity_assets(
     if not entity:
         raise HTTPException(status_code=404, detail="Entity not found")
 
-    # Get all holdings
-    holdings_result = await db.execute(
-        select(EntityHolding).where(EntityHolding.entity_id == UUID(entity_id))
-    )
-    holdings = holdings_result.scalars().all()
-
-    # Build balance map
-    balances = {
-        AssetType.EUR: Decimal("0"),
-        AssetType.CEA: Decimal("0"),
-        AssetType.EUA: Decimal("0"),
-    }
-    for h in holdings:
-        balances[h.asset_type] = h.quantity
-
-    # Use shared EUR logic (EntityHolding + Entity.balance_amount fallback); pass entity and eur to avoid extra queries
-    balances[AssetType.EUR] = await get_entity_eur_balance(
-        db, UUID(entity_id), entity=entity, eur_holding_quantity=balances[AssetType.EUR]
-    )
+    # All holdings in one query (EUR: EntityHolding + Entity.balance_amount fallback)
+    balances = await balance_loader.load(entity.id)
 
     # Get recent transactions (limit aligned with frontend unified history cap)
     RECENT_ASSET_TRANSACTIONS_LIMIT = 50
@@ -1307,9 +1305,7 @@ async def get_entity_assets(
     return EntityAssetsResponse(
         entity_id=UUID(entity_id),
         entity_name=entity.name,
-        eur_balance=float(balances[AssetType.EUR]),
-        cea_balance=int(float(balances[AssetType.CEA])),
-        eua_balance=int(float(balances[AssetType.EUA])),
+        **balances.as_dict(),
         recent_transactions=[
             AssetTransactionResponse(
                 id=t.id,
@@ -1332,13 +1328,18 @@ async def get_entity_assets(
 @router.get("/entities/{entity_id}/transactions")
 async def get_entity_transactions(
     entity_id: str,
+    response: Response,
     asset_type: Optional[AssetTypeEnum] = None,
-    limit: int = Query(50, le=100),  # noqa: B008
+    limit: int = Query(50, ge=1, le=100),  # noqa: B008
+    cursor: Optional[str] = Query(  # noqa: B008
+        None, description="X-Next-Cursor header of the previous page"
+    ),
     admin_user: User = Depends(get_admin_user),  # noqa: B008
     db: AsyncSession = Depends(get_db),  # noqa: B008
 ):
     """
-    Get transaction history for an entity.
+    Get transaction history for an entity, newest first.
+    Older pages are read with the cursor from the X-Next-Cursor response header.
     Admin only.
     """
     # Validate entity exists
@@ -1361,10 +1362,21 @@ async def get_entity_transactions(
         }
         query = query.where(AssetTransaction.asset_type == asset_type_map[asset_type])
 
-    query = query.order_by(AssetTransaction.created_at.desc()).limit(limit)
-
-    result = await db.execute(query)
-    transactions = result.scalars().all()
+    try:
+        page = await paginate(
+            db,
+            query,
+            AssetTransaction.created_at,
+            AssetTransaction.id,
+            per_page=limit,
+            cursor=cursor,
+            count="none",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    transactions = page.items
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
 
     def _amt(v, at) -> float:
         return int(round(float(v))) if at in (AssetType.CEA, AssetType.EUA) else float(v)
@@ -1468,7 +1480,7 @@ async def update_asset_balance(
         entity_id=UUID(entity_id),
         asset_type=model_asset_type,
         transaction_type=TransactionType.ADJUSTMENT,
-        amount=abs(delta),
+        amount=delta,  # Signed, like every ledger row
         balance_before=balance_before,
         balance_after=new_balance,
         reference=request.reference,
@@ -1604,6 +1616,7 @@ async def admin_cancel_order(
     order.status = ModelOrderStatus.CANCELLED
     # Use naive UTC for TIMESTAMP WITHOUT TIME ZONE (asyncpg)
     order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    await eur_reservations.release_order(db, order)
 
     await db.commit()
 
@@ -1639,34 +1652,52 @@ async def admin_update_order(
             detail=f"Can only update OPEN orders. Current status: {order.status.value}",
         )
 
+    new_price = order.price
+    new_quantity = order.quantity
+
     # Update price if provided
     if "price" in update and update["price"] is not None:
-        new_price = float(update["price"])
-        if new_price <= 0:
+        price = float(update["price"])
+        if price <= 0:
             raise HTTPException(status_code=400, detail="Price must be greater than 0")
-        order.price = Decimal(str(new_price))
+        new_price = Decimal(str(price))
 
     # Update quantity if provided (CEA cash market: whole certificates only)
     if "quantity" in update and update["quantity"] is not None:
-        new_quantity = float(update["quantity"])
-        if new_quantity <= 0:
+        quantity = float(update["quantity"])
+        if quantity <= 0:
             raise HTTPException(
                 status_code=400, detail="Quantity must be greater than 0"
             )
-        if new_quantity != int(round(new_quantity)):
+        if quantity != int(round(quantity)):
             raise HTTPException(
                 status_code=400,
                 detail="CEA quantity must be a whole number (no fractional certificates)",
             )
-        quantity_int = int(round(new_quantity))
+        quantity_int = int(round(quantity))
         if quantity_int < float(order.filled_quantity):
             filled = float(order.filled_quantity)
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot reduce quantity below filled amount ({filled})",
             )
-        order.quantity = Decimal(str(quantity_int))
+        new_quantity = Decimal(str(quantity_int))
+
+    # Resize the EUR reservation before the price / quantity change
+    if eur_reservations.holds_reservation(order):
+        fee_rate = await get_effective_fee_rate(
+            db, MarketType.CEA_CASH, "BID", order.entity_id
+        )
+        try:
+            await eur_reservations.reprice_reservation(
+                db, order, new_price, fee_rate, admin_user.id, new_quantity=new_quantity
+            )
+        except eur_reservations.InsufficientEURError as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=str(e)) from e
 
+    order.price = new_price
+    order.quantity = new_quantity
     # Use naive UTC for TIMESTAMP WITHOUT TIME ZONE (asyncpg)
     order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
@@ -10,7 +10,7 @@ import logging
 import uuid
 
 logger = logging.getLogger(__name__)
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from decimal import Decimal, ROUND_DOWN
 from typing import List, Optional
 
@@ -38,6 +38,7 @@ from ...models.models import (
     AssetType,
     CashMarketTrade,
     Entity,
+    EntityHolding,
     MarketMakerClient,
     MarketType,
     Order,
@@ -69,6 +70,7 @@ from ...schemas.schemas import (
     OrderSide,
 )
 from ..v1.client_ws import client_ws_manager
+from ...services import eur_reservations
 from ...services.balance_utils import get_entity_eur_balance
 from ...services.order_matching import (
     DEFAULT_FEE_RATE,
@@ -184,43 +186,14 @@ async def get_market_stats(
     """
     orderbook = await get_real_orderbook(db, certificate_type.value)
 
-    # Get 24h trade stats from database - use naive UTC for DB query
-    cert_enum = CertTypeEnum.CEA if certificate_type.value == "CEA" else CertTypeEnum.EUA
-    yesterday = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=24)
-
-    result = await db.execute(
-        select(CashMarketTrade)
-        .where(
-            and_(
-                CashMarketTrade.certificate_type == cert_enum,
-                CashMarketTrade.executed_at >= yesterday,
-            )
-        )
-    )
-    trades_24h = result.scalars().all()
-
-    # Calculate real stats
-    if trades_24h:
-        prices = [float(t.price) for t in trades_24h]
-        volumes = [float(t.quantity) for t in trades_24h]
-        high_24h = max(prices)
-        low_24h = min(prices)
-        volume_24h = sum(volumes)
-        # Change calculation: compare last trade to first trade in 24h
-        change_24h = round(((prices[0] - prices[-1]) / prices[-1]) * 100, 2) if len(prices) > 1 else 0.0
-    else:
-        high_24h = orderbook["last_price"]
-        low_24h = orderbook["last_price"]
-        volume_24h = 0
-        change_24h = 0.0
-
+    # get_real_orderbook already resolved 24h stats from the rolling window
     return MarketStatsResponse(
         certificate_type=certificate_type.value,
         last_price=orderbook["last_price"],
-        change_24h=change_24h,
-        high_24h=high_24h,
-        low_24h=low_24h,
-        volume_24h=int(round(volume_24h)) if trades_24h else 0,
+        change_24h=orderbook["change_24h"],
+        high_24h=orderbook["high_24h"],
+        low_24h=orderbook["low_24h"],
+        volume_24h=orderbook["volume_24h"],
         total_bids=len(orderbook["bids"]),
         total_asks=len(orderbook["asks"]),
     )
@@ -280,6 +253,17 @@ async def place_order(
         )
 
         db.add(new_order)
+
+        # Client BUY orders hold their EUR (incl. fee) until filled or cancelled
+        if not is_market_maker and new_order.side == OrderSideEnum.BUY:
+            fee_rate = await get_effective_fee_rate(
+                db, MarketType.CEA_CASH, "BID", current_user.entity_id
+            )
+            try:
+                await eur_reservations.reserve_for_order(db, new_order, fee_rate, current_user.id)
+            except eur_reservations.InsufficientEURError as e:
+                raise HTTPException(status_code=400, detail=str(e)) from e
+
         await db.flush()  # Get order ID before ticket creation
 
         # Create audit ticket for order placement
@@ -462,6 +446,7 @@ async def cancel_order(
     order.status = OrderStatus.CANCELLED
     # Use naive UTC for TIMESTAMP WITHOUT TIME ZONE (asyncpg)
     order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    await eur_reservations.release_order(db, order)
 
     # Create audit ticket for order cancellation
     ticket = await TicketService.create_ticket(
@@ -542,9 +527,23 @@ async def modify_order_price(
         "status": order.status.value,
     }
 
+    # Resize the EUR reservation before the price changes
+    new_price = Decimal(str(request.new_price))
+    if eur_reservations.holds_reservation(order):
+        fee_rate = await get_effective_fee_rate(
+            db, MarketType.CEA_CASH, "BID", order.entity_id
+        )
+        try:
+            await eur_reservations.reprice_reservation(
+                db, order, new_price, fee_rate, current_user.id
+            )
+        except eur_reservations.InsufficientEURError as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
     # Update the price
     old_price = float(order.price)
-    order.price = Decimal(str(request.new_price))
+    order.price = new_price
     # Use naive UTC for TIMESTAMP WITHOUT TIME ZONE (asyncpg)
     order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
@@ -870,12 +869,19 @@ async def get_user_balances(
         }
 
     eur_balance = await get_entity_eur_balance(db, current_user.entity_id)
+    eur_reserved = await db.scalar(
+        select(EntityHolding.reserved).where(
+            EntityHolding.entity_id == current_user.entity_id,
+            EntityHolding.asset_type == AssetType.EUR,
+        )
+    )
     cea_balance = await get_entity_balance(db, current_user.entity_id, AssetType.CEA)
     eua_balance = await get_entity_balance(db, current_user.entity_id, AssetType.EUA)
 
     return {
         "entity_id": str(current_user.entity_id),
         "eur_balance": float(eur_balance),
+        "eur_reserved": float(eur_reserved or 0),
         "cea_balance": int(float(cea_balance)),
         "eua_balance": int(float(eua_balance)),
     }
@@ -38,8 +38,11 @@ from ...schemas.schemas import (
     MarketMakerUpdate,
     ResetPasswordRequest,
 )
+from ...services.ledger_reconciliation import MARKET_MAKER, reset_checkpoints
+from ...services.market_maker_balances import get_balances_bulk, recompute_balances
 from ...services.market_maker_service import MarketMakerService
 from ...services.ticket_service import TicketService
+from ...services.ticket_stats import remove_from_rollups
 from ...services.auto_trade_executor import fill_spread_with_orders, AutoTradeExecutor
 from ...models.models import MarketType
 
@@ -74,10 +77,11 @@ async def list_market_makers(
     market_makers = result.scalars().all()
 
     # Enrich with balances and stats
+    all_balances = await get_balances_bulk(db, [mm.id for mm in market_makers])
     response = []
     for mm in market_makers:
         # Get balances
-        balances = await MarketMakerService.get_balances(db, mm.id)
+        balances = all_balances[mm.id]
 
         # Format balances for response
         formatted_balances = {
@@ -349,14 +353,16 @@ async def reset_all_market_makers(
         Order.__table__.delete().where(Order.market_maker_id.in_(mm_ids))
     )
 
-    # 3. Delete asset transactions for all MMs
+    # 3. Delete asset transactions for all MMs (and restart their ledger checkpoints)
     await db.execute(
         AssetTransaction.__table__.delete().where(
             AssetTransaction.market_maker_id.in_(mm_ids)
         )
     )
+    await reset_checkpoints(db, MARKET_MAKER, mm_ids)
 
-    # 4. Delete ticket logs for MM-related tickets
+    # 4. Delete ticket logs for MM-related tickets (and their dashboard rollup counts)
+    await remove_from_rollups(db, TicketLog.market_maker_id.in_(mm_ids))
     await db.execute(
         TicketLog.__table__.delete().where(TicketLog.market_maker_id.in_(mm_ids))
     )
@@ -367,6 +373,7 @@ async def reset_all_market_makers(
         .where(MarketMakerClient.id.in_(mm_ids))
         .values(eur_balance=0)
     )
+    await recompute_balances(db, mm_ids)
 
     await db.commit()
 
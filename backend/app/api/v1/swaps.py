@@ -9,12 +9,12 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
 from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.database import get_db
 from ...core.security import get_swap_user
 from ...models.models import (
+    AssetTransaction,
     AssetType,
     CertificateType,
     EntityHolding,
@@ -30,8 +30,10 @@ from ...models.models import (
     SettlementType,
     SwapRequest,
     SwapStatus,
+    TransactionType,
     User,
 )
+from ...services.market_maker_balances import get_balances_bulk, recompute_balances
 from ...services.market_maker_service import MarketMakerService
 from ...services.price_scraper import price_scraper
 from ...services.settlement_service import SettlementService
@@ -530,6 +532,10 @@ async def reset_swap_liquidity(
             updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
         )
     )
+    # Bulk update bypasses the flush hook: rebuild the MMs' locked EUA
+    await recompute_balances(
+        db, {o.market_maker_id for o in orders_to_delete if o.market_maker_id}
+    )
 
     await db.commit()
 
@@ -588,10 +594,11 @@ async def create_swap_offers_batch(
             )
         mm_required_balance[mm_id] = mm_required_balance.get(mm_id, 0) + offer.eua_quantity
 
-    # Check balances using MarketMakerService
+    # Check balances (one read for all MMs in the batch)
+    all_balances = await get_balances_bulk(db, [UUID(mm_id) for mm_id in mm_required_balance])
     for mm_id, required in mm_required_balance.items():
         mm = mms[mm_id]
-        balances = await MarketMakerService.get_balances(db, UUID(mm_id))
+        balances = all_balances[UUID(mm_id)]
         eua_available = balances.get("EUA", {}).get("available", 0)
 
         if float(eua_available) < required:
@@ -959,7 +966,21 @@ async def execute_swap(
     # the raw decimal (e.g. 301983 vs 301982.51). Clamp to zero to avoid
     # tiny negative balances from rounding.
     new_cea = float(cea_holding.quantity) - cea_quantity
+    cea_before = cea_holding.quantity
     cea_holding.quantity = Decimal("0") if new_cea < 0 else Decimal(str(new_cea))
+    db.add(
+        AssetTransaction(
+            entity_id=current_user.entity_id,
+            asset_type=AssetType.CEA,
+            transaction_type=TransactionType.TRADE_SELL,
+            amount=cea_holding.quantity - cea_before,
+            balance_before=cea_before,
+            balance_after=cea_holding.quantity,
+            reference=str(swap.id),
+            notes=f"Swap {cea_quantity} CEA to EUA",
+            created_by=current_user.id,
+        )
+    )
 
     # Get current EUA price for settlement value calculation
     prices = await price_scraper.get_current_prices()
@@ -971,40 +992,24 @@ async def execute_swap(
         hour=0, minute=0, second=0, microsecond=0, tzinfo=None
     ) + timedelta(days=14)
 
-    # Retry with savepoint to handle rare batch_reference collisions
-    max_attempts = 3
-    settlement = None
-    for attempt in range(max_attempts):
-        batch_reference = await SettlementService.generate_batch_reference(
-            db, SettlementType.SWAP_CEA_TO_EUA, CertificateType.EUA
-        )
-
-        settlement = SettlementBatch(
-            entity_id=current_user.entity_id,
-            batch_reference=batch_reference,
-            settlement_type=SettlementType.SWAP_CEA_TO_EUA,
-            asset_type=CertificateType.EUA,
-            quantity=Decimal(str(eua_output)),
-            price=Decimal(str(eua_price)),
-            total_value_eur=Decimal(str(eua_output * eua_price)),
-            status=SettlementStatus.PENDING,
-            expected_settlement_date=expected_settlement,
-            notes=f"Swap {cea_quantity:.2f} CEA → {eua_output:.2f} EUA at avg rate {weighted_avg_ratio:.4f}. Matched {len(matched_orders)} orders.",
-        )
+    batch_reference = await SettlementService.generate_batch_reference(
+        db, SettlementType.SWAP_CEA_TO_EUA, CertificateType.EUA
+    )
 
-        try:
-            async with db.begin_nested():
-                db.add(settlement)
-                await db.flush()
-            break  # Success
-        except IntegrityError:
-            if attempt < max_attempts - 1:
-                logger.warning(
-                    f"batch_reference collision on {batch_reference}, "
-                    f"retrying (attempt {attempt + 1}/{max_attempts})"
-                )
-                continue
-            raise
+    settlement = SettlementBatch(
+        entity_id=current_user.entity_id,
+        batch_reference=batch_reference,
+        settlement_type=SettlementType.SWAP_CEA_TO_EUA,
+        asset_type=CertificateType.EUA,
+        quantity=Decimal(str(eua_output)),
+        price=Decimal(str(eua_price)),
+        total_value_eur=Decimal(str(eua_output * eua_price)),
+        status=SettlementStatus.PENDING,
+        expected_settlement_date=expected_settlement,
+        notes=f"Swap {cea_quantity:.2f} CEA → {eua_output:.2f} EUA at avg rate {weighted_avg_ratio:.4f}. Matched {len(matched_orders)} orders.",
+    )
+    db.add(settlement)
+    await db.flush()
 
     # Add initial status history
     history_entry = SettlementStatusHistory(
@@ -0,0 +1,153 @@
+"""
+On-Commit Hooks
+
+Services that react to committed writes (cache invalidation, cross-worker
+events) register a hook for the models they watch instead of each adding
+their own Session listeners:
+
+    on_commit("mail_config", MailConfig, publish=invalidate_mail_config)
+    on_commit("market_stats", CashMarketTrade, collect=trade_fills, publish=record_fills)
+
+One after_flush listener walks session.new / dirty / deleted once and hands
+every hook the flushed objects of its model types. collect(new, dirty,
+deleted) turns them into plain values while the objects are still loaded;
+a hook without collect only needs to know that one of its models was written.
+
+After the outermost commit each hook's publish() runs once, with everything
+collected since the transaction began (publish(items)), or without arguments
+when the hook has no collect. A publish that returns a coroutine is scheduled
+on the running event loop.
+
+What a flush collects belongs to the innermost savepoint open at that time:
+rolling the savepoint back (or any savepoint enclosing it) discards it, and a
+rolled-back transaction publishes nothing.
+"""
+
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "commit_hooks_pending"  # session.info: [(savepoint, hook name, items)]
+
+Collect = Callable[[List[Any], List[Any], List[Any]], Iterable[Any]]
+
+
+@dataclass
+class _Hook:
+    name: str
+    types: Tuple[type, ...]
+    publish: Callable[..., Any]
+    collect: Optional[Collect] = None
+
+
+_hooks: Dict[str, _Hook] = {}
+_hooks_by_class: Dict[type, List[_Hook]] = {}
+
+
+def on_commit(
+    name: str,
+    *types: type,
+    publish: Callable[..., Any],
+    collect: Optional[Collect] = None,
+) -> None:
+    """
+    Run publish after commits that flushed objects of `types` (see module
+    docstring). Registering a name again replaces its hook.
+    """
+    _hooks[name] = _Hook(name, tuple(types), publish, collect)
+    _hooks_by_class.clear()
+
+
+def _hooks_for(cls: type) -> List[_Hook]:
+    hooks = _hooks_by_class.get(cls)
+    if hooks is None:
+        hooks = _hooks_by_class[cls] = [h for h in _hooks.values() if issubclass(cls, h.types)]
+    return hooks
+
+
+def _schedule(awaitable) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        return
+    loop.create_task(awaitable)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context) -> None:
+    if not _hooks:
+        return
+    flushed: Dict[str, Tuple[list, list, list]] = {}
+    for i, objects in enumerate((session.new, session.dirty, session.deleted)):
+        for obj in objects:
+            for hook in _hooks_for(type(obj)):
+                flushed.setdefault(hook.name, ([], [], []))[i].append(obj)
+    if not flushed:
+        return
+
+    savepoint = session.get_nested_transaction()
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for name, (new, dirty, deleted) in flushed.items():
+        hook = _hooks[name]
+        items = list(hook.collect(new, dirty, deleted)) if hook.collect else []
+        if hook.collect and not items:
+            continue
+        pending.append((savepoint, name, items))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    if session.in_nested_transaction():
+        return  # Savepoint release; wait for the outer commit
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    items_by_hook: Dict[str, list] = {}
+    for _, name, items in pending:
+        items_by_hook.setdefault(name, []).extend(items)
+    for name, items in items_by_hook.items():
+        hook = _hooks.get(name)
+        if hook is None:
+            continue
+        try:
+            result = hook.publish(items) if hook.collect else hook.publish()
+        except Exception as e:
+            logger.warning(f"On-commit hook {name} failed: {e}")
+            continue
+        if inspect.isawaitable(result):
+            _schedule(result)
+
+
+def _within(savepoint: Optional[SessionTransaction], transaction: SessionTransaction) -> bool:
+    while savepoint is not None:
+        if savepoint is transaction:
+            return True
+        savepoint = savepoint.parent
+    return False
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session: Session, previous_transaction: SessionTransaction) -> None:
+    if not previous_transaction.nested:
+        return  # Outer transaction: cleared when it ends; failed flush: its savepoint rolls back next
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        session.info[_PENDING_KEY] = [
+            entry for entry in pending if not _within(entry[0], previous_transaction)
+        ]
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_unpublished(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        # Rolled back or closed without commit (after a commit it is already empty)
+        session.info.pop(_PENDING_KEY, None)
@@ -71,6 +71,27 @@ class Settings(BaseSettings):
     RESEND_API_KEY: str = ""
     FROM_EMAIL: str = "noreply@nihaogroup.com"
 
+    # Email outbox delivery (email_outbox scheduler job)
+    EMAIL_OUTBOX_WORKERS: int = 4  # Concurrent delivery workers
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50  # Emails claimed per worker round (one Resend batch call)
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8  # Then the email is marked FAILED
+    EMAIL_RATE_LIMIT_RESEND: float = 2.0  # API requests per second
+    EMAIL_RATE_LIMIT_SMTP: float = 10.0  # Messages per second
+    SMTP_POOL_SIZE: int = 2  # Persistent SMTP connections per worker
+    # Cached mail config is dropped on every MailConfig commit; this is the fallback expiry
+    MAIL_CONFIG_CACHE_SECONDS: int = 300
+
+    # Background scheduler (leader lease in Redis; failover within one TTL)
+    SCHEDULER_LEASE_TTL_SECONDS: int = 10
+
+    # Auto-trade: order books executed concurrently per cycle (own DB session each)
+    AUTO_TRADE_MAX_CONCURRENT_MARKETS: int = 4
+
+    # Business-day calendars: extra holidays as comma-separated ISO dates
+    # (EU already excludes TARGET2 closing days; CN exchange holidays are announced yearly)
+    BUSINESS_HOLIDAYS_EU: str = ""
+    BUSINESS_HOLIDAYS_CN: str = ""
+
     # Price Scraping
     PRICE_UPDATE_INTERVAL_SECONDS: int = 300  # 5 minutes
 
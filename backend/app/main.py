@@ -8,7 +8,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from .api.v1 import (
     admin,
     admin_fees,
+    admin_ledger,
     admin_logging,
+    admin_scheduler,
     assets,
     auth,
     backoffice,
@@ -30,8 +32,16 @@ from .core.database import AsyncSessionLocal, init_db
 from .core.security import RedisManager
 from .services import deposit_service
 from .services.auto_trade_executor import AutoTradeExecutor
+from .services.email_outbox import get_next_email_due, run_email_outbox
+from .services.email_service import email_service
+from .services.ledger_reconciliation import run_ledger_reconciliation
+from .services.market_maker_balances import run_balance_verification
+from .services.market_stats import market_stats
+from .services.scheduler import scheduler
 from .services.settlement_monitoring import SettlementMonitoring
 from .services.settlement_processor import SettlementProcessor
+from .services.smtp_pool import close_smtp_pool
+from .services.ticket_stats import run_ticket_rollup_compaction
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -49,75 +59,87 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
 
-    # Start settlement processor background task
-    async def settlement_processor_loop():
-        """Run settlement processor every hour"""
-        while True:
-            try:
-                await SettlementProcessor.process_pending_settlements()
-                await SettlementProcessor.check_overdue_settlements()
-            except Exception as e:
-                logger.error(f"Settlement processor error: {e}", exc_info=True)
-
-            # Wait 1 hour
-            await asyncio.sleep(3600)
-
-    # Start settlement monitoring background task
-    async def settlement_monitoring_loop():
-        """Run settlement monitoring every hour"""
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    result = await SettlementMonitoring.run_monitoring_cycle(db)
-                    if result.get("success"):
-                        logger.info(
-                            f"Settlement monitoring cycle completed: "
-                            f"{result.get('alert_count', 0)} alerts detected"
-                        )
-                    else:
-                        logger.error(
-                            f"Settlement monitoring cycle failed: {result.get('error')}"
-                        )
-            except Exception as e:
-                logger.error(f"Settlement monitoring error: {e}", exc_info=True)
-
-            # Wait 1 hour
-            await asyncio.sleep(3600)
+    # Rolling 24h market statistics: rebuild from trades, then follow other workers' fills
+    try:
+        async with AsyncSessionLocal() as db:
+            await market_stats.rebuild(db)
+    except Exception as e:
+        logger.error(f"Market stats rebuild failed (will retry on first read): {e}")
+    _background_tasks.append(market_stats.start_listener())
+    _background_tasks.append(email_service.start_listener())
+
+    # Compile email templates and their static layouts before the first send
+    try:
+        logger.info(f"Email templates precompiled: {email_service.precompile_templates()}")
+    except Exception as e:
+        logger.error(f"Email template precompile failed (templates compile on first use): {e}")
+
+    # Periodic jobs: every worker registers them, only the scheduler leader runs them.
+    # Failures are logged and recorded per job by the scheduler.
+    async def run_settlement_processor():
+        """Advance due settlements"""
+        await SettlementProcessor.process_pending_settlements()
+
+    async def run_settlement_overdue_check():
+        """Flag settlements past their expected date"""
+        await SettlementProcessor.check_overdue_settlements()
+
+    async def run_settlement_monitoring():
+        """Run settlement monitoring cycle"""
+        async with AsyncSessionLocal() as db:
+            result = await SettlementMonitoring.run_monitoring_cycle(db)
+            if result.get("success"):
+                logger.info(
+                    f"Settlement monitoring cycle completed: "
+                    f"{result.get('alert_count', 0)} alerts detected"
+                )
+            else:
+                logger.error(
+                    f"Settlement monitoring cycle failed: {result.get('error')}"
+                )
 
     # Deposit hold expiration processor
-    async def deposit_hold_processor_loop():
-        """Process expired deposit holds every hour"""
+    async def run_deposit_hold_processor():
+        """Process expired deposit holds"""
         # Get system admin ID for audit trail (first admin user)
         from sqlalchemy import select
 
         from .models.models import User, UserRole
 
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    # Get a system admin for audit trail
-                    result = await db.execute(
-                        select(User).where(User.role == UserRole.ADMIN).limit(1)
+        async with AsyncSessionLocal() as db:
+            # Get a system admin for audit trail
+            result = await db.execute(
+                select(User).where(User.role == UserRole.ADMIN).limit(1)
+            )
+            admin = result.scalar_one_or_none()
+
+            if admin:
+                cleared = await deposit_service.process_expired_holds(
+                    db=db, system_admin_id=admin.id
+                )
+                await db.commit()
+                if cleared > 0:
+                    logger.info(
+                        f"Auto-cleared {cleared} deposit(s) with expired holds"
                     )
-                    admin = result.scalar_one_or_none()
 
-                    if admin:
-                        cleared = await deposit_service.process_expired_holds(
-                            db=db, system_admin_id=admin.id
-                        )
-                        await db.commit()
-                        if cleared > 0:
-                            logger.info(
-                                f"Auto-cleared {cleared} deposit(s) with expired holds"
-                            )
-            except Exception as e:
-                logger.error(f"Deposit hold processor error: {e}", exc_info=True)
+    async def next_deposit_hold_due():
+        async with AsyncSessionLocal() as db:
+            return await deposit_service.get_next_hold_expiry(db)
 
-            # Wait 1 hour
-            await asyncio.sleep(3600)
+    def next_scrape_due(sources):
+        """Earliest (last scrape + interval) over (last_scrape, interval_minutes) rows"""
+        from datetime import datetime, timedelta, timezone
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        due_times = [
+            now if last is None else last + timedelta(minutes=interval)
+            for last, interval in sources
+        ]
+        return min(due_times) if due_times else None
 
     # Price scraping scheduler
-    async def price_scraping_scheduler_loop():
+    async def run_price_scraping():
         """Run price scraping based on each source's configured interval"""
         from datetime import datetime, timezone
 
@@ -126,92 +148,96 @@ async def lifespan(app: FastAPI):
         from .models.models import ScrapingSource
         from .services.price_scraper import price_scraper
 
-        # Wait 30 seconds on startup before first check
-        await asyncio.sleep(30)
-
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    # Get all active scraping sources
-                    result = await db.execute(
-                        select(ScrapingSource).where(
-                            ScrapingSource.is_active.is_(True)
-                        )
-                    )
-                    sources = result.scalars().all()
-
-                    now = datetime.now(timezone.utc).replace(tzinfo=None)
-
-                    # Partition: carboncredits.com uses one shared fetch per cycle (0026)
-                    carboncredits_sources = [
-                        s for s in sources
-                        if s.url and "carboncredits.com" in s.url
-                    ]
-                    other_sources = [
-                        s for s in sources
-                        if not s.url or "carboncredits.com" not in s.url
-                    ]
-
-                    # One request for all carboncredits.com sources if any is due
-                    if carboncredits_sources:
-                        any_due = any(
-                            s.last_scrape_at is None
-                            or (now - s.last_scrape_at).total_seconds() / 60
-                            >= s.scrape_interval_minutes
-                            for s in carboncredits_sources
+        async with AsyncSessionLocal() as db:
+            # Get all active scraping sources
+            result = await db.execute(
+                select(ScrapingSource).where(
+                    ScrapingSource.is_active.is_(True)
+                )
+            )
+            sources = result.scalars().all()
+
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+            # Partition: carboncredits.com uses one shared fetch per cycle (0026)
+            carboncredits_sources = [
+                s for s in sources
+                if s.url and "carboncredits.com" in s.url
+            ]
+            other_sources = [
+                s for s in sources
+                if not s.url or "carboncredits.com" not in s.url
+            ]
+
+            # One request for all carboncredits.com sources if any is due
+            if carboncredits_sources:
+                any_due = any(
+                    s.last_scrape_at is None
+                    or (now - s.last_scrape_at).total_seconds() / 60
+                    >= s.scrape_interval_minutes
+                    for s in carboncredits_sources
+                )
+                if any_due:
+                    try:
+                        await price_scraper.refresh_carboncredits_sources(
+                            db, carboncredits_sources
                         )
-                        if any_due:
-                            try:
-                                await price_scraper.refresh_carboncredits_sources(
-                                    db, carboncredits_sources
-                                )
-                                for s in carboncredits_sources:
-                                    if s.last_price is not None:
-                                        logger.info(
-                                            "Auto-scraped %s: %s",
-                                            s.name,
-                                            s.last_price,
-                                        )
-                            except Exception as e:
-                                logger.warning(
-                                    "Auto-scrape failed for carboncredits.com: %s",
-                                    e,
-                                )
-
-                    for source in other_sources:
-                        if source.last_scrape_at is None:
-                            should_scrape = True
-                        else:
-                            minutes_since_last = (
-                                now - source.last_scrape_at
-                            ).total_seconds() / 60
-                            should_scrape = (
-                                minutes_since_last
-                                >= source.scrape_interval_minutes
-                            )
-
-                        if should_scrape:
-                            try:
-                                await price_scraper.refresh_source(source, db)
+                        for s in carboncredits_sources:
+                            if s.last_price is not None:
                                 logger.info(
                                     "Auto-scraped %s: %s",
-                                    source.name,
-                                    source.last_price,
-                                )
-                            except Exception as e:
-                                logger.warning(
-                                    "Auto-scrape failed for %s: %s",
-                                    source.name,
-                                    e,
+                                    s.name,
+                                    s.last_price,
                                 )
-            except Exception as e:
-                logger.error(f"Price scraping scheduler error: {e}", exc_info=True)
+                    except Exception as e:
+                        logger.warning(
+                            "Auto-scrape failed for carboncredits.com: %s",
+                            e,
+                        )
+
+            for source in other_sources:
+                if source.last_scrape_at is None:
+                    should_scrape = True
+                else:
+                    minutes_since_last = (
+                        now - source.last_scrape_at
+                    ).total_seconds() / 60
+                    should_scrape = (
+                        minutes_since_last
+                        >= source.scrape_interval_minutes
+                    )
+
+                if should_scrape:
+                    try:
+                        await price_scraper.refresh_source(source, db)
+                        logger.info(
+                            "Auto-scraped %s: %s",
+                            source.name,
+                            source.last_price,
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            "Auto-scrape failed for %s: %s",
+                            source.name,
+                            e,
+                        )
+
+    async def next_price_scrape_due():
+        from sqlalchemy import select
+
+        from .models.models import ScrapingSource
 
-            # Check every 60 seconds
-            await asyncio.sleep(60)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    ScrapingSource.last_scrape_at,
+                    ScrapingSource.scrape_interval_minutes,
+                ).where(ScrapingSource.is_active.is_(True))
+            )
+            return next_scrape_due(result.all())
 
     # Exchange rate scraping scheduler
-    async def exchange_rate_scraping_scheduler_loop():
+    async def run_exchange_rate_scraping():
         """Run exchange rate scraping based on each source's configured interval"""
         from datetime import datetime, timezone
 
@@ -220,103 +246,174 @@ async def lifespan(app: FastAPI):
         from .models.models import ExchangeRateSource
         from .services.price_scraper import price_scraper
 
-        # Wait 45 seconds on startup before first check (stagger from price scraper)
-        await asyncio.sleep(45)
+        async with AsyncSessionLocal() as db:
+            # Get all active exchange rate sources
+            result = await db.execute(
+                select(ExchangeRateSource).where(
+                    ExchangeRateSource.is_active.is_(True)
+                )
+            )
+            sources = result.scalars().all()
+
+            # Use naive UTC for comparison with DB timestamps
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            for source in sources:
+                # Check if it's time to scrape based on configured interval
+                if source.last_scraped_at is None:
+                    should_scrape = True
+                else:
+                    minutes_since_last = (
+                        now - source.last_scraped_at
+                    ).total_seconds() / 60
+                    should_scrape = (
+                        minutes_since_last >= source.scrape_interval_minutes
+                    )
 
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    # Get all active exchange rate sources
-                    result = await db.execute(
-                        select(ExchangeRateSource).where(
-                            ExchangeRateSource.is_active.is_(True)
+                if should_scrape:
+                    try:
+                        await price_scraper.refresh_exchange_rate_source(
+                            source, db
                         )
-                    )
-                    sources = result.scalars().all()
-
-                    # Use naive UTC for comparison with DB timestamps
-                    now = datetime.now(timezone.utc).replace(tzinfo=None)
-                    for source in sources:
-                        # Check if it's time to scrape based on configured interval
-                        if source.last_scraped_at is None:
-                            should_scrape = True
-                        else:
-                            minutes_since_last = (
-                                now - source.last_scraped_at
-                            ).total_seconds() / 60
-                            should_scrape = (
-                                minutes_since_last >= source.scrape_interval_minutes
-                            )
-
-                        if should_scrape:
-                            try:
-                                await price_scraper.refresh_exchange_rate_source(
-                                    source, db
-                                )
-                                logger.info(
-                                    f"Auto-scraped exchange rate {source.name}: "
-                                    f"{source.last_rate}"
-                                )
-                            except Exception as e:
-                                logger.warning(
-                                    f"Auto-scrape failed for exchange rate "
-                                    f"{source.name}: {e}"
-                                )
-            except Exception as e:
-                logger.error(
-                    f"Exchange rate scraping scheduler error: {e}", exc_info=True
-                )
+                        logger.info(
+                            f"Auto-scraped exchange rate {source.name}: "
+                            f"{source.last_rate}"
+                        )
+                    except Exception as e:
+                        logger.warning(
+                            f"Auto-scrape failed for exchange rate "
+                            f"{source.name}: {e}"
+                        )
+
+    async def next_exchange_rate_scrape_due():
+        from sqlalchemy import select
+
+        from .models.models import ExchangeRateSource
 
-            # Check every 60 seconds
-            await asyncio.sleep(60)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    ExchangeRateSource.last_scraped_at,
+                    ExchangeRateSource.scrape_interval_minutes,
+                ).where(ExchangeRateSource.is_active.is_(True))
+            )
+            return next_scrape_due(result.all())
 
     # Auto-trade executor scheduler
-    async def auto_trade_executor_loop():
+    async def run_auto_trade_executor():
         """Execute auto-trade rules based on their configured intervals"""
         from sqlalchemy import select
 
         from .models.models import User, UserRole
 
-        # Wait 10 seconds on startup before first check
-        await asyncio.sleep(10)
+        async with AsyncSessionLocal() as db:
+            # Get a system admin for audit trail
+            result = await db.execute(
+                select(User).where(User.role == UserRole.ADMIN).limit(1)
+            )
+            admin = result.scalar_one_or_none()
 
-        while True:
-            try:
-                async with AsyncSessionLocal() as db:
-                    # Get a system admin for audit trail
-                    result = await db.execute(
-                        select(User).where(User.role == UserRole.ADMIN).limit(1)
+            if admin:
+                results = await AutoTradeExecutor.execute_all_ready_rules(
+                    db=db, admin_user_id=admin.id
+                )
+                successes = sum(1 for r in results if r.get("success"))
+                if results:
+                    logger.info(
+                        f"Auto-trade cycle: {successes}/{len(results)} orders placed"
                     )
-                    admin = result.scalar_one_or_none()
 
-                    if admin:
-                        results = await AutoTradeExecutor.execute_all_ready_rules(
-                            db=db, admin_user_id=admin.id
-                        )
-                        successes = sum(1 for r in results if r.get("success"))
-                        if results:
-                            logger.info(
-                                f"Auto-trade cycle: {successes}/{len(results)} orders placed"
-                            )
-            except Exception as e:
-                logger.error(f"Auto-trade executor error: {e}", exc_info=True)
-
-            # Check every 5 seconds for rules ready to execute (supports 10-20 sec intervals)
-            await asyncio.sleep(5)
-
-    # Start background tasks
-    processor_task = asyncio.create_task(settlement_processor_loop())
-    monitoring_task = asyncio.create_task(settlement_monitoring_loop())
-    deposit_task = asyncio.create_task(deposit_hold_processor_loop())
-    scraping_task = asyncio.create_task(price_scraping_scheduler_loop())
-    exchange_rate_task = asyncio.create_task(exchange_rate_scraping_scheduler_loop())
-    auto_trade_task = asyncio.create_task(auto_trade_executor_loop())
-    _background_tasks.extend(
-        [processor_task, monitoring_task, deposit_task, scraping_task, exchange_rate_task, auto_trade_task]
+    async def next_auto_trade_due():
+        async with AsyncSessionLocal() as db:
+            return await AutoTradeExecutor.get_next_execution_at(db)
+
+    from .models.models import (
+        AutoTradeRule,
+        Deposit,
+        EmailOutbox,
+        ExchangeRateSource,
+        MarketMakerClient,
+        ScrapingSource,
+        SettlementBatch,
+    )
+
+    # Fixed-interval jobs
+    scheduler.add_job("settlement_monitoring", run_settlement_monitoring, interval_seconds=3600)
+    scheduler.add_job("settlement_overdue_check", run_settlement_overdue_check, interval_seconds=3600)
+    # Recompute materialized MM balances from the ledger and repair drift
+    scheduler.add_job(
+        "mm_balance_verification",
+        run_balance_verification,
+        interval_seconds=3600,
+        initial_delay_seconds=300,
+    )
+    # Check balances against the ledger, reading only transactions since the last checkpoints
+    scheduler.add_job(
+        "ledger_reconciliation",
+        run_ledger_reconciliation,
+        interval_seconds=900,
+        initial_delay_seconds=600,
+    )
+    # Roll closed days of ticket_logs into the audit dashboard rollups
+    scheduler.add_job(
+        "ticket_rollup_compaction",
+        run_ticket_rollup_compaction,
+        interval_seconds=3600,
+        initial_delay_seconds=120,
+    )
+    # Due-time jobs: run when their earliest item is due, or early when a commit
+    # touches one of the wake_on models; interval_seconds is the minimum spacing
+    scheduler.add_job(
+        "settlement_processor",
+        run_settlement_processor,
+        interval_seconds=60,
+        next_due=SettlementProcessor.get_next_advance_at,
+        wake_on=(SettlementBatch,),
     )
+    scheduler.add_job(
+        "deposit_hold_processor",
+        run_deposit_hold_processor,
+        interval_seconds=60,
+        next_due=next_deposit_hold_due,
+        wake_on=(Deposit,),
+    )
+    # Failing sources are retried at most once a minute; staggered start after startup
+    scheduler.add_job(
+        "price_scraping",
+        run_price_scraping,
+        interval_seconds=60,
+        initial_delay_seconds=30,
+        next_due=next_price_scrape_due,
+        wake_on=(ScrapingSource,),
+    )
+    scheduler.add_job(
+        "exchange_rate_scraping",
+        run_exchange_rate_scraping,
+        interval_seconds=60,
+        initial_delay_seconds=45,
+        next_due=next_exchange_rate_scrape_due,
+        wake_on=(ExchangeRateSource,),
+    )
+    # Rules run at their own next_execution_at (supports 10-20 sec intervals)
+    scheduler.add_job(
+        "auto_trade_executor",
+        run_auto_trade_executor,
+        interval_seconds=2,
+        initial_delay_seconds=10,
+        next_due=next_auto_trade_due,
+        wake_on=(AutoTradeRule, MarketMakerClient),
+    )
+    # Queued emails go out right after the commit that queued them; retries at their backoff time
+    scheduler.add_job(
+        "email_outbox",
+        run_email_outbox,
+        interval_seconds=1,
+        next_due=get_next_email_due,
+        wake_on=(EmailOutbox,),
+    )
+    scheduler.start()
     logger.info(
-        "Settlement processor, monitoring, deposit hold processor, price scraping, "
-        "exchange rate scraping, and auto-trade schedulers started"
+        "Background scheduler started (settlement processor, monitoring, deposit holds, "
+        "price scraping, exchange rate scraping, auto-trade, MM balance verification, ledger reconciliation, ticket rollups, email outbox); jobs run on the lease holder only"
     )
 
     # Register ticket broadcast to backoffice WebSocket
@@ -330,12 +427,17 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down...")
 
+    # Stop scheduled jobs and release the leader lease
+    await scheduler.stop()
+
     # Cancel background tasks
     for task in _background_tasks:
         task.cancel()
     await asyncio.gather(*_background_tasks, return_exceptions=True)
     logger.info("Background tasks cancelled")
 
+    await close_smtp_pool()
+
     await RedisManager.close()
 
 
@@ -417,6 +519,8 @@ app.include_router(settlement.router, prefix="/api/v1")
 app.include_router(market_maker.router, prefix="/api/v1/admin")
 app.include_router(admin_logging.router, prefix="/api/v1/admin")
 app.include_router(admin_fees.router, prefix="/api/v1/admin")
+app.include_router(admin_ledger.router, prefix="/api/v1/admin")
+app.include_router(admin_scheduler.router, prefix="/api/v1/admin")
 app.include_router(deposits.router, prefix="/api/v1")
 app.include_router(assets.router, prefix="/api/v1")
 app.include_router(withdrawals.router, prefix="/api/v1")
@@ -7,18 +7,22 @@ from sqlalchemy import (
     JSON,
     Boolean,
     Column,
+    Computed,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     LargeBinary,
     Numeric,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from ..core.database import Base
 
@@ -492,6 +496,11 @@ class ActivityLog(Base):
 
     user = relationship("User", back_populates="activity_logs")
 
+    __table_args__ = (
+        # Keyset pagination: newest first on (created_at, id)
+        Index("ix_activity_logs_created_at_id", "created_at", "id"),
+    )
+
 
 class KYCDocument(Base):
     """KYC documents uploaded by users/entities"""
@@ -616,6 +625,8 @@ class Order(Base):
     price = Column(Numeric(18, 4), nullable=False)
     quantity = Column(Numeric(18, 2), nullable=False)
     filled_quantity = Column(Numeric(18, 2), default=0)
+    # EUR (incl. fee) still reserved for the unfilled part of a client BUY order
+    reserved_eur = Column(Numeric(18, 2), nullable=True)
     status = Column(SQLEnum(OrderStatus), default=OrderStatus.OPEN)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), index=True)
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
@@ -830,17 +841,70 @@ class EntityHolding(Base):
     )
     asset_type = Column(SQLEnum(AssetType), nullable=False)
     quantity = Column(Numeric(18, 2), nullable=False, default=0)
+    # EUR held by open client BUY orders (services/eur_reservations.py); available = quantity - reserved
+    reserved = Column(Numeric(18, 2), nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
 
     entity = relationship("Entity", back_populates="holdings")
 
     __table_args__ = (
-        # One record per entity per asset type
+        # One record per entity per asset type (conflict target of balance upserts)
+        UniqueConstraint("entity_id", "asset_type", name="uq_entity_holdings_entity_asset"),
         {"sqlite_autoincrement": True},
     )
 
 
+class MarketMakerAssetBalance(Base):
+    """
+    Materialized balance of one market maker in one asset (CEA, EUA, EUR).
+
+    total is the AssetTransaction ledger sum (EUR: MarketMakerClient.eur_balance),
+    locked is held by open orders (SELL: remaining certificates, BUY: price x
+    remaining EUR). Maintained in the same transaction as every ledger and order
+    write by services/market_maker_balances.py, which also verifies it against
+    the ledger.
+    """
+
+    __tablename__ = "market_maker_balances"
+
+    market_maker_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("market_maker_clients.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    asset_type = Column(SQLEnum(AssetType), primary_key=True)
+    total = Column(Numeric(24, 6), nullable=False, default=0)
+    locked = Column(Numeric(24, 6), nullable=False, default=0)
+    available = Column(Numeric(24, 6), Computed("total - locked", persisted=True))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
+
+
+class LedgerCheckpoint(Base):
+    """
+    Reconciliation checkpoint of one balance (entity holding or MM certificate
+    total) against the AssetTransaction ledger.
+
+    ledger_balance is the sum of all transactions up to and including
+    (last_transaction_at, last_transaction_id); later runs of
+    services/ledger_reconciliation.py only add transactions after it.
+    drift is actual balance minus ledger at the last check (0 = consistent).
+    """
+
+    __tablename__ = "ledger_checkpoints"
+
+    owner_type = Column(String(20), primary_key=True)  # "entity" | "market_maker"
+    owner_id = Column(UUID(as_uuid=True), primary_key=True)
+    asset_type = Column(SQLEnum(AssetType), primary_key=True)
+    ledger_balance = Column(Numeric(24, 6), nullable=False, default=0)
+    last_transaction_at = Column(DateTime, nullable=True)
+    last_transaction_id = Column(UUID(as_uuid=True), nullable=True)
+    balance = Column(Numeric(24, 6), nullable=False, default=0)  # Actual balance at the last check
+    drift = Column(Numeric(24, 6), nullable=False, default=0)
+    drift_detected_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
+
+
 class AssetTransaction(Base):
     """Audit trail for all asset movements"""
 
@@ -883,6 +947,22 @@ class AssetTransaction(Base):
     market_maker = relationship("MarketMakerClient", back_populates="transactions")
     creator = relationship("User", foreign_keys=[created_by])
 
+    __table_args__ = (
+        # Keyset pagination of an entity's history: newest first on (created_at, id)
+        Index("ix_asset_transactions_entity_created_at_id", "entity_id", "created_at", "id"),
+    )
+
+
+# Generated tsvector of TicketLog: ticket/action/entity names plus every string
+# and number in the request and response payloads ('simple' config: no stemming)
+TICKET_SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple'::regconfig, ticket_id || ' ' || action_type || ' ' || entity_type)"
+    " || jsonb_to_tsvector('simple'::regconfig, coalesce(request_payload, '{}'::jsonb),"
+    " '[\"string\", \"numeric\"]'::jsonb)"
+    " || jsonb_to_tsvector('simple'::regconfig, coalesce(response_data, '{}'::jsonb),"
+    " '[\"string\", \"numeric\"]'::jsonb)"
+)
+
 
 class TicketLog(Base):
     """Comprehensive audit trail for all system actions"""
@@ -922,12 +1002,77 @@ class TicketLog(Base):
     after_state = Column(JSONB, nullable=True)
     related_ticket_ids = Column(ARRAY(String(30)), nullable=True)
     tags = Column(ARRAY(String(50)), nullable=True, index=True)
+    # Full-text search over the ticket's names and payload values (see ticket_search)
+    search_vector = deferred(
+        Column(TSVECTOR, Computed(TICKET_SEARCH_VECTOR_SQL, persisted=True))
+    )
 
     # Relationships
     user = relationship("User", foreign_keys=[user_id])
     market_maker = relationship("MarketMakerClient", foreign_keys=[market_maker_id])
     session = relationship("UserSession", foreign_keys=[session_id])
 
+    __table_args__ = (
+        # Keyset pagination: newest first on (timestamp, id)
+        Index("ix_ticket_logs_timestamp_id", "timestamp", "id"),
+        # Substring/prefix/fuzzy search (pg_trgm), full-text and payload-key search
+        Index(
+            "ix_ticket_logs_ticket_id_trgm",
+            "ticket_id",
+            postgresql_using="gin",
+            postgresql_ops={"ticket_id": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_ticket_logs_action_type_trgm",
+            "action_type",
+            postgresql_using="gin",
+            postgresql_ops={"action_type": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_ticket_logs_entity_type_trgm",
+            "entity_type",
+            postgresql_using="gin",
+            postgresql_ops={"entity_type": "gin_trgm_ops"},
+        ),
+        Index("ix_ticket_logs_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_ticket_logs_request_payload", "request_payload", postgresql_using="gin"),
+        Index("ix_ticket_logs_response_data", "response_data", postgresql_using="gin"),
+    )
+
+
+class TicketLogRollup(Base):
+    """
+    Daily ticket counts per (day, action_type, status, user_id) for the audit
+    dashboard. Days before the newest rolled-up day + 1 are complete; later
+    tickets are counted live from ticket_logs (services/ticket_stats.py).
+    """
+
+    __tablename__ = "ticket_log_rollups"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),  # Rows are inserted with INSERT ... SELECT
+    )
+    day = Column(Date, nullable=False)
+    action_type = Column(String(100), nullable=False)
+    status = Column(SQLEnum(TicketStatus), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            "uq_ticket_log_rollups_day_action_status_user",
+            "day",
+            "action_type",
+            "status",
+            "user_id",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
 
 class LiquidityOperation(Base):
     """Audit trail for liquidity creation operations
@@ -1055,7 +1200,10 @@ class SettlementBatch(Base):
     expected_settlement_date = Column(
         DateTime, nullable=False, index=True
     )  # T+1, T+3, or T+5
-    actual_settlement_date = Column(DateTime, nullable=True)
+    actual_settlement_date = Column(DateTime, nullable=True, index=True)
+    # When the settlement processor advances the current status (None: never
+    # automatically). Maintained by services/settlement_processor.py.
+    next_transition_at = Column(DateTime, nullable=True)
 
     # External registry tracking
     registry_reference = Column(
@@ -1081,6 +1229,15 @@ class SettlementBatch(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Due-batch lookups only ever look at non-final settlements
+        Index(
+            "ix_settlement_batches_next_transition_at",
+            "next_transition_at",
+            postgresql_where=text("status NOT IN ('SETTLED', 'FAILED')"),
+        ),
+    )
+
 
 class SettlementStatusHistory(Base):
     """
@@ -1399,3 +1556,42 @@ class MailConfig(Base):
     auth_method = Column(String(50), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+
+class EmailOutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING"  # Claimed by a worker until next_attempt_at (lease)
+    SENT = "SENT"
+    FAILED = "FAILED"  # Gave up after EMAIL_OUTBOX_MAX_ATTEMPTS
+
+
+class EmailOutbox(Base):
+    """
+    Outbound email, written by EmailService in the caller's transaction and
+    delivered by the email_outbox scheduler job (services/email_outbox.py).
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Only undelivered rows are ever scanned by the workers
+        Index(
+            "ix_email_outbox_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('PENDING', 'SENDING')"),
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    to_email = Column(String(255), nullable=False)
+    from_email = Column(String(255), nullable=True)  # None = mail config / env default
+    subject = Column(String(500), nullable=False)
+    html = Column(Text, nullable=False)
+    status = Column(
+        SQLEnum(EmailOutboxStatus), nullable=False, default=EmailOutboxStatus.PENDING
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    last_error = Column(Text, nullable=True)
+    provider = Column(String(20), nullable=True)  # Provider that delivered it
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
+    sent_at = Column(DateTime, nullable=True)
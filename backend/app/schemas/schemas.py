@@ -916,6 +916,9 @@ class AdminUserFullResponse(UserResponse):
     """Full user details for admin - includes auth history and stats"""
 
     entity_name: Optional[str] = None
+    eur_balance: Optional[float] = None
+    cea_balance: Optional[int] = None
+    eua_balance: Optional[int] = None
     password_set: bool = (
         False  # Indicates if user has password (NOT the actual password)
     )
@@ -7,18 +7,22 @@ Validates balances before placing orders to ensure orders are always covered.
 
 import asyncio
 import logging
-import random
+import time
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal, ROUND_DOWN
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from sqlalchemy import and_, select, update
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from sqlalchemy import func
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.models import (
     AutoTradeMarketSettings,
     AutoTradePriceMode,
@@ -36,12 +40,71 @@ from app.models.models import (
     TicketStatus,
     TransactionType,
 )
+from app.services.ladder_generator import LadderGenerator, default_generator
 from app.services.market_maker_service import MarketMakerService
 from app.services.price_scraper import price_scraper
 from app.services.ticket_service import TicketService
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_ORDER_STATUSES = [OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]
+
+
+@dataclass
+class MarketContext:
+    """
+    Order-book state shared by one book's rules during a single executor cycle.
+
+    Built once per book per cycle and updated in place as orders are placed,
+    so rules sharing a book don't re-query the same values. Trades change the
+    book in ways we don't track here; they mark the context stale and the
+    executor rebuilds it before the next rule.
+    """
+
+    certificate_type: CertificateType
+    market_type: MarketType
+    best_bid: Optional[Decimal]
+    best_ask: Optional[Decimal]
+    market_price: Optional[Decimal]  # Scraped EUR price, or CEA/EUA ratio for SWAP
+    eua_eur_price: Optional[Decimal]  # Converts SWAP quantities (EUA) to EUR
+    liquidity: Dict[OrderSide, Decimal]  # EUR value of open MM orders per side
+    market_settings: Dict[str, Optional[AutoTradeMarketSettings]]
+    active_orders: Dict[uuid.UUID, int] = field(default_factory=dict)  # Per market maker
+    orders_at_price: Dict[Tuple[OrderSide, Decimal], int] = field(default_factory=dict)
+    stale: bool = False
+
+    @property
+    def expired(self) -> bool:
+        """True after a session rollback expired the cached settings rows."""
+        return any(
+            ms is not None and sa_inspect(ms).expired_attributes
+            for ms in self.market_settings.values()
+        )
+
+    def record_order(
+        self,
+        market_maker_id: uuid.UUID,
+        side: OrderSide,
+        price: Optional[Decimal],
+        quantity: Decimal,
+    ) -> None:
+        """Apply a newly placed (unmatched) order to the snapshot."""
+        self.active_orders[market_maker_id] = self.active_orders.get(market_maker_id, 0) + 1
+        if not price:
+            return
+        self.orders_at_price[(side, price)] = self.orders_at_price.get((side, price), 0) + 1
+
+        if self.market_type == MarketType.SWAP:
+            added = quantity * self.eua_eur_price if self.eua_eur_price else Decimal("0")
+        else:
+            added = price * quantity
+        self.liquidity[side] = self.liquidity.get(side, Decimal("0")) + added
+
+        if side == OrderSide.BUY and (self.best_bid is None or price > self.best_bid):
+            self.best_bid = price
+        elif side == OrderSide.SELL and (self.best_ask is None or price < self.best_ask):
+            self.best_ask = price
+
 
 class AutoTradeExecutor:
     """
@@ -86,10 +149,37 @@ class AutoTradeExecutor:
 
         return list(result.scalars().all())
 
+    @staticmethod
+    async def get_next_execution_at(db: AsyncSession) -> Optional[datetime]:
+        """
+        Earliest time any enabled rule of an active market maker is due.
+        Rules that never executed are due now; None if there are no rules.
+        """
+        result = await db.execute(
+            select(
+                func.count().filter(AutoTradeRule.next_execution_at == None),
+                func.min(AutoTradeRule.next_execution_at),
+            )
+            .select_from(AutoTradeRule)
+            .join(MarketMakerClient)
+            .where(
+                and_(
+                    AutoTradeRule.enabled == True,
+                    MarketMakerClient.is_active == True,
+                )
+            )
+        )
+        never_executed, earliest = result.one()
+        if never_executed:
+            return datetime.now(timezone.utc).replace(tzinfo=None)
+        return earliest
+
     @staticmethod
     def calculate_next_execution_time(
         rule: AutoTradeRule,
         interval_variation_pct: Optional[Decimal] = None,
+        now: Optional[datetime] = None,
+        generator: LadderGenerator = default_generator,
     ) -> datetime:
         """
         Calculate the next execution time based on interval mode.
@@ -98,21 +188,24 @@ class AutoTradeExecutor:
 
         If interval_variation_pct is provided (from market settings), applies
         ±pct% random variation to the calculated interval.
+        now defaults to the wall clock (the simulator passes its virtual clock);
+        random draws come from generator (the simulator passes a seeded one).
         """
         # Naive UTC for TIMESTAMP WITHOUT TIME ZONE (asyncpg)
-        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if now is None:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
 
         if rule.interval_mode == "random":
             # Prefer seconds-based intervals
             if rule.interval_min_seconds is not None and rule.interval_max_seconds is not None:
                 min_secs = rule.interval_min_seconds
                 max_secs = rule.interval_max_seconds
-                interval_secs = random.randint(min_secs, max_secs)
+                interval_secs = int(generator.rng.integers(min_secs, max_secs + 1))
             else:
                 # Fall back to minutes
                 min_mins = rule.interval_min_minutes or 1
                 max_mins = rule.interval_max_minutes or 30
-                interval_secs = random.randint(min_mins, max_mins) * 60
+                interval_secs = int(generator.rng.integers(min_mins, max_mins + 1)) * 60
         else:
             # Fixed mode - prefer seconds
             if rule.interval_seconds is not None:
@@ -123,7 +216,7 @@ class AutoTradeExecutor:
         # Apply market-level interval variation if provided
         if interval_variation_pct is not None and interval_variation_pct > 0:
             pct = float(interval_variation_pct)
-            factor = 1.0 + random.uniform(-pct / 100, pct / 100)
+            factor = 1.0 + generator.rng.uniform(-pct / 100, pct / 100)
             interval_secs = max(1, int(interval_secs * factor))
 
         return now + timedelta(seconds=interval_secs)
@@ -264,6 +357,16 @@ class AutoTradeExecutor:
             # Default fallback
             return "CEA_BID"
 
+    @staticmethod
+    def determine_order_book_key(market_maker: MarketMakerClient) -> str:
+        """
+        Key of the order book a market maker's rules trade in.
+
+        CEA_BID and CEA_ASK rules share the CEA cash book (they match against
+        each other), so they are grouped together; EUA_SWAP has its own book.
+        """
+        return AutoTradeExecutor.determine_market_type(market_maker).value
+
     @staticmethod
     async def get_market_settings(
         db: AsyncSession,
@@ -277,117 +380,13 @@ class AutoTradeExecutor:
         )
         return result.scalar_one_or_none()
 
-    @staticmethod
-    def calculate_order_volume_with_variety(
-        min_volume_eur: Decimal,
-        volume_variety: int,
-        target_liquidity: Optional[Decimal],
-        current_liquidity: Decimal,
-        avg_order_count: int,
-        variation_pct: Optional[Decimal] = None,
-        max_volume_eur: Optional[Decimal] = None,
-    ) -> Decimal:
-        """
-        Calculate order volume based on variety setting and liquidity needs.
-
-        If variation_pct is provided, uses percentage-based variation (±pct% of min_volume_eur).
-        Otherwise falls back to the legacy 1-10 volume_variety scale.
-
-        Args:
-            min_volume_eur: Minimum order volume in EUR
-            volume_variety: 1-10 scale (1=uniform, 10=very diverse) — legacy
-            target_liquidity: Target liquidity in EUR
-            current_liquidity: Current liquidity in EUR
-            avg_order_count: Target number of orders
-            variation_pct: ±% variation on min_order_value (new, takes precedence)
-            max_volume_eur: Maximum order volume in EUR (new, optional cap)
-
-        Returns:
-            Order volume in EUR
-        """
-        # Calculate how much liquidity we need to add
-        if target_liquidity and target_liquidity > current_liquidity:
-            needed_liquidity = target_liquidity - current_liquidity
-            # Estimate order size based on target order count
-            base_volume = needed_liquidity / Decimal(str(max(avg_order_count, 1)))
-        else:
-            # No target or at/above target, use minimum
-            base_volume = min_volume_eur
-
-        # Ensure we're at least at minimum volume
-        base_volume = max(base_volume, min_volume_eur)
-
-        # New percentage-based variation (takes precedence over legacy scale)
-        if variation_pct is not None and variation_pct > 0:
-            pct = float(variation_pct)
-            factor = Decimal(str(1.0 + random.uniform(-pct / 100, pct / 100)))
-            varied_volume = base_volume * factor
-            varied_volume = max(varied_volume, min_volume_eur)
-            if max_volume_eur is not None and max_volume_eur > 0:
-                varied_volume = min(varied_volume, max_volume_eur)
-            return varied_volume
-
-        # Legacy variety factor (1-10 scale)
-        if volume_variety <= 1:
-            result = base_volume
-        else:
-            variation_factor = (volume_variety - 1) / 9.0
-            min_multiplier = Decimal(str(1.0 - 0.5 * variation_factor))
-            max_multiplier = Decimal(str(1.0 + 2.0 * variation_factor))
-            random_factor = Decimal(str(random.random()))
-            multiplier = min_multiplier + random_factor * (max_multiplier - min_multiplier)
-            result = max(base_volume * multiplier, min_volume_eur)
-
-        if max_volume_eur is not None and max_volume_eur > 0:
-            result = min(result, max_volume_eur)
-        return result
-
-    @staticmethod
-    def calculate_price_with_deviation(
-        best_price: Decimal,
-        price_deviation_pct: Decimal,
-        side: OrderSide,
-        is_swap_market: bool = False,
-    ) -> Decimal:
-        """
-        Calculate order price with deviation from best price.
-
-        For BUY orders: price is below best ask (or best bid if no asks)
-        For SELL orders: price is above best bid (or best ask if no bids)
-
-        The deviation is applied to create spread in the order book.
-
-        For SWAP market, the price is a ratio (CEA/EUA), not EUR,
-        so we round to 4 decimals instead of 0.1 EUR steps.
-        """
-        # Calculate deviation as percentage
-        deviation = best_price * (price_deviation_pct / Decimal("100"))
-
-        # Apply random factor within the deviation range
-        random_deviation = Decimal(str(random.random())) * deviation
-
-        if side == OrderSide.BUY:
-            # BUY: place below reference price
-            price = best_price - random_deviation
-        else:
-            # SELL: place above reference price
-            price = best_price + random_deviation
-
-        if is_swap_market:
-            # For swap market, ratio is typically 0.1xxx - round to 4 decimals
-            price = price.quantize(Decimal("0.0001"))
-            return max(price, Decimal("0.0001"))
-        else:
-            # For cash market, round to 0.1 EUR step
-            price = (price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
-            return max(price, Decimal("0.10"))
-
     @staticmethod
     async def calculate_current_liquidity(
         db: AsyncSession,
         certificate_type: CertificateType,
         side: OrderSide,
         market_type: Optional[MarketType] = None,
+        eua_eur_price: Optional[Decimal] = None,
     ) -> Decimal:
         """
         Calculate current liquidity (EUR value) for a side.
@@ -395,6 +394,7 @@ class AutoTradeExecutor:
         For CEA_CASH market: Liquidity = SUM(price * remaining_quantity)
         For SWAP market: Liquidity = SUM(remaining_quantity * eua_eur_price)
             because Order.price is ratio (CEA/EUA), not EUR price!
+            eua_eur_price is read from the scraped prices unless passed in.
         """
         if market_type == MarketType.SWAP:
             # For swap market, quantity is in EUA, price is ratio (not EUR)
@@ -414,7 +414,8 @@ class AutoTradeExecutor:
             total_eua = Decimal(str(result.scalar() or 0))
 
             # Convert to EUR using current EUA price
-            eua_eur_price = await AutoTradeExecutor.get_market_price("EUA")
+            if eua_eur_price is None:
+                eua_eur_price = await AutoTradeExecutor.get_market_price("EUA")
             if eua_eur_price and eua_eur_price > 0:
                 return total_eua * eua_eur_price
             return Decimal("0")
@@ -504,6 +505,16 @@ class AutoTradeExecutor:
         current = await AutoTradeExecutor.calculate_current_liquidity(
             db, certificate_type, side, market_type
         )
+        return AutoTradeExecutor.classify_liquidity(market_settings, current)
+
+    @staticmethod
+    def classify_liquidity(
+        market_settings: Optional[AutoTradeMarketSettings],
+        current: Optional[Decimal],
+    ) -> Tuple[str, Optional[Decimal], Optional[Decimal], Optional[AutoTradeMarketSettings]]:
+        """Liquidity status for a known current liquidity (see get_liquidity_status_v2)."""
+        if not market_settings or not market_settings.enabled:
+            return "no_target", None, None, market_settings
 
         target = market_settings.target_liquidity
 
@@ -525,6 +536,77 @@ class AutoTradeExecutor:
         else:
             return "at_target", current, target, market_settings
 
+    @staticmethod
+    async def build_market_context(
+        db: AsyncSession,
+        certificate_type: CertificateType,
+        market_type: MarketType,
+        market_keys: List[str],
+        market_maker_ids: List[uuid.UUID],
+    ) -> MarketContext:
+        """
+        Snapshot one order book for the rules of these market makers / market keys.
+
+        Queries scale with the number of books, not the number of rules.
+        """
+        # Scraped prices (IMPORTANT: for SWAP the reference price is the CEA/EUA ratio)
+        eua_eur_price = None
+        if market_type == MarketType.SWAP:
+            market_price = await AutoTradeExecutor.get_swap_ratio()
+            eua_eur_price = await AutoTradeExecutor.get_market_price("EUA")
+        else:
+            market_price = await AutoTradeExecutor.get_market_price(certificate_type.value)
+
+        best_bid, best_ask = await AutoTradeExecutor.get_best_prices(db, certificate_type)
+
+        settings_result = await db.execute(
+            select(AutoTradeMarketSettings).where(
+                AutoTradeMarketSettings.market_key.in_(market_keys)
+            )
+        )
+        by_key = {ms.market_key: ms for ms in settings_result.scalars().all()}
+
+        liquidity = {
+            side: await AutoTradeExecutor.calculate_current_liquidity(
+                db, certificate_type, side, market_type, eua_eur_price=eua_eur_price or Decimal("0")
+            )
+            for side in (OrderSide.BUY, OrderSide.SELL)
+        }
+
+        active_result = await db.execute(
+            select(Order.market_maker_id, func.count())
+            .where(
+                and_(
+                    Order.market_maker_id.in_(market_maker_ids),
+                    Order.status.in_(ACTIVE_ORDER_STATUSES),
+                )
+            )
+            .group_by(Order.market_maker_id)
+        )
+        level_result = await db.execute(
+            select(Order.side, Order.price, func.count())
+            .where(
+                and_(
+                    Order.certificate_type == certificate_type,
+                    Order.status.in_(ACTIVE_ORDER_STATUSES),
+                )
+            )
+            .group_by(Order.side, Order.price)
+        )
+
+        return MarketContext(
+            certificate_type=certificate_type,
+            market_type=market_type,
+            best_bid=best_bid,
+            best_ask=best_ask,
+            market_price=market_price,
+            eua_eur_price=eua_eur_price,
+            liquidity=liquidity,
+            market_settings={key: by_key.get(key) for key in market_keys},
+            active_orders={mm_id: count for mm_id, count in active_result.all()},
+            orders_at_price={(side, price): count for side, price, count in level_result.all()},
+        )
+
     @staticmethod
     async def execute_internal_trade(
         db: AsyncSession,
@@ -564,20 +646,7 @@ class AutoTradeExecutor:
                 result["reason"] = "no_spread_to_trade_in"
                 return result
 
-            # Calculate random price within spread (rounded to 0.1 EUR)
-            spread = best_ask - best_bid
-            random_offset = Decimal(str(random.random())) * spread
-            trade_price = best_bid + random_offset
-            trade_price = (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
-
-            # Ensure price is within spread
-            trade_price = max(trade_price, best_bid + Decimal("0.1"))
-            trade_price = min(trade_price, best_ask - Decimal("0.1"))
-
-            # If spread is too tight (<=0.1), use mid price
-            if trade_price <= best_bid or trade_price >= best_ask:
-                trade_price = (best_bid + best_ask) / 2
-                trade_price = (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
+            trade_price = AutoTradeExecutor.internal_trade_price(best_bid, best_ask)
 
             # Find a SELL order to consume (best ask = lowest price first, oldest first)
             # We take the best ask order regardless of trade_price - the trade_price is just
@@ -718,6 +787,38 @@ class AutoTradeExecutor:
             result["reason"] = f"exception: {str(e)}"
             return result
 
+    @staticmethod
+    def internal_trade_price(
+        best_bid: Decimal,
+        best_ask: Decimal,
+        generator: LadderGenerator = default_generator,
+    ) -> Decimal:
+        """Random 0.1 EUR step strictly inside the spread (mid price if too tight)."""
+        spread = best_ask - best_bid
+        random_offset = Decimal(str(generator.rng.random())) * spread
+        trade_price = best_bid + random_offset
+        trade_price = (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
+
+        # Ensure price is within spread
+        trade_price = max(trade_price, best_bid + Decimal("0.1"))
+        trade_price = min(trade_price, best_ask - Decimal("0.1"))
+
+        # If spread is too tight (<=0.1), use mid price
+        if trade_price <= best_bid or trade_price >= best_ask:
+            trade_price = (best_bid + best_ask) / 2
+            trade_price = (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
+        return trade_price
+
+    @staticmethod
+    def match_price(buy_price: Decimal, sell_price: Decimal) -> Decimal:
+        """
+        Trade price for crossing MM orders: the sell price if it's a limit
+        order, otherwise the buy price (MARKET orders have price=0).
+        """
+        trade_price = sell_price if sell_price and sell_price > 0 else buy_price
+        # Round to 0.1 EUR step
+        return (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
+
     @staticmethod
     def determine_certificate_type(
         market_maker: MarketMakerClient,
@@ -742,10 +843,14 @@ class AutoTradeExecutor:
         rule: AutoTradeRule,
         certificate_type: CertificateType,
         market_price: Optional[Decimal],
+        best_prices: Optional[Tuple[Optional[Decimal], Optional[Decimal]]] = None,
+        generator: LadderGenerator = default_generator,
     ) -> Tuple[Optional[Decimal], str]:
         """
         Calculate order price based on rule's price mode.
 
+        best_prices is (best_bid, best_ask) if already known; otherwise read from the book.
+
         Returns: (price, reason) where reason explains the calculation or failure.
         """
         if rule.order_type == "MARKET":
@@ -758,7 +863,7 @@ class AutoTradeExecutor:
             return None, "fixed_price_not_set"
 
         elif rule.price_mode == AutoTradePriceMode.SPREAD_FROM_BEST:
-            best_bid, best_ask = await AutoTradeExecutor.get_best_prices(
+            best_bid, best_ask = best_prices or await AutoTradeExecutor.get_best_prices(
                 db, certificate_type
             )
 
@@ -808,7 +913,7 @@ class AutoTradeExecutor:
 
         elif rule.price_mode == AutoTradePriceMode.RANDOM_SPREAD:
             # Random spread between min and max, respecting 0.1 EUR step
-            best_bid, best_ask = await AutoTradeExecutor.get_best_prices(
+            best_bid, best_ask = best_prices or await AutoTradeExecutor.get_best_prices(
                 db, certificate_type
             )
 
@@ -824,7 +929,7 @@ class AutoTradeExecutor:
             steps_max = int(spread_max / Decimal("0.1"))
 
             # Pick a random step count
-            random_steps = random.randint(steps_min, steps_max)
+            random_steps = int(generator.rng.integers(steps_min, steps_max + 1))
             spread = Decimal(str(random_steps)) * Decimal("0.1")
 
             if rule.side == OrderSide.BUY:
@@ -863,6 +968,7 @@ class AutoTradeExecutor:
         balances: Dict[str, Dict[str, Decimal]],
         certificate_type: CertificateType,
         price: Optional[Decimal],
+        generator: LadderGenerator = default_generator,
     ) -> Tuple[Optional[Decimal], str]:
         """
         Calculate order quantity based on rule's quantity mode.
@@ -902,7 +1008,7 @@ class AutoTradeExecutor:
 
             # Generate random quantity
             range_size = max_qty - min_qty
-            random_offset = Decimal(str(random.random())) * range_size
+            random_offset = Decimal(str(generator.rng.random())) * range_size
             qty = min_qty + random_offset
 
             # Round to integer - no fractional certificates
@@ -920,10 +1026,13 @@ class AutoTradeExecutor:
         market_price: Optional[Decimal],
         balances: Dict[str, Dict[str, Decimal]],
         certificate_type: CertificateType,
+        active_count: Optional[int] = None,
     ) -> Tuple[bool, str]:
         """
         Validate that an order can be placed.
 
+        active_count is the market maker's open order count if already known.
+
         Checks:
         1. Max active orders limit
         2. Min balance requirement
@@ -934,9 +1043,10 @@ class AutoTradeExecutor:
         """
         # Check max active orders
         if rule.max_active_orders:
-            active_count = await AutoTradeExecutor.count_active_orders(
-                db, market_maker.id
-            )
+            if active_count is None:
+                active_count = await AutoTradeExecutor.count_active_orders(
+                    db, market_maker.id
+                )
             if active_count >= rule.max_active_orders:
                 return False, f"max_active_orders_reached ({active_count}/{rule.max_active_orders})"
 
@@ -1125,14 +1235,7 @@ class AutoTradeExecutor:
                 if match_qty <= 0:
                     continue
 
-                # Trade price: use sell price if it's a limit order, otherwise use buy price
-                # This handles MARKET orders which have price=0
-                if sell_order.price and sell_order.price > 0:
-                    trade_price = sell_order.price
-                else:
-                    trade_price = buy_order.price
-                # Round to 0.1 EUR step
-                trade_price = (trade_price / Decimal("0.1")).quantize(Decimal("1")) * Decimal("0.1")
+                trade_price = AutoTradeExecutor.match_price(buy_order.price, sell_order.price)
 
                 # Create trade
                 trade = CashMarketTrade(
@@ -1214,11 +1317,161 @@ class AutoTradeExecutor:
 
         return trades_created
 
+    @staticmethod
+    async def plan_order(
+        db: Optional[AsyncSession],
+        rule: AutoTradeRule,
+        market_maker: MarketMakerClient,
+        context: MarketContext,
+        market_settings: Optional[AutoTradeMarketSettings],
+        current_liq: Optional[Decimal],
+        target_liq: Optional[Decimal],
+        generator: LadderGenerator = default_generator,
+    ) -> Tuple[Optional[Decimal], Optional[Decimal], Optional[str]]:
+        """
+        Price, quantity and validation for a rule that should place an order.
+
+        Reads book state only from `context`, so it also runs without a
+        database (see auto_trade_simulator; db may then be None). Random
+        prices, volumes and quantities come from generator.
+
+        Returns: (price, quantity, failure_reason) - failure_reason is None
+        when the order can be placed.
+        """
+        # Get market price (or swap ratio for SWAP market)
+        # IMPORTANT: For SWAP market, Order.price is the ratio CEA/EUA, NOT EUR price!
+        market_price = context.market_price
+        if context.market_type == MarketType.SWAP:
+            # For swap market, use the CEA/EUA ratio as the "market price"
+            logger.info(f"Swap market: using ratio {market_price} as reference price")
+
+        # MMs have unlimited resources — skip balance fetch
+        balances: Dict[str, Dict[str, Decimal]] = {}
+
+        # Best prices for price calculation
+        best_bid, best_ask = context.best_bid, context.best_ask
+
+        # Calculate price - use market settings if available
+        if market_settings and best_bid and rule.order_type == "LIMIT":
+            # Use new price deviation setting
+            # For BUY: use best_ask as reference (we want to buy below it)
+            # For SELL: use best_bid as reference (we want to sell above it)
+            if rule.side == OrderSide.BUY:
+                reference_price = best_ask if best_ask else (best_bid if best_bid else market_price)
+            else:
+                reference_price = best_bid if best_bid else (best_ask if best_ask else market_price)
+
+            if reference_price:
+                [price] = generator.prices_with_deviation(
+                    1,
+                    reference_price,
+                    market_settings.price_deviation_pct,
+                    rule.side,
+                    is_swap_market=(context.market_type == MarketType.SWAP),
+                )
+                price_reason = f"market_settings_deviation ({market_settings.price_deviation_pct}%)"
+            else:
+                # Fall back to rule-based calculation
+                price, price_reason = await AutoTradeExecutor.calculate_order_price(
+                    db, rule, context.certificate_type, market_price, (best_bid, best_ask), generator
+                )
+        else:
+            # Use rule-based calculation
+            price, price_reason = await AutoTradeExecutor.calculate_order_price(
+                db, rule, context.certificate_type, market_price, (best_bid, best_ask), generator
+            )
+
+        if price is None and rule.order_type == "LIMIT":
+            return None, None, f"price_calculation_failed: {price_reason}"
+
+        # Max orders per price level enforcement
+        if market_settings and price and market_settings.max_orders_per_price_level:
+            max_per_level = market_settings.max_orders_per_price_level
+            # Apply variation to the max
+            if market_settings.max_orders_per_level_variation_pct and market_settings.max_orders_per_level_variation_pct > 0:
+                pct = float(market_settings.max_orders_per_level_variation_pct)
+                factor = 1.0 + generator.rng.uniform(-pct / 100, pct / 100)
+                max_per_level = max(1, round(max_per_level * factor))
+
+            # Count existing orders at this price level
+            orders_at_price = context.orders_at_price.get((rule.side, price), 0)
+
+            # If at capacity, shift to next available price level
+            if orders_at_price >= max_per_level:
+                step = Decimal("0.1") if context.market_type != MarketType.SWAP else Decimal("0.0001")
+                shifted = False
+                for shift in range(1, 20):  # Try up to 20 levels
+                    if rule.side == OrderSide.BUY:
+                        candidate = price - step * shift
+                        if candidate <= Decimal("0"):
+                            break
+                    else:
+                        candidate = price + step * shift
+
+                    if context.orders_at_price.get((rule.side, candidate), 0) < max_per_level:
+                        price = candidate
+                        shifted = True
+                        break
+
+                if not shifted:
+                    return price, None, "all_price_levels_at_max_capacity"
+
+        # Calculate quantity - use market settings for volume variety if available
+        if market_settings and price and price > 0:
+            # Calculate volume in EUR with variety
+            [volume] = generator.volumes_with_variety(
+                1,
+                market_settings.min_order_volume_eur,
+                market_settings.volume_variety,
+                target_liq,
+                current_liq or Decimal("0"),
+                market_settings.avg_order_count,
+                variation_pct=market_settings.min_order_value_variation_pct,
+                max_volume_eur=market_settings.max_order_volume_eur,
+            )
+            volume_eur = Decimal(str(volume))
+            # Convert EUR volume to quantity (certificates)
+            # IMPORTANT: For SWAP market, price is ratio (CEA/EUA), not EUR price!
+            # We need to use the actual EUA EUR price to calculate quantity
+            if context.market_type == MarketType.SWAP:
+                # For swap: quantity is in EUA, so divide by EUA EUR price
+                eua_eur_price = context.eua_eur_price
+                if eua_eur_price and eua_eur_price > 0:
+                    quantity = (volume_eur / eua_eur_price).quantize(Decimal("1"), rounding=ROUND_DOWN)
+                    qty_reason = f"swap_volume (vol={volume_eur:.0f} EUR / {eua_eur_price} EUR/EUA = {quantity} EUA)"
+                else:
+                    quantity = Decimal("0")
+                    qty_reason = "eua_price_unavailable"
+            else:
+                quantity = (volume_eur / price).quantize(Decimal("1"), rounding=ROUND_DOWN)
+                qty_reason = f"market_settings_variety (vol={volume_eur:.0f} EUR, variety={market_settings.volume_variety})"
+        else:
+            # Use rule-based calculation
+            quantity, qty_reason = await AutoTradeExecutor.calculate_order_quantity(
+                db, rule, balances, context.certificate_type, price, generator
+            )
+
+        if quantity is None or quantity <= 0:
+            return price, None, f"quantity_calculation_failed: {qty_reason}"
+
+        # Validate order
+        is_valid, validation_reason = await AutoTradeExecutor.validate_order(
+            db, rule, market_maker, price, quantity, market_price,
+            balances, context.certificate_type,
+            active_count=context.active_orders.get(market_maker.id, 0),
+        )
+
+        if not is_valid:
+            return price, quantity, f"validation_failed: {validation_reason}"
+
+        return price, quantity, None
+
     @staticmethod
     async def execute_rule(
         db: AsyncSession,
         rule: AutoTradeRule,
         admin_user_id: uuid.UUID,
+        context: Optional[MarketContext] = None,
     ) -> Dict:
         """
         Execute a single auto-trade rule with target-based liquidity management.
@@ -1229,6 +1482,9 @@ class AutoTradeExecutor:
         - above_target: Execute internal trades to consume excess
         - no_target: Place orders normally (no liquidity management)
 
+        Book state is read from `context` (built for this rule alone if not
+        given); placed orders are applied to it, trades mark it stale.
+
         Returns a dict with execution result details.
         """
         result = {
@@ -1251,9 +1507,14 @@ class AutoTradeExecutor:
             market_type = AutoTradeExecutor.determine_market_type(market_maker)
             market_key = AutoTradeExecutor.determine_market_key(market_maker)
 
+            if context is None:
+                context = await AutoTradeExecutor.build_market_context(
+                    db, certificate_type, market_type, [market_key], [market_maker.id]
+                )
+
             # Check liquidity status using new v2 method (AutoTradeMarketSettings)
-            status, current_liq, target_liq, market_settings = await AutoTradeExecutor.get_liquidity_status_v2(
-                db, market_key, certificate_type, rule.side, market_type
+            status, current_liq, target_liq, market_settings = AutoTradeExecutor.classify_liquidity(
+                context.market_settings.get(market_key), context.liquidity.get(rule.side)
             )
 
             result["liquidity_status"] = {
@@ -1297,6 +1558,7 @@ class AutoTradeExecutor:
                         break
 
                     trades_executed += 1
+                    context.stale = True
                     logger.info(
                         f"Rule {rule.name} threshold reduction trade #{trades_executed}: "
                         f"{internal_result['quantity']} @ {internal_result['price']}"
@@ -1344,6 +1606,8 @@ class AutoTradeExecutor:
                 internal_result = await AutoTradeExecutor.execute_internal_trade(
                     db, certificate_type, admin_user_id
                 )
+                if internal_result["success"]:
+                    context.stale = True
 
                 # Update rule execution tracking
                 rule.last_executed_at = datetime.now(timezone.utc).replace(tzinfo=None)
@@ -1376,160 +1640,11 @@ class AutoTradeExecutor:
             else:
                 result["action"] = "place_order_normal"
 
-            # Get market price (or swap ratio for SWAP market)
-            # IMPORTANT: For SWAP market, Order.price is the ratio CEA/EUA, NOT EUR price!
-            if market_type == MarketType.SWAP:
-                # For swap market, use the CEA/EUA ratio as the "market price"
-                market_price = await AutoTradeExecutor.get_swap_ratio()
-                logger.info(f"Swap market: using ratio {market_price} as reference price")
-            else:
-                market_price = await AutoTradeExecutor.get_market_price(certificate_type.value)
-
-            # MMs have unlimited resources — skip balance fetch
-            balances: Dict[str, Dict[str, Decimal]] = {}
-
-            # Get best prices for price calculation
-            best_bid, best_ask = await AutoTradeExecutor.get_best_prices(db, certificate_type)
-
-            # Calculate price - use market settings if available
-            if market_settings and best_bid and rule.order_type == "LIMIT":
-                # Use new price deviation setting
-                # For BUY: use best_ask as reference (we want to buy below it)
-                # For SELL: use best_bid as reference (we want to sell above it)
-                if rule.side == OrderSide.BUY:
-                    reference_price = best_ask if best_ask else (best_bid if best_bid else market_price)
-                else:
-                    reference_price = best_bid if best_bid else (best_ask if best_ask else market_price)
-
-                if reference_price:
-                    price = AutoTradeExecutor.calculate_price_with_deviation(
-                        reference_price,
-                        market_settings.price_deviation_pct,
-                        rule.side,
-                        is_swap_market=(market_type == MarketType.SWAP),
-                    )
-                    price_reason = f"market_settings_deviation ({market_settings.price_deviation_pct}%)"
-                else:
-                    # Fall back to rule-based calculation
-                    price, price_reason = await AutoTradeExecutor.calculate_order_price(
-                        db, rule, certificate_type, market_price
-                    )
-            else:
-                # Use rule-based calculation
-                price, price_reason = await AutoTradeExecutor.calculate_order_price(
-                    db, rule, certificate_type, market_price
-                )
-
-            if price is None and rule.order_type == "LIMIT":
-                result["reason"] = f"price_calculation_failed: {price_reason}"
-                # Schedule next execution anyway
-                rule.next_execution_at = AutoTradeExecutor.calculate_next_execution_time(rule, _interval_var)
-                await db.commit()
-                return result
-
-            # Max orders per price level enforcement
-            if market_settings and price and market_settings.max_orders_per_price_level:
-                from sqlalchemy import and_ as sql_and, func as sql_func
-                max_per_level = market_settings.max_orders_per_price_level
-                # Apply variation to the max
-                if market_settings.max_orders_per_level_variation_pct and market_settings.max_orders_per_level_variation_pct > 0:
-                    pct = float(market_settings.max_orders_per_level_variation_pct)
-                    factor = 1.0 + random.uniform(-pct / 100, pct / 100)
-                    max_per_level = max(1, round(max_per_level * factor))
-
-                # Count existing orders at this price level
-                count_result = await db.execute(
-                    select(sql_func.count()).select_from(Order).where(
-                        sql_and(
-                            Order.certificate_type == certificate_type,
-                            Order.side == rule.side,
-                            Order.price == price,
-                            Order.status.in_([OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]),
-                        )
-                    )
-                )
-                orders_at_price = count_result.scalar() or 0
-
-                # If at capacity, shift to next available price level
-                if orders_at_price >= max_per_level:
-                    step = Decimal("0.1") if market_type != MarketType.SWAP else Decimal("0.0001")
-                    shifted = False
-                    for shift in range(1, 20):  # Try up to 20 levels
-                        if rule.side == OrderSide.BUY:
-                            candidate = price - step * shift
-                            if candidate <= Decimal("0"):
-                                break
-                        else:
-                            candidate = price + step * shift
-
-                        count_result = await db.execute(
-                            select(sql_func.count()).select_from(Order).where(
-                                sql_and(
-                                    Order.certificate_type == certificate_type,
-                                    Order.side == rule.side,
-                                    Order.price == candidate,
-                                    Order.status.in_([OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]),
-                                )
-                            )
-                        )
-                        if (count_result.scalar() or 0) < max_per_level:
-                            price = candidate
-                            shifted = True
-                            break
-
-                    if not shifted:
-                        result["reason"] = "all_price_levels_at_max_capacity"
-                        rule.next_execution_at = AutoTradeExecutor.calculate_next_execution_time(rule, _interval_var)
-                        await db.commit()
-                        return result
-
-            # Calculate quantity - use market settings for volume variety if available
-            if market_settings and price and price > 0:
-                # Calculate volume in EUR with variety
-                volume_eur = AutoTradeExecutor.calculate_order_volume_with_variety(
-                    market_settings.min_order_volume_eur,
-                    market_settings.volume_variety,
-                    target_liq,
-                    current_liq or Decimal("0"),
-                    market_settings.avg_order_count,
-                    variation_pct=market_settings.min_order_value_variation_pct,
-                    max_volume_eur=market_settings.max_order_volume_eur,
-                )
-                # Convert EUR volume to quantity (certificates)
-                # IMPORTANT: For SWAP market, price is ratio (CEA/EUA), not EUR price!
-                # We need to use the actual EUA EUR price to calculate quantity
-                if market_type == MarketType.SWAP:
-                    # For swap: quantity is in EUA, so divide by EUA EUR price
-                    eua_eur_price = await AutoTradeExecutor.get_market_price("EUA")
-                    if eua_eur_price and eua_eur_price > 0:
-                        quantity = (volume_eur / eua_eur_price).quantize(Decimal("1"), rounding=ROUND_DOWN)
-                        qty_reason = f"swap_volume (vol={volume_eur:.0f} EUR / {eua_eur_price} EUR/EUA = {quantity} EUA)"
-                    else:
-                        quantity = Decimal("0")
-                        qty_reason = "eua_price_unavailable"
-                else:
-                    quantity = (volume_eur / price).quantize(Decimal("1"), rounding=ROUND_DOWN)
-                    qty_reason = f"market_settings_variety (vol={volume_eur:.0f} EUR, variety={market_settings.volume_variety})"
-            else:
-                # Use rule-based calculation
-                quantity, qty_reason = await AutoTradeExecutor.calculate_order_quantity(
-                    db, rule, balances, certificate_type, price
-                )
-
-            if quantity is None or quantity <= 0:
-                result["reason"] = f"quantity_calculation_failed: {qty_reason}"
-                rule.next_execution_at = AutoTradeExecutor.calculate_next_execution_time(rule, _interval_var)
-                await db.commit()
-                return result
-
-            # Validate order
-            is_valid, validation_reason = await AutoTradeExecutor.validate_order(
-                db, rule, market_maker, price, quantity, market_price,
-                balances, certificate_type
+            price, quantity, plan_failure = await AutoTradeExecutor.plan_order(
+                db, rule, market_maker, context, market_settings, current_liq, target_liq
             )
-
-            if not is_valid:
-                result["reason"] = f"validation_failed: {validation_reason}"
+            if plan_failure:
+                result["reason"] = plan_failure
                 rule.next_execution_at = AutoTradeExecutor.calculate_next_execution_time(rule, _interval_var)
                 await db.commit()
                 return result
@@ -1546,12 +1661,15 @@ class AutoTradeExecutor:
                 result["ticket_id"] = ticket_id
                 result["price"] = str(price) if price else None
                 result["quantity"] = str(quantity)
+                context.record_order(market_maker.id, rule.side, price, quantity)
 
                 # Try to match crossing orders after placement
                 trades_matched = await AutoTradeExecutor.try_match_orders(
                     db, certificate_type, admin_user_id
                 )
                 result["trades_matched"] = trades_matched
+                if trades_matched:
+                    context.stale = True
             else:
                 result["reason"] = f"order_placement_failed: {ticket_id}"
 
@@ -1566,27 +1684,47 @@ class AutoTradeExecutor:
     async def execute_all_ready_rules(
         db: AsyncSession,
         admin_user_id: uuid.UUID,
+        max_concurrent_markets: Optional[int] = None,
     ) -> List[Dict]:
         """
         Execute all rules that are ready for execution.
 
         This is the main entry point for the background scheduler.
+        Ready rules are grouped by order book; books run concurrently (bounded
+        by AUTO_TRADE_MAX_CONCURRENT_MARKETS), each on its own session, while
+        rules within a book run one after another to keep the book consistent.
         Returns list of execution results.
         """
-        results = []
+        results: List[Dict] = []
 
         try:
             rules = await AutoTradeExecutor.get_rules_ready_for_execution(db)
             logger.info(f"Found {len(rules)} rules ready for execution")
 
+            groups: Dict[str, List[uuid.UUID]] = {}
             for rule in rules:
-                result = await AutoTradeExecutor.execute_rule(db, rule, admin_user_id)
-                results.append(result)
+                book_key = AutoTradeExecutor.determine_order_book_key(rule.market_maker)
+                groups.setdefault(book_key, []).append(rule.id)
 
-                if result["success"]:
-                    logger.info(f"Rule {rule.name} executed successfully: order {result['order_id']}")
-                else:
-                    logger.warning(f"Rule {rule.name} execution failed: {result['reason']}")
+            semaphore = asyncio.Semaphore(
+                max_concurrent_markets or settings.AUTO_TRADE_MAX_CONCURRENT_MARKETS
+            )
+
+            async def run_group(book_key: str, rule_ids: List[uuid.UUID]) -> List[Dict]:
+                async with semaphore:
+                    return await AutoTradeExecutor.execute_market_rules(
+                        book_key, rule_ids, admin_user_id
+                    )
+
+            group_results = await asyncio.gather(
+                *(run_group(key, ids) for key, ids in groups.items()),
+                return_exceptions=True,
+            )
+            for book_key, group_result in zip(groups, group_results):
+                if isinstance(group_result, BaseException):
+                    logger.error(f"Auto-trade market {book_key} failed: {group_result}")
+                    continue
+                results.extend(group_result)
 
             return results
 
@@ -1594,6 +1732,73 @@ class AutoTradeExecutor:
             logger.exception(f"Error in execute_all_ready_rules: {e}")
             return results
 
+    @staticmethod
+    async def execute_market_rules(
+        book_key: str,
+        rule_ids: List[uuid.UUID],
+        admin_user_id: uuid.UUID,
+    ) -> List[Dict]:
+        """Execute one order book's ready rules serially on a dedicated session."""
+        started = time.monotonic()
+        results = []
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(AutoTradeRule)
+                .where(AutoTradeRule.id.in_(rule_ids))
+                .options(selectinload(AutoTradeRule.market_maker))
+            )
+            rules_by_id = {rule.id: rule for rule in result.scalars().all()}
+            if not rules_by_id:
+                return results
+
+            # Plain values: a rollback later in the cycle expires the ORM objects
+            market_makers = [rule.market_maker for rule in rules_by_id.values()]
+            certificate_type = AutoTradeExecutor.determine_certificate_type(market_makers[0])
+            market_type = AutoTradeExecutor.determine_market_type(market_makers[0])
+            market_keys = sorted({AutoTradeExecutor.determine_market_key(mm) for mm in market_makers})
+            market_maker_ids = list({mm.id for mm in market_makers})
+            context: Optional[MarketContext] = None
+
+            for rule_id in rule_ids:
+                rule = rules_by_id.get(rule_id)
+                if rule is not None and sa_inspect(rule).expired_attributes:
+                    # An earlier rule rolled back, which expired everything on this session
+                    result = await db.execute(
+                        select(AutoTradeRule)
+                        .where(AutoTradeRule.id == rule_id)
+                        .options(selectinload(AutoTradeRule.market_maker))
+                        .execution_options(populate_existing=True)
+                    )
+                    rule = result.scalar_one_or_none()
+                if rule is None:
+                    continue  # Deleted since the ready check
+
+                if context is None or context.stale or context.expired:
+                    context = await AutoTradeExecutor.build_market_context(
+                        db, certificate_type, market_type, market_keys, market_maker_ids
+                    )
+
+                result = await AutoTradeExecutor.execute_rule(db, rule, admin_user_id, context)
+                result["market"] = book_key
+                results.append(result)
+
+                if result["success"]:
+                    logger.info(f"Rule {rule.name} executed successfully: order {result['order_id']}")
+                else:
+                    logger.warning(f"Rule {rule.name} execution failed: {result['reason']}")
+                    if (result["reason"] or "").startswith("exception:"):
+                        # Don't let a failed flush poison the rest of this book's rules
+                        await db.rollback()
+
+        duration_ms = int((time.monotonic() - started) * 1000)
+        successes = sum(1 for r in results if r["success"])
+        logger.info(
+            f"Auto-trade market {book_key}: {successes}/{len(results)} rules succeeded "
+            f"in {duration_ms} ms"
+        )
+        return results
+
 
 # Background task for running auto-trade execution
 _executor_task: Optional[asyncio.Task] = None
@@ -1670,6 +1875,48 @@ async def get_all_orderbook_prices(
     return [row[0] for row in result.fetchall()]
 
 
+def spread_fill_levels(
+    best_bid: Decimal,
+    best_ask: Decimal,
+    existing_bids: Set[Decimal],
+    existing_asks: Set[Decimal],
+    price_step: Decimal,
+) -> Tuple[List[Decimal], List[Decimal], List[Dict]]:
+    """
+    Price levels fill_spread_with_orders adds: (bid_prices, ask_prices, gaps).
+
+    BIDs go on every free level inside the spread (narrowing it); ASKs fill
+    missing levels between consecutive existing asks.
+    """
+    # Calculate BID prices to add (from best_bid+0.1 up to best_ask-0.1)
+    # This will improve the best bid and narrow the spread
+    bid_prices = [
+        price
+        for price in LadderGenerator.spread_levels(best_bid, best_ask, price_step)
+        if price not in existing_bids
+    ]
+
+    # Calculate ASK gaps to fill (missing prices in the ask book)
+    # Find gaps where consecutive asks differ by more than 0.1
+    sorted_asks = sorted(existing_asks)
+    ask_prices = []
+    gaps = []
+
+    for i in range(len(sorted_asks) - 1):
+        gap = sorted_asks[i + 1] - sorted_asks[i]
+        if gap > price_step:
+            # Fill the gap
+            for fill_price in LadderGenerator.spread_levels(sorted_asks[i], sorted_asks[i + 1], price_step):
+                if fill_price not in existing_asks:
+                    ask_prices.append(fill_price)
+                    gaps.append({
+                        "between": [str(sorted_asks[i]), str(sorted_asks[i + 1])],
+                        "filling": str(fill_price),
+                    })
+
+    return bid_prices, ask_prices, gaps
+
+
 async def fill_spread_with_orders(
     db: AsyncSession,
     certificate_type: CertificateType,
@@ -1761,36 +2008,10 @@ async def fill_spread_with_orders(
             result["message"] = "No active market makers available"
             return result
 
-        # Calculate BID prices to add (from best_bid+0.1 up to best_ask-0.1)
-        # This will improve the best bid and narrow the spread
-        bid_prices_to_add = []
-        current_price = best_bid + price_step
-        while current_price < best_ask:
-            # Round to 0.1 EUR step
-            current_price = (current_price / price_step).quantize(Decimal("1")) * price_step
-            if current_price not in existing_bids:
-                bid_prices_to_add.append(current_price)
-            current_price += price_step
-
-        # Calculate ASK gaps to fill (missing prices in the ask book)
-        # Find gaps where consecutive asks differ by more than 0.1
-        sorted_asks = sorted(existing_asks)
-        ask_prices_to_add = []
-
-        for i in range(len(sorted_asks) - 1):
-            gap = sorted_asks[i + 1] - sorted_asks[i]
-            if gap > price_step:
-                # Fill the gap
-                fill_price = sorted_asks[i] + price_step
-                while fill_price < sorted_asks[i + 1]:
-                    fill_price = (fill_price / price_step).quantize(Decimal("1")) * price_step
-                    if fill_price not in existing_asks:
-                        ask_prices_to_add.append(fill_price)
-                        result["gaps_found"].append({
-                            "between": [str(sorted_asks[i]), str(sorted_asks[i + 1])],
-                            "filling": str(fill_price),
-                        })
-                    fill_price += price_step
+        bid_prices_to_add, ask_prices_to_add, gaps = spread_fill_levels(
+            best_bid, best_ask, existing_bids, existing_asks, price_step
+        )
+        result["gaps_found"].extend(gaps)
 
         logger.info(f"Fill spread: bid_prices_to_add={bid_prices_to_add}, ask_prices_to_add={ask_prices_to_add}")
 
@@ -0,0 +1,719 @@
+"""
+Auto-Trade Simulator
+
+Offline backtesting for AutoTradeRule / AutoTradeMarketSettings changes.
+Runs the executor's decision logic (liquidity classification, order
+planning, internal trades, crossing-order matching, spread fill) against an
+in-memory order book, a recorded or synthetic price series and a virtual
+clock - no database, Redis or price scraper involved.
+
+The decision code is shared with the live executor (classify_liquidity,
+plan_order, internal_trade_price, match_price, spread_fill_levels,
+calculate_next_execution_time); only persistence is replaced, so
+Simulator.execute_rule mirrors AutoTradeExecutor.execute_rule branch by
+branch.
+
+Parameter grids run across a process pool (run_grid). From the shell:
+
+    python -m app.services.auto_trade_simulator sim.json --grid grid.json --workers 4
+"""
+
+import argparse
+import asyncio
+import bisect
+import csv
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_DOWN
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.models import (
+    AutoTradeMarketSettings,
+    AutoTradeRule,
+    CertificateType,
+    MarketMakerClient,
+    MarketMakerType,
+    MarketType,
+    OrderSide,
+)
+from .auto_trade_executor import AutoTradeExecutor, MarketContext, spread_fill_levels
+from .ladder_generator import LadderGenerator, default_generator
+
+logger = logging.getLogger(__name__)
+
+SIM_EPOCH = datetime(2026, 1, 1)  # Virtual clock start for synthetic series
+
+
+# =============================================================================
+# Price series
+# =============================================================================
+
+
+@dataclass
+class PriceSeries:
+    """Step-function price series: the price at t is the last point at or before t"""
+
+    times: List[datetime]
+    prices: List[Decimal]
+
+    def __post_init__(self):
+        if not self.times or len(self.times) != len(self.prices):
+            raise ValueError("PriceSeries needs matching, non-empty times and prices")
+
+    @property
+    def start(self) -> datetime:
+        return self.times[0]
+
+    @property
+    def end(self) -> datetime:
+        return self.times[-1]
+
+    def at(self, t: datetime) -> Decimal:
+        i = bisect.bisect_right(self.times, t) - 1
+        return self.prices[max(i, 0)]
+
+    @classmethod
+    def from_points(cls, points: Sequence[Tuple[datetime, Any]]) -> "PriceSeries":
+        """Build from (timestamp, price) pairs, e.g. PriceHistory rows."""
+        ordered = sorted(points, key=lambda p: p[0])
+        return cls(
+            times=[t for t, _ in ordered],
+            prices=[Decimal(str(p)) for _, p in ordered],
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "PriceSeries":
+        """CSV with `timestamp` (ISO 8601) and `price` columns."""
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        return cls.from_points(
+            [(datetime.fromisoformat(r["timestamp"]), r["price"]) for r in rows]
+        )
+
+    @classmethod
+    def synthetic(
+        cls,
+        start_price: Decimal,
+        duration_seconds: int,
+        step_seconds: int = 60,
+        volatility_pct: float = 0.2,
+        drift_pct: float = 0.0,
+        seed: Optional[int] = None,
+        quantum: Decimal = Decimal("0.01"),
+        start: datetime = SIM_EPOCH,
+    ) -> "PriceSeries":
+        """Geometric random walk; volatility/drift are per step, in percent."""
+        steps = max(duration_seconds // step_seconds, 1) + 1
+        rng = np.random.default_rng(seed)
+        log_returns = rng.normal(drift_pct / 100, volatility_pct / 100, size=steps - 1)
+        path = float(start_price) * np.exp(np.concatenate(([0.0], np.cumsum(log_returns))))
+        return cls(
+            times=[start + timedelta(seconds=i * step_seconds) for i in range(steps)],
+            prices=[Decimal(str(p)).quantize(quantum) for p in path],
+        )
+
+
+# =============================================================================
+# In-memory order book
+# =============================================================================
+
+
+@dataclass
+class SimOrder:
+    """Open MM order in the simulated book"""
+
+    seq: int
+    market_maker_id: uuid.UUID
+    side: OrderSide
+    price: Decimal
+    quantity: Decimal
+    filled_quantity: Decimal = Decimal("0")
+
+    @property
+    def remaining(self) -> Decimal:
+        return self.quantity - self.filled_quantity
+
+
+@dataclass
+class SimTrade:
+    kind: str  # "match" or "internal"
+    price: Decimal
+    quantity: Decimal
+    buyer_id: uuid.UUID
+    seller_id: uuid.UUID
+
+
+class SimBook:
+    """
+    Price-time ordered book of open MM orders with incrementally maintained
+    aggregates (liquidity, per-level and per-MM order counts), so building a
+    MarketContext does not scan every order.
+    """
+
+    def __init__(self, market_type: MarketType, generator: LadderGenerator = default_generator):
+        self.market_type = market_type
+        self.generator = generator
+        self.bids: List[SimOrder] = []  # Highest price first, then oldest
+        self.asks: List[SimOrder] = []  # Lowest price first, then oldest
+        self.level_counts: Dict[Tuple[OrderSide, Decimal], int] = {}
+        self.active_counts: Dict[uuid.UUID, int] = {}
+        self.remaining_qty = {OrderSide.BUY: Decimal("0"), OrderSide.SELL: Decimal("0")}
+        self.remaining_value = {OrderSide.BUY: Decimal("0"), OrderSide.SELL: Decimal("0")}
+        self._seq = 0
+
+    @staticmethod
+    def _key(order: SimOrder):
+        return (-order.price if order.side == OrderSide.BUY else order.price, order.seq)
+
+    def _orders(self, side: OrderSide) -> List[SimOrder]:
+        return self.bids if side == OrderSide.BUY else self.asks
+
+    @property
+    def best_bid(self) -> Optional[Decimal]:
+        return self.bids[0].price if self.bids else None
+
+    @property
+    def best_ask(self) -> Optional[Decimal]:
+        return self.asks[0].price if self.asks else None
+
+    def prices(self, side: OrderSide) -> set:
+        return {price for (s, price), count in self.level_counts.items() if s == side and count}
+
+    def liquidity(self, side: OrderSide, eua_eur_price: Optional[Decimal]) -> Decimal:
+        """EUR liquidity, computed like AutoTradeExecutor.calculate_current_liquidity."""
+        if self.market_type == MarketType.SWAP:
+            if eua_eur_price and eua_eur_price > 0:
+                return self.remaining_qty[side] * eua_eur_price
+            return Decimal("0")
+        return self.remaining_value[side]
+
+    def place(self, market_maker_id: uuid.UUID, side: OrderSide, price: Decimal, quantity: Decimal) -> SimOrder:
+        self._seq += 1
+        order = SimOrder(self._seq, market_maker_id, side, price, quantity)
+        bisect.insort(self._orders(side), order, key=self._key)
+        self.level_counts[(side, price)] = self.level_counts.get((side, price), 0) + 1
+        self.active_counts[market_maker_id] = self.active_counts.get(market_maker_id, 0) + 1
+        self.remaining_qty[side] += quantity
+        self.remaining_value[side] += price * quantity
+        return order
+
+    def _fill(self, order: SimOrder, quantity: Decimal) -> None:
+        order.filled_quantity += quantity
+        self.remaining_qty[order.side] -= quantity
+        self.remaining_value[order.side] -= order.price * quantity
+        if order.remaining <= 0:
+            self._orders(order.side).remove(order)
+            self.level_counts[(order.side, order.price)] -= 1
+            self.active_counts[order.market_maker_id] -= 1
+
+    def match(self) -> List[SimTrade]:
+        """Cross MM orders the way AutoTradeExecutor.try_match_orders does."""
+        trades: List[SimTrade] = []
+        for buy in list(self.bids):
+            buy_remaining = buy.remaining
+            for sell in list(self.asks):
+                if buy.price < sell.price:
+                    break
+                if buy.market_maker_id == sell.market_maker_id or sell.remaining <= 0:
+                    continue
+                match_qty = min(buy_remaining, sell.remaining).quantize(Decimal("1"), rounding=ROUND_DOWN)
+                if match_qty <= 0:
+                    continue
+                price = AutoTradeExecutor.match_price(buy.price, sell.price)
+                self._fill(buy, match_qty)
+                self._fill(sell, match_qty)
+                trades.append(SimTrade("match", price, match_qty, buy.market_maker_id, sell.market_maker_id))
+                buy_remaining -= match_qty
+                if buy_remaining <= 0:
+                    break
+        return trades
+
+    def internal_trade(self) -> Optional[SimTrade]:
+        """Consume the best bid and ask, like AutoTradeExecutor.execute_internal_trade."""
+        best_bid, best_ask = self.best_bid, self.best_ask
+        if not best_bid or not best_ask or best_bid >= best_ask:
+            return None
+        trade_price = AutoTradeExecutor.internal_trade_price(best_bid, best_ask, self.generator)
+        buy, sell = self.bids[0], self.asks[0]
+        if buy.market_maker_id == sell.market_maker_id:
+            return None
+        match_qty = min(buy.remaining, sell.remaining).quantize(Decimal("1"), rounding=ROUND_DOWN)
+        if match_qty <= 0:
+            return None
+        self._fill(buy, match_qty)
+        self._fill(sell, match_qty)
+        return SimTrade("internal", trade_price, match_qty, buy.market_maker_id, sell.market_maker_id)
+
+    def context(
+        self,
+        certificate_type: CertificateType,
+        market_price: Optional[Decimal],
+        eua_eur_price: Optional[Decimal],
+        market_settings: Dict[str, Optional[AutoTradeMarketSettings]],
+    ) -> MarketContext:
+        return MarketContext(
+            certificate_type=certificate_type,
+            market_type=self.market_type,
+            best_bid=self.best_bid,
+            best_ask=self.best_ask,
+            market_price=market_price,
+            eua_eur_price=eua_eur_price,
+            liquidity={side: self.liquidity(side, eua_eur_price) for side in (OrderSide.BUY, OrderSide.SELL)},
+            market_settings=market_settings,
+            active_orders={k: v for k, v in self.active_counts.items() if v},
+            orders_at_price={k: v for k, v in self.level_counts.items() if v},
+        )
+
+
+# =============================================================================
+# Configuration and report
+# =============================================================================
+
+
+@dataclass
+class SimulationConfig:
+    """
+    One simulated parameter set.
+
+    rules: AutoTradeRule fields per rule, plus "market_maker" (name; rules with
+        the same name share a market maker) and "mm_type" (MarketMakerType value).
+    market_settings: AutoTradeMarketSettings fields per market_key.
+    prices: EUR price of the certificate (CEA cash) or CEA/EUA ratio (SWAP).
+    eua_prices: EUA EUR price, SWAP only (converts EUA quantities to EUR).
+    initial_book: (market_maker, side, price, quantity) orders to start from.
+    """
+
+    rules: List[Dict[str, Any]]
+    market_settings: Dict[str, Dict[str, Any]]
+    prices: PriceSeries
+    eua_prices: Optional[PriceSeries] = None
+    duration_seconds: Optional[int] = None  # Defaults to the price series span
+    cycle_seconds: int = 5
+    spread_fill_every: int = 0  # Cycles between spread fills; 0 disables
+    spread_fill_quantity: Decimal = Decimal("100")
+    initial_book: List[Tuple[str, str, Any, Any]] = field(default_factory=list)
+    seed: Optional[int] = 0
+    name: str = "baseline"
+    params: Dict[str, Any] = field(default_factory=dict)  # Grid overrides applied
+
+
+@dataclass
+class SimulationReport:
+    name: str
+    params: Dict[str, Any]
+    cycles: int
+    simulated_seconds: int
+    wall_seconds: float
+    cycles_per_second: float
+    rule_executions: int
+    outcomes: Dict[str, int]
+    orders_placed: int
+    spread_fill_orders: int
+    match_trades: int
+    internal_trades: int
+    traded_quantity: str
+    traded_value_eur: str
+    spread: Dict[str, Optional[float]]
+    liquidity_eur: Dict[str, Dict[str, Optional[float]]]
+    inventory: Dict[str, Dict[str, str]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _with_defaults(model, values: Dict[str, Any]):
+    """Transient model instance with scalar column defaults applied (no flush happens)."""
+    data = dict(values)
+    for column in model.__table__.columns:
+        if column.key not in data and column.default is not None and column.default.is_scalar:
+            data[column.key] = column.default.arg
+    return model(**data)
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"mean": None, "min": None, "max": None, "p95": None}
+    arr = np.asarray(values, dtype=float)
+    return {
+        "mean": round(float(arr.mean()), 4),
+        "min": round(float(arr.min()), 4),
+        "max": round(float(arr.max()), 4),
+        "p95": round(float(np.percentile(arr, 95)), 4),
+    }
+
+
+# =============================================================================
+# Simulator
+# =============================================================================
+
+
+class Simulator:
+    """Drives the executor's decision logic over one SimulationConfig"""
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.market_makers: Dict[str, MarketMakerClient] = {}
+        self.rules: List[AutoTradeRule] = []
+        for spec in config.rules:
+            spec = dict(spec)
+            mm_name = spec.pop("market_maker", None) or spec["name"]
+            mm_type = MarketMakerType(spec.pop("mm_type"))
+            mm = self.market_makers.get(mm_name)
+            if mm is None:
+                mm = MarketMakerClient(id=uuid.uuid4(), name=mm_name, mm_type=mm_type, is_active=True)
+                self.market_makers[mm_name] = mm
+            spec.setdefault("enabled", True)
+            spec["side"] = OrderSide(spec["side"])
+            rule = _with_defaults(AutoTradeRule, {"id": uuid.uuid4(), "market_maker_id": mm.id, **spec})
+            rule.market_maker = mm
+            self.rules.append(rule)
+        if not self.rules:
+            raise ValueError("Simulation needs at least one rule")
+
+        first_mm = self.rules[0].market_maker
+        self.market_type = AutoTradeExecutor.determine_market_type(first_mm)
+        self.certificate_type = AutoTradeExecutor.determine_certificate_type(first_mm)
+        if any(AutoTradeExecutor.determine_market_type(r.market_maker) != self.market_type for r in self.rules):
+            raise ValueError("All simulated rules must trade in the same order book")
+
+        self.market_settings = {
+            key: _with_defaults(AutoTradeMarketSettings, {"market_key": key, **values})
+            for key, values in config.market_settings.items()
+        }
+        # Every random draw of the run comes from here, so a seed replays it exactly
+        self.generator = LadderGenerator(config.seed)
+        self.book = SimBook(self.market_type, self.generator)
+        self.mm_names = {mm.id: name for name, mm in self.market_makers.items()}
+        for mm_name, side, price, quantity in config.initial_book:
+            mm = self.market_makers[mm_name]
+            self.book.place(mm.id, OrderSide(side), Decimal(str(price)), Decimal(str(quantity)))
+
+        self.outcomes: Counter = Counter()
+        self.trades: List[SimTrade] = []
+        self.orders_placed = 0
+        self.spread_fill_orders = 0
+
+    def _record_trades(self, trades: Sequence[SimTrade], context: MarketContext) -> None:
+        if trades:
+            self.trades.extend(trades)
+            context.stale = True
+
+    def _schedule(self, rule: AutoTradeRule, now: datetime, interval_variation_pct=None) -> None:
+        rule.next_execution_at = AutoTradeExecutor.calculate_next_execution_time(
+            rule, interval_variation_pct, now=now, generator=self.generator
+        )
+
+    def _executed(self, rule: AutoTradeRule, now: datetime, interval_variation_pct=None) -> None:
+        rule.last_executed_at = now
+        self._schedule(rule, now, interval_variation_pct)
+        rule.execution_count = (rule.execution_count or 0) + 1
+
+    async def execute_rule(self, rule: AutoTradeRule, context: MarketContext, now: datetime) -> str:
+        """One rule execution; mirrors AutoTradeExecutor.execute_rule. Returns the outcome."""
+        market_maker = rule.market_maker
+        market_key = AutoTradeExecutor.determine_market_key(market_maker)
+        status, current_liq, target_liq, market_settings = AutoTradeExecutor.classify_liquidity(
+            context.market_settings.get(market_key), context.liquidity.get(rule.side)
+        )
+        interval_var = market_settings.order_interval_variation_pct if market_settings else None
+
+        if status == "exceeds_max_threshold":
+            max_threshold = market_settings.max_liquidity_threshold if market_settings else None
+            trades_executed = 0
+            while trades_executed < 5:
+                trade = self.book.internal_trade()
+                if trade is None:
+                    break
+                trades_executed += 1
+                self._record_trades([trade], context)
+                new_current = self.book.liquidity(rule.side, context.eua_eur_price)
+                if new_current and max_threshold and new_current <= max_threshold:
+                    break
+            self._executed(rule, now, interval_var)
+            return "threshold_reduction"
+
+        if status == "at_target":
+            self._schedule(rule, now, interval_var)
+            return "liquidity_at_target"
+
+        if status == "above_target":
+            trade = self.book.internal_trade()
+            if trade is not None:
+                self._record_trades([trade], context)
+            self._executed(rule, now, interval_var)
+            return "internal_trade" if trade is not None else "internal_trade_failed"
+
+        price, quantity, failure = await AutoTradeExecutor.plan_order(
+            None, rule, market_maker, context, market_settings, current_liq, target_liq, self.generator
+        )
+        if failure:
+            self._schedule(rule, now, interval_var)
+            return failure.split(":", 1)[0]
+
+        # place_order schedules without the market-level interval variation
+        self.book.place(market_maker.id, rule.side, price or Decimal("0"), quantity)
+        self.orders_placed += 1
+        self._executed(rule, now)
+        context.record_order(market_maker.id, rule.side, price, quantity)
+        self._record_trades(self.book.match(), context)
+        return "order_placed"
+
+    def fill_spread(self, context: MarketContext) -> None:
+        """In-memory fill_spread_with_orders: one order per free level, MMs round-robin."""
+        best_bid, best_ask = self.book.best_bid, self.book.best_ask
+        if not best_bid or not best_ask:
+            return
+        step = Decimal("0.0001") if self.market_type == MarketType.SWAP else Decimal("0.1")
+        bid_prices, ask_prices, _ = spread_fill_levels(
+            best_bid, best_ask, self.book.prices(OrderSide.BUY), self.book.prices(OrderSide.SELL), step
+        )
+        by_type: Dict[MarketMakerType, List[MarketMakerClient]] = {}
+        for mm in self.market_makers.values():
+            by_type.setdefault(mm.mm_type, []).append(mm)
+        for prices, side, mm_type in (
+            (bid_prices, OrderSide.BUY, MarketMakerType.CEA_BUYER),
+            (ask_prices, OrderSide.SELL, MarketMakerType.CEA_SELLER),
+        ):
+            mms = by_type.get(mm_type)
+            if not mms:
+                continue
+            for i, price in enumerate(prices):
+                self.book.place(mms[i % len(mms)].id, side, price, self.config.spread_fill_quantity)
+                self.spread_fill_orders += 1
+        if bid_prices or ask_prices:
+            context.stale = True
+
+    async def run(self) -> SimulationReport:
+        config = self.config
+        started = time.perf_counter()
+
+        now = config.prices.start
+        duration = config.duration_seconds or int((config.prices.end - config.prices.start).total_seconds())
+        end = now + timedelta(seconds=duration)
+        step = timedelta(seconds=config.cycle_seconds)
+        market_keys = sorted({AutoTradeExecutor.determine_market_key(r.market_maker) for r in self.rules})
+        settings_by_key = {key: self.market_settings.get(key) for key in market_keys}
+
+        cycles = 0
+        spreads: List[float] = []
+        liquidity: Dict[OrderSide, List[float]] = {OrderSide.BUY: [], OrderSide.SELL: []}
+        one_sided = 0
+
+        while now < end:
+            market_price = config.prices.at(now)
+            eua_eur_price = config.eua_prices.at(now) if config.eua_prices else None
+            context: Optional[MarketContext] = None
+
+            for rule in self.rules:
+                if not rule.enabled or (rule.next_execution_at is not None and rule.next_execution_at > now):
+                    continue
+                if context is None or context.stale:
+                    context = self.book.context(self.certificate_type, market_price, eua_eur_price, settings_by_key)
+                self.outcomes[await self.execute_rule(rule, context, now)] += 1
+
+            cycles += 1
+            if config.spread_fill_every and cycles % config.spread_fill_every == 0:
+                if context is None:
+                    context = self.book.context(self.certificate_type, market_price, eua_eur_price, settings_by_key)
+                self.fill_spread(context)
+
+            best_bid, best_ask = self.book.best_bid, self.book.best_ask
+            if best_bid is not None and best_ask is not None:
+                spreads.append(float(best_ask - best_bid))
+            else:
+                one_sided += 1
+            for side in liquidity:
+                liquidity[side].append(float(self.book.liquidity(side, eua_eur_price)))
+            now += step
+
+        wall = time.perf_counter() - started
+        return self._report(cycles, duration, wall, spreads, one_sided, liquidity)
+
+    def _report(self, cycles, duration, wall, spreads, one_sided, liquidity) -> SimulationReport:
+        inventory: Dict[str, Dict[str, Decimal]] = {
+            name: {"quantity": Decimal("0"), "eur": Decimal("0")} for name in self.market_makers
+        }
+        traded_qty = Decimal("0")
+        traded_value = Decimal("0")
+        for trade in self.trades:
+            value = trade.price * trade.quantity
+            traded_qty += trade.quantity
+            traded_value += value
+            buyer, seller = inventory[self.mm_names[trade.buyer_id]], inventory[self.mm_names[trade.seller_id]]
+            buyer["quantity"] += trade.quantity
+            buyer["eur"] -= value
+            seller["quantity"] -= trade.quantity
+            seller["eur"] += value
+
+        spread = _summary(spreads)
+        spread["one_sided_pct"] = round(one_sided / cycles * 100, 2) if cycles else None
+        return SimulationReport(
+            name=self.config.name,
+            params=self.config.params,
+            cycles=cycles,
+            simulated_seconds=duration,
+            wall_seconds=round(wall, 3),
+            cycles_per_second=round(cycles / wall, 1) if wall > 0 else float(cycles),
+            rule_executions=sum(self.outcomes.values()),
+            outcomes=dict(self.outcomes),
+            orders_placed=self.orders_placed,
+            spread_fill_orders=self.spread_fill_orders,
+            match_trades=sum(1 for t in self.trades if t.kind == "match"),
+            internal_trades=sum(1 for t in self.trades if t.kind == "internal"),
+            traded_quantity=str(traded_qty),
+            traded_value_eur=str(traded_value.quantize(Decimal("0.01"))),
+            spread=spread,
+            liquidity_eur={side.value: _summary(values) for side, values in liquidity.items()},
+            inventory={
+                name: {k: str(v) for k, v in inv.items()} for name, inv in inventory.items()
+            },
+        )
+
+
+def run_simulation(config: SimulationConfig) -> SimulationReport:
+    """
+    Run one parameter set to completion (blocking; not for use inside an event loop).
+
+    Uses a private loop rather than asyncio.run, which would leave the calling
+    thread without a current event loop.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(Simulator(config).run())
+    finally:
+        loop.close()
+
+
+# =============================================================================
+# Parameter grids
+# =============================================================================
+
+
+def apply_overrides(config: SimulationConfig, overrides: Dict[str, Any]) -> SimulationConfig:
+    """
+    Copy of config with grid overrides applied. Keys:
+    - "<MARKET_KEY>.<field>": AutoTradeMarketSettings field (e.g. "CEA_BID.price_deviation_pct")
+    - "rule:<name>.<field>": field of the named rule
+    - "<field>": SimulationConfig field (e.g. "cycle_seconds")
+    """
+    market_settings = {k: dict(v) for k, v in config.market_settings.items()}
+    rules = [dict(r) for r in config.rules]
+    top: Dict[str, Any] = {}
+    for key, value in overrides.items():
+        if key.startswith("rule:"):
+            rule_name, attr = key[len("rule:"):].rsplit(".", 1)
+            matched = [r for r in rules if r["name"] == rule_name]
+            if not matched:
+                raise ValueError(f"Unknown rule in grid key: {key}")
+            for r in matched:
+                r[attr] = value
+        elif "." in key:
+            market_key, attr = key.split(".", 1)
+            market_settings.setdefault(market_key, {})[attr] = value
+        else:
+            top[key] = value
+    label = ", ".join(f"{k}={v}" for k, v in overrides.items()) or config.name
+    return replace(
+        config,
+        rules=rules,
+        market_settings=market_settings,
+        name=label,
+        params={**config.params, **{k: str(v) for k, v in overrides.items()}},
+        **top,
+    )
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of a {key: [values]} grid."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_grid(
+    config: SimulationConfig,
+    grid: Dict[str, Sequence[Any]],
+    workers: Optional[int] = None,
+) -> List[SimulationReport]:
+    """Simulate every grid combination, spread over a process pool (workers=1 runs inline)."""
+    configs = [apply_overrides(config, overrides) for overrides in expand_grid(grid)]
+    logger.info(f"Simulating {len(configs)} parameter sets on {workers or 'default'} workers")
+    if workers == 1 or len(configs) == 1:
+        return [run_simulation(c) for c in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_simulation, configs))
+
+
+# =============================================================================
+# Command line
+# =============================================================================
+
+
+def _decimals(values: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON numbers -> Decimal for Numeric model fields (floats would lose precision)."""
+    return {k: Decimal(str(v)) if isinstance(v, float) else v for k, v in values.items()}
+
+
+def load_config(path: str) -> SimulationConfig:
+    """
+    Load a SimulationConfig from JSON. "prices" is either {"csv": path} or
+    {"synthetic": {start_price, duration_seconds, step_seconds, volatility_pct, ...}};
+    "eua_prices" likewise (SWAP only).
+    """
+    with open(path) as f:
+        raw = json.load(f)
+
+    def series(spec: Optional[Dict[str, Any]]) -> Optional[PriceSeries]:
+        if not spec:
+            return None
+        if "csv" in spec:
+            return PriceSeries.from_csv(spec["csv"])
+        params = dict(spec["synthetic"])
+        params["start_price"] = Decimal(str(params["start_price"]))
+        if "quantum" in params:
+            params["quantum"] = Decimal(str(params["quantum"]))
+        return PriceSeries.synthetic(**params)
+
+    return SimulationConfig(
+        rules=[_decimals(r) for r in raw["rules"]],
+        market_settings={k: _decimals(v) for k, v in raw.get("market_settings", {}).items()},
+        prices=series(raw["prices"]),
+        eua_prices=series(raw.get("eua_prices")),
+        duration_seconds=raw.get("duration_seconds"),
+        cycle_seconds=raw.get("cycle_seconds", 5),
+        spread_fill_every=raw.get("spread_fill_every", 0),
+        spread_fill_quantity=Decimal(str(raw.get("spread_fill_quantity", 100))),
+        initial_book=[tuple(o) for o in raw.get("initial_book", [])],
+        seed=raw.get("seed", 0),
+        name=raw.get("name", "baseline"),
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline auto-trade simulation")
+    parser.add_argument("config", help="Simulation config (JSON)")
+    parser.add_argument("--grid", help="Parameter grid (JSON object of key -> list of values)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.grid:
+        with open(args.grid) as f:
+            grid = {k: [Decimal(str(v)) if isinstance(v, float) else v for v in values]
+                    for k, values in json.load(f).items()}
+        reports = run_grid(config, grid, args.workers)
+    else:
+        reports = [run_simulation(config)]
+    print(json.dumps([r.to_dict() for r in reports], indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Batched Entity Balance Loader
+
+DataLoader-style, request-scoped loader for entity balances. Listing
+endpoints queue every entity ID they will render, then load them; all queued
+IDs resolve together with one EntityHolding query (plus one Entity query for
+the EUR fallback of entities without an EUR holding), so the query count
+stays constant however many entities a page shows. Results are cached for
+the rest of the request.
+
+    loader = EntityBalanceLoader(db)      # or Depends(get_balance_loader)
+    loader.queue(*(u.entity_id for u in users))
+    balances = await loader.load(user.entity_id)
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_db
+from ..models.models import AssetType, Entity, EntityHolding
+
+
+@dataclass
+class EntityBalances:
+    """All asset balances of one entity"""
+
+    entity_id: UUID
+    eur: Decimal = Decimal("0")  # Available EUR, same rule as get_entity_eur_balance
+    eur_reserved: Decimal = Decimal("0")
+    cea: Decimal = Decimal("0")
+    eua: Decimal = Decimal("0")
+
+    def as_dict(self) -> Dict[str, float]:
+        """API shape used across endpoints: EUR as float, certificates as integers."""
+        return {
+            "eur_balance": float(self.eur),
+            "cea_balance": int(float(self.cea)),
+            "eua_balance": int(float(self.eua)),
+        }
+
+
+class EntityBalanceLoader:
+    """Collects entity IDs and resolves their balances in one batch."""
+
+    def __init__(self, db: AsyncSession):
+        self._db = db
+        self._pending: Set[UUID] = set()
+        self._cache: Dict[UUID, EntityBalances] = {}
+
+    def queue(self, *entity_ids: Optional[UUID]) -> None:
+        """Register IDs for the next batch (None and already loaded IDs are ignored)."""
+        self._pending.update(
+            entity_id
+            for entity_id in entity_ids
+            if entity_id is not None and entity_id not in self._cache
+        )
+
+    async def load(self, entity_id: UUID) -> EntityBalances:
+        self.queue(entity_id)
+        if entity_id not in self._cache:
+            await self._dispatch()
+        return self._cache[entity_id]
+
+    async def load_many(self, entity_ids: Iterable[UUID]) -> List[EntityBalances]:
+        ids = list(entity_ids)
+        self.queue(*ids)
+        if self._pending:
+            await self._dispatch()
+        return [self._cache[entity_id] for entity_id in ids]
+
+    async def _dispatch(self) -> None:
+        ids, self._pending = list(self._pending), set()
+        if not ids:
+            return
+
+        balances = {entity_id: EntityBalances(entity_id) for entity_id in ids}
+        with_eur_holding: Set[UUID] = set()
+
+        result = await self._db.execute(
+            select(
+                EntityHolding.entity_id,
+                EntityHolding.asset_type,
+                EntityHolding.quantity,
+                EntityHolding.reserved,
+            ).where(EntityHolding.entity_id.in_(ids))
+        )
+        for entity_id, asset_type, quantity, reserved in result.all():
+            entry = balances[entity_id]
+            quantity = Decimal(str(quantity))
+            if asset_type == AssetType.EUR:
+                # Holding row is authoritative, even when zero or negative
+                with_eur_holding.add(entity_id)
+                entry.eur_reserved = Decimal(str(reserved or 0))
+                entry.eur = max(quantity - entry.eur_reserved, Decimal("0"))
+            elif asset_type == AssetType.CEA:
+                entry.cea = quantity
+            elif asset_type == AssetType.EUA:
+                entry.eua = quantity
+
+        # Legacy/seeded entities without an EUR holding fall back to balance_amount
+        without_holding = [entity_id for entity_id in ids if entity_id not in with_eur_holding]
+        if without_holding:
+            result = await self._db.execute(
+                select(Entity.id, Entity.balance_amount).where(Entity.id.in_(without_holding))
+            )
+            for entity_id, balance_amount in result.all():
+                if balance_amount is not None and balance_amount > 0:
+                    balances[entity_id].eur = Decimal(str(balance_amount))
+
+        self._cache.update(balances)
+
+
+def get_balance_loader(db: AsyncSession = Depends(get_db)) -> EntityBalanceLoader:  # noqa: B008
+    """FastAPI dependency: one loader (and cache) per request."""
+    return EntityBalanceLoader(db)
@@ -5,25 +5,28 @@ Shared utilities for entity balance management.
 Moved from order_matching to avoid circular imports.
 """
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from decimal import Decimal
-from typing import Optional
-from uuid import UUID
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.models import AssetTransaction, AssetType, Entity, EntityHolding, TransactionType
 
 logger = __import__("logging").getLogger(__name__)
 
+CENTS = Decimal("0.01")  # EntityHolding / AssetTransaction scale
+
 
 async def get_entity_eur_balance(
     db: AsyncSession,
     entity_id: UUID,
     *,
     entity: Optional[Entity] = None,
-    eur_holding_quantity: Optional[Decimal] = None,
 ) -> Decimal:
     """
     Return EUR balance for display/availability across the platform.
@@ -36,14 +39,10 @@ async def get_entity_eur_balance(
     quantity is authoritative — even if it's zero or negative.  This prevents
     the fallback from re-surfacing the seed balance_amount after the user
     spent all their EUR, which would allow double-spending.
-    """
-    # Fast-path when caller already fetched the holding quantity
-    if eur_holding_quantity is not None:
-        if eur_holding_quantity > 0:
-            return eur_holding_quantity
-        # Caller told us the holding exists (they passed a value) — don't fallback
-        return Decimal("0")
 
+    EUR reserved by open limit BUY orders (EntityHolding.reserved) is not
+    available and is excluded.
+    """
     # Check if an EntityHolding(EUR) row exists
     result = await db.execute(
         select(EntityHolding).where(
@@ -57,7 +56,7 @@ async def get_entity_eur_balance(
 
     if holding is not None:
         # Holding row exists — its quantity is the truth (even if 0 or negative)
-        qty = Decimal(str(holding.quantity))
+        qty = Decimal(str(holding.quantity)) - Decimal(str(holding.reserved or 0))
         return qty if qty > 0 else Decimal("0")
 
     # No holding row at all — fall back to Entity.balance_amount (legacy seed data)
@@ -91,6 +90,149 @@ async def get_entity_balance(
     return Decimal(str(holding.quantity)) if holding else Decimal("0")
 
 
+async def get_available_balance(
+    db: AsyncSession, entity_id: UUID, asset_type: AssetType
+) -> Decimal:
+    """Holding quantity minus what open orders reserve (0 if no holding exists)."""
+    result = await db.execute(
+        select(EntityHolding.quantity - EntityHolding.reserved).where(
+            and_(
+                EntityHolding.entity_id == entity_id,
+                EntityHolding.asset_type == asset_type,
+            )
+        )
+    )
+    available = result.scalar()
+    return Decimal(str(available)) if available is not None else Decimal("0")
+
+
+class InsufficientBalanceError(Exception):
+    """Available balance (quantity - reserved) does not cover a debit"""
+
+    def __init__(self, asset_type: AssetType, required: Decimal, available: Decimal):
+        self.asset_type = asset_type
+        self.required = required
+        self.available = available
+        super().__init__(
+            f"Insufficient balance. Available: {available} {asset_type.value}"
+        )
+
+
+@dataclass
+class BalanceChange:
+    """One entity balance mutation and its AssetTransaction audit fields"""
+
+    entity_id: UUID
+    asset_type: AssetType
+    amount: Decimal
+    transaction_type: TransactionType
+    created_by: UUID
+    reference: Optional[str] = None
+    notes: Optional[str] = None
+    reserved: Decimal = Decimal("0")  # Change of EntityHolding.reserved (no audit row)
+
+
+def _to_cents(amount: Decimal) -> Decimal:
+    """Round like PostgreSQL does when storing into Numeric(18, 2)."""
+    return Decimal(str(amount)).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _running_balances(
+    changes: Sequence[BalanceChange], quantities: Dict[Tuple[UUID, AssetType], Decimal]
+) -> List[Tuple[Decimal, Decimal]]:
+    """
+    (balance_before, balance_after) per change, in order, given each holding's
+    quantity after all changes were applied.
+    """
+    running: Dict[Tuple[UUID, AssetType], Decimal] = {}
+    for c in changes:
+        key = (c.entity_id, c.asset_type)
+        running[key] = running.get(key, quantities[key]) - _to_cents(c.amount)
+    result = []
+    for c in changes:
+        key = (c.entity_id, c.asset_type)
+        before = running[key]
+        running[key] = before + _to_cents(c.amount)
+        result.append((before, running[key]))
+    return result
+
+
+async def update_entity_balances(
+    db: AsyncSession, changes: Sequence[BalanceChange]
+) -> List[Decimal]:
+    """
+    Apply many balance changes atomically and create their audit trail.
+    Returns the balance after each change, in order.
+
+    One INSERT ... ON CONFLICT DO UPDATE SET quantity = quantity + delta
+    RETURNING upserts every touched holding (deltas of the same entity/asset
+    are summed; rows are locked in key order so concurrent batches can't
+    deadlock), then one bulk INSERT writes the AssetTransaction rows.
+    Concurrent writers queue on the row lock instead of losing updates.
+    """
+    if not changes:
+        return []
+
+    deltas: Dict[Tuple[UUID, AssetType], Decimal] = {}
+    reserved: Dict[Tuple[UUID, AssetType], Decimal] = {}
+    for c in changes:
+        key = (c.entity_id, c.asset_type)
+        deltas[key] = deltas.get(key, Decimal("0")) + _to_cents(c.amount)
+        reserved[key] = reserved.get(key, Decimal("0")) + _to_cents(c.reserved)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stmt = pg_insert(EntityHolding).values(
+        [
+            {
+                "id": uuid4(),
+                "entity_id": entity_id,
+                "asset_type": asset_type,
+                "quantity": delta,
+                "reserved": reserved[(entity_id, asset_type)],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (entity_id, asset_type), delta in sorted(
+                deltas.items(), key=lambda item: (str(item[0][0]), item[0][1].value)
+            )
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EntityHolding.entity_id, EntityHolding.asset_type],
+        set_={
+            "quantity": EntityHolding.quantity + stmt.excluded.quantity,
+            "reserved": EntityHolding.reserved + stmt.excluded.reserved,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(EntityHolding)
+    # populate_existing refreshes holdings already loaded in this session
+    holdings = await db.scalars(stmt, execution_options={"populate_existing": True})
+    quantities = {
+        (h.entity_id, h.asset_type): Decimal(str(h.quantity)) for h in holdings.all()
+    }
+
+    balances = _running_balances(changes, quantities)
+    await db.execute(
+        insert(AssetTransaction),
+        [
+            {
+                "entity_id": c.entity_id,
+                "asset_type": c.asset_type,
+                "transaction_type": c.transaction_type,
+                "amount": _to_cents(c.amount),
+                "balance_before": before,
+                "balance_after": after,
+                "reference": c.reference,
+                "notes": c.notes,
+                "created_by": c.created_by,
+            }
+            for c, (before, after) in zip(changes, balances)
+        ],
+    )
+
+    return [after for _, after in balances]
+
+
 async def update_entity_balance(
     db: AsyncSession,
     entity_id: UUID,
@@ -105,42 +247,73 @@ async def update_entity_balance(
     Update entity balance and create audit trail.
     Returns the new balance.
     """
-    # Get or create holding record
-    result = await db.execute(
-        select(EntityHolding).where(
+    change = BalanceChange(
+        entity_id=entity_id,
+        asset_type=asset_type,
+        amount=amount,
+        transaction_type=transaction_type,
+        created_by=created_by,
+        reference=reference,
+        notes=notes,
+    )
+    return (await update_entity_balances(db, [change]))[0]
+
+
+async def debit_available_balance(
+    db: AsyncSession,
+    entity_id: UUID,
+    asset_type: AssetType,
+    amount: Decimal,
+    transaction_type: TransactionType,
+    created_by: UUID,
+    reference: Optional[str] = None,
+    notes: Optional[str] = None,
+) -> Decimal:
+    """
+    Debit amount (positive) and create its audit trail, only if the available
+    balance covers it. One conditional UPDATE (quantity - reserved >= amount),
+    like eur_reservations reserves EUR, so concurrent debits and reservations
+    can't push quantity below reserved. Returns the new balance; raises
+    InsufficientBalanceError (nothing changed) otherwise.
+    """
+    amount = _to_cents(amount)
+    holdings = await db.scalars(
+        update(EntityHolding)
+        .where(
             and_(
                 EntityHolding.entity_id == entity_id,
                 EntityHolding.asset_type == asset_type,
+                EntityHolding.quantity - EntityHolding.reserved >= amount,
             )
         )
+        .values(
+            quantity=EntityHolding.quantity - amount,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+        .returning(EntityHolding)
+        .execution_options(synchronize_session=False, populate_existing=True)
     )
-    holding = result.scalar_one_or_none()
-
-    balance_before = Decimal(str(holding.quantity)) if holding else Decimal("0")
-    balance_after = balance_before + amount
-
-    if holding:
-        holding.quantity = balance_after
-        holding.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-    else:
-        # Create new holding
-        holding = EntityHolding(
-            entity_id=entity_id, asset_type=asset_type, quantity=balance_after
+    holding = holdings.first()
+    if holding is None:
+        raise InsufficientBalanceError(
+            asset_type, amount, await get_available_balance(db, entity_id, asset_type)
         )
-        db.add(holding)
 
-    # Create audit trail
-    transaction = AssetTransaction(
-        entity_id=entity_id,
-        asset_type=asset_type,
-        transaction_type=transaction_type,
-        amount=amount,
-        balance_before=balance_before,
-        balance_after=balance_after,
-        reference=reference,
-        notes=notes,
-        created_by=created_by,
+    after = Decimal(str(holding.quantity))
+    await db.execute(
+        insert(AssetTransaction),
+        [
+            {
+                "entity_id": entity_id,
+                "asset_type": asset_type,
+                "transaction_type": transaction_type,
+                "amount": -amount,
+                "balance_before": after + amount,
+                "balance_after": after,
+                "reference": reference,
+                "notes": notes,
+                "created_by": created_by,
+            }
+        ],
     )
-    db.add(transaction)
-
-    return balance_after
+    return after
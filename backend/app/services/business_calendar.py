@@ -0,0 +1,152 @@
+"""
+Business-Day Calendar
+
+Precomputed business-day index per jurisdiction, used for settlement T+N
+dates, automatic settlement transitions and AML deposit holds.
+
+For every day in [RANGE_START, RANGE_END) the calendar stores how many
+business days fall on or before it (a cumulative NumPy array built once with
+np.is_busday), plus the offsets of all business days. Adding N business days
+and counting business days between two dates are then two array lookups
+instead of a day-by-day Python loop.
+
+Business days are Monday-Friday minus holidays:
+- EU: TARGET2 closing days (New Year, Good Friday, Easter Monday, 1 May,
+  25/26 December), computed per year, plus BUSINESS_HOLIDAYS_EU.
+- CN: BUSINESS_HOLIDAYS_CN (China's exchange holidays are announced yearly).
+- Other jurisdictions: weekends only.
+BUSINESS_HOLIDAYS_* settings are comma-separated ISO dates.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, Set, Union
+
+import numpy as np
+
+from ..core.config import settings
+from ..models.models import CertificateType, Jurisdiction
+
+RANGE_START = date(2000, 1, 1)
+RANGE_END = date(2100, 1, 1)
+WEEKMASK = "1111100"  # Monday-Friday
+
+DateLike = Union[date, datetime]
+
+
+def _easter_sunday(year: int) -> date:
+    """Gregorian Easter (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _target_holidays(years: Iterable[int]) -> Set[date]:
+    holidays: Set[date] = set()
+    for year in years:
+        easter = _easter_sunday(year)
+        holidays.update(
+            {
+                date(year, 1, 1),
+                easter - timedelta(days=2),  # Good Friday
+                easter + timedelta(days=1),  # Easter Monday
+                date(year, 5, 1),
+                date(year, 12, 25),
+                date(year, 12, 26),
+            }
+        )
+    return holidays
+
+
+def _configured_holidays(value: str) -> Set[date]:
+    return {date.fromisoformat(part.strip()) for part in value.split(",") if part.strip()}
+
+
+def holidays_for(jurisdiction: Jurisdiction) -> Set[date]:
+    """Holiday set of a jurisdiction over the calendar range."""
+    if jurisdiction == Jurisdiction.EU:
+        return _target_holidays(range(RANGE_START.year, RANGE_END.year)) | _configured_holidays(
+            settings.BUSINESS_HOLIDAYS_EU
+        )
+    if jurisdiction == Jurisdiction.CN:
+        return _configured_holidays(settings.BUSINESS_HOLIDAYS_CN)
+    return set()
+
+
+def jurisdiction_for_certificate(certificate_type: CertificateType) -> Jurisdiction:
+    """Registry calendar a certificate settles on: CEA in China, EUA in the EU."""
+    return Jurisdiction.CN if certificate_type == CertificateType.CEA else Jurisdiction.EU
+
+
+class BusinessCalendar:
+    """Business-day index of one jurisdiction (see module docstring)."""
+
+    def __init__(self, jurisdiction: Jurisdiction, holidays: Iterable[date]):
+        self.jurisdiction = jurisdiction
+        days = np.arange(
+            np.datetime64(RANGE_START, "D"), np.datetime64(RANGE_END, "D"), dtype="datetime64[D]"
+        )
+        busdaycal = np.busdaycalendar(
+            weekmask=WEEKMASK, holidays=np.array(sorted(holidays), dtype="datetime64[D]")
+        )
+        is_business = np.is_busday(days, busdaycal=busdaycal)
+        self._is_business = is_business
+        # Business days on or before each day
+        self._rank = np.cumsum(is_business, dtype=np.int64)
+        # Day offsets (from RANGE_START) of every business day, ascending
+        self._business_offsets = np.flatnonzero(is_business)
+
+    @staticmethod
+    def _offset(day: DateLike) -> int:
+        if isinstance(day, datetime):
+            day = day.date()
+        offset = (day - RANGE_START).days
+        if not 0 <= offset < (RANGE_END - RANGE_START).days:
+            raise ValueError(f"{day} is outside the business calendar range")
+        return offset
+
+    def is_business_day(self, day: DateLike) -> bool:
+        return bool(self._is_business[self._offset(day)])
+
+    def add_business_days(self, start: datetime, days: int) -> datetime:
+        """
+        The days-th business day after start's date, at start's time of day.
+        A start on a weekend or holiday counts from the next business day.
+        """
+        if days <= 0:
+            return start
+        offset = self._offset(start)
+        index = int(self._rank[offset]) + days - 1
+        if index >= len(self._business_offsets):
+            raise ValueError(f"{start} + {days} business days is outside the calendar range")
+        return start + timedelta(days=int(self._business_offsets[index]) - offset)
+
+    def business_days_between(self, start: DateLike, end: DateLike) -> int:
+        """Business days after start's date up to and including end's date."""
+        return int(self._rank[self._offset(end)] - self._rank[self._offset(start)])
+
+
+@lru_cache(maxsize=None)
+def get_calendar(jurisdiction: Jurisdiction = Jurisdiction.EU) -> BusinessCalendar:
+    """Calendar of a jurisdiction, built on first use."""
+    return BusinessCalendar(jurisdiction, holidays_for(jurisdiction))
+
+
+def add_business_days(
+    start: datetime, days: int, jurisdiction: Jurisdiction = Jurisdiction.EU
+) -> datetime:
+    return get_calendar(jurisdiction).add_business_days(start, days)
+
+
+def business_days_between(
+    start: DateLike, end: DateLike, jurisdiction: Jurisdiction = Jurisdiction.EU
+) -> int:
+    return get_calendar(jurisdiction).business_days_between(start, end)
@@ -21,9 +21,9 @@ Hold Period Rules:
 import logging
 import secrets
 import string
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from sqlalchemy import and_, func, or_, select
@@ -38,12 +38,14 @@ from ..models.models import (
     DepositStatus,
     Entity,
     HoldType,
+    Jurisdiction,
     TicketStatus,
     TransactionType,
     User,
     UserRole,
 )
-from ..services.balance_utils import update_entity_balance
+from ..services.balance_utils import BalanceChange, update_entity_balances
+from ..services.business_calendar import add_business_days
 from ..services.ticket_service import TicketService
 
 logger = logging.getLogger(__name__)
@@ -81,7 +83,7 @@ class InsufficientPermissionError(DepositServiceError):
 
 def calculate_business_days(start_date: datetime, days: int) -> datetime:
     """
-    Add business days to a date, skipping weekends.
+    Add business days to a date, skipping weekends and EU (TARGET2) holidays.
 
     Args:
         start_date: Starting datetime
@@ -90,16 +92,7 @@ def calculate_business_days(start_date: datetime, days: int) -> datetime:
     Returns:
         Target datetime after adding business days
     """
-    current = start_date
-    remaining_days = days
-
-    while remaining_days > 0:
-        current += timedelta(days=1)
-        # Skip weekends (5=Saturday, 6=Sunday)
-        if current.weekday() < 5:
-            remaining_days -= 1
-
-    return current
+    return add_business_days(start_date, days, Jurisdiction.EU)
 
 
 async def get_entity_deposit_count(db: AsyncSession, entity_id: UUID) -> int:
@@ -329,6 +322,83 @@ async def confirm_deposit(
     return deposit
 
 
+async def _clear_deposits(
+    db: AsyncSession,
+    deposits: List[Deposit],
+    admin_id: UUID,
+    admin_notes: Optional[str],
+    now: datetime,
+) -> Dict[UUID, List[UUID]]:
+    """
+    Mark deposits CLEARED, upgrade their entities' AML users to CEA and credit
+    EUR amounts in one balance batch. Returns upgraded user IDs per deposit.
+    """
+    for deposit in deposits:
+        deposit.status = DepositStatus.CLEARED
+        deposit.aml_status = AMLStatus.CLEARED.value
+        deposit.cleared_at = now
+        deposit.cleared_by_admin_id = admin_id
+        if admin_notes:
+            deposit.admin_notes = (deposit.admin_notes or "") + f"\n[Cleared] {admin_notes}"
+
+    # Transition: AML → CEA when deposit is cleared
+    entity_ids = {d.entity_id for d in deposits}
+    users_result = await db.execute(
+        select(User).where(
+            User.entity_id.in_(entity_ids),
+            User.role == UserRole.AML,
+        )
+    )
+    upgraded_by_entity: Dict[UUID, List[UUID]] = {}
+    for u in users_result.scalars().all():
+        u.role = UserRole.CEA
+        upgraded_by_entity.setdefault(u.entity_id, []).append(u.id)
+    await db.flush()
+
+    # Credit funds to entity balances
+    credited = [d for d in deposits if d.amount and d.currency == Currency.EUR]
+    if credited:
+        await update_entity_balances(
+            db,
+            [
+                BalanceChange(
+                    entity_id=d.entity_id,
+                    asset_type=AssetType.EUR,
+                    amount=d.amount,
+                    transaction_type=TransactionType.DEPOSIT,
+                    created_by=admin_id,
+                    reference=f"deposit:{d.id}",
+                    notes=f"Deposit cleared - Wire ref: {d.wire_reference or 'N/A'}",
+                )
+                for d in credited
+            ],
+        )
+
+        # Update entity total deposited
+        entity_result = await db.execute(
+            select(Entity).where(Entity.id.in_({d.entity_id for d in credited}))
+        )
+        entities = {e.id: e for e in entity_result.scalars().all()}
+        for d in credited:
+            entity = entities.get(d.entity_id)
+            if entity:
+                entity.total_deposited = (
+                    entity.total_deposited or Decimal("0")
+                ) + d.amount
+                entity.balance_amount = (
+                    entity.balance_amount or Decimal("0")
+                ) + d.amount
+                entity.balance_currency = Currency.EUR
+
+    await db.flush()
+
+    # Users are attributed to the first deposit of their entity
+    upgraded: Dict[UUID, List[UUID]] = {}
+    for deposit in deposits:
+        upgraded[deposit.id] = upgraded_by_entity.pop(deposit.entity_id, [])
+    return upgraded
+
+
 async def clear_deposit(
     db: AsyncSession,
     deposit_id: UUID,
@@ -377,55 +447,9 @@ async def clear_deposit(
             "Use force_clear=True to override."
         )
 
-    # Update deposit status
-    deposit.status = DepositStatus.CLEARED
-    deposit.aml_status = AMLStatus.CLEARED.value
-    deposit.cleared_at = now
-    deposit.cleared_by_admin_id = admin_id
-    if admin_notes:
-        deposit.admin_notes = (deposit.admin_notes or "") + f"\n[Cleared] {admin_notes}"
-
-    # Transition: AML → CEA when deposit is cleared
-    users_result = await db.execute(
-        select(User).where(
-            User.entity_id == deposit.entity_id,
-            User.role == UserRole.AML,
-        )
-    )
-    users_to_upgrade = users_result.scalars().all()
-    upgraded_user_ids = [u.id for u in users_to_upgrade]
-    for u in users_to_upgrade:
-        u.role = UserRole.CEA
-    await db.flush()
-
-    # Credit funds to entity balance
-    if deposit.amount and deposit.currency == Currency.EUR:
-        await update_entity_balance(
-            db=db,
-            entity_id=deposit.entity_id,
-            asset_type=AssetType.EUR,
-            amount=deposit.amount,
-            transaction_type=TransactionType.DEPOSIT,
-            created_by=admin_id,
-            reference=f"deposit:{deposit.id}",
-            notes=f"Deposit cleared - Wire ref: {deposit.wire_reference or 'N/A'}",
-        )
-
-        # Update entity total deposited
-        entity_result = await db.execute(
-            select(Entity).where(Entity.id == deposit.entity_id)
-        )
-        entity = entity_result.scalar_one_or_none()
-        if entity:
-            entity.total_deposited = (
-                entity.total_deposited or Decimal("0")
-            ) + deposit.amount
-            entity.balance_amount = (
-                entity.balance_amount or Decimal("0")
-            ) + deposit.amount
-            entity.balance_currency = Currency.EUR
-
-    await db.flush()
+    upgraded_user_ids = (
+        await _clear_deposits(db, [deposit], admin_id, admin_notes, now)
+    )[deposit.id]
 
     currency_val = deposit.currency.value if deposit.currency else "N/A"
     logger.info(
@@ -611,6 +635,16 @@ async def get_expired_holds(db: AsyncSession) -> List[Deposit]:
     return list(result.scalars().all())
 
 
+async def get_next_hold_expiry(db: AsyncSession) -> Optional[datetime]:
+    """Earliest hold_expires_at among deposits still on hold."""
+    result = await db.execute(
+        select(func.min(Deposit.hold_expires_at)).where(
+            Deposit.status == DepositStatus.ON_HOLD,
+        )
+    )
+    return result.scalar()
+
+
 async def process_expired_holds(db: AsyncSession, system_admin_id: UUID) -> int:
     """
     Auto-clear deposits where hold period has expired.
@@ -625,20 +659,40 @@ async def process_expired_holds(db: AsyncSession, system_admin_id: UUID) -> int:
         Number of deposits auto-cleared
     """
     expired = await get_expired_holds(db)
-    cleared_count = 0
-
-    for deposit in expired:
-        try:
-            await clear_deposit(
+    if not expired:
+        return 0
+    admin_notes = "Auto-cleared after hold period expiration"
+    deposit_ids = [d.id for d in expired]
+
+    try:
+        # One status pass, one AML→CEA update and one balance batch for all deposits
+        async with db.begin_nested():
+            await _clear_deposits(
                 db=db,
-                deposit_id=deposit.id,
+                deposits=expired,
                 admin_id=system_admin_id,
-                admin_notes="Auto-cleared after hold period expiration",
-                force_clear=False,
+                admin_notes=admin_notes,
+                now=datetime.now(timezone.utc).replace(tzinfo=None),
             )
-            cleared_count += 1  # (deposit, upgraded_count) returned; we count cleared deposits
-        except Exception as e:
-            logger.error(f"Failed to auto-clear deposit {deposit.id}: {e}")
+        cleared_count = len(expired)
+    except Exception as e:
+        # A bad deposit must not block the others: clear one by one, each in
+        # its own savepoint
+        logger.warning(f"Batch auto-clear failed, clearing deposits one by one: {e}")
+        cleared_count = 0
+        for deposit_id in deposit_ids:
+            try:
+                async with db.begin_nested():
+                    await clear_deposit(
+                        db=db,
+                        deposit_id=deposit_id,
+                        admin_id=system_admin_id,
+                        admin_notes=admin_notes,
+                        force_clear=False,
+                    )
+                cleared_count += 1
+            except Exception as e:
+                logger.error(f"Failed to auto-clear deposit {deposit_id}: {e}")
 
     if cleared_count > 0:
         logger.info(f"Auto-cleared {cleared_count} deposits with expired holds")
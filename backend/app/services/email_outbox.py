@@ -0,0 +1,288 @@
+"""
+Email Outbox Delivery
+
+EmailService.send_* only renders the template and inserts an EmailOutbox row
+(in the caller's transaction when wrapped in email_service.outbox(db)), so
+request latency never includes delivery and queued mail survives restarts.
+
+The email_outbox scheduler job drains the table on the leader worker:
+- EMAIL_OUTBOX_WORKERS workers each claim up to EMAIL_OUTBOX_BATCH_SIZE due
+  rows with FOR UPDATE SKIP LOCKED, marking them SENDING with a lease
+  (next_attempt_at = now + CLAIM_LEASE); rows of a worker that died are
+  claimed again once the lease runs out
+- Resend rows go out through the batch API, one request per claim; SMTP
+  rows one message at a time
+- Requests are paced by a per-provider rate limit (EMAIL_RATE_LIMIT_*)
+- Failures are retried with exponential backoff; invalid messages (Resend
+  validation errors, refused recipients) and rows past
+  EMAIL_OUTBOX_MAX_ATTEMPTS are marked FAILED
+
+Commits that insert outbox rows wake the job (wake_on=EmailOutbox), so mail
+normally leaves within a second of the commit.
+"""
+
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Row
+
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.models import EmailOutbox, EmailOutboxStatus
+from .email_service import RESEND_BATCH_LIMIT, email_service
+
+logger = logging.getLogger(__name__)
+
+UNDELIVERED = (EmailOutboxStatus.PENDING, EmailOutboxStatus.SENDING)
+CLAIM_LEASE = timedelta(minutes=5)  # Longer than any delivery attempt
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+RUN_BUDGET_SECONDS = 120  # A run stops claiming after this; the next run continues
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class DeliveryOutcome:
+    """Result of one delivery attempt for an outbox row"""
+
+    id: Any
+    sent: bool
+    error: Optional[str] = None
+    permanent: bool = False  # Retrying cannot succeed (invalid message)
+
+
+class RateLimiter:
+    """Spaces calls at most `rate` per second across all workers of this process."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def _rate_limiter(provider: str) -> RateLimiter:
+    if provider not in _rate_limiters:
+        rate = {
+            "resend": settings.EMAIL_RATE_LIMIT_RESEND,
+            "smtp": settings.EMAIL_RATE_LIMIT_SMTP,
+        }.get(provider, 0)
+        _rate_limiters[provider] = RateLimiter(rate)
+    return _rate_limiters[provider]
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff after the given number of failed attempts: 30s, 60s, 120s ... capped at 1h, ±20% jitter."""
+    seconds = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def _is_permanent(error: Exception) -> bool:
+    from resend.exceptions import MissingRequiredFieldsError, ValidationError
+
+    return isinstance(
+        error, (ValidationError, MissingRequiredFieldsError, smtplib.SMTPRecipientsRefused)
+    )
+
+
+async def _claim(limit: int) -> List[Row]:
+    """Lease up to `limit` due rows to this worker."""
+    now = _utcnow()
+    due = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_(UNDELIVERED), EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due))
+            .values(
+                status=EmailOutboxStatus.SENDING,
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + CLAIM_LEASE,
+            )
+            .returning(
+                EmailOutbox.id,
+                EmailOutbox.to_email,
+                EmailOutbox.from_email,
+                EmailOutbox.subject,
+                EmailOutbox.html,
+                EmailOutbox.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await db.commit()
+    return rows
+
+
+async def _deliver_resend(
+    rows: Sequence[Row], api_key: str, mail_config: Optional[Dict[str, Any]]
+) -> List[DeliveryOutcome]:
+    messages = [
+        {
+            "from": email_service.from_address(row.from_email, mail_config),
+            "to": [row.to_email],
+            "subject": row.subject,
+            "html": row.html,
+        }
+        for row in rows
+    ]
+    limiter = _rate_limiter("resend")
+    try:
+        await limiter.acquire()
+        await email_service.send_resend(api_key, messages)
+        return [DeliveryOutcome(row.id, sent=True) for row in rows]
+    except Exception as e:
+        if len(rows) > 1 and _is_permanent(e):
+            # The batch API rejects the whole batch; send one by one to isolate the bad message
+            outcomes = []
+            for row, message in zip(rows, messages):
+                try:
+                    await limiter.acquire()
+                    await email_service.send_resend(api_key, [message])
+                    outcomes.append(DeliveryOutcome(row.id, sent=True))
+                except Exception as single_error:
+                    outcomes.append(
+                        DeliveryOutcome(
+                            row.id, False, str(single_error), _is_permanent(single_error)
+                        )
+                    )
+            return outcomes
+        return [DeliveryOutcome(row.id, False, str(e), _is_permanent(e)) for row in rows]
+
+
+async def _deliver_smtp(
+    rows: Sequence[Row], mail_config: Dict[str, Any]
+) -> List[DeliveryOutcome]:
+    limiter = _rate_limiter("smtp")
+    outcomes = []
+    for row in rows:
+        try:
+            await limiter.acquire()
+            await email_service.send_smtp(
+                row.to_email,
+                row.subject,
+                row.html,
+                email_service.from_address(row.from_email, mail_config),
+                mail_config,
+            )
+            outcomes.append(DeliveryOutcome(row.id, sent=True))
+        except Exception as e:
+            outcomes.append(DeliveryOutcome(row.id, False, str(e), _is_permanent(e)))
+    return outcomes
+
+
+async def _record(
+    rows: Sequence[Row], outcomes: List[DeliveryOutcome], provider: str
+) -> None:
+    """Mark rows SENT, back to PENDING with a retry time, or FAILED (one executemany)."""
+    now = _utcnow()
+    attempts = {row.id: row.attempts for row in rows}
+    params = []
+    for outcome in outcomes:
+        if outcome.sent:
+            params.append(
+                {
+                    "id": outcome.id,
+                    "status": EmailOutboxStatus.SENT,
+                    "sent_at": now,
+                    "provider": provider,
+                    "last_error": None,
+                }
+            )
+        elif outcome.permanent or attempts[outcome.id] >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            params.append(
+                {"id": outcome.id, "status": EmailOutboxStatus.FAILED, "last_error": outcome.error}
+            )
+        else:
+            params.append(
+                {
+                    "id": outcome.id,
+                    "status": EmailOutboxStatus.PENDING,
+                    "next_attempt_at": now + retry_delay(attempts[outcome.id]),
+                    "last_error": outcome.error,
+                }
+            )
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(EmailOutbox), params)
+        await db.commit()
+
+    failed = [o for o in outcomes if not o.sent]
+    if failed:
+        logger.warning(
+            f"Email outbox: {len(failed)}/{len(outcomes)} via {provider} failed "
+            f"(first error: {failed[0].error})"
+        )
+
+
+async def _worker(mail_config: Optional[Dict[str, Any]], deadline: float) -> int:
+    """Claim and deliver rounds until the outbox has nothing due or the run budget is spent."""
+    provider, api_key = email_service.provider(mail_config)
+    batch_size = min(settings.EMAIL_OUTBOX_BATCH_SIZE, RESEND_BATCH_LIMIT)
+    sent = 0
+    while time.monotonic() < deadline:
+        rows = await _claim(batch_size)
+        if not rows:
+            break
+        if provider == "resend":
+            outcomes = await _deliver_resend(rows, api_key, mail_config)
+        elif provider == "smtp":
+            outcomes = await _deliver_smtp(rows, mail_config)
+        else:
+            for row in rows:
+                logger.info(f"[DEV MODE] Email would be sent to {row.to_email}: {row.subject}")
+            outcomes = [DeliveryOutcome(row.id, sent=True) for row in rows]
+        await _record(rows, outcomes, provider)
+        sent += sum(1 for o in outcomes if o.sent)
+    return sent
+
+
+async def run_email_outbox() -> None:
+    """Deliver due outbox emails with EMAIL_OUTBOX_WORKERS concurrent workers."""
+    mail_config = await email_service.get_mail_config()
+    deadline = time.monotonic() + RUN_BUDGET_SECONDS
+    results = await asyncio.gather(
+        *(_worker(mail_config, deadline) for _ in range(max(settings.EMAIL_OUTBOX_WORKERS, 1))),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, Exception):
+            logger.error(f"Email outbox worker failed: {r}", exc_info=r)
+    sent = sum(r for r in results if isinstance(r, int))
+    if sent:
+        logger.info(f"Email outbox: delivered {sent} email(s)")
+
+
+async def get_next_email_due() -> Optional[datetime]:
+    """Earliest next_attempt_at of undelivered mail (includes SENDING leases)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(func.min(EmailOutbox.next_attempt_at)).where(
+                EmailOutbox.status.in_(UNDELIVERED)
+            )
+        )
+        return result.scalar()
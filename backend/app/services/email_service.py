@@ -1,17 +1,33 @@
 import asyncio
+import contextvars
 import logging
 import os
-import smtplib
+import time
+import uuid
+from contextlib import contextmanager
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.commit_hooks import on_commit
 from ..core.config import settings
+from ..core.security import RedisManager
+from ..models.models import MailConfig, MailProvider
+from .email_templates import TemplateRenderer
+from .smtp_pool import get_smtp_pool
 
 logger = logging.getLogger(__name__)
 
+RESEND_BATCH_LIMIT = 100  # Messages per Resend batch API call
+MAIL_CONFIG_CHANNEL = "mail_config:invalidate"
+
+# Session that queued emails join (see EmailService.outbox); None = own session
+_outbox_session: contextvars.ContextVar[Optional[AsyncSession]] = contextvars.ContextVar(
+    "email_outbox_session", default=None
+)
+
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "templates", "emails")
 
 # Sample data for admin preview — one entry per template
@@ -97,6 +113,26 @@ TEMPLATE_SAMPLE_DATA: Dict[str, Dict[str, Any]] = {
 }
 
 
+def mail_config_from_row(row: MailConfig) -> Dict[str, Any]:
+    """Delivery settings of a MailConfig row, as used by EmailService."""
+    return {
+        "provider": row.provider.value,
+        "use_env_credentials": row.use_env_credentials,
+        "from_email": row.from_email,
+        "resend_api_key": (
+            row.resend_api_key
+            if not row.use_env_credentials
+            and row.provider == MailProvider.RESEND
+            else None
+        ),
+        "smtp_host": row.smtp_host,
+        "smtp_port": row.smtp_port,
+        "smtp_use_tls": row.smtp_use_tls,
+        "smtp_username": row.smtp_username,
+        "smtp_password": row.smtp_password,
+    }
+
+
 def _fmt(value: float) -> str:
     """Format a number with commas and 2 decimals (e.g. 1,234.56)."""
     return f"{value:,.2f}"
@@ -104,22 +140,27 @@ def _fmt(value: float) -> str:
 
 class EmailService:
     """
-    Email service using Resend API.
-    Falls back to logging in development mode.
+    Email service using Resend API (or SMTP from mail config).
+    send_* methods render a template and queue the email in the outbox;
+    services/email_outbox.py delivers it. Falls back to logging in
+    development mode.
     """
 
     def __init__(self):
         self.api_key = settings.RESEND_API_KEY
         self.from_email = settings.FROM_EMAIL
         self.enabled = bool(self.api_key)
-        self._jinja_env = Environment(
-            loader=FileSystemLoader(TEMPLATE_DIR),
-            autoescape=select_autoescape(["html"]),
-        )
+        self._mail_config_cache: Optional[Tuple[float, Optional[Dict[str, Any]]]] = None
+        self._origin = uuid.uuid4().hex  # Skips this worker's own invalidations
+        self._listener_task: Optional[asyncio.Task] = None
+        self.templates = TemplateRenderer(TEMPLATE_DIR)
+
+    def precompile_templates(self) -> int:
+        """Compile all templates up front (app startup); returns the template count."""
+        return self.templates.precompile()
 
     def _render_template(self, template_name: str, **kwargs: Any) -> str:
-        template = self._jinja_env.get_template(template_name)
-        return template.render(**kwargs)
+        return self.templates.render(template_name, **kwargs)
 
     def render_template(self, template_name: str, **kwargs: Any) -> str:
         """Public render for admin preview endpoint."""
@@ -127,12 +168,7 @@ class EmailService:
 
     def list_templates(self) -> List[str]:
         """Return available template filenames (excluding _base.html)."""
-        templates = []
-        if os.path.isdir(TEMPLATE_DIR):
-            for f in sorted(os.listdir(TEMPLATE_DIR)):
-                if f.endswith(".html") and not f.startswith("_"):
-                    templates.append(f)
-        return templates
+        return self.templates.template_names()
 
     # ── send_* methods ─────────────────────────────────────────────
 
@@ -413,7 +449,7 @@ class EmailService:
         current_status: str,
     ) -> bool:
         """Send admin alert for overdue settlement"""
-        subject = f"\u26A0\uFE0F ALERT: Settlement {batch_reference} is {days_overdue} days overdue"
+        subject = f"\u26A0\uFE0F ALERT: Settlement {batch_reference} is {days_overdue} business days overdue"
         html = self._render_template(
             "admin_overdue_settlement.html",
             batch_reference=batch_reference, entity_name=entity_name,
@@ -423,6 +459,28 @@ class EmailService:
         )
         return await self._send_email(to_email, subject, html)
 
+    async def send_admin_overdue_settlement_alerts(
+        self,
+        to_emails: List[str],
+        batch_reference: str,
+        entity_name: str,
+        certificate_type: str,
+        quantity: float,
+        expected_date: str,
+        days_overdue: int,
+        current_status: str,
+    ) -> bool:
+        """Send the overdue settlement alert to many admins, rendered once"""
+        subject = f"\u26A0\uFE0F ALERT: Settlement {batch_reference} is {days_overdue} business days overdue"
+        html = self._render_template(
+            "admin_overdue_settlement.html",
+            batch_reference=batch_reference, entity_name=entity_name,
+            certificate_type=certificate_type, quantity=_fmt(quantity),
+            expected_date=expected_date, days_overdue=days_overdue,
+            current_status=current_status.replace("_", " ").title(),
+        )
+        return await self._queue_emails([(to, subject, html) for to in to_emails])
+
     async def send_withdrawal_requested(
         self, to_email: str, first_name: str, amount: float, currency: str = "EUR"
     ) -> bool:
@@ -537,9 +595,10 @@ class EmailService:
         subject = "Test Email - Nihao Group Mail Configuration"
         provider = (mail_config.get("provider", "env") if mail_config else "env")
         html = self._render_template("test_email.html", provider=provider)
-        return await self._send_email(to_email, subject, html, mail_config=mail_config)
+        # Delivered right away (not queued) so the admin sees the result
+        return await self.deliver(to_email, subject, html, mail_config=mail_config)
 
-    # ── internal plumbing (unchanged) ──────────────────────────────
+    # ── internal plumbing ──────────────────────────────────────────
 
     async def _get_db_mail_config(self) -> Optional[Dict[str, Any]]:
         """Load current mail config from DB. Returns None if not configured."""
@@ -547,35 +606,62 @@ class EmailService:
             from sqlalchemy import select
 
             from ..core.database import AsyncSessionLocal
-            from ..models.models import MailConfig, MailProvider
 
             async with AsyncSessionLocal() as db:
                 result = await db.execute(
                     select(MailConfig).order_by(MailConfig.updated_at.desc()).limit(1)
                 )
                 row = result.scalar_one_or_none()
-                if not row:
-                    return None
-                return {
-                    "provider": row.provider.value,
-                    "use_env_credentials": row.use_env_credentials,
-                    "from_email": row.from_email,
-                    "resend_api_key": (
-                        row.resend_api_key
-                        if not row.use_env_credentials
-                        and row.provider == MailProvider.RESEND
-                        else None
-                    ),
-                    "smtp_host": row.smtp_host,
-                    "smtp_port": row.smtp_port,
-                    "smtp_use_tls": row.smtp_use_tls,
-                    "smtp_username": row.smtp_username,
-                    "smtp_password": row.smtp_password,
-                }
+                return mail_config_from_row(row) if row else None
         except Exception:
             logger.debug("Could not load mail config from DB, using env defaults")
             return None
 
+    async def get_mail_config(self) -> Optional[Dict[str, Any]]:
+        """
+        Mail config, cached per worker. Dropped on every MailConfig commit on
+        any worker (see invalidate_mail_config); MAIL_CONFIG_CACHE_SECONDS
+        bounds staleness if an invalidation is missed.
+        """
+        cached = self._mail_config_cache
+        if cached is not None and time.monotonic() - cached[0] < settings.MAIL_CONFIG_CACHE_SECONDS:
+            return cached[1]
+        mail_config = await self._get_db_mail_config()
+        self._mail_config_cache = (time.monotonic(), mail_config)
+        return mail_config
+
+    async def invalidate_mail_config(self) -> None:
+        """Drop the cached mail config here and on the other workers."""
+        self._mail_config_cache = None
+        try:
+            r = await RedisManager.get_redis()
+            await r.publish(MAIL_CONFIG_CHANNEL, self._origin)
+        except Exception as e:
+            logger.warning(f"Failed to publish mail config invalidation (Redis unavailable): {e}")
+
+    async def _listen(self) -> None:
+        """Drop the cached mail config when another worker changes it."""
+        while True:
+            try:
+                r = await RedisManager.get_redis()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(MAIL_CONFIG_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message" and message["data"] != self._origin:
+                        self._mail_config_cache = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Mail config listener error, resubscribing: {e}")
+                self._mail_config_cache = None
+                await asyncio.sleep(5)
+
+    def start_listener(self) -> asyncio.Task:
+        """Start the Redis subscriber task (called from app lifespan)."""
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+        return self._listener_task
+
     async def _send_email(
         self,
         to: str,
@@ -584,15 +670,70 @@ class EmailService:
         from_email: Optional[str] = None,
         mail_config: Optional[Dict[str, Any]] = None,
     ) -> bool:
-        """Send email via Resend, SMTP (from config), or log in dev mode."""
-        # Auto-load DB mail config if none provided
-        if mail_config is None:
-            mail_config = await self._get_db_mail_config()
+        """
+        Queue an email in the outbox (delivered by the email_outbox job).
+        With an explicit mail_config it is delivered right away.
+        """
+        if mail_config is not None:
+            return await self.deliver(to, subject, html, from_email, mail_config)
+        return await self._queue_emails([(to, subject, html)], from_email)
+
+    async def _queue_emails(
+        self, emails: List[Tuple[str, str, str]], from_email: Optional[str] = None
+    ) -> bool:
+        """Insert (to, subject, html) emails into the outbox, in one transaction."""
+        from ..core.database import AsyncSessionLocal
+        from ..models.models import EmailOutbox
+
+        rows = [
+            EmailOutbox(to_email=to, from_email=from_email, subject=subject, html=html)
+            for to, subject, html in emails
+        ]
+        if not rows:
+            return True
+        db = _outbox_session.get()
+        if db is not None:
+            db.add_all(rows)  # Committed (or rolled back) with the caller's transaction
+            return True
+        try:
+            async with AsyncSessionLocal() as session:
+                session.add_all(rows)
+                await session.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to queue {len(rows)} email(s) to {rows[0].to_email}: {e}")
+            return False
+
+    @contextmanager
+    def outbox(self, db: AsyncSession) -> Iterator[None]:
+        """
+        Queue emails sent inside the block in db's transaction, so they go
+        out only if it commits:
+
+            with email_service.outbox(db):
+                await email_service.send_account_approved(...)
+            await db.commit()
+        """
+        token = _outbox_session.set(db)
+        try:
+            yield
+        finally:
+            _outbox_session.reset(token)
+
+    # ── delivery (outbox worker, test email) ───────────────────────
 
-        from_addr = from_email or (mail_config or {}).get("from_email") or self.from_email
+    def from_address(
+        self, from_email: Optional[str], mail_config: Optional[Dict[str, Any]]
+    ) -> str:
+        return from_email or (mail_config or {}).get("from_email") or self.from_email
 
+    def provider(self, mail_config: Optional[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+        """
+        ("smtp", None), ("resend", api_key), or ("log", None) when no Resend
+        key is configured (dev mode: emails are only logged).
+        """
         if mail_config and mail_config.get("provider") == "smtp":
-            return await self._send_via_smtp(to, subject, html, from_addr, mail_config)
+            return "smtp", None
 
         api_key = self.api_key
         if mail_config and mail_config.get("provider") == "resend":
@@ -602,28 +743,70 @@ class EmailService:
                 api_key = mail_config["resend_api_key"]
             else:
                 api_key = settings.RESEND_API_KEY
+        return ("resend", api_key) if api_key else ("log", None)
 
-        if not api_key:
+    async def deliver(
+        self,
+        to: str,
+        subject: str,
+        html: str,
+        from_email: Optional[str] = None,
+        mail_config: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Send one email now via Resend, SMTP (from config), or log in dev mode."""
+        from_addr = self.from_address(from_email, mail_config)
+        provider, api_key = self.provider(mail_config)
+
+        if provider == "smtp":
+            return await self._send_via_smtp(to, subject, html, from_addr, mail_config)
+
+        if provider == "log":
             logger.info(f"[DEV MODE] Email would be sent to {to}")
             return True
 
         try:
-            import resend
-
-            resend.api_key = api_key
-            params = {
-                "from": from_addr,
-                "to": [to],
-                "subject": subject,
-                "html": html,
-            }
-            resend.Emails.send(params)
+            await self.send_resend(
+                api_key, [{"from": from_addr, "to": [to], "subject": subject, "html": html}]
+            )
             logger.info(f"Email sent successfully to {to}")
             return True
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
             return False
 
+    async def send_resend(self, api_key: str, messages: List[Dict[str, Any]]) -> None:
+        """
+        Send Resend messages ({from, to, subject, html}); several go in one
+        batch API call (up to RESEND_BATCH_LIMIT). Runs the blocking SDK call
+        in a thread. Raises resend.exceptions.ResendError on failure.
+        """
+        import resend
+
+        def _do_send() -> None:
+            resend.api_key = api_key
+            if len(messages) == 1:
+                resend.Emails.send(messages[0])
+            else:
+                resend.Batch.send(messages)
+
+        await asyncio.to_thread(_do_send)
+
+    async def send_smtp(
+        self,
+        to: str,
+        subject: str,
+        html: str,
+        from_addr: str,
+        mail_config: Dict[str, Any],
+    ) -> None:
+        """Send over a pooled SMTP connection (services/smtp_pool.py); raises on failure."""
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = from_addr
+        msg["To"] = to
+        msg.attach(MIMEText(html, "html"))
+        await get_smtp_pool(mail_config).send(from_addr, to, msg.as_string())
+
     async def _send_via_smtp(
         self,
         to: str,
@@ -632,38 +815,22 @@ class EmailService:
         from_addr: str,
         mail_config: Dict[str, Any],
     ) -> bool:
-        """Send email via SMTP using config. Runs sync smtplib in thread."""
-        host = mail_config.get("smtp_host") or "localhost"
-        port = mail_config.get("smtp_port") or 587
-        use_tls = mail_config.get("smtp_use_tls", True)
-        username = mail_config.get("smtp_username")
-        password = mail_config.get("smtp_password")
-
-        def _do_send() -> None:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = from_addr
-            msg["To"] = to
-            msg.attach(MIMEText(html, "html"))
-            if use_tls:
-                with smtplib.SMTP(host, port) as server:
-                    server.starttls()
-                    if username and password:
-                        server.login(username, password)
-                    server.sendmail(from_addr, [to], msg.as_string())
-            else:
-                with smtplib.SMTP(host, port) as server:
-                    if username and password:
-                        server.login(username, password)
-                    server.sendmail(from_addr, [to], msg.as_string())
-
+        """Send email via SMTP using config."""
         try:
-            await asyncio.to_thread(_do_send)
+            await self.send_smtp(to, subject, html, from_addr, mail_config)
             logger.info(f"Email sent via SMTP to {to}")
             return True
         except Exception as e:
             logger.error(f"Failed to send email via SMTP: {e}")
             return False
 
-
 email_service = EmailService()
+
+
+def _invalidate_mail_config():
+    email_service._mail_config_cache = None
+    return email_service.invalidate_mail_config()  # Other workers, via Redis
+
+
+# Drop the cached mail config once a MailConfig change commits
+on_commit("mail_config", MailConfig, publish=_invalidate_mail_config)
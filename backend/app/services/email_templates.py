@@ -0,0 +1,126 @@
+"""
+Precompiled Email Templates
+
+Renders the Jinja email templates for EmailService and the admin preview:
+- Every template is compiled once (precompile(), called at startup) and kept
+  for the life of the process; templates ship with the code, so there is no
+  per-render file stat (auto_reload is off). Compiled bytecode is cached on
+  disk, so other workers and restarts skip the Jinja compile step.
+- The layout around the `content` block (the _base.html head, styles and
+  footer) is rendered once per template and memoized. A render then only
+  runs the content block and concatenates it with the memoized layout.
+  Templates whose layout uses variables outside the content block are
+  rendered in full.
+- render_many() renders one template for many contexts with a single
+  template lookup. Sends whose content is the same for every recipient
+  (e.g. overdue settlement alerts to all admins) render once instead.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    meta,
+    nodes,
+    select_autoescape,
+)
+from jinja2.utils import concat
+
+CONTENT_BLOCK = "content"
+_CONTENT_MARKER = "\x00email-content\x00"
+
+
+@dataclass
+class _Layout:
+    """Rendered output of a template before and after its content block"""
+
+    prefix: str
+    suffix: str
+
+
+class TemplateRenderer:
+    """Compiled-once email templates with memoized static layouts (see module docstring)."""
+
+    def __init__(self, template_dir: str, bytecode_cache: bool = True):
+        self.template_dir = template_dir
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+            cache_size=-1,  # Never evict a compiled template
+            bytecode_cache=FileSystemBytecodeCache() if bytecode_cache else None,
+        )
+        self._layouts: Dict[str, Optional[_Layout]] = {}
+
+    def template_names(self) -> List[str]:
+        """Available template filenames (excluding partials such as _base.html)."""
+        if not os.path.isdir(self.template_dir):
+            return []
+        return [
+            f for f in sorted(os.listdir(self.template_dir))
+            if f.endswith(".html") and not f.startswith("_")
+        ]
+
+    def precompile(self) -> int:
+        """Compile every template and memoize its layout; returns the template count."""
+        names = self.template_names()
+        for name in names:
+            self._layout(name)
+        return len(names)
+
+    def _static_layout(self, name: str) -> bool:
+        """True if nothing outside the content block, in the template or its parents, uses variables."""
+        while name:
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            ast = self.env.parse(source)
+            for block in ast.find_all(nodes.Block):
+                if block.name == CONTENT_BLOCK:
+                    if any(n.name == "super" for n in block.find_all(nodes.Name)):
+                        return False  # super() needs the parent's block at render time
+                    block.body = []
+            if meta.find_undeclared_variables(ast):
+                return False
+            parents = [
+                node.template.value
+                for node in ast.find_all(nodes.Extends)
+                if isinstance(node.template, nodes.Const)
+            ]
+            if not parents and any(True for _ in ast.find_all(nodes.Extends)):
+                return False  # Dynamic parent template
+            name = parents[0] if parents else None
+        return True
+
+    def _layout(self, name: str) -> Optional[_Layout]:
+        if name not in self._layouts:
+            template = self.env.get_template(name)
+            layout = None
+            if CONTENT_BLOCK in template.blocks and self._static_layout(name):
+                context = template.new_context({})
+                context.blocks[CONTENT_BLOCK] = [lambda _context: iter([_CONTENT_MARKER])]
+                rendered = concat(template.root_render_func(context))
+                if rendered.count(_CONTENT_MARKER) == 1:
+                    prefix, _, suffix = rendered.partition(_CONTENT_MARKER)
+                    layout = _Layout(prefix, suffix)
+            self._layouts[name] = layout
+        return self._layouts[name]
+
+    def render(self, template_name: str, **context: Any) -> str:
+        return self.render_many(template_name, [context])[0]
+
+    def render_many(
+        self, template_name: str, contexts: Iterable[Mapping[str, Any]]
+    ) -> List[str]:
+        """Render one template for each context."""
+        template = self.env.get_template(template_name)
+        layout = self._layout(template_name)
+        if layout is None:
+            return [template.render(**context) for context in contexts]
+        content = template.blocks[CONTENT_BLOCK]
+        return [
+            layout.prefix + concat(content(template.new_context(dict(context)))) + layout.suffix
+            for context in contexts
+        ]
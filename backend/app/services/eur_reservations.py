@@ -0,0 +1,227 @@
+"""
+EUR Reservations for client limit BUY orders
+
+Placing a client BUY order reserves price x quantity x (1 + fee rate) EUR on
+the entity's EUR holding (EntityHolding.reserved) with one conditional UPDATE
+that only succeeds while quantity - reserved covers it, so concurrent orders
+can never overcommit the balance. The order remembers what it holds in
+Order.reserved_eur:
+
+- fill:   the filled slice of the reservation is consumed. The trade cost
+          (trade price, same fee rate) is debited with a TRADE_BUY audit row
+          and the slice is released, so price improvement stays available.
+- cancel: the rest of the reservation is released.
+- reprice: the reservation is resized to the new limit price / quantity.
+
+Market maker EUR is locked by their BUY orders in market_maker_balances.
+"""
+
+import logging
+from datetime import datetime, timezone
+from decimal import ROUND_UP, Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import (
+    AssetTransaction,
+    AssetType,
+    Entity,
+    EntityHolding,
+    Order,
+    OrderSide,
+    TransactionType,
+)
+from .balance_utils import CENTS, BalanceChange, get_entity_eur_balance
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientEURError(Exception):
+    """Available EUR does not cover the reservation"""
+
+    def __init__(self, required: Decimal, available: Decimal):
+        self.required = required
+        self.available = available
+        super().__init__(
+            f"Insufficient EUR balance. Required: {required} (incl. fees), available: {available}"
+        )
+
+
+def reservation_amount(price: Decimal, quantity: Decimal, fee_rate: Decimal) -> Decimal:
+    """EUR to hold for quantity at price, fees included (rounded up to cents)."""
+    return (price * quantity * (Decimal("1") + fee_rate)).quantize(CENTS, rounding=ROUND_UP)
+
+
+def holds_reservation(order: Order) -> bool:
+    return order.side == OrderSide.BUY and order.entity_id is not None and bool(order.reserved_eur)
+
+
+async def _try_reserve(db: AsyncSession, entity_id: UUID, amount: Decimal) -> bool:
+    """Atomically add amount to reserved if available covers it."""
+    result = await db.execute(
+        update(EntityHolding)
+        .where(
+            and_(
+                EntityHolding.entity_id == entity_id,
+                EntityHolding.asset_type == AssetType.EUR,
+                EntityHolding.quantity - EntityHolding.reserved >= amount,
+            )
+        )
+        .values(
+            reserved=EntityHolding.reserved + amount,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+        .returning(EntityHolding.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first() is not None
+
+
+async def ensure_eur_holding(db: AsyncSession, entity_id: UUID, created_by: UUID) -> None:
+    """
+    Create the EUR holding of a legacy entity from Entity.balance_amount (the
+    fallback get_entity_eur_balance uses while no holding row exists), with an
+    opening-balance ADJUSTMENT so the ledger matches the new holding.
+    """
+    result = await db.execute(select(Entity.balance_amount).where(Entity.id == entity_id))
+    opening = max(Decimal(str(result.scalar() or 0)), Decimal("0")).quantize(CENTS)
+    created = await db.execute(
+        pg_insert(EntityHolding)
+        .values(
+            entity_id=entity_id,
+            asset_type=AssetType.EUR,
+            quantity=opening,
+            reserved=Decimal("0"),
+        )
+        .on_conflict_do_nothing(index_elements=[EntityHolding.entity_id, EntityHolding.asset_type])
+        .returning(EntityHolding.id)
+    )
+    if created.first() is None or opening <= 0:
+        return  # Holding already existed (concurrent first order), or nothing to open
+    await db.execute(
+        insert(AssetTransaction),
+        [
+            {
+                "entity_id": entity_id,
+                "asset_type": AssetType.EUR,
+                "transaction_type": TransactionType.ADJUSTMENT,
+                "amount": opening,
+                "balance_before": Decimal("0"),
+                "balance_after": opening,
+                "notes": "Opening balance from Entity.balance_amount",
+                "created_by": created_by,
+            }
+        ],
+    )
+
+
+async def _reserve(db: AsyncSession, entity_id: UUID, amount: Decimal, created_by: UUID) -> None:
+    if amount <= 0 or await _try_reserve(db, entity_id, amount):
+        return
+    await ensure_eur_holding(db, entity_id, created_by)
+    if not await _try_reserve(db, entity_id, amount):
+        raise InsufficientEURError(amount, await get_entity_eur_balance(db, entity_id))
+
+
+async def _release(db: AsyncSession, entity_id: UUID, amount: Decimal) -> None:
+    if amount <= 0:
+        return
+    await db.execute(
+        update(EntityHolding)
+        .where(
+            and_(
+                EntityHolding.entity_id == entity_id,
+                EntityHolding.asset_type == AssetType.EUR,
+            )
+        )
+        .values(
+            reserved=EntityHolding.reserved - amount,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def reserve_for_order(
+    db: AsyncSession, order: Order, fee_rate: Decimal, created_by: UUID
+) -> Decimal:
+    """
+    Reserve EUR for a new client BUY order's remaining quantity.
+    Raises InsufficientEURError (nothing reserved) when available EUR is short.
+    """
+    remaining = order.quantity - (order.filled_quantity or Decimal("0"))
+    amount = reservation_amount(order.price, remaining, fee_rate)
+    await _reserve(db, order.entity_id, amount, created_by)
+    order.reserved_eur = amount
+    return amount
+
+
+async def reprice_reservation(
+    db: AsyncSession,
+    order: Order,
+    new_price: Decimal,
+    fee_rate: Decimal,
+    created_by: UUID,
+    new_quantity: Optional[Decimal] = None,
+) -> None:
+    """
+    Resize an order's reservation for a new limit price and/or quantity (before
+    order.price / order.quantity change). Raises InsufficientEURError when the
+    increase is not covered; nothing changes then.
+    """
+    if not holds_reservation(order):
+        return
+    quantity = order.quantity if new_quantity is None else new_quantity
+    remaining = quantity - (order.filled_quantity or Decimal("0"))
+    new_amount = reservation_amount(new_price, remaining, fee_rate)
+    delta = new_amount - order.reserved_eur
+    if delta > 0:
+        await _reserve(db, order.entity_id, delta, created_by)
+    else:
+        await _release(db, order.entity_id, -delta)
+    order.reserved_eur = new_amount
+
+
+async def release_order(db: AsyncSession, order: Order) -> None:
+    """Release whatever an order still holds (cancel, or a remainder that can't fill)."""
+    if not holds_reservation(order):
+        return
+    await _release(db, order.entity_id, order.reserved_eur)
+    order.reserved_eur = Decimal("0")
+
+
+def consume_fill(
+    order: Order,
+    fill_quantity: Decimal,
+    trade_price: Decimal,
+    created_by: Optional[UUID],
+) -> Optional[BalanceChange]:
+    """
+    Consume the reservation slice of a fill. Call before order.filled_quantity
+    is updated; apply the returned change with update_entity_balances (one
+    upsert for all fills of a matching run). None for orders without a reservation.
+    """
+    if not holds_reservation(order):
+        return None
+    remaining = order.quantity - (order.filled_quantity or Decimal("0"))
+    if fill_quantity >= remaining:
+        released = order.reserved_eur
+    else:
+        released = (order.reserved_eur * fill_quantity / remaining).quantize(CENTS)
+    # Same fee rate as reserved: cost / slice == trade price / limit price
+    cost = (released * trade_price / order.price).quantize(CENTS, rounding=ROUND_UP)
+    order.reserved_eur = order.reserved_eur - released
+    return BalanceChange(
+        entity_id=order.entity_id,
+        asset_type=AssetType.EUR,
+        amount=-cost,
+        transaction_type=TransactionType.TRADE_BUY,
+        created_by=created_by,
+        reference=str(order.id),
+        notes=f"Limit buy fill {fill_quantity} @ {trade_price} EUR (incl. fee)",
+        reserved=-released,
+    )
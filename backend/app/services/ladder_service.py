@@ -0,0 +1,341 @@
+"""
+Market Maker Ladder Rebuild Service
+
+Replaces all open MM orders of a market with a freshly generated ladder in
+one transaction, using set-based statements instead of per-order ORM work:
+
+1. Cancel: one UPDATE ... RETURNING over the market's open MM orders
+2. Build: the new ladder (prices, volumes, MM assignment) is generated in memory
+   by the vectorized LadderGenerator
+3. Insert: one bulk INSERT for the orders and one for their audit tickets
+
+The rebuild returns a per-side diff (orders, price levels, liquidity, best
+price before/after) for the admin response and the summary ticket.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import (
+    CertificateType,
+    MarketType,
+    Order,
+    OrderSide,
+    OrderStatus,
+    TicketStatus,
+)
+from .ladder_generator import LadderGenerator, LadderParams, default_generator
+from .market_maker_balances import BalanceDeltas, add_order_lock, apply_balance_deltas
+from .ticket_service import TicketService
+
+logger = logging.getLogger(__name__)
+
+MAX_ORDERS_PER_LEVEL = 3  # Hard cap per price level
+
+
+@dataclass
+class LadderOrder:
+    """One order of a generated ladder"""
+
+    market_maker_id: uuid.UUID
+    side: OrderSide
+    price: Decimal
+    quantity: Decimal
+
+
+def build_ladder(
+    side: OrderSide,
+    start_price: Decimal,
+    price_step: Decimal,
+    target_liquidity_eur: Decimal,
+    min_volume_eur: Optional[Decimal],
+    max_volume_eur: Optional[Decimal],
+    max_orders: int,
+    market_maker_ids: Sequence[uuid.UUID],
+    unit_price_eur: Optional[Decimal] = None,
+    min_price: Optional[Decimal] = None,
+    max_orders_per_level: int = MAX_ORDERS_PER_LEVEL,
+    generator: Optional[LadderGenerator] = None,
+) -> List[LadderOrder]:
+    """
+    Generate a contiguous ladder walking from start_price by price_step.
+
+    price_step is signed: negative walks down (BID ladders, swap ASK band),
+    positive walks up (cash ASK ladders). Each level gets 1..max_orders_per_level
+    orders until the target liquidity or max_orders is reached. Market makers
+    are assigned round-robin.
+
+    unit_price_eur converts EUR volume to quantity when the order price is not
+    in EUR (SWAP: price is the CEA/EUA ratio, quantity is EUA); by default the
+    level price is used. With min_price set, no order is placed below it.
+
+    Pass a seeded LadderGenerator for a reproducible ladder.
+    """
+    if not market_maker_ids or max_orders <= 0:
+        return []
+
+    arrays = (generator or default_generator).ladder(
+        start_price=start_price,
+        price_step=price_step,
+        params=LadderParams(
+            target_liquidity_eur=target_liquidity_eur,
+            min_volume_eur=min_volume_eur,
+            max_volume_eur=max_volume_eur,
+            max_orders=max_orders,
+            max_orders_per_level=min(max_orders_per_level, MAX_ORDERS_PER_LEVEL),
+        ),
+        unit_price_eur=unit_price_eur,
+        min_price=min_price,
+    )
+    mm_count = len(market_maker_ids)
+    return [
+        LadderOrder(
+            market_maker_id=market_maker_ids[i % mm_count],
+            side=side,
+            price=price,
+            quantity=Decimal(int(quantity)),
+        )
+        for i, (price, quantity) in enumerate(zip(arrays.prices(), arrays.quantities))
+    ]
+
+
+def _side_summary(
+    rows: Sequence[Dict[str, Any]],
+    side: OrderSide,
+    unit_price_eur: Optional[Decimal],
+) -> Dict[str, Any]:
+    """Orders, levels, EUR liquidity and best price for one side of a ladder."""
+    side_rows = [r for r in rows if r["side"] == side]
+    levels = {r["price"] for r in side_rows}
+    liquidity = sum(
+        (r["remaining"] * (unit_price_eur or r["price"]) for r in side_rows),
+        Decimal("0"),
+    )
+    best = None
+    if levels:
+        best = max(levels) if side == OrderSide.BUY else min(levels)
+    return {"orders": len(side_rows), "levels": levels, "liquidity_eur": liquidity, "best": best}
+
+
+def ladder_diff(
+    before: Sequence[Dict[str, Any]],
+    after: Sequence[Dict[str, Any]],
+    unit_price_eur: Optional[Decimal] = None,
+) -> Dict[str, Any]:
+    """Per-side comparison of the cancelled book and the new ladder."""
+    diff: Dict[str, Any] = {}
+    for side in (OrderSide.BUY, OrderSide.SELL):
+        old = _side_summary(before, side, unit_price_eur)
+        new = _side_summary(after, side, unit_price_eur)
+        if not old["orders"] and not new["orders"]:
+            continue
+        diff[side.value] = {
+            "orders_before": old["orders"],
+            "orders_after": new["orders"],
+            "levels_before": len(old["levels"]),
+            "levels_after": len(new["levels"]),
+            "levels_added": len(new["levels"] - old["levels"]),
+            "levels_removed": len(old["levels"] - new["levels"]),
+            "liquidity_eur_before": str(old["liquidity_eur"].quantize(Decimal("1"))),
+            "liquidity_eur_after": str(new["liquidity_eur"].quantize(Decimal("1"))),
+            "best_price_before": str(old["best"]) if old["best"] is not None else None,
+            "best_price_after": str(new["best"]) if new["best"] is not None else None,
+        }
+    return diff
+
+
+class LadderService:
+    """Set-based replacement of a market's MM order ladder"""
+
+    @staticmethod
+    async def rebuild(
+        db: AsyncSession,
+        market: MarketType,
+        certificate_type: CertificateType,
+        ladder: Sequence[LadderOrder],
+        admin_user_id: uuid.UUID,
+        unit_price_eur: Optional[Decimal] = None,
+        summary: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Cancel every open MM order in `market` and insert `ladder` in its place.
+
+        Does not commit. Returns {"orders_cancelled", "orders_created", "diff"}.
+        unit_price_eur values liquidity for markets whose price is not in EUR.
+        summary is merged into the LADDER_REBUILT ticket's request payload.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        tag_market = market.value.lower()
+
+        # 1. Cancel in one statement
+        cancel_result = await db.execute(
+            update(Order)
+            .where(
+                and_(
+                    Order.market == market,
+                    Order.market_maker_id.isnot(None),
+                    Order.status.in_([OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]),
+                )
+            )
+            .values(status=OrderStatus.CANCELLED, updated_at=now)
+            .returning(
+                Order.id,
+                Order.market_maker_id,
+                Order.certificate_type,
+                Order.side,
+                Order.price,
+                Order.quantity,
+                Order.filled_quantity,
+                Order.ticket_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        cancel_rows = cancel_result.all()
+        cancelled = [
+            {
+                "id": row.id,
+                "market_maker_id": row.market_maker_id,
+                "side": row.side,
+                "price": row.price,
+                "remaining": row.quantity - (row.filled_quantity or Decimal("0")),
+                "ticket_id": row.ticket_id,
+            }
+            for row in cancel_rows
+        ]
+
+        # 2. Audit tickets for cancellations and new orders, one INSERT
+        created = [
+            {
+                "id": uuid.uuid4(),
+                "market_maker_id": o.market_maker_id,
+                "side": o.side,
+                "price": o.price,
+                "remaining": o.quantity,
+                "quantity": o.quantity,
+            }
+            for o in ladder
+        ]
+        tickets: List[Dict[str, Any]] = [
+            {
+                "action_type": "ORDER_CANCELLED",
+                "entity_type": "Order",
+                "entity_id": c["id"],
+                "status": TicketStatus.SUCCESS,
+                "user_id": admin_user_id,
+                "market_maker_id": c["market_maker_id"],
+                "request_payload": {"reason": "ladder_rebuild"},
+                "response_data": {
+                    "order_id": str(c["id"]),
+                    "side": c["side"].value,
+                    "price": str(c["price"]),
+                    "remaining_quantity": str(c["remaining"]),
+                },
+                "related_ticket_ids": [c["ticket_id"]] if c["ticket_id"] else [],
+                "tags": ["auto_trade", "ladder_rebuild", "cancel", tag_market],
+            }
+            for c in cancelled
+        ]
+        tickets.extend(
+            {
+                "action_type": "AUTO_TRADE_ORDER_PLACED",
+                "entity_type": "Order",
+                "entity_id": o["id"],
+                "status": TicketStatus.SUCCESS,
+                "user_id": admin_user_id,
+                "market_maker_id": o["market_maker_id"],
+                "request_payload": {"source": "ladder_rebuild", "side": o["side"].value},
+                "response_data": {
+                    "order_id": str(o["id"]),
+                    "price": str(o["price"]),
+                    "quantity": str(o["quantity"]),
+                    "certificate_type": certificate_type.value,
+                },
+                "tags": ["auto_trade", "ladder_rebuild", "order", o["side"].value.lower(), tag_market],
+            }
+            for o in created
+        )
+        ticket_ids = await TicketService.create_tickets_bulk(db, tickets)
+        order_ticket_ids = ticket_ids[len(cancelled):]
+
+        # 3. New ladder, one INSERT
+        if created:
+            await db.execute(
+                insert(Order),
+                [
+                    {
+                        "id": o["id"],
+                        "market": market,
+                        "market_maker_id": o["market_maker_id"],
+                        "ticket_id": ticket_id,
+                        "certificate_type": certificate_type,
+                        "side": o["side"],
+                        "price": o["price"],
+                        "quantity": o["quantity"],
+                        "filled_quantity": Decimal("0"),
+                        "status": OrderStatus.OPEN,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for o, ticket_id in zip(created, order_ticket_ids)
+                ],
+            )
+
+        # 4. Core statements bypass the flush hook: release and add locks explicitly
+        deltas: BalanceDeltas = {}
+        for row in cancel_rows:
+            add_order_lock(
+                deltas, -1,
+                market_maker_id=row.market_maker_id,
+                certificate_type=row.certificate_type,
+                side=row.side,
+                status=OrderStatus.OPEN,
+                price=row.price,
+                quantity=row.quantity,
+                filled_quantity=row.filled_quantity,
+            )
+        for o in created:
+            add_order_lock(
+                deltas, 1,
+                market_maker_id=o["market_maker_id"],
+                certificate_type=certificate_type,
+                side=o["side"],
+                status=OrderStatus.OPEN,
+                price=o["price"],
+                quantity=o["quantity"],
+                filled_quantity=Decimal("0"),
+            )
+        await apply_balance_deltas(db, deltas)
+
+        diff = ladder_diff(cancelled, created, unit_price_eur)
+        await TicketService.create_ticket(
+            db=db,
+            action_type="LADDER_REBUILT",
+            entity_type="Market",
+            entity_id=None,
+            status=TicketStatus.SUCCESS,
+            user_id=admin_user_id,
+            request_payload={"market": market.value, **(summary or {})},
+            response_data={
+                "orders_cancelled": len(cancelled),
+                "orders_created": len(created),
+                "diff": diff,
+            },
+            tags=["auto_trade", "ladder_rebuild", tag_market],
+        )
+
+        logger.info(
+            f"Ladder rebuilt for {market.value}: cancelled {len(cancelled)}, "
+            f"created {len(created)} MM orders"
+        )
+        return {
+            "orders_cancelled": len(cancelled),
+            "orders_created": len(created),
+            "diff": diff,
+        }
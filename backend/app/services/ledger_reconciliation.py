@@ -0,0 +1,318 @@
+"""
+Incremental Ledger Reconciliation
+
+Checks that balances match the AssetTransaction ledger:
+- entities:      EntityHolding.quantity == SUM(amount) per (entity, asset)
+- market makers: market_maker_balances.total == SUM(amount) per (MM, certificate)
+
+Each (owner, asset) has a LedgerCheckpoint holding the ledger sum up to its
+last transaction (created_at, id). A run only aggregates transactions after
+the checkpoints, so its cost follows recent activity rather than the size of
+the history. Transactions younger than SETTLE_LAG count towards the
+comparison but are not folded into the checkpoint yet, which leaves
+in-flight writes (created_at is set before commit) time to become visible.
+
+New and resolved drift is written to the audit log; GET /admin/ledger/drift
+lists the current drift. MM EUR has no transaction ledger
+(MarketMakerClient.eur_balance) and is checked by mm_balance_verification.
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, and_, cast, func, or_, select, tuple_, type_coerce, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, aggregate_order_by, array_agg
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import AsyncSessionLocal
+from ..models.models import (
+    AssetTransaction,
+    AssetType,
+    EntityHolding,
+    LedgerCheckpoint,
+    MarketMakerAssetBalance,
+    TicketStatus,
+)
+from .ticket_service import TicketService
+
+logger = logging.getLogger(__name__)
+
+ENTITY = "entity"
+MARKET_MAKER = "market_maker"
+OWNER_TYPES = (ENTITY, MARKET_MAKER)
+SETTLE_LAG = timedelta(minutes=5)
+
+CheckpointKey = Tuple[str, uuid.UUID, AssetType]
+
+
+@dataclass
+class LedgerActivity:
+    """Ledger movement of one (owner, asset) after its checkpoint"""
+
+    settled: Decimal = Decimal("0")  # Older than the horizon: folded into the checkpoint
+    pending: Decimal = Decimal("0")  # Newer than the horizon: compared only
+    last_transaction_at: Optional[datetime] = None
+    last_transaction_id: Optional[uuid.UUID] = None
+
+
+def _dec(value: Any) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal("0")
+
+
+def apply_activity(
+    checkpoint: LedgerCheckpoint,
+    activity: Optional[LedgerActivity],
+    actual: Decimal,
+    now: datetime,
+) -> Optional[Decimal]:
+    """
+    Advance a checkpoint over new ledger activity and compare it with the
+    actual balance. Returns the previous drift when the drift changed, else None.
+    """
+    ledger_balance = _dec(checkpoint.ledger_balance)
+    expected = ledger_balance
+    if activity is not None:
+        ledger_balance += activity.settled
+        expected = ledger_balance + activity.pending
+        if activity.last_transaction_at is not None:
+            checkpoint.ledger_balance = ledger_balance
+            checkpoint.last_transaction_at = activity.last_transaction_at
+            checkpoint.last_transaction_id = activity.last_transaction_id
+            checkpoint.updated_at = now
+
+    previous = _dec(checkpoint.drift)
+    drift = actual - expected
+    if _dec(checkpoint.balance) != actual:
+        checkpoint.balance = actual
+        checkpoint.updated_at = now
+    if drift == previous:
+        return None
+    checkpoint.drift = drift
+    checkpoint.drift_detected_at = now if drift else None
+    checkpoint.updated_at = now
+    return previous
+
+
+async def _ledger_activity(
+    db: AsyncSession,
+    owner_type: str,
+    horizon: datetime,
+    since: Optional[datetime],
+) -> Dict[CheckpointKey, LedgerActivity]:
+    """
+    Sum transactions after each key's checkpoint in one grouped query.
+    since bounds the scan on the created_at index (None: whole ledger).
+    """
+    t, cp = AssetTransaction, LedgerCheckpoint
+    if owner_type == ENTITY:
+        owner_col, asset_col = t.entity_id, t.asset_type
+        same_asset = cp.asset_type == t.asset_type
+    else:
+        owner_col, asset_col = t.market_maker_id, t.certificate_type
+        same_asset = cast(cp.asset_type, String) == cast(t.certificate_type, String)
+
+    settled = t.created_at <= horizon
+    query = (
+        select(
+            owner_col,
+            asset_col,
+            func.sum(t.amount).filter(settled),
+            func.sum(t.amount).filter(t.created_at > horizon),
+            func.max(t.created_at).filter(settled),
+            # Newest settled transaction id (the checkpoint's tie-breaker)
+            type_coerce(
+                array_agg(aggregate_order_by(t.id, t.created_at.desc(), t.id.desc())).filter(settled),
+                ARRAY(UUID(as_uuid=True)),
+            )[1],
+        )
+        .select_from(t)
+        .outerjoin(cp, and_(cp.owner_type == owner_type, cp.owner_id == owner_col, same_asset))
+        .where(
+            owner_col.isnot(None),
+            asset_col.isnot(None),
+            or_(
+                cp.last_transaction_at.is_(None),
+                tuple_(t.created_at, t.id) > tuple_(cp.last_transaction_at, cp.last_transaction_id),
+            ),
+        )
+        .group_by(owner_col, asset_col)
+    )
+    if since is not None:
+        query = query.where(t.created_at >= since)
+
+    activity: Dict[CheckpointKey, LedgerActivity] = {}
+    for owner_id, asset, settled_sum, pending_sum, last_at, last_id in (await db.execute(query)).all():
+        activity[(owner_type, owner_id, AssetType(asset.value))] = LedgerActivity(
+            settled=_dec(settled_sum),
+            pending=_dec(pending_sum),
+            last_transaction_at=last_at,
+            last_transaction_id=last_id,
+        )
+    return activity
+
+
+async def _actual_balances(db: AsyncSession) -> Dict[CheckpointKey, Decimal]:
+    balances: Dict[CheckpointKey, Decimal] = {}
+    result = await db.execute(
+        select(EntityHolding.entity_id, EntityHolding.asset_type, EntityHolding.quantity)
+    )
+    for entity_id, asset_type, quantity in result.all():
+        balances[(ENTITY, entity_id, asset_type)] = _dec(quantity)
+    result = await db.execute(
+        select(
+            MarketMakerAssetBalance.market_maker_id,
+            MarketMakerAssetBalance.asset_type,
+            MarketMakerAssetBalance.total,
+        ).where(MarketMakerAssetBalance.asset_type != AssetType.EUR)
+    )
+    for mm_id, asset_type, total in result.all():
+        balances[(MARKET_MAKER, mm_id, asset_type)] = _dec(total)
+    return balances
+
+
+def _drift_ticket(checkpoint: LedgerCheckpoint, previous: Decimal) -> Dict[str, Any]:
+    drift = _dec(checkpoint.drift)
+    is_mm = checkpoint.owner_type == MARKET_MAKER
+    return {
+        "action_type": "LEDGER_DRIFT_DETECTED" if drift else "LEDGER_DRIFT_RESOLVED",
+        "entity_type": "MarketMaker" if is_mm else "Entity",
+        "entity_id": checkpoint.owner_id,
+        "market_maker_id": checkpoint.owner_id if is_mm else None,
+        "status": TicketStatus.FAILED if drift else TicketStatus.SUCCESS,
+        "before_state": {"drift": str(previous)},
+        "after_state": {
+            "asset_type": checkpoint.asset_type.value,
+            "balance": str(checkpoint.balance),
+            "ledger_balance": str(_dec(checkpoint.balance) - drift),
+            "drift": str(drift),
+        },
+        "tags": ["ledger", "reconciliation"],
+    }
+
+
+async def reconcile_ledger(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Advance all checkpoints and compare them with the actual balances.
+    Records drift changes in the audit log; returns the keys whose drift
+    changed. Run it in a REPEATABLE READ transaction so ledger and balances
+    come from one snapshot.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    horizon = now - SETTLE_LAG
+
+    checkpoints: Dict[CheckpointKey, LedgerCheckpoint] = {
+        (c.owner_type, c.owner_id, c.asset_type): c
+        for c in (await db.scalars(select(LedgerCheckpoint))).all()
+    }
+
+    activity: Dict[CheckpointKey, LedgerActivity] = {}
+    for owner_type in OWNER_TYPES:
+        reconciled_until = max(
+            (
+                c.last_transaction_at
+                for (kind, _, _), c in checkpoints.items()
+                if kind == owner_type and c.last_transaction_at is not None
+            ),
+            default=None,
+        )
+        # Transactions before the newest checkpoint were in an earlier window
+        since = reconciled_until - SETTLE_LAG if reconciled_until else None
+        activity.update(await _ledger_activity(db, owner_type, horizon, since))
+
+    actual = await _actual_balances(db)
+
+    changed: List[Tuple[LedgerCheckpoint, Decimal]] = []
+    for key in checkpoints.keys() | activity.keys() | actual.keys():
+        checkpoint = checkpoints.get(key)
+        if checkpoint is None:
+            owner_type, owner_id, asset_type = key
+            checkpoint = LedgerCheckpoint(
+                owner_type=owner_type,
+                owner_id=owner_id,
+                asset_type=asset_type,
+                ledger_balance=Decimal("0"),
+                balance=Decimal("0"),
+                drift=Decimal("0"),
+                updated_at=now,
+            )
+            db.add(checkpoint)
+        previous = apply_activity(checkpoint, activity.get(key), actual.get(key, Decimal("0")), now)
+        if previous is not None:
+            changed.append((checkpoint, previous))
+
+    if changed:
+        await TicketService.create_tickets_bulk(
+            db, [_drift_ticket(checkpoint, previous) for checkpoint, previous in changed]
+        )
+    await db.flush()
+
+    return [
+        {
+            "owner_type": checkpoint.owner_type,
+            "owner_id": str(checkpoint.owner_id),
+            "asset_type": checkpoint.asset_type.value,
+            "previous_drift": str(previous),
+            "drift": str(checkpoint.drift),
+        }
+        for checkpoint, previous in changed
+    ]
+
+
+async def list_drift(db: AsyncSession, owner_type: Optional[str] = None) -> List[LedgerCheckpoint]:
+    """Checkpoints whose balance disagreed with the ledger at the last run, largest first."""
+    query = select(LedgerCheckpoint).where(LedgerCheckpoint.drift != 0)
+    if owner_type:
+        query = query.where(LedgerCheckpoint.owner_type == owner_type)
+    query = query.order_by(func.abs(LedgerCheckpoint.drift).desc())
+    return list((await db.scalars(query)).all())
+
+
+async def reset_checkpoints(db: AsyncSession, owner_type: str, owner_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Restart the checkpoints of owners whose whole ledger is hard-deleted (MM
+    reset) at zero, so the next run counts only new transactions instead of
+    reporting the deleted history as drift. Call in the deleting transaction.
+    """
+    await db.execute(
+        update(LedgerCheckpoint)
+        .where(
+            LedgerCheckpoint.owner_type == owner_type,
+            LedgerCheckpoint.owner_id.in_(list(owner_ids)),
+        )
+        .values(
+            ledger_balance=0,
+            last_transaction_at=None,
+            last_transaction_id=None,
+            balance=0,
+            drift=0,
+            drift_detected_at=None,
+            updated_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def run_ledger_reconciliation() -> List[Dict[str, Any]]:
+    """Scheduler job: incremental reconciliation on a consistent snapshot."""
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        try:
+            changed = await reconcile_ledger(db)
+            await db.commit()
+        except DBAPIError as e:
+            # Checkpoints were advanced concurrently; the next run continues from them
+            await db.rollback()
+            logger.warning(f"Ledger reconciliation aborted by a concurrent write: {e}")
+            return []
+
+    detected = [c for c in changed if Decimal(c["drift"])]
+    if detected:
+        logger.warning(f"Ledger reconciliation found {len(detected)} drifted balances: {detected[:10]}")
+    else:
+        logger.info(f"Ledger reconciliation: no new drift ({len(changed)} resolved)")
+    return changed
@@ -30,6 +30,10 @@ from app.models.models import (
     OrderStatus,
     TicketStatus,
 )
+from app.services import eur_reservations
+from app.services.balance_utils import BalanceChange, update_entity_balances
+from app.services.role_transitions import transition_cea_to_cea_settle_if_eur_zero
+from app.services.settlement_service import SettlementService
 from app.services.ticket_service import TicketService
 
 logger = logging.getLogger(__name__)
@@ -45,6 +49,46 @@ class MatchResult:
     maker_is_buyer: bool  # True if the existing order (maker) was the buyer
 
 
+@dataclass
+class ClientFill:
+    """A client BUY fill paid from the order's EUR reservation"""
+    order: Order
+    trade: CashMarketTrade
+    quantity: Decimal
+    price: Decimal
+    change: BalanceChange  # EUR debit and reservation release
+    created_by: Optional[UUID]  # Buyer's user when known (settlement email)
+
+
+async def settle_client_fills(db: AsyncSession, fills: List[ClientFill]) -> None:
+    """
+    Pay for client BUY fills and deliver their CEA, as a market buy does:
+    debit the EUR (one upsert for all fills), move entities whose EUR is spent
+    from CEA to CEA_SETTLE, and open a T+3 purchase settlement per fill.
+
+    Settlement creation commits the session.
+    """
+    if not fills:
+        return
+    balances = await update_entity_balances(db, [f.change for f in fills])
+    eur_after = {}
+    for fill, balance in zip(fills, balances):
+        eur_after[fill.change.entity_id] = balance  # Last change = final balance
+    for entity_id, balance in eur_after.items():
+        await transition_cea_to_cea_settle_if_eur_zero(db, entity_id, balance)
+    for fill in fills:
+        await SettlementService.create_cea_purchase_settlement(
+            db=db,
+            entity_id=fill.order.entity_id,
+            order_id=fill.order.id,
+            trade_id=fill.trade.id,
+            quantity=fill.quantity,
+            price=fill.price,
+            seller_id=None,
+            created_by=fill.created_by,
+        )
+
+
 @dataclass
 class OrderMatchingResult:
     """Result of attempting to match an incoming order"""
@@ -116,6 +160,9 @@ class LimitOrderMatcher:
                 trades_created=0,
             )
 
+        # Client BUY fills, paid and settled once matching is done
+        client_fills: List[ClientFill] = []
+
         # Match against contra orders
         for contra_order in contra_orders:
             if remaining <= 0:
@@ -131,6 +178,7 @@ class LimitOrderMatcher:
                 contra_order.filled_quantity = contra_order.quantity
                 contra_order.status = OrderStatus.FILLED
                 contra_order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+                await eur_reservations.release_order(db, contra_order)
                 logger.info(
                     f"Auto-filled zombie order {contra_order.id} "
                     f"(remainder {contra_remaining} < 1 certificate)"
@@ -208,6 +256,17 @@ class LimitOrderMatcher:
             # Link ticket to trade
             trade.ticket_id = trade_ticket.ticket_id
 
+            change = eur_reservations.consume_fill(buy_order, match_qty, trade_price, user_id)
+            if change:
+                client_fills.append(ClientFill(
+                    order=buy_order,
+                    trade=trade,
+                    quantity=match_qty,
+                    price=trade_price,
+                    change=change,
+                    created_by=user_id if buy_order is incoming_order else None,
+                ))
+
             # Update incoming order
             incoming_order.filled_quantity = incoming_order.filled_quantity + match_qty
             incoming_order.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
@@ -246,6 +305,8 @@ class LimitOrderMatcher:
             incoming_order.status = OrderStatus.PARTIALLY_FILLED
         # else: remains OPEN
 
+        await settle_client_fills(db, client_fills)
+
         return OrderMatchingResult(
             matches=matches,
             total_filled=total_filled,
@@ -322,16 +383,20 @@ class LimitOrderMatcher:
     async def match_all_crossing_orders(
         db: AsyncSession,
         certificate_type: CertificateType,
+        user_id: Optional[UUID] = None,
     ) -> int:
         """
         Match all crossing orders in the order book for a certificate type.
 
         This is a bulk matching function that can be called to clean up
         any existing crossing orders (e.g., after a bug fix or migration).
+        user_id is recorded on EUR debits of client BUY fills, which are
+        settled like those of match_incoming_order.
 
         Returns: number of trades created
         """
         trades_created = 0
+        client_fills: List[ClientFill] = []
 
         # Get all open BUY orders sorted by price DESC, time ASC
         buy_result = await db.execute(
@@ -407,6 +472,17 @@ class LimitOrderMatcher:
                 )
                 db.add(trade)
 
+                change = eur_reservations.consume_fill(buy_order, match_qty, trade_price, user_id)
+                if change:
+                    client_fills.append(ClientFill(
+                        order=buy_order,
+                        trade=trade,
+                        quantity=match_qty,
+                        price=trade_price,
+                        change=change,
+                        created_by=None,
+                    ))
+
                 # Update buy order
                 buy_order.filled_quantity = buy_order.filled_quantity + match_qty
                 if buy_order.filled_quantity >= buy_order.quantity:
@@ -435,6 +511,8 @@ class LimitOrderMatcher:
                     break
 
         if trades_created > 0:
+            await db.flush()  # Trade IDs for the settlements
+            await settle_client_fills(db, client_fills)
             await db.commit()
             logger.info(f"Bulk matching created {trades_created} trades for {certificate_type.value}")
 
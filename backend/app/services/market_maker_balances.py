@@ -0,0 +1,496 @@
+"""
+Materialized Market Maker Balances
+
+market_maker_balances holds one (total, locked, available) row per market
+maker and asset, so balance checks are single-row reads instead of summing the
+whole AssetTransaction ledger and every open order on each call.
+
+Rows change in the same transaction as the writes they reflect:
+- ORM writes (AssetTransaction inserts, Order inserts/updates/deletes,
+  MarketMakerClient.eur_balance changes) are turned into deltas by an
+  after_flush hook and applied with one upsert on the flush's connection.
+- Bulk Core statements bypass the ORM, so their callers apply deltas
+  (apply_balance_deltas) or recompute the market makers they touched
+  (recompute_balances).
+
+verify_balances() recomputes every row from the ledger and repairs drift; it
+runs periodically as the mm_balance_verification scheduler job.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, func, select, true
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.database import AsyncSessionLocal
+from ..models.models import (
+    AssetTransaction,
+    AssetType,
+    CertificateType,
+    MarketMakerAssetBalance,
+    MarketMakerClient,
+    Order,
+    OrderSide,
+    OrderStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_ORDER_STATUSES = (OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED)
+BALANCE_ASSETS = (AssetType.CEA, AssetType.EUA, AssetType.EUR)
+UPSERT_CHUNK_ROWS = 1000  # Stay far below PostgreSQL's bind parameter limit
+
+_ORDER_FIELDS = (
+    "market_maker_id",
+    "certificate_type",
+    "side",
+    "status",
+    "price",
+    "quantity",
+    "filled_quantity",
+)
+
+BalanceKey = Tuple[uuid.UUID, AssetType]
+# [total delta, locked delta] per market maker and asset
+BalanceDeltas = Dict[BalanceKey, List[Decimal]]
+
+
+def _dec(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def add_delta(
+    deltas: BalanceDeltas,
+    market_maker_id: uuid.UUID,
+    asset_type: AssetType,
+    total: Decimal = Decimal("0"),
+    locked: Decimal = Decimal("0"),
+) -> None:
+    entry = deltas.setdefault((market_maker_id, asset_type), [Decimal("0"), Decimal("0")])
+    entry[0] += total
+    entry[1] += locked
+
+
+def order_lock(
+    market_maker_id: Optional[uuid.UUID],
+    certificate_type: Optional[CertificateType],
+    side: OrderSide,
+    status: Optional[OrderStatus],
+    price,
+    quantity,
+    filled_quantity,
+) -> Optional[Tuple[uuid.UUID, AssetType, Decimal]]:
+    """
+    Balance an order holds: SELL locks its remaining certificates, BUY locks
+    price x remaining EUR. None for non-MM or inactive orders.
+    """
+    if market_maker_id is None or (status or OrderStatus.OPEN) not in ACTIVE_ORDER_STATUSES:
+        return None
+    remaining = _dec(quantity) - _dec(filled_quantity)
+    if side == OrderSide.SELL:
+        if certificate_type is None:
+            return None
+        return market_maker_id, AssetType(certificate_type.value), remaining
+    return market_maker_id, AssetType.EUR, _dec(price) * remaining
+
+
+def add_order_lock(deltas: BalanceDeltas, sign: int, **order_values) -> None:
+    """Add (sign=1) or release (sign=-1) the lock of an order given its column values."""
+    lock = order_lock(**order_values)
+    if lock is not None:
+        market_maker_id, asset_type, amount = lock
+        add_delta(deltas, market_maker_id, asset_type, locked=amount * sign)
+
+
+# =============================================================================
+# Sync core (runs on the flush connection or via AsyncSession.run_sync)
+# =============================================================================
+
+
+def _upsert_deltas(session: Session, deltas: BalanceDeltas) -> None:
+    rows = [
+        {
+            "market_maker_id": mm_id,
+            "asset_type": asset_type,
+            "total": total,
+            "locked": locked,
+            "updated_at": _now(),
+        }
+        for (mm_id, asset_type), (total, locked) in deltas.items()
+        if total or locked
+    ]
+    table = MarketMakerAssetBalance.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        stmt = pg_insert(table).values(rows[start:start + UPSERT_CHUNK_ROWS])
+        session.connection().execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.market_maker_id, table.c.asset_type],
+                set_={
+                    "total": table.c.total + stmt.excluded.total,
+                    "locked": table.c.locked + stmt.excluded.locked,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+
+
+def _ledger_balances(
+    session: Session,
+    market_maker_ids: Optional[Collection[uuid.UUID]] = None,
+) -> Dict[BalanceKey, List[Decimal]]:
+    """[total, locked] per market maker and asset, recomputed from the ledger and open orders."""
+    conn = session.connection()
+
+    def only(column):
+        return column.in_(list(market_maker_ids)) if market_maker_ids is not None else true()
+
+    balances: Dict[BalanceKey, List[Decimal]] = {}
+    for mm_id, eur_balance in conn.execute(
+        select(MarketMakerClient.id, MarketMakerClient.eur_balance).where(only(MarketMakerClient.id))
+    ):
+        for asset_type in BALANCE_ASSETS:
+            balances[(mm_id, asset_type)] = [Decimal("0"), Decimal("0")]
+        balances[(mm_id, AssetType.EUR)][0] = _dec(eur_balance)
+
+    for mm_id, certificate_type, amount in conn.execute(
+        select(
+            AssetTransaction.market_maker_id,
+            AssetTransaction.certificate_type,
+            func.sum(AssetTransaction.amount),
+        )
+        .where(
+            and_(
+                AssetTransaction.market_maker_id.isnot(None),
+                AssetTransaction.certificate_type.isnot(None),
+                only(AssetTransaction.market_maker_id),
+            )
+        )
+        .group_by(AssetTransaction.market_maker_id, AssetTransaction.certificate_type)
+    ):
+        key = (mm_id, AssetType(certificate_type.value))
+        if key in balances:
+            balances[key][0] = _dec(amount)
+
+    remaining = Order.quantity - func.coalesce(Order.filled_quantity, 0)
+    for mm_id, side, certificate_type, quantity, value in conn.execute(
+        select(
+            Order.market_maker_id,
+            Order.side,
+            Order.certificate_type,
+            func.sum(remaining),
+            func.sum(Order.price * remaining),
+        )
+        .where(
+            and_(
+                Order.market_maker_id.isnot(None),
+                Order.status.in_(ACTIVE_ORDER_STATUSES),
+                only(Order.market_maker_id),
+            )
+        )
+        .group_by(Order.market_maker_id, Order.side, Order.certificate_type)
+    ):
+        if side == OrderSide.SELL:
+            if certificate_type is None:
+                continue
+            key, amount = (mm_id, AssetType(certificate_type.value)), quantity
+        else:
+            key, amount = (mm_id, AssetType.EUR), value
+        if key in balances:
+            balances[key][1] += _dec(amount)
+
+    return balances
+
+
+def _write_balances(session: Session, balances: Dict[BalanceKey, List[Decimal]]) -> None:
+    rows = [
+        {
+            "market_maker_id": mm_id,
+            "asset_type": asset_type,
+            "total": total,
+            "locked": locked,
+            "updated_at": _now(),
+        }
+        for (mm_id, asset_type), (total, locked) in balances.items()
+    ]
+    table = MarketMakerAssetBalance.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        stmt = pg_insert(table).values(rows[start:start + UPSERT_CHUNK_ROWS])
+        session.connection().execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.market_maker_id, table.c.asset_type],
+                set_={
+                    "total": stmt.excluded.total,
+                    "locked": stmt.excluded.locked,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+        )
+
+
+def _recompute(session: Session, market_maker_ids: Optional[Collection[uuid.UUID]]) -> None:
+    _write_balances(session, _ledger_balances(session, market_maker_ids))
+
+
+# =============================================================================
+# ORM write tracking
+# =============================================================================
+
+
+def _order_values(obj: Order, previous: bool) -> Optional[Dict[str, Any]]:
+    """
+    Column values of an order before (previous=True) or after this flush.
+    None when a needed value isn't loaded (the caller recomputes instead).
+    """
+    state = sa_inspect(obj)
+    values: Dict[str, Any] = {}
+    for name in _ORDER_FIELDS:
+        if previous:
+            history = state.attrs[name].history
+            if history.deleted:
+                values[name] = history.deleted[0]
+                continue
+            if history.added:
+                return None  # Changed from an unloaded (or NULL) value
+        if name not in state.dict:
+            return None
+        values[name] = state.dict[name]
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flushed_balance_changes(session: Session, flush_context) -> None:
+    """Mirror flushed ledger/order/EUR balance writes into market_maker_balances."""
+    deltas: BalanceDeltas = {}
+    recompute: set = set()
+    deleted_mms = {obj.id for obj in session.deleted if isinstance(obj, MarketMakerClient)}
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            after = _order_values(obj, previous=False)
+            if after is None:
+                recompute.add(obj.market_maker_id)
+            else:
+                add_order_lock(deltas, 1, **after)
+        elif isinstance(obj, AssetTransaction):
+            if obj.market_maker_id and obj.certificate_type:
+                add_delta(deltas, obj.market_maker_id, AssetType(obj.certificate_type.value), total=_dec(obj.amount))
+        elif isinstance(obj, MarketMakerClient):
+            add_delta(deltas, obj.id, AssetType.EUR, total=_dec(obj.eur_balance))
+
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            if not session.is_modified(obj, include_collections=False):
+                continue
+            before = _order_values(obj, previous=True)
+            after = _order_values(obj, previous=False)
+            if before is None or after is None:
+                recompute.add(obj.market_maker_id or sa_inspect(obj).committed_state.get("market_maker_id"))
+                continue
+            add_order_lock(deltas, -1, **before)
+            add_order_lock(deltas, 1, **after)
+        elif isinstance(obj, MarketMakerClient):
+            history = sa_inspect(obj).attrs.eur_balance.history
+            if history.added:
+                if history.deleted:
+                    add_delta(deltas, obj.id, AssetType.EUR, total=_dec(history.added[0]) - _dec(history.deleted[0]))
+                else:
+                    recompute.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            before = _order_values(obj, previous=True)
+            if before is None:
+                recompute.add(obj.market_maker_id)
+            else:
+                add_order_lock(deltas, -1, **before)
+        elif isinstance(obj, AssetTransaction):
+            if obj.market_maker_id and obj.certificate_type:
+                add_delta(deltas, obj.market_maker_id, AssetType(obj.certificate_type.value), total=-_dec(obj.amount))
+
+    for key in [k for k in deltas if k[0] in deleted_mms or k[0] in recompute]:
+        del deltas[key]
+    recompute = {mm_id for mm_id in recompute if mm_id and mm_id not in deleted_mms}
+
+    if deltas:
+        _upsert_deltas(session, deltas)
+    if recompute:
+        _recompute(session, recompute)
+
+
+# =============================================================================
+# Async API
+# =============================================================================
+
+
+async def apply_balance_deltas(db: AsyncSession, deltas: BalanceDeltas) -> None:
+    """Apply deltas for writes made with bulk Core statements."""
+    if deltas:
+        await db.run_sync(_upsert_deltas, deltas)
+
+
+async def recompute_balances(
+    db: AsyncSession,
+    market_maker_ids: Optional[Collection[uuid.UUID]] = None,
+) -> None:
+    """Rebuild rows from the ledger (all market makers when ids is None)."""
+    await db.run_sync(_recompute, market_maker_ids)
+
+
+def _format(total: Decimal, locked: Decimal) -> Dict[str, Decimal]:
+    return {"available": total - locked, "locked": locked, "total": total}
+
+
+async def get_balances_bulk(
+    db: AsyncSession,
+    market_maker_ids: Collection[uuid.UUID],
+) -> Dict[uuid.UUID, Dict[str, Dict[str, Decimal]]]:
+    """
+    {mm_id: {CEA|EUA|EUR: {available, locked, total}}} in one query.
+    Market makers without rows yet are recomputed from the ledger first.
+    """
+    ids = list(market_maker_ids)
+    if not ids:
+        return {}
+
+    async def read() -> Dict[uuid.UUID, Dict[str, Dict[str, Decimal]]]:
+        result = await db.execute(
+            select(
+                MarketMakerAssetBalance.market_maker_id,
+                MarketMakerAssetBalance.asset_type,
+                MarketMakerAssetBalance.total,
+                MarketMakerAssetBalance.locked,
+            ).where(MarketMakerAssetBalance.market_maker_id.in_(ids))
+        )
+        rows: Dict[uuid.UUID, Dict[str, Dict[str, Decimal]]] = {}
+        for mm_id, asset_type, total, locked in result.all():
+            rows.setdefault(mm_id, {})[asset_type.value] = _format(_dec(total), _dec(locked))
+        return rows
+
+    rows = await read()
+    missing = [mm_id for mm_id in ids if len(rows.get(mm_id, {})) < len(BALANCE_ASSETS)]
+    if missing:
+        await recompute_balances(db, missing)
+        rows = await read()
+
+    zero = {"available": Decimal("0"), "locked": Decimal("0"), "total": Decimal("0")}
+    ordered = [c.value for c in CertificateType] + [AssetType.EUR.value]
+    return {
+        mm_id: {asset: rows.get(mm_id, {}).get(asset, dict(zero)) for asset in ordered}
+        for mm_id in ids
+    }
+
+
+async def get_available(
+    db: AsyncSession,
+    market_maker_id: uuid.UUID,
+    asset_type: AssetType,
+) -> Decimal:
+    """Available balance of one asset: a single-row read."""
+    query = select(MarketMakerAssetBalance.available).where(
+        and_(
+            MarketMakerAssetBalance.market_maker_id == market_maker_id,
+            MarketMakerAssetBalance.asset_type == asset_type,
+        )
+    )
+    available = (await db.execute(query)).scalar_one_or_none()
+    if available is None:
+        await recompute_balances(db, [market_maker_id])
+        available = (await db.execute(query)).scalar_one_or_none()
+    return _dec(available)
+
+
+async def lock_total(
+    db: AsyncSession,
+    market_maker_id: uuid.UUID,
+    asset_type: AssetType,
+) -> Decimal:
+    """Current ledger total, row-locked until commit (serializes ledger writes per MM and asset)."""
+    query = (
+        select(MarketMakerAssetBalance.total)
+        .where(
+            and_(
+                MarketMakerAssetBalance.market_maker_id == market_maker_id,
+                MarketMakerAssetBalance.asset_type == asset_type,
+            )
+        )
+        .with_for_update()
+    )
+    total = (await db.execute(query)).scalar_one_or_none()
+    if total is None:
+        await recompute_balances(db, [market_maker_id])
+        total = (await db.execute(query)).scalar_one_or_none()
+    return _dec(total)
+
+
+async def verify_balances(db: AsyncSession, fix: bool = True) -> List[Dict[str, str]]:
+    """
+    Compare every materialized row with the ledger; returns the drifted rows
+    and, with fix=True, overwrites them with the recomputed values. Run it
+    in a REPEATABLE READ transaction so ledger and rows come from one snapshot.
+    """
+
+    def verify(session: Session) -> List[Dict[str, str]]:
+        expected = _ledger_balances(session)
+        actual = {
+            (mm_id, asset_type): (_dec(total), _dec(locked))
+            for mm_id, asset_type, total, locked in session.connection().execute(
+                select(
+                    MarketMakerAssetBalance.market_maker_id,
+                    MarketMakerAssetBalance.asset_type,
+                    MarketMakerAssetBalance.total,
+                    MarketMakerAssetBalance.locked,
+                )
+            )
+        }
+        drifted = {
+            key: value
+            for key, value in expected.items()
+            if actual.get(key) != (value[0], value[1])
+        }
+        if fix and drifted:
+            _write_balances(session, drifted)
+        return [
+            {
+                "market_maker_id": str(mm_id),
+                "asset_type": asset_type.value,
+                "expected_total": str(total),
+                "expected_locked": str(locked),
+                "actual_total": str(actual[(mm_id, asset_type)][0]) if (mm_id, asset_type) in actual else None,
+                "actual_locked": str(actual[(mm_id, asset_type)][1]) if (mm_id, asset_type) in actual else None,
+            }
+            for (mm_id, asset_type), (total, locked) in drifted.items()
+        ]
+
+    return await db.run_sync(verify)
+
+
+async def run_balance_verification() -> List[Dict[str, str]]:
+    """Scheduler job: verify and repair all rows on a consistent snapshot."""
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        try:
+            drift = await verify_balances(db, fix=True)
+            await db.commit()
+        except DBAPIError as e:
+            # A concurrent write touched a drifted row; the next run re-checks it
+            await db.rollback()
+            logger.warning(f"MM balance verification aborted by a concurrent write: {e}")
+            return []
+
+    if drift:
+        logger.warning(f"MM balance verification repaired {len(drift)} drifted rows: {drift[:10]}")
+    else:
+        logger.info("MM balance verification: all rows match the ledger")
+    return drift
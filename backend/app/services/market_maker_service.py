@@ -5,23 +5,22 @@ import uuid
 from decimal import Decimal
 from typing import Dict, Optional
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import hash_password
 from app.models.models import (
     AssetTransaction,
+    AssetType,
     CertificateType,
     MarketMakerClient,
     MarketMakerType,
-    Order,
-    OrderSide,
-    OrderStatus,
     TicketStatus,
     TransactionType,
     User,
     UserRole,
 )
+from app.services import market_maker_balances
 from app.services.ticket_service import TicketService
 
 logger = logging.getLogger(__name__)
@@ -140,16 +139,11 @@ class MarketMakerService:
         Create asset transaction and calculate new balance
         Returns: (AssetTransaction, ticket_id)
         """
-        # Calculate new balance from transaction history
-        result = await db.execute(
-            select(func.coalesce(func.sum(AssetTransaction.amount), 0)).where(
-                and_(
-                    AssetTransaction.market_maker_id == market_maker_id,
-                    AssetTransaction.certificate_type == certificate_type,
-                )
-            )
+        # Current ledger total from the materialized balance row, locked until
+        # commit so concurrent transactions for this MM/asset chain correctly
+        current_balance = await market_maker_balances.lock_total(
+            db, market_maker_id, AssetType(certificate_type.value)
         )
-        current_balance = result.scalar() or Decimal("0")
         new_balance = current_balance + amount
 
         # Create ticket first
@@ -176,8 +170,6 @@ class MarketMakerService:
 
         # Create transaction
         # Convert CertificateType to AssetType (same values: CEA/EUA)
-        from app.models.models import AssetType
-
         asset_type_value = AssetType(certificate_type.value)
 
         transaction = AssetTransaction(
@@ -210,80 +202,13 @@ class MarketMakerService:
         """
         Get current balances (available, locked, total) for all certificate types and EUR
         Returns: {CEA: {available: 5000, locked: 1500, total: 6500}, EUR: {...}, ...}
-        """
-        balances = {}
-
-        for cert_type in CertificateType:
-            # Total balance from transactions
-            result = await db.execute(
-                select(func.coalesce(func.sum(AssetTransaction.amount), 0)).where(
-                    and_(
-                        AssetTransaction.market_maker_id == market_maker_id,
-                        AssetTransaction.certificate_type == cert_type,
-                    )
-                )
-            )
-            total = result.scalar() or Decimal("0")
-
-            # Locked in active SELL orders (only sell orders lock certificates)
-            result = await db.execute(
-                select(
-                    func.coalesce(func.sum(Order.quantity - Order.filled_quantity), 0)
-                ).where(
-                    and_(
-                        Order.market_maker_id == market_maker_id,
-                        Order.certificate_type == cert_type,
-                        Order.side == OrderSide.SELL,
-                        Order.status.in_(
-                            [OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]
-                        ),
-                    )
-                )
-            )
-            locked = result.scalar() or Decimal("0")
-
-            available = total - locked
-
-            balances[cert_type.value] = {
-                "available": available,
-                "locked": locked,
-                "total": total,
-            }
 
-        # Calculate EUR balance and locked amount from BUY orders
-        # EUR locked = sum of (price * remaining_quantity) for all active BUY orders
-        result = await db.execute(
-            select(
-                func.coalesce(
-                    func.sum(Order.price * (Order.quantity - Order.filled_quantity)), 0
-                )
-            ).where(
-                and_(
-                    Order.market_maker_id == market_maker_id,
-                    Order.side == OrderSide.BUY,
-                    Order.status.in_(
-                        [OrderStatus.OPEN, OrderStatus.PARTIALLY_FILLED]
-                    ),
-                )
-            )
-        )
-        eur_locked = result.scalar() or Decimal("0")
-
-        # Get EUR total from market maker record
-        mm_result = await db.execute(
-            select(MarketMakerClient).where(MarketMakerClient.id == market_maker_id)
-        )
-        mm = mm_result.scalar_one_or_none()
-        eur_total = Decimal(str(mm.eur_balance)) if mm else Decimal("0")
-        eur_available = eur_total - eur_locked
-
-        balances["EUR"] = {
-            "available": eur_available,
-            "locked": eur_locked,
-            "total": eur_total,
-        }
-
-        return balances
+        Reads the materialized market_maker_balances rows (see market_maker_balances.py):
+        total is the ledger sum (EUR: eur_balance), locked is the remainder of
+        active SELL orders (certificates) or price * remainder of BUY orders (EUR).
+        """
+        balances = await market_maker_balances.get_balances_bulk(db, [market_maker_id])
+        return balances[market_maker_id]
 
     @staticmethod
     async def validate_sufficient_balance(
@@ -293,6 +218,7 @@ class MarketMakerService:
         required_amount: Decimal,
     ) -> bool:
         """Check if MM has sufficient available balance"""
-        balances = await MarketMakerService.get_balances(db, market_maker_id)
-        available = balances[certificate_type.value]["available"]
+        available = await market_maker_balances.get_available(
+            db, market_maker_id, AssetType(certificate_type.value)
+        )
         return available >= required_amount
@@ -0,0 +1,364 @@
+"""
+Rolling 24h Market Statistics
+
+Keeps high, low, volume, last price and change for the last 24 hours in memory
+so the order book, depth and stats endpoints no longer load every trade of the
+day on each request.
+
+Structure (per certificate type):
+- Ring buffer of per-minute buckets (1440 slots for 24h)
+- Monotonic deques over bucket highs/lows for O(1) max/min
+- Running volume and trade count, adjusted as buckets expire
+
+Lifecycle:
+- Rebuilt from cash_market_trades on first use / at startup
+- Updated on every committed CashMarketTrade (on-commit hook)
+- Fills are published on Redis so every worker applies the same trades
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.commit_hooks import on_commit
+from ..core.security import RedisManager
+from ..models.models import CashMarketTrade, CertificateType
+
+logger = logging.getLogger(__name__)
+
+WINDOW_MINUTES = 24 * 60
+FILLS_CHANNEL = "market_stats:fills"
+
+
+def _to_naive_utc(ts: datetime) -> datetime:
+    """Normalize to naive UTC (DB timestamps are TIMESTAMP WITHOUT TIME ZONE)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _minute_of(ts: datetime) -> int:
+    """Absolute minute index (minutes since epoch) for a naive UTC timestamp."""
+    return int(ts.replace(tzinfo=timezone.utc).timestamp() // 60)
+
+
+@dataclass
+class _MinuteBucket:
+    """Aggregated fills for one wall-clock minute"""
+
+    minute: int
+    high: float
+    low: float
+    volume: float
+    count: int
+    first_price: float
+    first_at: datetime
+    last_price: float
+    last_at: datetime
+
+
+@dataclass
+class RollingStats:
+    """Snapshot of rolling window statistics"""
+
+    high: Optional[float]
+    low: Optional[float]
+    volume: float
+    trade_count: int
+    last_price: Optional[float]
+    change_pct: float
+
+
+class RollingWindowStats:
+    """
+    Sliding 24h window of trade statistics for a single market.
+
+    Fills are aggregated into per-minute buckets stored in a ring buffer.
+    Two monotonic deques hold (minute, price) candidates for the window
+    maximum and minimum, so reads never scan the window.
+    """
+
+    def __init__(self, window_minutes: int = WINDOW_MINUTES):
+        self.window_minutes = window_minutes
+        self._buckets: List[Optional[_MinuteBucket]] = [None] * window_minutes
+        self._live: Deque[int] = deque()  # Minutes with a bucket, oldest first
+        self._max_q: Deque[Tuple[int, float]] = deque()  # Decreasing prices
+        self._min_q: Deque[Tuple[int, float]] = deque()  # Increasing prices
+        self._volume = 0.0
+        self._count = 0
+
+    def _bucket(self, minute: int) -> Optional[_MinuteBucket]:
+        bucket = self._buckets[minute % self.window_minutes]
+        if bucket is not None and bucket.minute == minute:
+            return bucket
+        return None
+
+    def _expire(self, now_minute: int) -> None:
+        """Drop buckets that fell out of the window ending at now_minute."""
+        cutoff = now_minute - self.window_minutes + 1
+        while self._live and self._live[0] < cutoff:
+            minute = self._live.popleft()
+            slot = minute % self.window_minutes
+            bucket = self._buckets[slot]
+            if bucket is not None and bucket.minute == minute:
+                self._volume -= bucket.volume
+                self._count -= bucket.count
+                self._buckets[slot] = None
+        while self._max_q and self._max_q[0][0] < cutoff:
+            self._max_q.popleft()
+        while self._min_q and self._min_q[0][0] < cutoff:
+            self._min_q.popleft()
+        if not self._live:
+            self._volume = 0.0
+            self._count = 0
+
+    def _rebuild_extremes(self) -> None:
+        """Recompute monotonic deques from buckets (out-of-order fills only)."""
+        self._max_q.clear()
+        self._min_q.clear()
+        for minute in self._live:
+            bucket = self._bucket(minute)
+            if bucket is not None:
+                self._push_extremes(minute, bucket.high, bucket.low)
+
+    def _push_extremes(self, minute: int, high: float, low: float) -> None:
+        if not (self._max_q and self._max_q[-1][0] == minute and self._max_q[-1][1] >= high):
+            while self._max_q and self._max_q[-1][1] <= high:
+                self._max_q.pop()
+            self._max_q.append((minute, high))
+        if not (self._min_q and self._min_q[-1][0] == minute and self._min_q[-1][1] <= low):
+            while self._min_q and self._min_q[-1][1] >= low:
+                self._min_q.pop()
+            self._min_q.append((minute, low))
+
+    def add_fill(self, price: float, quantity: float, executed_at: datetime) -> None:
+        """Apply a single executed trade to the window."""
+        executed_at = _to_naive_utc(executed_at)
+        minute = _minute_of(executed_at)
+        newest = self._live[-1] if self._live else None
+
+        if newest is not None and minute <= newest - self.window_minutes:
+            return  # Older than the window we already hold
+        if newest is None or minute > newest:
+            self._expire(minute)
+
+        bucket = self._bucket(minute)
+        if bucket is None:
+            slot = minute % self.window_minutes
+            self._buckets[slot] = _MinuteBucket(
+                minute=minute,
+                high=price,
+                low=price,
+                volume=quantity,
+                count=1,
+                first_price=price,
+                first_at=executed_at,
+                last_price=price,
+                last_at=executed_at,
+            )
+        else:
+            bucket.high = max(bucket.high, price)
+            bucket.low = min(bucket.low, price)
+            bucket.volume += quantity
+            bucket.count += 1
+            if executed_at < bucket.first_at:
+                bucket.first_price, bucket.first_at = price, executed_at
+            if executed_at >= bucket.last_at:
+                bucket.last_price, bucket.last_at = price, executed_at
+
+        self._volume += quantity
+        self._count += 1
+
+        if newest is None or minute > newest:
+            self._live.append(minute)
+            self._push_extremes(minute, price, price)
+        elif minute == newest:
+            self._push_extremes(minute, price, price)
+        else:
+            # Late fill for an earlier minute (clock skew between workers)
+            if bucket is None:
+                self._live = deque(sorted([*self._live, minute]))
+            self._rebuild_extremes()
+
+    def snapshot(self, now: Optional[datetime] = None) -> RollingStats:
+        """Return window statistics as of `now` (default: current UTC time)."""
+        now = _to_naive_utc(now) if now else datetime.now(timezone.utc).replace(tzinfo=None)
+        self._expire(_minute_of(now))
+
+        if not self._live:
+            return RollingStats(
+                high=None, low=None, volume=0.0, trade_count=0,
+                last_price=None, change_pct=0.0,
+            )
+
+        oldest = self._bucket(self._live[0])
+        newest = self._bucket(self._live[-1])
+        last_price = newest.last_price
+        first_price = oldest.first_price
+        change_pct = (
+            round(((last_price - first_price) / first_price) * 100, 2)
+            if self._count > 1 and first_price
+            else 0.0
+        )
+        return RollingStats(
+            high=self._max_q[0][1],
+            low=self._min_q[0][1],
+            volume=max(self._volume, 0.0),
+            trade_count=self._count,
+            last_price=last_price,
+            change_pct=change_pct,
+        )
+
+
+class MarketStatsService:
+    """
+    Process-wide rolling statistics for all cash market certificate types.
+
+    Each worker keeps its own RollingWindowStats; fills committed in any
+    worker are broadcast on Redis pub/sub so all workers converge.
+    """
+
+    def __init__(self):
+        self._windows: Dict[str, RollingWindowStats] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._origin = uuid.uuid4().hex
+        self._listener_task: Optional[asyncio.Task] = None
+
+    def _window(self, certificate_type: str) -> RollingWindowStats:
+        if certificate_type not in self._windows:
+            self._windows[certificate_type] = RollingWindowStats()
+        return self._windows[certificate_type]
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Rebuild all windows from the last 24h of cash_market_trades."""
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            minutes=WINDOW_MINUTES
+        )
+        result = await db.execute(
+            select(
+                CashMarketTrade.certificate_type,
+                CashMarketTrade.price,
+                CashMarketTrade.quantity,
+                CashMarketTrade.executed_at,
+            )
+            .where(CashMarketTrade.executed_at >= since)
+            .order_by(CashMarketTrade.executed_at.asc())
+        )
+        windows: Dict[str, RollingWindowStats] = {}
+        for cert, price, quantity, executed_at in result.all():
+            key = cert.value if isinstance(cert, CertificateType) else str(cert)
+            windows.setdefault(key, RollingWindowStats()).add_fill(
+                float(price), float(quantity), executed_at
+            )
+        self._windows = windows
+        self._loaded = True
+        logger.info(
+            "Market stats rebuilt from trades: %s",
+            {k: w.snapshot().trade_count for k, w in windows.items()},
+        )
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Rebuild once per process if startup did not already do it."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if not self._loaded:
+                await self.rebuild(db)
+
+    def get_stats(self, certificate_type: str) -> RollingStats:
+        """O(1) read of the rolling 24h statistics for a certificate type."""
+        return self._window(certificate_type).snapshot()
+
+    def apply_fill(
+        self,
+        certificate_type: str,
+        price: float,
+        quantity: float,
+        executed_at: datetime,
+    ) -> None:
+        """Apply a fill to this worker's window only."""
+        self._window(certificate_type).add_fill(price, quantity, executed_at)
+
+    async def record_fills(self, fills: List[dict]) -> None:
+        """Apply committed fills locally and publish them to other workers."""
+        for fill in fills:
+            self.apply_fill(
+                fill["certificate_type"],
+                fill["price"],
+                fill["quantity"],
+                datetime.fromisoformat(fill["executed_at"]),
+            )
+        try:
+            r = await RedisManager.get_redis()
+            await r.publish(
+                FILLS_CHANNEL, json.dumps({"origin": self._origin, "fills": fills})
+            )
+        except Exception as e:
+            logger.warning(f"Failed to publish market stats fills (Redis unavailable): {e}")
+
+    async def _listen(self) -> None:
+        """Apply fills published by other workers."""
+        while True:
+            try:
+                r = await RedisManager.get_redis()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(FILLS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") == self._origin:
+                        continue
+                    for fill in payload.get("fills", []):
+                        self.apply_fill(
+                            fill["certificate_type"],
+                            fill["price"],
+                            fill["quantity"],
+                            datetime.fromisoformat(fill["executed_at"]),
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Market stats listener error, resubscribing: {e}")
+                # A worker that missed fills rebuilds from the DB on next read
+                self._loaded = False
+                await asyncio.sleep(5)
+
+    def start_listener(self) -> asyncio.Task:
+        """Start the Redis subscriber task (called from app lifespan)."""
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+        return self._listener_task
+
+
+market_stats = MarketStatsService()
+
+
+def _trade_fills(new: List[CashMarketTrade], dirty, deleted) -> List[dict]:
+    fills = []
+    for trade in new:
+        cert = trade.certificate_type
+        executed_at = trade.executed_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        fills.append(
+            {
+                "certificate_type": cert.value if isinstance(cert, CertificateType) else str(cert),
+                "price": float(trade.price),
+                "quantity": float(trade.quantity),
+                "executed_at": _to_naive_utc(executed_at).isoformat(),
+            }
+        )
+    return fills
+
+
+# Publish new CashMarketTrade rows only after commit, so rolled-back trades
+# never reach the statistics
+on_commit("market_stats_fills", CashMarketTrade, collect=_trade_fills, publish=market_stats.record_fills)
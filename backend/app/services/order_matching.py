@@ -9,7 +9,7 @@ import logging
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
@@ -18,7 +18,6 @@ from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.models import (
-    AssetTransaction,
     AssetType,
     CashMarketTrade,
     CertificateType,
@@ -34,7 +33,13 @@ from ..models.models import (
     TransactionType,
 )
 from ..services.currency_service import currency_service
-from ..services.balance_utils import get_entity_eur_balance
+from ..services import eur_reservations
+from ..services.balance_utils import (
+    InsufficientBalanceError,
+    debit_available_balance,
+    get_entity_eur_balance,
+)
+from ..services.market_stats import market_stats
 from ..services.settlement_service import SettlementService
 
 # Default platform fee rate: 0.5% (fallback if no config exists)
@@ -180,61 +185,6 @@ async def get_entity_balance(
     return Decimal(str(holding.quantity)) if holding else Decimal("0")
 
 
-async def update_entity_balance(
-    db: AsyncSession,
-    entity_id: UUID,
-    asset_type: AssetType,
-    amount: Decimal,
-    transaction_type: TransactionType,
-    created_by: UUID,
-    reference: Optional[str] = None,
-    notes: Optional[str] = None,
-) -> Decimal:
-    """
-    Update entity balance and create audit trail.
-    Returns the new balance.
-    """
-    # Get or create holding record
-    result = await db.execute(
-        select(EntityHolding).where(
-            and_(
-                EntityHolding.entity_id == entity_id,
-                EntityHolding.asset_type == asset_type,
-            )
-        )
-    )
-    holding = result.scalar_one_or_none()
-
-    balance_before = Decimal(str(holding.quantity)) if holding else Decimal("0")
-    balance_after = balance_before + amount
-
-    if holding:
-        holding.quantity = balance_after
-        holding.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-    else:
-        # Create new holding
-        holding = EntityHolding(
-            entity_id=entity_id, asset_type=asset_type, quantity=balance_after
-        )
-        db.add(holding)
-
-    # Create audit trail
-    transaction = AssetTransaction(
-        entity_id=entity_id,
-        asset_type=asset_type,
-        transaction_type=transaction_type,
-        amount=amount,
-        balance_before=balance_before,
-        balance_after=balance_after,
-        reference=reference,
-        notes=notes,
-        created_by=created_by,
-    )
-    db.add(transaction)
-
-    return balance_after
-
-
 async def get_cea_sell_orders(
     db: AsyncSession, limit_price: Optional[Decimal] = None
 ) -> List[Order]:
@@ -540,6 +490,54 @@ class OrderExecutionResult:
     certificate_balance: Decimal
 
 
+async def _failed_execution(
+    db: AsyncSession, entity_id: UUID, message: str
+) -> OrderExecutionResult:
+    return OrderExecutionResult(
+        success=False,
+        order_id=None,
+        message=message,
+        fills=[],
+        total_quantity=Decimal("0"),
+        total_cost_gross=Decimal("0"),
+        platform_fee=Decimal("0"),
+        total_cost_net=Decimal("0"),
+        weighted_avg_price=Decimal("0"),
+        eur_balance=await get_entity_eur_balance(db, entity_id),
+        certificate_balance=await get_entity_balance(db, entity_id, AssetType.CEA),
+    )
+
+
+async def _debit_market_buy(
+    db: AsyncSession,
+    entity_id: UUID,
+    user_id: UUID,
+    amount: Decimal,
+    reference: str,
+    notes: str,
+) -> Decimal:
+    """
+    Debit a market buy's EUR only if the available balance (quantity -
+    reserved) still covers it, so EUR reserved by limit orders since the
+    preview can't be spent twice. Raises InsufficientBalanceError.
+    """
+    debit = dict(
+        entity_id=entity_id,
+        asset_type=AssetType.EUR,
+        amount=amount,
+        transaction_type=TransactionType.TRADE_BUY,
+        created_by=user_id,
+        reference=reference,
+        notes=notes,
+    )
+    try:
+        return await debit_available_balance(db, **debit)
+    except InsufficientBalanceError:
+        # A legacy entity still on Entity.balance_amount has no holding yet
+        await eur_reservations.ensure_eur_holding(db, entity_id, user_id)
+        return await debit_available_balance(db, **debit)
+
+
 async def execute_market_buy_order(
     db: AsyncSession,
     entity_id: UUID,
@@ -553,9 +551,9 @@ async def execute_market_buy_order(
 
     This is an atomic operation that:
     1. Finds matching sell orders using FIFO
-    2. Creates trade records
-    3. Updates seller statistics
-    4. Updates buyer's balance
+    2. Debits the buyer's EUR (fails if no longer available)
+    3. Creates trade records
+    4. Updates seller statistics
 
     Args:
         db: Database session
@@ -579,19 +577,7 @@ async def execute_market_buy_order(
     )
 
     if not preview.can_execute:
-        return OrderExecutionResult(
-            success=False,
-            order_id=None,
-            message=preview.execution_message,
-            fills=[],
-            total_quantity=Decimal("0"),
-            total_cost_gross=Decimal("0"),
-            platform_fee=Decimal("0"),
-            total_cost_net=Decimal("0"),
-            weighted_avg_price=Decimal("0"),
-            eur_balance=await get_entity_eur_balance(db, entity_id),
-            certificate_balance=await get_entity_balance(db, entity_id, AssetType.CEA),
-        )
+        return await _failed_execution(db, entity_id, preview.execution_message)
 
     # Create buy order record (NEW ORDERS STORED IN EUR)
     buy_order = Order(
@@ -607,6 +593,24 @@ async def execute_market_buy_order(
     db.add(buy_order)
     await db.flush()  # Get the order ID
 
+    # Deduct EUR (total cost + fees) before recording any fill
+    try:
+        new_eur_balance = await _debit_market_buy(
+            db,
+            entity_id,
+            user_id,
+            amount=preview.total_cost_net,
+            reference=str(buy_order.id),
+            notes=(
+                f"Market buy {preview.total_quantity:.2f} CEA @ avg "
+                f"{preview.weighted_avg_price:.4f} EUR/CEA"
+            ),
+        )
+    except InsufficientBalanceError as e:
+        # EUR was reserved or spent since the preview
+        await db.rollback()
+        return await _failed_execution(db, entity_id, str(e))
+
     # Execute trades
     for fill in preview.fills:
         # Get the sell order
@@ -649,22 +653,6 @@ async def execute_market_buy_order(
                 seller.cea_sold = Decimal(str(seller.cea_sold or 0)) + fill.quantity
                 seller.total_transactions = (seller.total_transactions or 0) + 1
 
-    # Update buyer balances
-    # Deduct EUR (total cost + fees)
-    new_eur_balance = await update_entity_balance(
-        db=db,
-        entity_id=entity_id,
-        asset_type=AssetType.EUR,
-        amount=-preview.total_cost_net,
-        transaction_type=TransactionType.TRADE_BUY,
-        created_by=user_id,
-        reference=str(buy_order.id),
-        notes=(
-            f"Market buy {preview.total_quantity:.2f} CEA @ avg "
-            f"{preview.weighted_avg_price:.4f} EUR/CEA"
-        ),
-    )
-
     # Role transition: CEA → CEA_SETTLE when entity EUR balance reaches 0
     from .role_transitions import transition_cea_to_cea_settle_if_eur_zero
     await transition_cea_to_cea_settle_if_eur_zero(db, entity_id, new_eur_balance)
@@ -803,31 +791,17 @@ async def get_real_orderbook(db: AsyncSession, certificate_type: str) -> dict:
     spread = round(best_ask - best_bid, 4) if best_ask and best_bid else None
     last_price = best_ask or best_bid or (63.0 if certificate_type == "CEA" else 81.0)
 
-    # Get 24h trade stats
-    time_24h_ago = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=24)
-    trades_result = await db.execute(
-        select(CashMarketTrade)
-        .where(
-            and_(
-                CashMarketTrade.certificate_type == cert_enum,
-                CashMarketTrade.executed_at >= time_24h_ago,
-            )
-        )
-        .order_by(CashMarketTrade.executed_at.desc())
-    )
-    trades_24h = trades_result.scalars().all()
-
-    # Calculate 24h stats from actual trades
-    if trades_24h:
-        trade_prices = [float(t.price) for t in trades_24h]
-        trade_volumes = [float(t.quantity) for t in trades_24h]
-        high_24h = max(trade_prices)
-        low_24h = min(trade_prices)
-        volume_24h = sum(trade_volumes)
-        # Change: compare most recent to oldest in 24h period
-        change_24h = round(((trade_prices[0] - trade_prices[-1]) / trade_prices[-1]) * 100, 2) if len(trade_prices) > 1 else 0.0
+    # 24h trade stats from the in-memory rolling window (no per-request trade scan)
+    await market_stats.ensure_loaded(db)
+    stats_24h = market_stats.get_stats(certificate_type)
+
+    if stats_24h.trade_count:
+        high_24h = stats_24h.high
+        low_24h = stats_24h.low
+        volume_24h = int(round(stats_24h.volume))
+        change_24h = stats_24h.change_pct
         # Use most recent trade price as last_price if available
-        last_price = trade_prices[0]
+        last_price = stats_24h.last_price
     else:
         # No trades in 24h - use current best prices as fallback
         high_24h = last_price
@@ -835,8 +809,6 @@ async def get_real_orderbook(db: AsyncSession, certificate_type: str) -> dict:
         volume_24h = 0
         change_24h = 0.0
 
-    volume_24h = int(round(volume_24h)) if trades_24h else 0
-
     return {
         "certificate_type": certificate_type,
         "bids": bids,
@@ -0,0 +1,142 @@
+"""
+Keyset Pagination and Estimated Counts
+
+For the append-only audit tables (ticket_logs, activity_logs,
+asset_transactions), which are listed newest first:
+
+- Pages are cut on (timestamp, id) instead of OFFSET: the cursor of the last
+  row of a page is passed back and the next page is read with
+  `(timestamp, id) < cursor` from the composite index, so page 1000 costs
+  the same as page 1. `page` (OFFSET) is still accepted for the first pages
+  and for clients that jump to a page number.
+- Totals are optional. In "auto" mode the planner's row estimate for the
+  filtered query is read with EXPLAIN (no rows scanned); only when it is
+  small (<= EXACT_COUNT_LIMIT) is an exact COUNT(*) run. Broad filters on a
+  large table therefore return the estimate, flagged total_is_estimate.
+
+    page = await paginate(db, query, TicketLog.timestamp, TicketLog.id,
+                          per_page=50, cursor=cursor, count=count)
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable, Select
+
+COUNT_MODE_PATTERN = "^(auto|exact|estimate|none)$"
+EXACT_COUNT_LIMIT = 10_000  # Below this planner estimate an exact COUNT(*) is cheap
+
+
+@dataclass
+class Page:
+    """One page of rows plus what the client needs to fetch the next one"""
+
+    items: List[Any]
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+    def total_pages(self, per_page: int) -> Optional[int]:
+        if self.total is None:
+            return None
+        return (self.total + per_page - 1) // per_page if self.total > 0 else 0
+
+
+def encode_cursor(sort_value: datetime, row_id: UUID) -> str:
+    raw = f"{sort_value.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sort_value, row_id = raw.split("|")
+        return datetime.fromisoformat(sort_value), UUID(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, keeping the statement's bind parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """Planner row estimate for a query (no rows are read)."""
+    result = await db.execute(_Explain(query.order_by(None)))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def exact_count(db: AsyncSession, query: Select) -> int:
+    result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    return result.scalar() or 0
+
+
+async def count_rows(db: AsyncSession, query: Select, mode: str = "auto") -> Tuple[Optional[int], bool]:
+    """(total, is_estimate) for a query according to the count mode (see module docstring)."""
+    if mode == "none":
+        return None, False
+    if mode == "exact":
+        return await exact_count(db, query), False
+    estimate = await estimate_count(db, query)
+    if mode == "estimate" or estimate > EXACT_COUNT_LIMIT:
+        return estimate, True
+    return await exact_count(db, query), False
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    sort_column,
+    id_column,
+    *,
+    per_page: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    count: str = "auto",
+) -> Page:
+    """
+    Newest-first page of `query` (a filtered select of one model).
+
+    With a cursor the page starts after the cursor row and `page` is ignored;
+    without one it is read with OFFSET (page - 1) * per_page.
+    """
+    total, is_estimate = await count_rows(db, query, count)
+
+    paged = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        paged = paged.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    elif page > 1:
+        paged = paged.offset((page - 1) * per_page)
+
+    result = await db.execute(paged.limit(per_page + 1))
+    items = list(result.scalars().all())
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return Page(items, next_cursor, total, is_estimate)
@@ -0,0 +1,514 @@
+"""
+Leader-Elected Background Scheduler
+
+Every uvicorn worker runs the scheduler, but only the worker holding the
+Redis leader lease runs the periodic jobs (settlement processing, monitoring,
+deposit holds, scraping, auto-trade). Other workers stand by and take over
+within one lease TTL if the leader dies.
+
+Dispatch:
+- The leader keeps a min-heap of next-due times, one entry per job, and
+  sleeps exactly until the earliest one instead of polling on a fixed sleep
+- Due-time jobs (auto-trade rules, scrape sources, settlements, deposit holds)
+  report the earliest due item of their own via `next_due`; fixed-interval
+  jobs are due `interval_seconds` after their last start
+- Commits touching a job's `wake_on` models publish a wake event on Redis, so
+  an edit on any worker makes the leader recompute that job's due time early
+- A due-time job whose run leaves its due item pending (nothing it could
+  process) is not re-run every `interval_seconds`: it waits for a wake event
+  or the next resync instead
+
+Lease:
+- SET NX PX on `scheduler:leader`, renewed every TTL/3 by the holder
+- Each acquisition increments `scheduler:fencing_token`; the token is stored
+  in the lease value and on every job-run record, so a stale leader can never
+  overwrite state written by its successor
+- A leader that cannot renew before its lease would expire stops its jobs
+
+Job run metadata (last start/finish, status, duration, worker, token) is kept
+in Redis so the admin status endpoint can show it from any worker.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..core.commit_hooks import on_commit
+from ..core.config import settings
+from ..core.security import RedisManager
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[Any]]
+# Returns the naive-UTC time the job next has work, or None when nothing is pending
+DueFunc = Callable[[], Awaitable[Optional[datetime]]]
+
+LEADER_KEY = "scheduler:leader"
+FENCING_KEY = "scheduler:fencing_token"
+JOB_KEY_PREFIX = "scheduler:job:"
+WAKE_CHANNEL = "scheduler:wake"
+
+# Upper bound on how long a due-time job sleeps without re-reading its due
+# time, in case a wake event was lost (Redis blip, write outside the ORM)
+RESYNC_SECONDS = 300
+
+# Name of the job whose run is executing in the current task, so its own
+# writes (e.g. a rule's next_execution_at) do not wake the scheduler
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "scheduler_current_job", default=None
+)
+
+# Acquire the lease and issue a new fencing token atomically.
+# Returns the token, or nil if another worker holds the lease.
+_ACQUIRE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return nil
+end
+local token = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[1] .. '|' .. token, 'PX', ARGV[2])
+return token
+"""
+
+# Extend the lease only if we still hold it (value includes our token).
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Write job-run fields unless a newer leader (higher token) already wrote them.
+_RECORD_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'fencing_token') or '0')
+if tonumber(ARGV[1]) < current then
+    return 0
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, comparable with TIMESTAMP WITHOUT TIME ZONE columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _utcnow_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class ScheduledJob:
+    """
+    A job run only on the leader worker.
+
+    Without `next_due` the job runs every `interval_seconds`. With it, the job
+    runs when `next_due` says work is due, and `interval_seconds` is only the
+    minimum spacing between two runs.
+    """
+
+    name: str
+    func: JobFunc
+    interval_seconds: float
+    initial_delay_seconds: float = 0
+    next_due: Optional[DueFunc] = None
+    wake_on: Tuple[type, ...] = field(default_factory=tuple)
+
+
+class LeaderLease:
+    """Redis lease with renewal and fencing token"""
+
+    def __init__(self, worker_id: str, ttl_seconds: int):
+        self.worker_id = worker_id
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token: Optional[int] = None
+        self._valid_until: float = 0.0  # Monotonic deadline of our current lease
+
+    @property
+    def value(self) -> Optional[str]:
+        return f"{self.worker_id}|{self.token}" if self.token is not None else None
+
+    @property
+    def held(self) -> bool:
+        """True while we hold a lease that cannot have expired in Redis yet."""
+        return self.token is not None and time.monotonic() < self._valid_until
+
+    async def try_acquire(self) -> bool:
+        started = time.monotonic()
+        r = await RedisManager.get_redis()
+        token = await r.eval(_ACQUIRE_SCRIPT, 2, LEADER_KEY, FENCING_KEY, self.worker_id, self.ttl_ms)
+        if token is None:
+            return False
+        self.token = int(token)
+        self._valid_until = started + self.ttl_ms / 1000
+        return True
+
+    async def renew(self) -> bool:
+        if self.token is None:
+            return False
+        started = time.monotonic()
+        r = await RedisManager.get_redis()
+        renewed = await r.eval(_RENEW_SCRIPT, 1, LEADER_KEY, self.value, self.ttl_ms)
+        if not renewed:
+            self.token = None
+            return False
+        self._valid_until = started + self.ttl_ms / 1000
+        return True
+
+    async def release(self) -> None:
+        if self.token is None:
+            return
+        try:
+            r = await RedisManager.get_redis()
+            await r.eval(_RELEASE_SCRIPT, 1, LEADER_KEY, self.value)
+        finally:
+            self.token = None
+
+
+class Scheduler:
+    """
+    Runs registered periodic jobs on exactly one worker.
+
+    Usage (app lifespan):
+        scheduler.add_job("auto_trade", run_auto_trade, interval_seconds=5)
+        scheduler.start()
+        ...
+        await scheduler.stop()
+    """
+
+    def __init__(self, ttl_seconds: int = settings.SCHEDULER_LEASE_TTL_SECONDS):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease = LeaderLease(self.worker_id, ttl_seconds)
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._main_task: Optional[asyncio.Task] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        # Dispatcher state, only meaningful on the leader
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._seq = itertools.count()
+        self._due: Dict[str, datetime] = {}  # Live heap entry per job
+        self._not_before: Dict[str, datetime] = {}  # Startup delay / minimum spacing
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stale: Set[str] = set()  # Due-time jobs whose next_due must be re-read
+        self._last_run: Dict[str, datetime] = {}  # Start of a due-time job's last run, until woken
+        self._wakeup = asyncio.Event()
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lease.held
+
+    @property
+    def fencing_token(self) -> Optional[int]:
+        """Token of the current lease; pass along to guard external side effects."""
+        return self.lease.token if self.lease.held else None
+
+    def add_job(
+        self,
+        name: str,
+        func: JobFunc,
+        interval_seconds: float,
+        initial_delay_seconds: float = 0,
+        next_due: Optional[DueFunc] = None,
+        wake_on: Tuple[type, ...] = (),
+    ) -> None:
+        self.jobs[name] = ScheduledJob(
+            name, func, interval_seconds, initial_delay_seconds, next_due, tuple(wake_on)
+        )
+        if next_due and wake_on:
+            # Wake the leader only after commit, so it never re-reads due times
+            # before the change is visible. A job's own writes are picked up
+            # when its run finishes.
+            on_commit(
+                f"scheduler_wake:{name}",
+                *wake_on,
+                collect=lambda new, dirty, deleted: [] if _current_job.get() == name else [name],
+                publish=self.notify,
+            )
+
+    def start(self) -> asyncio.Task:
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen())
+        if self._main_task is None or self._main_task.done():
+            self._main_task = asyncio.create_task(self._run())
+        return self._main_task
+
+    async def stop(self) -> None:
+        for task in (self._main_task, self._listener_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._main_task = None
+        self._listener_task = None
+        await self._stop_jobs()
+        try:
+            await self.lease.release()
+        except Exception as e:
+            logger.warning(f"Scheduler lease release failed: {e}")
+
+    async def _run(self) -> None:
+        """Election loop: acquire or renew the lease every TTL/3."""
+        renew_every = self.lease.ttl_ms / 1000 / 3
+        while True:
+            try:
+                if self.lease.token is None:
+                    if await self.lease.try_acquire():
+                        logger.info(
+                            f"Scheduler leadership acquired by {self.worker_id} "
+                            f"(fencing token {self.lease.token})"
+                        )
+                        self._start_jobs()
+                elif not await self.lease.renew():
+                    logger.warning(f"Scheduler leadership lost by {self.worker_id}")
+                    await self._stop_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler lease error: {e}")
+                if self.lease.token is not None and not self.lease.held:
+                    # Could not renew in time; another worker may already lead
+                    logger.warning("Scheduler lease expired without renewal, stopping jobs")
+                    self.lease.token = None
+                    await self._stop_jobs()
+            await asyncio.sleep(renew_every)
+
+    def _start_jobs(self) -> None:
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._dispatch())
+
+    async def _stop_jobs(self) -> None:
+        tasks = list(self._running.values())
+        if self._dispatch_task:
+            tasks.append(self._dispatch_task)
+        self._dispatch_task = None
+        self._running.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -- Dispatch ---------------------------------------------------------
+
+    def _schedule(self, name: str, due: datetime) -> None:
+        self._due[name] = due
+        heapq.heappush(self._heap, (due, next(self._seq), name))
+
+    def _wake(self, names) -> None:
+        """Mark due-time jobs for a due-time re-read and interrupt the sleep."""
+        names = [n for n in names if n in self.jobs and self.jobs[n].next_due]
+        self._stale.update(names)
+        for name in names:
+            self._last_run.pop(name, None)  # Something changed: trust next_due again
+        self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        """Leader loop: sleep until the earliest due job (or a wake event), run it."""
+        self._heap.clear()
+        self._due.clear()
+        self._stale.clear()
+        self._last_run.clear()
+        now = _utcnow()
+        for job in self.jobs.values():
+            self._not_before[job.name] = now + timedelta(seconds=job.initial_delay_seconds)
+            if job.next_due:
+                self._stale.add(job.name)
+            else:
+                self._schedule(job.name, self._not_before[job.name])
+
+        while True:
+            self._wakeup.clear()
+            await self._refresh_stale()
+
+            now = _utcnow()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, name = heapq.heappop(self._heap)
+                if self._due.get(name) != due or name in self._running:
+                    continue  # Superseded entry, or still running from last time
+                del self._due[name]
+                self._running[name] = asyncio.create_task(self._run_scheduled(self.jobs[name]))
+
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh_stale(self) -> None:
+        """Re-read next_due for stale due-time jobs and reschedule them."""
+        for name in list(self._stale):
+            if name in self._running:
+                continue  # Rescheduled when the run finishes
+            self._stale.discard(name)
+            job = self.jobs[name]
+            now = _utcnow()
+            try:
+                due = await job.next_due()
+            except Exception as e:
+                logger.warning(f"Scheduler could not compute next due time for {name}: {e}")
+                due = now + timedelta(seconds=job.interval_seconds)
+            horizon = now + timedelta(seconds=RESYNC_SECONDS)
+            last_run = self._last_run.get(name)
+            if due is not None and last_run is not None and due <= last_run:
+                # The last run saw this item due and left it: nothing to process
+                # until a commit wakes the job (or the resync)
+                due = horizon
+            due = max(min(due or horizon, horizon), self._not_before.get(name, now))
+            self._schedule(name, due)
+            if self.fencing_token is not None:
+                await self._record(name, self.fencing_token, next_due_at=due.isoformat())
+
+    async def _run_scheduled(self, job: ScheduledJob) -> None:
+        started = _utcnow()
+        self._not_before[job.name] = started + timedelta(seconds=job.interval_seconds)
+        self._last_run.pop(job.name, None)
+        token = _current_job.set(job.name)
+        succeeded = False
+        try:
+            succeeded = await self.run_job_once(job)
+        finally:
+            _current_job.reset(token)
+            self._running.pop(job.name, None)
+            if job.next_due:
+                # Not woken during the run (that re-reads next_due as is); a
+                # failed run is retried after interval_seconds
+                if succeeded and job.name not in self._stale:
+                    self._last_run[job.name] = started
+                self._stale.add(job.name)
+            else:
+                self._schedule(job.name, self._not_before[job.name])
+            self._wakeup.set()
+
+    # -- Wake events ------------------------------------------------------
+
+    async def notify(self, names) -> None:
+        """Ask the leader (on whichever worker) to recompute these jobs' due times."""
+        names = sorted(set(names))
+        if not names:
+            return
+        try:
+            r = await RedisManager.get_redis()
+            await r.publish(WAKE_CHANNEL, json.dumps(names))
+        except Exception as e:
+            # The leader still re-reads due times within RESYNC_SECONDS
+            logger.warning(f"Scheduler wake publish failed for {names}: {e}")
+            if self.is_leader:
+                self._wake(names)
+
+    async def _listen(self) -> None:
+        """Apply wake events published by any worker (only acted on by the leader)."""
+        while True:
+            try:
+                r = await RedisManager.get_redis()
+                pubsub = r.pubsub()
+                await pubsub.subscribe(WAKE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message" or not self.is_leader:
+                        continue
+                    self._wake(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Scheduler wake listener error, resubscribing: {e}")
+                # Events may have been missed; re-read every due time
+                if self.is_leader:
+                    self._wake(self.jobs)
+                await asyncio.sleep(5)
+
+    async def run_job_once(self, job: ScheduledJob) -> bool:
+        """
+        Run a job once and record its outcome under the current fencing token.
+        Returns whether it ran without error.
+        """
+        token = self.fencing_token
+        if token is None:
+            return False
+        started = time.monotonic()
+        await self._record(job.name, token, last_started_at=_utcnow_iso())
+        status, error = "success", ""
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, error = "error", str(e)[:500]
+            logger.error(f"Scheduled job {job.name} failed: {e}", exc_info=True)
+        await self._record(
+            job.name,
+            token,
+            last_finished_at=_utcnow_iso(),
+            last_status=status,
+            last_error=error,
+            last_duration_ms=int((time.monotonic() - started) * 1000),
+        )
+        return status == "success"
+
+    async def _record(self, job_name: str, token: int, **fields: Any) -> None:
+        fields.update(worker_id=self.worker_id, fencing_token=token)
+        args: List[Any] = [token]
+        for key, value in fields.items():
+            args.extend([key, value])
+        try:
+            r = await RedisManager.get_redis()
+            await r.eval(_RECORD_SCRIPT, 1, f"{JOB_KEY_PREFIX}{job_name}", *args)
+        except Exception as e:
+            logger.debug(f"Scheduler run record failed for {job_name}: {e}")
+
+    async def status(self) -> dict:
+        """Current lease holder and last-run metadata for every registered job."""
+        r = await RedisManager.get_redis()
+        lease_value = await r.get(LEADER_KEY)
+        lease_ttl_ms = await r.pttl(LEADER_KEY) if lease_value else None
+        holder, token = (lease_value.rsplit("|", 1) + [None])[:2] if lease_value else (None, None)
+
+        jobs = []
+        for job in self.jobs.values():
+            record = await r.hgetall(f"{JOB_KEY_PREFIX}{job.name}")
+            jobs.append(
+                {
+                    "name": job.name,
+                    "mode": "due_time" if job.next_due else "interval",
+                    "interval_seconds": job.interval_seconds,
+                    "next_due_at": record.get("next_due_at") if job.next_due else None,
+                    "last_started_at": record.get("last_started_at"),
+                    "last_finished_at": record.get("last_finished_at"),
+                    "last_status": record.get("last_status"),
+                    "last_error": record.get("last_error") or None,
+                    "last_duration_ms": int(record["last_duration_ms"]) if record.get("last_duration_ms") else None,
+                    "last_worker_id": record.get("worker_id"),
+                    "fencing_token": int(record["fencing_token"]) if record.get("fencing_token") else None,
+                }
+            )
+
+        return {
+            "leader": {
+                "worker_id": holder,
+                "fencing_token": int(token) if token else None,
+                "lease_ttl_ms": lease_ttl_ms,
+            },
+            "this_worker": {
+                "worker_id": self.worker_id,
+                "is_leader": self.is_leader,
+            },
+            "lease_ttl_seconds": self.lease.ttl_ms / 1000,
+            "jobs": jobs,
+        }
+
+
+scheduler = Scheduler()
@@ -0,0 +1,239 @@
+"""
+Bulk Settlement Finalization
+
+Settles many settlement batches at once (admin bulk settle, automatic
+AT_CUSTODY → SETTLED advances):
+- one UPDATE per chunk sets SETTLED and the settlement date,
+- status history rows go in with one INSERT,
+- CEA/EUA credits are summed per (entity, asset) and applied with one
+  update_entity_balances upsert,
+- role transitions run once per affected entity and settlement type.
+
+Each chunk commits on its own, so a failing chunk does not undo the ones
+before it; every requested batch gets a result.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.models import (
+    SettlementBatch,
+    SettlementStatus,
+    SettlementStatusHistory,
+    SettlementType,
+)
+from .balance_utils import update_entity_balances
+from .settlement_monitoring import invalidate_metrics_cache
+from .settlement_service import SettlementService
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = (SettlementStatus.SETTLED, SettlementStatus.FAILED)
+DEFAULT_CHUNK_SIZE = 200
+
+
+@dataclass
+class FinalizeResult:
+    """Outcome for one requested batch"""
+
+    batch_id: UUID
+    result: str  # "settled" | "skipped" | "locked" | "not_found" | "error"
+    batch_reference: Optional[str] = None
+    entity_id: Optional[UUID] = None
+    old_status: Optional[SettlementStatus] = None
+    new_balance: Optional[Decimal] = None  # Holding after the credit
+    message: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "batch_id": str(self.batch_id),
+            "batch_reference": self.batch_reference,
+            "result": self.result,
+            "old_status": self.old_status.value if self.old_status else None,
+            "new_balance": float(self.new_balance) if self.new_balance is not None else None,
+            "message": self.message,
+        }
+
+
+async def run_role_transitions(
+    db: AsyncSession, settled: Set[Tuple[UUID, SettlementType]]
+) -> int:
+    """Role transitions once per (entity, settlement type); returns users advanced."""
+    from .role_transitions import (
+        transition_cea_settle_to_swap_if_all_cea_settled,
+        transition_eua_settle_to_eua_if_all_swap_settled,
+        transition_swap_to_eua_settle_if_cea_zero,
+    )
+
+    changed = 0
+    for entity_id, settlement_type in settled:
+        if settlement_type == SettlementType.CEA_PURCHASE:
+            changed += await transition_cea_settle_to_swap_if_all_cea_settled(db, entity_id)
+        elif settlement_type == SettlementType.SWAP_CEA_TO_EUA:
+            changed += await transition_swap_to_eua_settle_if_cea_zero(db, entity_id)
+            changed += await transition_eua_settle_to_eua_if_all_swap_settled(db, entity_id)
+    return changed
+
+
+async def credit_settled_batches(
+    db: AsyncSession, batches: Sequence[Any], finalized_by: Optional[UUID]
+) -> Tuple[List[Decimal], int]:
+    """
+    Credit batches already marked SETTLED (anything with the SettlementBatch
+    fields settlement_credit reads) and run their role transitions. Returns
+    the holding balance after each batch's credit, in order, and the number
+    of users whose role advanced.
+    """
+    if not batches:
+        return [], 0
+    balances = await update_entity_balances(
+        db, [SettlementService.settlement_credit(batch, finalized_by) for batch in batches]
+    )
+    roles_changed = await run_role_transitions(
+        db, {(batch.entity_id, batch.settlement_type) for batch in batches}
+    )
+    return balances, roles_changed
+
+
+async def _settle_chunk(
+    db: AsyncSession,
+    batch_ids: List[UUID],
+    finalized_by: Optional[UUID],
+    notes: str,
+    now: datetime,
+) -> Tuple[List[FinalizeResult], int]:
+    result = await db.execute(
+        select(
+            SettlementBatch.id,
+            SettlementBatch.entity_id,
+            SettlementBatch.batch_reference,
+            SettlementBatch.settlement_type,
+            SettlementBatch.status,
+            SettlementBatch.asset_type,
+            SettlementBatch.quantity,
+        )
+        .where(SettlementBatch.id.in_(batch_ids))
+        .with_for_update(skip_locked=True)
+    )
+    rows = {row.id: row for row in result.all()}
+
+    # Rows missing from a SKIP LOCKED read either don't exist or are locked
+    unread = [batch_id for batch_id in batch_ids if batch_id not in rows]
+    existing: Set[UUID] = set()
+    if unread:
+        result = await db.execute(select(SettlementBatch.id).where(SettlementBatch.id.in_(unread)))
+        existing = {row[0] for row in result.all()}
+
+    results: Dict[UUID, FinalizeResult] = {}
+    settleable = []
+    for batch_id in batch_ids:
+        row = rows.get(batch_id)
+        if row is None:
+            results[batch_id] = (
+                FinalizeResult(batch_id, "locked", message="Batch is being updated, retry later")
+                if batch_id in existing
+                else FinalizeResult(batch_id, "not_found", message="Settlement batch not found")
+            )
+        elif row.status in FINAL_STATUSES:
+            results[batch_id] = FinalizeResult(
+                batch_id,
+                "skipped",
+                batch_reference=row.batch_reference,
+                entity_id=row.entity_id,
+                old_status=row.status,
+                message=f"Batch already {row.status.value}",
+            )
+        else:
+            settleable.append(row)
+
+    roles_changed = 0
+    if settleable:
+        await db.execute(
+            update(SettlementBatch)
+            .where(
+                and_(
+                    SettlementBatch.id.in_([row.id for row in settleable]),
+                    SettlementBatch.status.notin_(FINAL_STATUSES),
+                )
+            )
+            .values(
+                status=SettlementStatus.SETTLED,
+                actual_settlement_date=now,
+                updated_at=now,
+                next_transition_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            insert(SettlementStatusHistory),
+            [
+                {
+                    "settlement_batch_id": row.id,
+                    "status": SettlementStatus.SETTLED,
+                    "notes": notes.format(old_status=row.status.value),
+                    "updated_by": finalized_by,
+                    "created_at": now,
+                }
+                for row in settleable
+            ],
+        )
+        balances, roles_changed = await credit_settled_batches(db, settleable, finalized_by)
+        for row, balance in zip(settleable, balances):
+            results[row.id] = FinalizeResult(
+                row.id,
+                "settled",
+                batch_reference=row.batch_reference,
+                entity_id=row.entity_id,
+                old_status=row.status,
+                new_balance=balance,
+            )
+
+    return [results[batch_id] for batch_id in batch_ids], roles_changed
+
+
+async def settle_batches(
+    db: AsyncSession,
+    batch_ids: Sequence[UUID],
+    finalized_by: Optional[UUID],
+    notes: str = "Bulk settle by admin (was {old_status})",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[List[FinalizeResult], int]:
+    """
+    Settle batches in chunks, committing each chunk. notes may reference
+    {old_status}. Returns per-batch results in request order and the number
+    of users whose role advanced.
+    """
+    ids = list(dict.fromkeys(batch_ids))  # Drop duplicates, keep order
+    results: List[FinalizeResult] = []
+    roles_changed = 0
+
+    for start in range(0, len(ids), max(chunk_size, 1)):
+        chunk = ids[start : start + max(chunk_size, 1)]
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        try:
+            chunk_results, chunk_roles = await _settle_chunk(db, chunk, finalized_by, notes, now)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Bulk settle chunk of {len(chunk)} batches failed: {e}", exc_info=True)
+            chunk_results = [
+                FinalizeResult(batch_id, "error", message="Chunk rolled back, batch not settled")
+                for batch_id in chunk
+            ]
+            chunk_roles = 0
+        results.extend(chunk_results)
+        roles_changed += chunk_roles
+
+    settled = sum(1 for r in results if r.result == "settled")
+    if settled:
+        # Batches were settled with Core UPDATEs, which the on-commit hook doesn't see
+        await invalidate_metrics_cache()
+    logger.info(f"Bulk settle: {settled}/{len(ids)} batches settled, {roles_changed} role(s) advanced")
+    return results, roles_changed
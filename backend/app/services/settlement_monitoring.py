@@ -12,25 +12,39 @@ This service runs alongside the settlement processor to ensure
 settlement health and identify issues requiring manual intervention.
 """
 
+import json
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.commit_hooks import on_commit
+from ..core.security import RedisManager
 from ..models.models import (
     Entity,
     SettlementBatch,
     SettlementStatus,
     User,
 )
+from ..services.business_calendar import business_days_between, jurisdiction_for_certificate
 from ..services.email_service import EmailService
 
 logger = logging.getLogger(__name__)
 
+FINAL_STATUSES = (SettlementStatus.SETTLED, SettlementStatus.FAILED)
+IN_PROGRESS_STATUSES = (
+    SettlementStatus.TRANSFER_INITIATED,
+    SettlementStatus.IN_TRANSIT,
+    SettlementStatus.AT_CUSTODY,
+)
+
+METRICS_CACHE_KEY = "settlement:metrics"
+METRICS_CACHE_TTL = 30  # seconds; status changes invalidate earlier
+
 
 @dataclass
 class SettlementMetrics:
@@ -61,133 +75,136 @@ class SettlementAlert:
     total_value_eur: Optional[Decimal] = None
 
 
+async def _read_cached_metrics() -> Optional[SettlementMetrics]:
+    try:
+        r = await RedisManager.get_redis()
+        cached = await r.get(METRICS_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Settlement metrics cache unavailable: {e}")
+        return None
+    if not cached:
+        return None
+    data = json.loads(cached)
+    data["total_value_pending_eur"] = Decimal(data["total_value_pending_eur"])
+    data["total_value_settled_today_eur"] = Decimal(data["total_value_settled_today_eur"])
+    return SettlementMetrics(**data)
+
+
+async def _cache_metrics(metrics: SettlementMetrics) -> None:
+    try:
+        r = await RedisManager.get_redis()
+        await r.set(METRICS_CACHE_KEY, json.dumps(asdict(metrics), default=str), ex=METRICS_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to cache settlement metrics: {e}")
+
+
+async def invalidate_metrics_cache() -> None:
+    """Drop cached metrics; call after settlement writes that bypass the ORM."""
+    try:
+        r = await RedisManager.get_redis()
+        await r.delete(METRICS_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate settlement metrics cache: {e}")
+
+
 class SettlementMonitoring:
     """Settlement monitoring and alerting service"""
 
     # Alert thresholds
-    OVERDUE_WARNING_DAYS = 1  # Warn if 1 day past expected
-    OVERDUE_CRITICAL_DAYS = 3  # Critical if 3 days past expected
+    OVERDUE_WARNING_DAYS = 1  # Warn if 1 business day past expected
+    OVERDUE_CRITICAL_DAYS = 3  # Critical if 3 business days past expected
     STUCK_STATUS_HOURS = 48  # Alert if stuck in same status for 48h
+    SETTLE_TIME_WINDOW_DAYS = 30  # Average settlement time over settlements of the last 30 days
+
+    @staticmethod
+    def business_days_overdue(settlement: SettlementBatch, now: datetime) -> int:
+        """Business days past the expected date, on the certificate's registry calendar."""
+        return business_days_between(
+            settlement.expected_settlement_date,
+            now,
+            jurisdiction_for_certificate(settlement.asset_type),
+        )
 
     @staticmethod
-    async def get_system_metrics(db: AsyncSession) -> SettlementMetrics:
+    async def get_system_metrics(db: AsyncSession, use_cache: bool = True) -> SettlementMetrics:
         """
         Get comprehensive settlement system metrics.
 
         Returns current state of all settlements including counts,
-        values, and performance indicators.
+        values, and performance indicators. Served from a short-lived Redis
+        cache that every settlement status change invalidates.
         """
-        # Count by status
-        pending_count = await db.scalar(
-            select(func.count(SettlementBatch.id)).where(
-                SettlementBatch.status == SettlementStatus.PENDING
-            )
-        )
+        if use_cache:
+            cached = await _read_cached_metrics()
+            if cached is not None:
+                return cached
 
-        in_progress_count = await db.scalar(
-            select(func.count(SettlementBatch.id)).where(
-                SettlementBatch.status.in_(
-                    [
-                        SettlementStatus.TRANSFER_INITIATED,
-                        SettlementStatus.IN_TRANSIT,
-                        SettlementStatus.AT_CUSTODY,
-                    ]
-                )
-            )
-        )
+        metrics = await SettlementMonitoring._compute_metrics(db)
+        if use_cache:
+            await _cache_metrics(metrics)
+        return metrics
 
-        # Settled today
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0, tzinfo=None
-        )
-        settled_today_count = await db.scalar(
-            select(func.count(SettlementBatch.id)).where(
-                and_(
-                    SettlementBatch.status == SettlementStatus.SETTLED,
-                    SettlementBatch.updated_at >= today_start,
-                )
-            )
-        )
-
-        # Failed settlements
-        failed_count = await db.scalar(
-            select(func.count(SettlementBatch.id)).where(
-                SettlementBatch.status == SettlementStatus.FAILED
-            )
-        )
-
-        # Overdue settlements (past expected date but not SETTLED)
+    @staticmethod
+    async def _compute_metrics(db: AsyncSession) -> SettlementMetrics:
+        """
+        All metrics in one aggregate query. Only open and failed batches plus
+        recently settled ones are read, so the cost does not grow with the
+        settlement history.
+        """
         now = datetime.now(timezone.utc).replace(tzinfo=None)
-        overdue_count = await db.scalar(
-            select(func.count(SettlementBatch.id)).where(
-                and_(
-                    SettlementBatch.expected_settlement_date < now,
-                    SettlementBatch.status.notin_(
-                        [SettlementStatus.SETTLED, SettlementStatus.FAILED]
-                    ),
-                )
-            )
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = now - timedelta(days=SettlementMonitoring.SETTLE_TIME_WINDOW_DAYS)
+
+        status_col = SettlementBatch.status
+        is_open = status_col.notin_(FINAL_STATUSES)
+        settled_today = and_(
+            status_col == SettlementStatus.SETTLED,
+            SettlementBatch.actual_settlement_date >= today_start,
         )
-
-        # Total value pending
-        pending_value = await db.scalar(
-            select(func.sum(SettlementBatch.total_value_eur)).where(
-                SettlementBatch.status.notin_(
-                    [SettlementStatus.SETTLED, SettlementStatus.FAILED]
-                )
+        settle_hours = (
+            func.extract(
+                "epoch", SettlementBatch.actual_settlement_date - SettlementBatch.created_at
             )
-        ) or Decimal("0")
-
-        # Total value settled today
-        settled_today_value = await db.scalar(
-            select(func.sum(SettlementBatch.total_value_eur)).where(
-                and_(
-                    SettlementBatch.status == SettlementStatus.SETTLED,
-                    SettlementBatch.updated_at >= today_start,
-                )
-            )
-        ) or Decimal("0")
+            / 3600
+        )
 
-        # Average settlement time (PENDING → SETTLED)
-        avg_time = None
         result = await db.execute(
-            select(SettlementBatch)
-            .where(
-                and_(
-                    SettlementBatch.status == SettlementStatus.SETTLED,
-                    SettlementBatch.actual_settlement_date.isnot(None),
-                )
-            )
-            .limit(100)  # Last 100 settlements
-        )
-        settled = result.scalars().all()
-        if settled:
-            total_hours = 0
-            count = 0
-            for s in settled:
-                if s.actual_settlement_date:
-                    duration = (
-                        s.actual_settlement_date - s.created_at
-                    ).total_seconds() / 3600
-                    total_hours += duration
-                    count += 1
-            avg_time = total_hours / count if count > 0 else None
-
-        # Oldest pending settlement
-        oldest_pending_result = await db.execute(
-            select(SettlementBatch)
-            .where(
-                SettlementBatch.status.notin_(
-                    [SettlementStatus.SETTLED, SettlementStatus.FAILED]
+            select(
+                func.count().filter(status_col == SettlementStatus.PENDING),
+                func.count().filter(status_col.in_(IN_PROGRESS_STATUSES)),
+                func.count().filter(settled_today),
+                func.count().filter(status_col == SettlementStatus.FAILED),
+                func.count().filter(
+                    and_(is_open, SettlementBatch.expected_settlement_date < now)
+                ),
+                func.sum(SettlementBatch.total_value_eur).filter(is_open),
+                func.sum(SettlementBatch.total_value_eur).filter(settled_today),
+                # Average settlement time (PENDING → SETTLED) over the recent window
+                func.avg(settle_hours).filter(
+                    and_(
+                        status_col == SettlementStatus.SETTLED,
+                        SettlementBatch.actual_settlement_date >= window_start,
+                    )
+                ),
+                func.min(SettlementBatch.created_at).filter(is_open),
+            ).where(
+                or_(
+                    status_col != SettlementStatus.SETTLED,
+                    SettlementBatch.actual_settlement_date >= min(today_start, window_start),
                 )
             )
-            .order_by(SettlementBatch.created_at.asc())
-            .limit(1)
         )
-        oldest = oldest_pending_result.scalars().first()
-        oldest_days = None
-        if oldest:
-            oldest_days = (now - oldest.created_at).days
+        (
+            pending_count,
+            in_progress_count,
+            settled_today_count,
+            failed_count,
+            overdue_count,
+            pending_value,
+            settled_today_value,
+            avg_time,
+            oldest_created_at,
+        ) = result.one()
 
         return SettlementMetrics(
             total_pending=pending_count or 0,
@@ -195,10 +212,10 @@ class SettlementMonitoring:
             total_settled_today=settled_today_count or 0,
             total_failed=failed_count or 0,
             total_overdue=overdue_count or 0,
-            avg_settlement_time_hours=avg_time,
-            total_value_pending_eur=pending_value,
-            total_value_settled_today_eur=settled_today_value,
-            oldest_pending_days=oldest_days,
+            avg_settlement_time_hours=float(avg_time) if avg_time is not None else None,
+            total_value_pending_eur=pending_value or Decimal("0"),
+            total_value_settled_today_eur=settled_today_value or Decimal("0"),
+            oldest_pending_days=(now - oldest_created_at).days if oldest_created_at else None,
         )
 
     @staticmethod
@@ -212,127 +229,104 @@ class SettlementMonitoring:
         - Settlements stuck in same status too long
         - High-value settlements requiring monitoring
 
+        One query selects every candidate; rows are classified here.
         Returns list of alerts ordered by severity.
         """
         alerts: List[SettlementAlert] = []
         now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Candidates are a day late; business days decide the severity
+        warning_cutoff = now - timedelta(days=SettlementMonitoring.OVERDUE_WARNING_DAYS)
+        stuck_threshold = now - timedelta(hours=SettlementMonitoring.STUCK_STATUS_HOURS)
 
-        # === CRITICAL: Failed Settlements ===
-        failed_result = await db.execute(
-            select(SettlementBatch, Entity)
-            .join(Entity, SettlementBatch.entity_id == Entity.id)
-            .where(SettlementBatch.status == SettlementStatus.FAILED)
-        )
-        for settlement, entity in failed_result:
-            alerts.append(
-                SettlementAlert(
-                    severity="CRITICAL",
-                    settlement_id=str(settlement.id),
-                    batch_reference=settlement.batch_reference,
-                    alert_type="FAILED_SETTLEMENT",
-                    message="Settlement failed - requires manual intervention",
-                    entity_name=entity.name,
-                    total_value_eur=settlement.total_value_eur,
-                )
-            )
-
-        # === ERROR: Critically Overdue (3+ days past expected) ===
-        critical_overdue = await db.execute(
+        result = await db.execute(
             select(SettlementBatch, Entity)
             .join(Entity, SettlementBatch.entity_id == Entity.id)
             .where(
-                and_(
-                    SettlementBatch.expected_settlement_date
-                    < now - timedelta(days=SettlementMonitoring.OVERDUE_CRITICAL_DAYS),
-                    SettlementBatch.status.notin_(
-                        [SettlementStatus.SETTLED, SettlementStatus.FAILED]
+                or_(
+                    SettlementBatch.status == SettlementStatus.FAILED,
+                    and_(
+                        SettlementBatch.status.notin_(FINAL_STATUSES),
+                        or_(
+                            SettlementBatch.expected_settlement_date < warning_cutoff,
+                            and_(
+                                SettlementBatch.status != SettlementStatus.PENDING,  # Expected to wait
+                                SettlementBatch.updated_at < stuck_threshold,
+                            ),
+                        ),
                     ),
                 )
             )
         )
-        for settlement, entity in critical_overdue:
-            days_overdue = (now - settlement.expected_settlement_date).days
-            alerts.append(
-                SettlementAlert(
-                    severity="ERROR",
-                    settlement_id=str(settlement.id),
-                    batch_reference=settlement.batch_reference,
-                    alert_type="CRITICALLY_OVERDUE",
-                    message=(
-                        f"Settlement {days_overdue} days overdue - "
-                        f"urgent review required"
-                    ),
-                    entity_name=entity.name,
-                    days_overdue=days_overdue,
-                    total_value_eur=settlement.total_value_eur,
-                )
-            )
 
-        # === WARNING: Overdue (1+ days past expected) ===
-        warning_overdue = await db.execute(
-            select(SettlementBatch, Entity)
-            .join(Entity, SettlementBatch.entity_id == Entity.id)
-            .where(
-                and_(
-                    SettlementBatch.expected_settlement_date
-                    < now - timedelta(days=SettlementMonitoring.OVERDUE_WARNING_DAYS),
-                    SettlementBatch.expected_settlement_date
-                    >= now - timedelta(days=SettlementMonitoring.OVERDUE_CRITICAL_DAYS),
-                    SettlementBatch.status.notin_(
-                        [SettlementStatus.SETTLED, SettlementStatus.FAILED]
-                    ),
+        for settlement, entity in result:
+            # === CRITICAL: Failed Settlements ===
+            if settlement.status == SettlementStatus.FAILED:
+                alerts.append(
+                    SettlementAlert(
+                        severity="CRITICAL",
+                        settlement_id=str(settlement.id),
+                        batch_reference=settlement.batch_reference,
+                        alert_type="FAILED_SETTLEMENT",
+                        message="Settlement failed - requires manual intervention",
+                        entity_name=entity.name,
+                        total_value_eur=settlement.total_value_eur,
+                    )
                 )
-            )
-        )
-        for settlement, entity in warning_overdue:
-            days_overdue = (now - settlement.expected_settlement_date).days
-            alerts.append(
-                SettlementAlert(
-                    severity="WARNING",
-                    settlement_id=str(settlement.id),
-                    batch_reference=settlement.batch_reference,
-                    alert_type="OVERDUE",
-                    message=f"Settlement {days_overdue} days overdue",
-                    entity_name=entity.name,
-                    days_overdue=days_overdue,
-                    total_value_eur=settlement.total_value_eur,
+                continue
+
+            days_overdue = SettlementMonitoring.business_days_overdue(settlement, now)
+            # === ERROR: Critically Overdue (3+ business days past expected) ===
+            if days_overdue >= SettlementMonitoring.OVERDUE_CRITICAL_DAYS:
+                alerts.append(
+                    SettlementAlert(
+                        severity="ERROR",
+                        settlement_id=str(settlement.id),
+                        batch_reference=settlement.batch_reference,
+                        alert_type="CRITICALLY_OVERDUE",
+                        message=(
+                            f"Settlement {days_overdue} business days overdue - "
+                            f"urgent review required"
+                        ),
+                        entity_name=entity.name,
+                        days_overdue=days_overdue,
+                        total_value_eur=settlement.total_value_eur,
+                    )
                 )
-            )
-
-        # === WARNING: Stuck in Status (48+ hours no progress) ===
-        stuck_threshold = now - timedelta(hours=SettlementMonitoring.STUCK_STATUS_HOURS)
-        stuck_result = await db.execute(
-            select(SettlementBatch, Entity)
-            .join(Entity, SettlementBatch.entity_id == Entity.id)
-            .where(
-                and_(
-                    SettlementBatch.updated_at < stuck_threshold,
-                    SettlementBatch.status.notin_(
-                        [
-                            SettlementStatus.PENDING,  # Expected to wait
-                            SettlementStatus.SETTLED,
-                            SettlementStatus.FAILED,
-                        ]
-                    ),
+            # === WARNING: Overdue (1+ business days past expected) ===
+            elif days_overdue >= SettlementMonitoring.OVERDUE_WARNING_DAYS:
+                alerts.append(
+                    SettlementAlert(
+                        severity="WARNING",
+                        settlement_id=str(settlement.id),
+                        batch_reference=settlement.batch_reference,
+                        alert_type="OVERDUE",
+                        message=f"Settlement {days_overdue} business days overdue",
+                        entity_name=entity.name,
+                        days_overdue=days_overdue,
+                        total_value_eur=settlement.total_value_eur,
+                    )
                 )
-            )
-        )
-        for settlement, entity in stuck_result:
-            hours_stuck = (now - settlement.updated_at).total_seconds() / 3600
-            alerts.append(
-                SettlementAlert(
-                    severity="WARNING",
-                    settlement_id=str(settlement.id),
-                    batch_reference=settlement.batch_reference,
-                    alert_type="STUCK_IN_STATUS",
-                    message=(
-                        f"Settlement stuck in {settlement.status.value} "
-                        f"for {int(hours_stuck)} hours"
-                    ),
-                    entity_name=entity.name,
-                    total_value_eur=settlement.total_value_eur,
+
+            # === WARNING: Stuck in Status (48+ hours no progress) ===
+            if (
+                settlement.status != SettlementStatus.PENDING
+                and settlement.updated_at < stuck_threshold
+            ):
+                hours_stuck = (now - settlement.updated_at).total_seconds() / 3600
+                alerts.append(
+                    SettlementAlert(
+                        severity="WARNING",
+                        settlement_id=str(settlement.id),
+                        batch_reference=settlement.batch_reference,
+                        alert_type="STUCK_IN_STATUS",
+                        message=(
+                            f"Settlement stuck in {settlement.status.value} "
+                            f"for {int(hours_stuck)} hours"
+                        ),
+                        entity_name=entity.name,
+                        total_value_eur=settlement.total_value_eur,
+                    )
                 )
-            )
 
         # Sort by severity: CRITICAL > ERROR > WARNING
         severity_order = {"CRITICAL": 0, "ERROR": 1, "WARNING": 2}
@@ -366,7 +360,7 @@ class SettlementMonitoring:
             .where(
                 and_(
                     SettlementBatch.status == SettlementStatus.SETTLED,
-                    SettlementBatch.updated_at >= today_start,
+                    SettlementBatch.actual_settlement_date >= today_start,
                 )
             )
         )
@@ -521,3 +515,7 @@ class SettlementMonitoring:
                 "error": str(e),
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
+
+
+# Invalidate cached metrics after commits that write settlement batches
+on_commit("settlement_metrics", SettlementBatch, publish=invalidate_metrics_cache)
@@ -2,22 +2,72 @@
 Settlement Processor - Background Job for Automatic Status Updates
 
 Runs periodically to advance settlement statuses based on timeline.
+
+Each non-final batch stores when its current status advances
+(next_transition_at, kept up to date on every ORM flush by a before_flush
+hook), so a run selects only due batches through a partial index. Due batches
+advance one status per run with one UPDATE per status group; history rows and
+SETTLED credits are written in bulk, and status emails are queued in the
+email outbox.
 """
 
+import asyncio
 import logging
-from datetime import datetime, timezone, timedelta
-from typing import Optional
-
-from sqlalchemy import and_, select
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, case, event, func, insert, or_, select, update
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from ..core.database import AsyncSessionLocal
-from ..models.models import Entity, SettlementBatch, SettlementStatus, User
+from ..models.models import (
+    CertificateType,
+    Entity,
+    SettlementBatch,
+    SettlementStatus,
+    SettlementStatusHistory,
+    SettlementType,
+    User,
+)
+from .business_calendar import add_business_days, jurisdiction_for_certificate
 from .email_service import email_service
-from .settlement_service import SettlementService
+from .settlement_finalizer import credit_settled_batches
+from .settlement_monitoring import SettlementMonitoring, invalidate_metrics_cache
 
 logger = logging.getLogger(__name__)
 
+FINAL_STATUSES = (SettlementStatus.SETTLED, SettlementStatus.FAILED)
+ADVANCE_CHUNK_SIZE = 500  # Batches advanced (and committed) per transaction
+AUTO_ADVANCE_NOTES = "Automatic status update by settlement processor"
+
+STATUS_PROGRESSION = {
+    SettlementStatus.PENDING: SettlementStatus.TRANSFER_INITIATED,
+    SettlementStatus.TRANSFER_INITIATED: SettlementStatus.IN_TRANSIT,
+    SettlementStatus.IN_TRANSIT: SettlementStatus.AT_CUSTODY,
+    SettlementStatus.AT_CUSTODY: SettlementStatus.SETTLED,
+}
+
+
+@dataclass
+class AdvancedSettlement:
+    """One automatic status advance, for post-commit notifications"""
+
+    id: UUID
+    entity_id: UUID
+    user_id: Optional[UUID]
+    batch_reference: str
+    settlement_type: SettlementType
+    asset_type: CertificateType
+    quantity: Any
+    old_status: SettlementStatus
+    new_status: SettlementStatus
+    new_balance: Optional[float] = None  # Holding after a SETTLED credit
+
 
 class SettlementProcessor:
     """Automatic settlement status processor"""
@@ -37,143 +87,321 @@ class SettlementProcessor:
         """Internal method that does the actual processing"""
         try:
             logger.info("Starting settlement batch processing...")
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+            await SettlementProcessor._schedule_unscheduled(db)
 
-            # Get all non-final settlements
             result = await db.execute(
-                select(SettlementBatch).where(
-                    SettlementBatch.status.notin_(
-                        [SettlementStatus.SETTLED, SettlementStatus.FAILED]
+                select(SettlementBatch.id)
+                .where(
+                    and_(
+                        SettlementBatch.status.notin_(FINAL_STATUSES),
+                        SettlementBatch.next_transition_at <= now,
                     )
                 )
+                .order_by(SettlementBatch.next_transition_at)
             )
-            settlements = result.scalars().all()
-
-            processed_count = 0
-            for settlement in settlements:
-                if SettlementProcessor._should_advance_status(settlement):
-                    next_status = SettlementProcessor._get_next_status(settlement)
-                    if next_status:
-                        old_status_value = settlement.status.value
-                        system_user_id = await SettlementProcessor._get_system_user_id(
-                            db
-                        )
-
-                        await SettlementService.update_settlement_status(
-                            db=db,
-                            settlement_id=settlement.id,
-                            new_status=next_status,
-                            notes="Automatic status update by settlement processor",
-                            updated_by=system_user_id,
-                        )
-
-                        # Email notification for auto-advance
-                        try:
-                            _user_result = await db.execute(
-                                select(User).where(User.id == settlement.user_id)
-                            )
-                            _user = _user_result.scalar_one_or_none()
-                            if _user and _user.email:
-                                await email_service.send_settlement_status_update(
-                                    to_email=_user.email,
-                                    first_name=_user.first_name or "Trader",
-                                    batch_reference=settlement.batch_reference,
-                                    old_status=old_status_value,
-                                    new_status=next_status.value,
-                                    certificate_type=settlement.asset_type.value,
-                                    quantity=float(settlement.quantity),
-                                )
-                        except Exception:
-                            logger.debug(
-                                "Settlement status email failed for batch %s",
-                                settlement.batch_reference,
-                            )
+            due_ids = [row[0] for row in result.all()]
+
+            advanced: List[AdvancedSettlement] = []
+            if due_ids:
+                system_user_id = await SettlementProcessor._get_system_user_id(db)
+                for start in range(0, len(due_ids), ADVANCE_CHUNK_SIZE):
+                    chunk = await SettlementProcessor._advance_batches(
+                        db, due_ids[start : start + ADVANCE_CHUNK_SIZE], system_user_id, now
+                    )
+                    await db.commit()
+                    advanced.extend(chunk)
 
-                        processed_count += 1
-                        logger.info(
-                            "Advanced settlement %s to %s",
-                            settlement.batch_reference,
-                            next_status,
-                        )
+            if advanced:
+                # _advance_batches writes through Core, not the ORM; refresh metrics here
+                await invalidate_metrics_cache()
+                await SettlementProcessor._notify_advanced(db, advanced)
 
             logger.info(
                 "Settlement processing complete. Advanced %d settlements.",
-                processed_count,
+                len(advanced),
             )
 
         except Exception as e:
+            await db.rollback()
             logger.error(f"Error in settlement processor: {e}", exc_info=True)
 
     @staticmethod
-    def _should_advance_status(settlement: SettlementBatch) -> bool:
-        """Check if settlement should advance based on expected timeline."""
-        now = datetime.now(timezone.utc).replace(tzinfo=None)
-
-        # Terminal statuses should never advance
-        if settlement.status in [SettlementStatus.SETTLED, SettlementStatus.FAILED]:
-            return False
-
-        # Calculate how far we are in the settlement timeline
-        # For CEA (T+3): expected_settlement_date is 3 business days from creation
-        # Calculate business days from creation to expected date
-        if settlement.settlement_type.value == "CEA_PURCHASE":
-            pass  # T+3
-        elif settlement.settlement_type.value == "SWAP_CEA_TO_EUA":
-            if settlement.asset_type.value == "CEA":
-                pass  # T+2 for CEA swaps
-            else:
-                pass  # T+3-T+5 for EUA swaps
-        else:
-            pass  # Default T+3
-
-        # Calculate business days elapsed from creation
-        created = settlement.created_at
-        days_elapsed = 0
-        current_date = created.date()
-        now_date = now.date()
-
-        # Count business days between created date and now date
-        while current_date < now_date:
-            current_date += timedelta(days=1)
-            if current_date.weekday() < 5:  # Monday-Friday
-                days_elapsed += 1
-
-        # Also check if expected date has passed (failsafe)
-        expected_date_passed = (
-            settlement.expected_settlement_date
-            and now >= settlement.expected_settlement_date
+    async def _schedule_unscheduled(db: AsyncSession) -> None:
+        """Compute next_transition_at for batches written without it (e.g. before the column existed)."""
+        result = await db.execute(
+            select(SettlementBatch).where(
+                and_(
+                    SettlementBatch.status.notin_(FINAL_STATUSES),
+                    SettlementBatch.next_transition_at.is_(None),
+                )
+            )
+        )
+        unscheduled = result.scalars().all()
+        for settlement in unscheduled:
+            settlement.next_transition_at = SettlementProcessor.next_advance_at(settlement)
+        if unscheduled:
+            await db.commit()
+
+    @staticmethod
+    async def _advance_batches(
+        db: AsyncSession,
+        batch_ids: List[UUID],
+        system_user_id: Optional[UUID],
+        now: datetime,
+    ) -> List[AdvancedSettlement]:
+        """
+        Advance due batches one status each: one UPDATE per current status,
+        bulk history rows, SETTLED credits in one balance upsert. Batches
+        locked by a concurrent (manual) update are left for the next run.
+        """
+        result = await db.execute(
+            select(
+                SettlementBatch.id,
+                SettlementBatch.entity_id,
+                SettlementBatch.user_id,
+                SettlementBatch.batch_reference,
+                SettlementBatch.settlement_type,
+                SettlementBatch.status,
+                SettlementBatch.asset_type,
+                SettlementBatch.quantity,
+                SettlementBatch.created_at,
+                SettlementBatch.expected_settlement_date,
+            )
+            .where(
+                and_(
+                    SettlementBatch.id.in_(batch_ids),
+                    SettlementBatch.status.notin_(FINAL_STATUSES),
+                )
+            )
+            .with_for_update(skip_locked=True)
+        )
+        by_status: Dict[SettlementStatus, list] = defaultdict(list)
+        for row in result.all():
+            by_status[row.status].append(row)
+
+        advanced: List[AdvancedSettlement] = []
+        for old_status, rows in by_status.items():
+            new_status = STATUS_PROGRESSION.get(old_status)
+            if new_status is None:
+                continue
+
+            next_due = {
+                row.id: SettlementProcessor.next_transition_at(
+                    new_status,
+                    row.settlement_type,
+                    row.asset_type,
+                    row.created_at,
+                    row.expected_settlement_date,
+                )
+                for row in rows
+            }
+            scheduled = {batch_id: due for batch_id, due in next_due.items() if due is not None}
+            values: Dict[str, Any] = {
+                "status": new_status,
+                "updated_at": now,
+                "next_transition_at": (
+                    case(scheduled, value=SettlementBatch.id, else_=None) if scheduled else None
+                ),
+            }
+            if new_status == SettlementStatus.SETTLED:
+                values["actual_settlement_date"] = now
+            await db.execute(
+                update(SettlementBatch)
+                .where(SettlementBatch.id.in_(list(next_due)))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+
+            advanced.extend(
+                AdvancedSettlement(
+                    id=row.id,
+                    entity_id=row.entity_id,
+                    user_id=row.user_id,
+                    batch_reference=row.batch_reference,
+                    settlement_type=row.settlement_type,
+                    asset_type=row.asset_type,
+                    quantity=row.quantity,
+                    old_status=old_status,
+                    new_status=new_status,
+                )
+                for row in rows
+            )
+
+        if not advanced:
+            return []
+
+        await db.execute(
+            insert(SettlementStatusHistory),
+            [
+                {
+                    "settlement_batch_id": item.id,
+                    "status": item.new_status,
+                    "notes": AUTO_ADVANCE_NOTES,
+                    "updated_by": system_user_id,
+                    "created_at": now,
+                }
+                for item in advanced
+            ],
+        )
+
+        settled = [item for item in advanced if item.new_status == SettlementStatus.SETTLED]
+        balances, _ = await credit_settled_batches(db, settled, system_user_id)
+        for item, balance in zip(settled, balances):
+            item.new_balance = float(balance)
+
+        return advanced
+
+    @staticmethod
+    async def _notify_advanced(db: AsyncSession, advanced: List[AdvancedSettlement]) -> None:
+        """WebSocket pushes and outbox status emails for committed advances."""
+        entity_ids = {item.entity_id for item in advanced}
+        owner_ids = {item.user_id for item in advanced if item.user_id}
+        result = await db.execute(
+            select(User.id, User.entity_id, User.email, User.first_name).where(
+                or_(User.entity_id.in_(entity_ids), User.id.in_(owner_ids))
+            )
         )
+        users_by_entity: Dict[UUID, list] = defaultdict(list)
+        users_by_id = {}
+        for user in result.all():
+            users_by_entity[user.entity_id].append(user)
+            users_by_id[user.id] = user
 
-        # Status advancement timeline
-        if settlement.status == SettlementStatus.PENDING:
-            # Advance if 1+ business day elapsed OR expected date passed
-            return days_elapsed >= 1 or expected_date_passed
-        elif settlement.status == SettlementStatus.TRANSFER_INITIATED:
-            # Advance if 2+ business days elapsed OR expected date passed
-            return days_elapsed >= 2 or expected_date_passed
-        elif settlement.status == SettlementStatus.IN_TRANSIT:
-            # Advance if timeline complete OR expected date passed
-            if settlement.settlement_type.value == "CEA_PURCHASE":
-                return days_elapsed >= 3 or expected_date_passed
-            elif settlement.settlement_type.value == "SWAP_CEA_TO_EUA":
-                if settlement.asset_type.value == "CEA":
-                    return days_elapsed >= 2 or expected_date_passed
-                elif settlement.asset_type.value == "EUA":
-                    return days_elapsed >= 3 or expected_date_passed
-        elif settlement.status == SettlementStatus.AT_CUSTODY:
-            return True  # Immediately advance to SETTLED
-
-        return False
+        try:
+            from ..api.v1.client_ws import client_ws_manager
+
+            for item in advanced:
+                user_ids = [user.id for user in users_by_entity.get(item.entity_id, [])]
+                if not user_ids:
+                    continue
+                asyncio.create_task(client_ws_manager.broadcast_to_users(
+                    user_ids,
+                    {
+                        "type": "settlement_updated",
+                        "data": {
+                            "batch_id": str(item.id),
+                            "status": item.new_status.value,
+                            "batch_reference": item.batch_reference,
+                        },
+                    },
+                ))
+                if item.new_status == SettlementStatus.SETTLED:
+                    asyncio.create_task(client_ws_manager.broadcast_to_users(
+                        user_ids,
+                        {"type": "balance_updated", "data": {"source": "settlement_completed"}},
+                    ))
+        except Exception as ws_err:
+            logger.warning(f"Failed to send settlement WS notifications: {ws_err}")
+
+        with email_service.outbox(db):
+            for item in advanced:
+                # The user the settlement belongs to
+                user = users_by_id.get(item.user_id)
+                if not user or not user.email:
+                    continue
+                if item.new_status == SettlementStatus.SETTLED:
+                    await email_service.send_settlement_completed(
+                        to_email=user.email,
+                        first_name=user.first_name or "Trader",
+                        batch_reference=item.batch_reference,
+                        certificate_type=item.asset_type.value,
+                        quantity=float(item.quantity),
+                        new_balance=item.new_balance or 0.0,
+                    )
+                else:
+                    await email_service.send_settlement_status_update(
+                        to_email=user.email,
+                        first_name=user.first_name or "Trader",
+                        batch_reference=item.batch_reference,
+                        old_status=item.old_status.value,
+                        new_status=item.new_status.value,
+                        certificate_type=item.asset_type.value,
+                        quantity=float(item.quantity),
+                    )
+        await db.commit()
 
     @staticmethod
-    def _get_next_status(settlement: SettlementBatch) -> SettlementStatus:
-        """Get next status in progression"""
-        status_progression = {
-            SettlementStatus.PENDING: SettlementStatus.TRANSFER_INITIATED,
-            SettlementStatus.TRANSFER_INITIATED: SettlementStatus.IN_TRANSIT,
-            SettlementStatus.IN_TRANSIT: SettlementStatus.AT_CUSTODY,
-            SettlementStatus.AT_CUSTODY: SettlementStatus.SETTLED,
-        }
-        return status_progression.get(settlement.status)
+    def _business_days_required(
+        status: SettlementStatus,
+        settlement_type: SettlementType,
+        asset_type: CertificateType,
+    ) -> Optional[int]:
+        """
+        Business days after creation at which a status advances:
+        PENDING T+1, TRANSFER_INITIATED T+2, IN_TRANSIT T+3 (CEA swap leg T+2).
+        """
+        if status == SettlementStatus.PENDING:
+            return 1
+        if status == SettlementStatus.TRANSFER_INITIATED:
+            return 2
+        if status == SettlementStatus.IN_TRANSIT:
+            if settlement_type == SettlementType.CEA_PURCHASE:
+                return 3
+            if settlement_type == SettlementType.SWAP_CEA_TO_EUA:
+                if asset_type == CertificateType.CEA:
+                    return 2
+                if asset_type == CertificateType.EUA:
+                    return 3
+        return None
+
+    @staticmethod
+    def next_transition_at(
+        status: SettlementStatus,
+        settlement_type: SettlementType,
+        asset_type: CertificateType,
+        created_at: datetime,
+        expected_settlement_date: Optional[datetime],
+    ) -> Optional[datetime]:
+        """
+        Earliest time a batch in this status advances automatically, or None
+        if it never does: midnight of the required business day after
+        creation, or the expected settlement date if that is earlier.
+        AT_CUSTODY advances immediately.
+        """
+        if status == SettlementStatus.AT_CUSTODY:
+            return created_at
+        required = SettlementProcessor._business_days_required(status, settlement_type, asset_type)
+        if required is None:
+            return None
+
+        # Midnight of the required-th business day after the creation date
+        due = add_business_days(
+            datetime.combine(created_at.date(), time.min),
+            required,
+            jurisdiction_for_certificate(asset_type),
+        )
+
+        if expected_settlement_date:
+            due = min(due, expected_settlement_date)
+        return due
+
+    @staticmethod
+    def next_advance_at(settlement: SettlementBatch) -> Optional[datetime]:
+        """next_transition_at for a settlement's current status."""
+        return SettlementProcessor.next_transition_at(
+            settlement.status,
+            settlement.settlement_type,
+            settlement.asset_type,
+            settlement.created_at,
+            settlement.expected_settlement_date,
+        )
+
+    @staticmethod
+    async def get_next_advance_at() -> Optional[datetime]:
+        """Earliest automatic status advance across all non-final settlements."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    func.min(SettlementBatch.next_transition_at),
+                    func.count().filter(SettlementBatch.next_transition_at.is_(None)),
+                ).where(SettlementBatch.status.notin_(FINAL_STATUSES))
+            )
+            next_due, unscheduled = result.one()
+        if unscheduled:
+            return datetime.now(timezone.utc).replace(tzinfo=None)
+        return next_due
 
     @staticmethod
     async def _get_system_user_id(db: AsyncSession):
@@ -225,9 +453,9 @@ class SettlementProcessor:
                 admin_users = admin_result.scalars().all()
 
                 for settlement in overdue:
-                    days_overdue = (now - settlement.expected_settlement_date).days
+                    days_overdue = SettlementMonitoring.business_days_overdue(settlement, now)
                     logger.warning(
-                        "Settlement %s is %d days overdue. Status: %s",
+                        "Settlement %s is %d business days overdue. Status: %s",
                         settlement.batch_reference,
                         days_overdue,
                         settlement.status,
@@ -240,32 +468,52 @@ class SettlementProcessor:
                     entity = entity_result.scalar_one_or_none()
                     entity_name = entity.legal_name if entity else "Unknown Entity"
 
-                    # Send admin alert emails
-                    for admin in admin_users:
-                        if admin.email:
-                            try:
-                                await email_service.send_admin_overdue_settlement_alert(
-                                    to_email=admin.email,
-                                    batch_reference=settlement.batch_reference,
-                                    entity_name=entity_name,
-                                    certificate_type=settlement.asset_type.value,
-                                    quantity=float(settlement.quantity),
-                                    expected_date=settlement.expected_settlement_date.strftime(
-                                        "%Y-%m-%d"
-                                    ),
-                                    days_overdue=days_overdue,
-                                    current_status=settlement.status.value,
-                                )
-                                logger.info(
-                                    "Overdue settlement alert sent to admin %s",
-                                    admin.email,
-                                )
-                            except Exception as email_error:
-                                logger.error(
-                                    "Failed to send overdue alert to %s: %s",
-                                    admin.email,
-                                    email_error,
-                                )
+                    # Send admin alert emails (one render for all admins)
+                    admin_emails = [admin.email for admin in admin_users if admin.email]
+                    if admin_emails:
+                        try:
+                            await email_service.send_admin_overdue_settlement_alerts(
+                                to_emails=admin_emails,
+                                batch_reference=settlement.batch_reference,
+                                entity_name=entity_name,
+                                certificate_type=settlement.asset_type.value,
+                                quantity=float(settlement.quantity),
+                                expected_date=settlement.expected_settlement_date.strftime(
+                                    "%Y-%m-%d"
+                                ),
+                                days_overdue=days_overdue,
+                                current_status=settlement.status.value,
+                            )
+                            logger.info(
+                                "Overdue settlement alert sent to %d admin(s)",
+                                len(admin_emails),
+                            )
+                        except Exception as email_error:
+                            logger.error(
+                                "Failed to send overdue alert for %s: %s",
+                                settlement.batch_reference,
+                                email_error,
+                            )
 
         except Exception as e:
             logger.error(f"Error checking overdue settlements: {e}", exc_info=True)
+
+
+_SCHEDULE_FIELDS = ("status", "created_at", "expected_settlement_date")
+
+
+@event.listens_for(Session, "before_flush")
+def _schedule_settlement_transitions(session: Session, flush_context, instances) -> None:
+    """Keep next_transition_at in step with ORM writes to a batch's status or timeline."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, SettlementBatch):
+            continue
+        if obj not in session.new:
+            attrs = sa_inspect(obj).attrs
+            if not any(attrs[field].history.has_changes() for field in _SCHEDULE_FIELDS):
+                continue
+        if obj.status is None:
+            obj.status = SettlementStatus.PENDING
+        if obj.created_at is None:
+            obj.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        obj.next_transition_at = SettlementProcessor.next_advance_at(obj)
@@ -6,23 +6,23 @@ for CEA purchases and CEA→EUA swaps through external registries.
 """
 
 import logging
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Optional, Set
 from uuid import UUID
 
-from sqlalchemy import and_, func, select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from ..core.database import engine
 from ..core.exceptions import handle_database_error
 from ..models.models import (
-    AssetTransaction,
     AssetType,
     CertificateType,
     Entity,
     EntityHolding,
+    Jurisdiction,
     SettlementBatch,
     SettlementStatus,
     SettlementStatusHistory,
@@ -30,29 +30,61 @@ from ..models.models import (
     TransactionType,
     User,
 )
+from .balance_utils import BalanceChange, update_entity_balances
+from .business_calendar import add_business_days, jurisdiction_for_certificate
 from .email_service import email_service
 
 logger = logging.getLogger(__name__)
 
+# Reference sequences this process has created/seeded ("settlement_ref_<year>_<asset>")
+_reference_sequences: Set[str] = set()
+
 
 class SettlementService:
     """Service for managing settlement operations"""
 
     @staticmethod
-    def calculate_business_days(start_date: datetime, num_days: int) -> datetime:
+    def calculate_business_days(
+        start_date: datetime, num_days: int, jurisdiction: Jurisdiction = Jurisdiction.EU
+    ) -> datetime:
         """
         Calculate target date N business days from start_date.
-        Business days = Monday-Friday, excludes weekends.
+        Business days = Monday-Friday minus the jurisdiction's holidays.
         """
-        current_date = start_date
-        days_added = 0
-
-        while days_added < num_days:
-            current_date += timedelta(days=1)
-            if current_date.weekday() < 5:  # Skip weekends
-                days_added += 1
+        return add_business_days(start_date, num_days, jurisdiction)
 
-        return current_date
+    @staticmethod
+    async def _ensure_reference_sequence(
+        sequence: str, prefix: str, suffix: str, asset_type: CertificateType
+    ) -> None:
+        """
+        Create a (year, asset) reference sequence and seed it past the highest
+        existing reference. Runs once per sequence and process, on its own
+        autocommit connection so the sequence outlives the caller's transaction.
+        """
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequence}"))
+            result = await conn.execute(
+                select(func.max(SettlementBatch.batch_reference)).where(
+                    and_(
+                        SettlementBatch.batch_reference.like(f"{prefix}%{suffix}"),
+                        SettlementBatch.asset_type == asset_type,
+                    )
+                )
+            )
+            max_ref = result.scalar_one_or_none()
+            if max_ref:
+                # "SET-2026-000013-CEA" → split("-") → parts[2] = "000013" → 13
+                # Only moves forward, so concurrent seeding can't rewind it
+                await conn.execute(
+                    text(
+                        f"SELECT setval('{sequence}', :seq) WHERE :seq > "
+                        f"(SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {sequence})"
+                    ),
+                    {"seq": int(max_ref.split("-")[2])},
+                )
+        _reference_sequences.add(sequence)
 
     @staticmethod
     async def generate_batch_reference(
@@ -60,30 +92,21 @@ class SettlementService:
     ) -> str:
         """Generate unique settlement batch reference: SET-YYYY-NNNNNN-TYPE
 
-        Uses MAX of existing references (not COUNT) so that gaps from deleted
-        rows don't cause collisions with the unique constraint.
+        Numbers come from a per-(year, asset) Postgres sequence, so concurrent
+        settlements never collide and no reference scan is needed. Sequence
+        values are not transactional: a rolled-back settlement leaves a gap.
         """
         year = datetime.now(timezone.utc).year
         asset_suffix = asset_type.value
         prefix = f"SET-{year}-"
         suffix = f"-{asset_suffix}"
 
-        result = await db.execute(
-            select(func.max(SettlementBatch.batch_reference)).where(
-                and_(
-                    SettlementBatch.batch_reference.like(f"{prefix}%{suffix}"),
-                    SettlementBatch.asset_type == asset_type,
-                )
-            )
-        )
-        max_ref = result.scalar_one_or_none()
+        sequence = f"settlement_ref_{year}_{asset_suffix.lower()}"
+        if sequence not in _reference_sequences:
+            await SettlementService._ensure_reference_sequence(sequence, prefix, suffix, asset_type)
 
-        if max_ref:
-            # "SET-2026-000013-CEA" → split("-") → parts[2] = "000013" → 13
-            current_max = int(max_ref.split("-")[2])
-            next_seq = current_max + 1
-        else:
-            next_seq = 1
+        result = await db.execute(text(f"SELECT nextval('{sequence}')"))
+        next_seq = result.scalar_one()
 
         return f"{prefix}{str(next_seq).zfill(6)}{suffix}"
 
@@ -101,48 +124,31 @@ class SettlementService:
         """Create settlement batch for CEA purchase (T+3)"""
         try:
             today = datetime.now(timezone.utc).replace(tzinfo=None)
-            expected_date = SettlementService.calculate_business_days(today, 3)
+            expected_date = SettlementService.calculate_business_days(
+                today, 3, jurisdiction_for_certificate(CertificateType.CEA)
+            )
             total_value_eur = quantity * price
 
-            # Retry with savepoint to handle rare batch_reference collisions
-            max_attempts = 3
-            settlement = None
-            for attempt in range(max_attempts):
-                batch_reference = await SettlementService.generate_batch_reference(
-                    db, SettlementType.CEA_PURCHASE, CertificateType.CEA
-                )
-
-                settlement = SettlementBatch(
-                    batch_reference=batch_reference,
-                    entity_id=entity_id,
-                    order_id=order_id,
-                    trade_id=trade_id,
-                    counterparty_id=seller_id,
-                    settlement_type=SettlementType.CEA_PURCHASE,
-                    status=SettlementStatus.PENDING,
-                    asset_type=CertificateType.CEA,
-                    quantity=quantity,
-                    price=price,
-                    total_value_eur=total_value_eur,
-                    expected_settlement_date=expected_date,
-                )
+            batch_reference = await SettlementService.generate_batch_reference(
+                db, SettlementType.CEA_PURCHASE, CertificateType.CEA
+            )
 
-                try:
-                    async with db.begin_nested():
-                        db.add(settlement)
-                        await db.flush()
-                    break  # Success — exit retry loop
-                except IntegrityError:
-                    if attempt < max_attempts - 1:
-                        logger.warning(
-                            f"batch_reference collision on {batch_reference}, "
-                            f"retrying (attempt {attempt + 1}/{max_attempts})"
-                        )
-                        continue
-                    logger.error(
-                        f"batch_reference collision persisted after {max_attempts} attempts"
-                    )
-                    raise
+            settlement = SettlementBatch(
+                batch_reference=batch_reference,
+                entity_id=entity_id,
+                order_id=order_id,
+                trade_id=trade_id,
+                counterparty_id=seller_id,
+                settlement_type=SettlementType.CEA_PURCHASE,
+                status=SettlementStatus.PENDING,
+                asset_type=CertificateType.CEA,
+                quantity=quantity,
+                price=price,
+                total_value_eur=total_value_eur,
+                expected_settlement_date=expected_date,
+            )
+            db.add(settlement)
+            await db.flush()
 
             status_history = SettlementStatusHistory(
                 settlement_batch_id=settlement.id,
@@ -390,6 +396,25 @@ class SettlementService:
             await db.rollback()
             raise handle_database_error(e, "update settlement status", logger) from e
 
+    @staticmethod
+    def settlement_credit(
+        settlement: SettlementBatch, finalized_by: Optional[UUID]
+    ) -> BalanceChange:
+        """Holding credit (and its audit fields) for a finalized settlement"""
+        return BalanceChange(
+            entity_id=settlement.entity_id,
+            asset_type=(
+                AssetType.CEA
+                if settlement.asset_type == CertificateType.CEA
+                else AssetType.EUA
+            ),
+            amount=settlement.quantity,
+            transaction_type=TransactionType.TRADE_CREDIT,
+            created_by=finalized_by,
+            reference=f"Settlement {settlement.batch_reference}",
+            notes=f"Settlement finalized: {settlement.settlement_type.value}",
+        )
+
     @staticmethod
     async def finalize_settlement(
         db: AsyncSession, settlement: SettlementBatch, finalized_by: Optional[UUID]
@@ -398,49 +423,9 @@ class SettlementService:
         try:
             settlement.actual_settlement_date = datetime.now(timezone.utc).replace(tzinfo=None)
 
-            asset_type_enum = (
-                AssetType.CEA
-                if settlement.asset_type == CertificateType.CEA
-                else AssetType.EUA
-            )
-
-            result = await db.execute(
-                select(EntityHolding).where(
-                    and_(
-                        EntityHolding.entity_id == settlement.entity_id,
-                        EntityHolding.asset_type == asset_type_enum,
-                    )
-                )
-            )
-            holding = result.scalar_one_or_none()
-
-            balance_before = Decimal("0")
-            if not holding:
-                holding = EntityHolding(
-                    entity_id=settlement.entity_id,
-                    asset_type=asset_type_enum,
-                    quantity=Decimal("0"),
-                )
-                db.add(holding)
-                await db.flush()
-            else:
-                balance_before = holding.quantity
-
-            holding.quantity += settlement.quantity
-            holding.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
-
-            transaction = AssetTransaction(
-                entity_id=settlement.entity_id,
-                asset_type=asset_type_enum,
-                transaction_type=TransactionType.TRADE_CREDIT,
-                amount=settlement.quantity,
-                balance_before=balance_before,
-                balance_after=holding.quantity,
-                reference=f"Settlement {settlement.batch_reference}",
-                notes=f"Settlement finalized: {settlement.settlement_type.value}",
-                created_by=finalized_by,
+            await update_entity_balances(
+                db, [SettlementService.settlement_credit(settlement, finalized_by)]
             )
-            db.add(transaction)
 
             logger.info(f"Finalized settlement {settlement.batch_reference}")
 
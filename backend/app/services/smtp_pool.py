@@ -0,0 +1,174 @@
+"""
+Pooled SMTP Connections
+
+SMTP delivery reuses up to SMTP_POOL_SIZE connections that stay open,
+STARTTLS-upgraded and logged in, between messages instead of connecting,
+upgrading and authenticating for every email:
+- A connection idle for more than IDLE_CHECK_SECONDS is checked with NOOP
+  before reuse and replaced if the server dropped it
+- A send failing because the connection broke is retried once on a fresh
+  connection; rejected messages (refused recipient, bad data) keep the
+  connection
+- Connections are recycled after MAX_MESSAGES_PER_CONNECTION messages, as
+  many servers cap messages per session
+
+One pool exists per SMTP configuration; a changed host or credential closes
+the old pool: its idle connections at once, connections of sends still in
+flight when those finish. smtplib is blocking, so every call runs in a thread.
+"""
+
+import asyncio
+import logging
+import smtplib
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SMTP_TIMEOUT_SECONDS = 30
+IDLE_CHECK_SECONDS = 30
+MAX_MESSAGES_PER_CONNECTION = 100
+
+# host, port, use_tls, username, password
+SmtpKey = Tuple[str, int, bool, Optional[str], Optional[str]]
+
+
+def smtp_key(mail_config: Dict[str, Any]) -> SmtpKey:
+    return (
+        mail_config.get("smtp_host") or "localhost",
+        mail_config.get("smtp_port") or 587,
+        bool(mail_config.get("smtp_use_tls", True)),
+        mail_config.get("smtp_username"),
+        mail_config.get("smtp_password"),
+    )
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+def _quit(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        smtp.close()
+
+
+def _alive(smtp: smtplib.SMTP) -> bool:
+    try:
+        return smtp.noop()[0] == 250
+    except Exception:
+        return False
+
+
+class SMTPPool:
+    """Up to `size` persistent, authenticated connections to one SMTP server."""
+
+    def __init__(self, key: SmtpKey, size: int):
+        self.key = key
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(max(size, 1))
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        host, port, use_tls, username, password = self.key
+        smtp = smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if use_tls:
+                smtp.starttls()
+            if username and password:
+                smtp.login(username, password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    async def _open(self) -> _Connection:
+        return _Connection(await asyncio.to_thread(self._connect))
+
+    async def _acquire(self) -> _Connection:
+        while self._idle:
+            conn = self._idle.pop()  # Most recently used first
+            if time.monotonic() - conn.last_used < IDLE_CHECK_SECONDS:
+                return conn
+            if await asyncio.to_thread(_alive, conn.smtp):
+                return conn
+            await asyncio.to_thread(_quit, conn.smtp)
+        return await self._open()
+
+    async def _release(self, conn: _Connection) -> None:
+        conn.sent += 1
+        conn.last_used = time.monotonic()
+        if self._closed or conn.sent >= MAX_MESSAGES_PER_CONNECTION:
+            await asyncio.to_thread(_quit, conn.smtp)
+        else:
+            self._idle.append(conn)
+
+    async def send(self, from_addr: str, to: str, message: str) -> None:
+        """Send one message; raises smtplib/OSError errors the retry could not fix."""
+        async with self._slots:
+            conn = await self._acquire()
+            keep = False
+            try:
+                for attempt in range(2):
+                    try:
+                        await asyncio.to_thread(conn.smtp.sendmail, from_addr, [to], message)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                        # Server answered: the message was rejected, the connection is fine
+                        keep = True
+                        raise
+                    except (smtplib.SMTPServerDisconnected, OSError) as e:
+                        if attempt:
+                            raise
+                        logger.info(f"SMTP connection to {self.key[0]} lost ({e}), reconnecting")
+                        conn.smtp.close()
+                        conn = await self._open()
+                        continue
+                    keep = True
+                    return
+            finally:
+                # Anything else (cancellation, unexpected errors) may leave the
+                # session mid-command: drop the connection rather than reuse it
+                if keep:
+                    await self._release(conn)
+                else:
+                    conn.smtp.close()
+
+    async def close(self) -> None:
+        """Quit idle connections; connections in use are quit when released."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await asyncio.to_thread(_quit, conn.smtp)
+
+
+_pool: Optional[SMTPPool] = None
+_closing: Set["asyncio.Task[None]"] = set()  # Replaced pools being closed
+
+
+def get_smtp_pool(mail_config: Dict[str, Any]) -> SMTPPool:
+    """Pool for this SMTP configuration; replaces (and closes) a pool for another one."""
+    global _pool
+    key = smtp_key(mail_config)
+    if _pool is None or _pool.key != key:
+        if _pool is not None:
+            task = asyncio.get_running_loop().create_task(_pool.close())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+        _pool = SMTPPool(key, settings.SMTP_POOL_SIZE)
+    return _pool
+
+
+async def close_smtp_pool() -> None:
+    """Close idle pooled connections (app shutdown)."""
+    global _pool
+    if _closing:
+        await asyncio.gather(*_closing, return_exceptions=True)
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -0,0 +1,156 @@
+"""
+Audit Ticket Enrichment
+
+Adds actor details to a page of TicketLog rows for the admin ticket listing:
+user email/role/company/name, the acting market maker's name and, for
+TRADE_EXECUTED tickets, the buyer/seller market maker names stored in
+response_data.
+
+All IDs referenced by the page are collected first and resolved together:
+one User+Entity query and at most one MarketMakerClient query, whatever the
+page size. Market maker names rarely change and are shared by most pages, so
+they are kept in an in-process cache; renamed or deleted market makers are
+dropped from it when the change commits, and the whole cache expires after
+MM_NAME_CACHE_SECONDS so renames made by other workers show up too.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.commit_hooks import on_commit
+from ..models.models import Entity, MarketMakerClient, TicketLog, User
+from ..schemas.schemas import TicketLogResponse
+
+MM_NAME_CACHE_SECONDS = 300
+TRADE_MM_FIELDS = (("buyer_mm_id", "buyer_mm_name"), ("seller_mm_id", "seller_mm_name"))
+
+_mm_names: Dict[UUID, str] = {}
+_mm_names_loaded_at = 0.0
+
+
+def _as_uuid(value: Any) -> Optional[UUID]:
+    """UUID from a response_data value (stored as str); None if missing or malformed."""
+    if not value:
+        return None
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _trade_mm_ids(ticket: TicketLog) -> Dict[str, Optional[UUID]]:
+    """buyer/seller MM IDs of a TRADE_EXECUTED ticket, keyed by response field."""
+    if ticket.action_type != "TRADE_EXECUTED" or not ticket.response_data:
+        return {}
+    return {
+        field: _as_uuid(ticket.response_data.get(field))
+        for field, _ in TRADE_MM_FIELDS
+        if ticket.response_data.get(field)
+    }
+
+
+def clear_mm_name_cache() -> None:
+    global _mm_names_loaded_at
+    _mm_names.clear()
+    _mm_names_loaded_at = 0.0
+
+
+async def get_mm_names(db: AsyncSession, mm_ids: Iterable[UUID]) -> Dict[UUID, str]:
+    """Names for the given market maker IDs; only uncached IDs are queried (one IN-query)."""
+    global _mm_names_loaded_at
+    if time.monotonic() - _mm_names_loaded_at > MM_NAME_CACHE_SECONDS:
+        clear_mm_name_cache()
+        _mm_names_loaded_at = time.monotonic()
+
+    ids = set(mm_ids)
+    missing = [mm_id for mm_id in ids if mm_id not in _mm_names]
+    if missing:
+        result = await db.execute(
+            select(MarketMakerClient.id, MarketMakerClient.name).where(
+                MarketMakerClient.id.in_(missing)
+            )
+        )
+        _mm_names.update({mm_id: name for mm_id, name in result.all()})
+    return {mm_id: _mm_names[mm_id] for mm_id in ids if mm_id in _mm_names}
+
+
+async def _get_users(db: AsyncSession, user_ids: Set[UUID]) -> Dict[UUID, Any]:
+    if not user_ids:
+        return {}
+    result = await db.execute(
+        select(
+            User.id,
+            User.email,
+            User.role,
+            User.first_name,
+            User.last_name,
+            Entity.name.label("company"),
+        )
+        .outerjoin(Entity, User.entity_id == Entity.id)
+        .where(User.id.in_(user_ids))
+    )
+    return {row.id: row for row in result.all()}
+
+
+async def enrich_tickets(
+    db: AsyncSession, tickets: Sequence[TicketLog]
+) -> List[Dict[str, Any]]:
+    """Serialize tickets with user/entity/MM details using a constant number of queries."""
+    user_ids: Set[UUID] = set()
+    mm_ids: Set[UUID] = set()
+    trade_mm_ids = []
+    for ticket in tickets:
+        if ticket.user_id:
+            user_ids.add(ticket.user_id)
+        if ticket.market_maker_id:
+            mm_ids.add(ticket.market_maker_id)
+        trade_ids = _trade_mm_ids(ticket)
+        mm_ids.update(mm_id for mm_id in trade_ids.values() if mm_id)
+        trade_mm_ids.append(trade_ids)
+
+    users = await _get_users(db, user_ids)
+    mm_names = await get_mm_names(db, mm_ids) if mm_ids else {}
+
+    tickets_data = []
+    for ticket, trade_ids in zip(tickets, trade_mm_ids):
+        base = TicketLogResponse.model_validate(ticket).model_dump()
+        user = users.get(ticket.user_id)
+        if user:
+            base["user_email"] = user.email
+            base["user_role"] = user.role.value if user.role else None
+            base["user_company"] = user.company
+            full_name = f"{user.first_name or ''} {user.last_name or ''}".strip()
+            base["user_full_name"] = full_name or user.email
+        else:
+            base["user_email"] = None
+            base["user_role"] = None
+            base["user_company"] = None
+            base["user_full_name"] = None
+        base["mm_name"] = mm_names.get(ticket.market_maker_id)
+
+        for field, name_field in TRADE_MM_FIELDS:
+            if field in trade_ids:
+                base[name_field] = mm_names.get(trade_ids[field])
+
+        tickets_data.append(base)
+    return tickets_data
+
+
+def _forget_mm_names(mm_ids: List[UUID]) -> None:
+    for mm_id in mm_ids:
+        _mm_names.pop(mm_id, None)
+
+
+# Drop cached names of market makers renamed or deleted once the change commits
+on_commit(
+    "ticket_enrichment_mm_names",
+    MarketMakerClient,
+    collect=lambda new, dirty, deleted: [mm.id for mm in dirty + deleted],
+    publish=_forget_mm_names,
+)
@@ -0,0 +1,83 @@
+"""
+Audit Ticket Search
+
+Filters for the admin ticket listing, each served by an index added in the
+2026_10_18_ticket_search migration:
+
+- contains: substring match (ILIKE '%term%') on ticket_id, action_type and
+  entity_type — pg_trgm GIN indexes, so no sequential scan
+- prefix:   ILIKE 'term%' on the same columns — same trigram indexes
+- fuzzy:    trigram word similarity (term <% column), tolerant of typos
+- text:     full-text match of every word as a prefix (word:*) against
+  search_vector, which also covers the string and number values of
+  request_payload/response_data
+- payload key: key present (?) in request_payload or response_data, or
+  key/value containment (@>) when a value is given — JSONB GIN indexes
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+from sqlalchemy import func, literal, or_, text
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..models.models import TicketLog
+
+SEARCH_MODE_PATTERN = "^(contains|prefix|fuzzy|text)$"
+SEARCH_COLUMNS = (TicketLog.ticket_id, TicketLog.action_type, TicketLog.entity_type)
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards (backslash is PostgreSQL's default LIKE escape)."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_tsquery(term: str) -> Optional[str]:
+    """'order 2026-01' -> 'order:* & 2026:* & 01:*' (split like the 'simple' parser)."""
+    words = re.findall(r"[^\W_]+", term.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def search_filter(term: str, mode: str = "contains") -> ColumnElement:
+    """Filter for the ticket search box; see the module docstring for the modes."""
+    term = term.strip()
+    if mode == "text":
+        query = prefix_tsquery(term)
+        if query is None:
+            return literal(False)
+        return TicketLog.search_vector.op("@@")(
+            func.to_tsquery(text("'simple'::regconfig"), query)
+        )
+    if mode == "fuzzy":
+        return or_(*(literal(term).op("<%")(column) for column in SEARCH_COLUMNS))
+    pattern = f"{escape_like(term)}%" if mode == "prefix" else f"%{escape_like(term)}%"
+    return or_(*(column.ilike(pattern) for column in SEARCH_COLUMNS))
+
+
+def _payload_values(value: str) -> List[Any]:
+    """The value as stored: always as a string, also as number/boolean/null if it parses as one."""
+    values: List[Any] = [value]
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return values
+    if not isinstance(parsed, (str, dict, list)):
+        values.append(parsed)
+    return values
+
+
+def payload_filter(key: str, value: Optional[str] = None) -> ColumnElement:
+    """Tickets whose request_payload or response_data has `key` (equal to `value` if given)."""
+    payloads = (TicketLog.request_payload, TicketLog.response_data)
+    if value is None:
+        return or_(*(payload.has_key(key) for payload in payloads))
+    return or_(
+        *(
+            payload.contains({key: candidate})
+            for payload in payloads
+            for candidate in _payload_values(value)
+        )
+    )
@@ -6,7 +6,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import Any, Callable, Coroutine, Dict, List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import RedisManager
@@ -49,6 +49,22 @@ class TicketService:
         ticket_id = f"TKT-{year}-{counter:06d}"
         return ticket_id
 
+    @staticmethod
+    async def generate_ticket_ids(count: int) -> List[str]:
+        """Reserve `count` consecutive ticket IDs with a single Redis INCRBY."""
+        if count <= 0:
+            return []
+        year = datetime.now(timezone.utc).year
+        redis = await RedisManager.get_redis()
+
+        counter_key = f"ticket_counter:{year}"
+        last = await redis.incrby(counter_key, count)
+
+        if last == count:
+            await redis.expire(counter_key, 60 * 60 * 24 * 400)  # ~13 months
+
+        return [f"TKT-{year}-{n:06d}" for n in range(last - count + 1, last + 1)]
+
     @staticmethod
     async def create_ticket(
         db: AsyncSession,
@@ -120,6 +136,54 @@ class TicketService:
 
         return ticket
 
+    @staticmethod
+    async def create_tickets_bulk(
+        db: AsyncSession,
+        tickets: List[Dict[str, Any]],
+    ) -> List[str]:
+        """
+        Create many audit tickets with one INSERT.
+
+        Each dict takes the create_ticket keyword arguments (without db).
+        Tickets are not broadcast individually; callers creating a batch
+        should record a summary ticket with create_ticket.
+
+        Returns the ticket IDs in input order.
+        """
+        ticket_ids = await TicketService.generate_ticket_ids(len(tickets))
+        if not ticket_ids:
+            return []
+
+        # Naive UTC for Column(DateTime) / TIMESTAMP WITHOUT TIME ZONE (asyncpg)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "ticket_id": ticket_id,
+                "timestamp": now,
+                "user_id": t.get("user_id"),
+                "market_maker_id": t.get("market_maker_id"),
+                "action_type": t["action_type"],
+                "entity_type": t["entity_type"],
+                "entity_id": t.get("entity_id"),
+                "status": t["status"],
+                "request_payload": t.get("request_payload"),
+                "response_data": t.get("response_data"),
+                "ip_address": t.get("ip_address"),
+                "user_agent": t.get("user_agent"),
+                "session_id": t.get("session_id"),
+                "before_state": t.get("before_state"),
+                "after_state": t.get("after_state"),
+                "related_ticket_ids": t.get("related_ticket_ids") or [],
+                "tags": t.get("tags") or [],
+            }
+            for ticket_id, t in zip(ticket_ids, tickets)
+        ]
+        await db.execute(insert(TicketLog), rows)
+
+        logger.info(f"Created {len(rows)} tickets in bulk ({ticket_ids[0]}..{ticket_ids[-1]})")
+        return ticket_ids
+
     @staticmethod
     async def get_entity_state(
         db: AsyncSession, entity_type: str, entity_id: uuid.UUID
@@ -0,0 +1,281 @@
+"""
+Audit Log Statistics from Daily Rollups
+
+ticket_log_rollups holds ticket counts per (day, action_type, status,
+user_id). The ticket_rollup_compaction scheduler job appends every closed day
+(ended more than COMPACTION_GRACE ago, so no open transaction can still add
+tickets to it) with one INSERT ... SELECT; the newest rolled-up day + 1 is the
+watermark.
+
+get_ticket_stats() answers the dashboard from:
+- rollup rows for whole days before the watermark, and
+- a live GROUP BY over ticket_logs for the rest of the range: everything
+  since the watermark (normally today) plus partial days at the edges of a
+  date filter — a timestamp index range, independent of the table size.
+
+Both are merged with UNION ALL and aggregated with GROUPING SETS in one query
+per range, so dashboard latency depends on the number of days and distinct
+(action, status, user) combinations, not on the number of tickets.
+
+Core DELETEs of tickets bypass the job; their callers subtract the removed
+tickets first with remove_from_rollups().
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from ..core.database import AsyncSessionLocal
+from ..models.models import Entity, TicketLog, TicketLogRollup, TicketStatus, User
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_GRACE = timedelta(hours=1)  # Longer than any transaction that writes tickets
+COMPACTION_CHUNK_DAYS = 31  # Days rolled up per INSERT ... SELECT on the first run
+TOP_USERS = 10
+DEFAULT_SERIES_DAYS = 30
+_MICROSECOND = timedelta(microseconds=1)
+
+# grouping(status, action_type, user_id) sets a bit for each column aggregated away
+_BY_STATUS, _BY_ACTION, _BY_USER = 0b011, 0b101, 0b110
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+async def rollup_watermark(db: AsyncSession) -> Optional[date]:
+    """First day not covered by rollups (None before the first compaction)."""
+    newest = (await db.execute(select(func.max(TicketLogRollup.day)))).scalar()
+    return newest + timedelta(days=1) if newest else None
+
+
+def _split_range(
+    start: Optional[datetime], end: Optional[datetime], watermark: Optional[date]
+) -> Tuple[Optional[Tuple[Optional[date], date]], List[Tuple[Optional[datetime], Optional[datetime]]]]:
+    """
+    Split [start, end] (end inclusive, either open) into whole rollup days
+    [first, last) and the timestamp ranges [lo, hi) that must be counted live.
+    """
+    end_excl = end + _MICROSECOND if end else None
+    if watermark is None:
+        return None, [(start, end_excl)]
+
+    first = None
+    if start is not None:
+        first = start.date() if start == _midnight(start.date()) else start.date() + timedelta(days=1)
+    last = min(watermark, end_excl.date()) if end_excl else watermark
+    if first is not None and first >= last:
+        return None, [(start, end_excl)]
+
+    live = []
+    if start is not None and start < _midnight(first):
+        live.append((start, _midnight(first)))
+    if end_excl is None or _midnight(last) < end_excl:
+        live.append((_midnight(last), end_excl))
+    return (first, last), live
+
+
+def _counts(
+    start: Optional[datetime], end: Optional[datetime], watermark: Optional[date]
+):
+    """(day, action_type, status, user_id, count) rows for the range: rollups + live tickets."""
+    days, live = _split_range(start, end, watermark)
+    r, t = TicketLogRollup, TicketLog
+    parts = []
+    if days:
+        first, last = days
+        conditions = [r.day < last]
+        if first is not None:
+            conditions.append(r.day >= first)
+        parts.append(
+            select(
+                r.day.label("day"),
+                r.action_type.label("action_type"),
+                r.status.label("status"),
+                r.user_id.label("user_id"),
+                r.count.label("count"),
+            ).where(*conditions)
+        )
+    live_conditions: List[ColumnElement] = []
+    for lo, hi in live:
+        bounds = []
+        if lo is not None:
+            bounds.append(t.timestamp >= lo)
+        if hi is not None:
+            bounds.append(t.timestamp < hi)
+        live_conditions.append(and_(*bounds) if bounds else literal(True))
+    if live_conditions:
+        day = func.date(t.timestamp)
+        parts.append(
+            select(
+                day.label("day"),
+                t.action_type,
+                t.status,
+                t.user_id,
+                func.count().label("count"),
+            )
+            .where(or_(*live_conditions))
+            .group_by(day, t.action_type, t.status, t.user_id)
+        )
+    return (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+
+
+@dataclass
+class TicketStats:
+    total_actions: int = 0
+    success_count: int = 0
+    failed_count: int = 0
+    by_action_type: Dict[str, int] = field(default_factory=dict)
+    by_user: List[Dict[str, Any]] = field(default_factory=list)
+    actions_over_time: List[Dict[str, Any]] = field(default_factory=list)
+
+
+async def get_ticket_stats(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> TicketStats:
+    """Dashboard statistics (same figures as grouping ticket_logs directly)."""
+    watermark = await rollup_watermark(db)
+    stats = TicketStats()
+
+    c = _counts(start_date, end_date, watermark)
+    grouping = func.grouping(c.c.status, c.c.action_type, c.c.user_id)
+    result = await db.execute(
+        select(c.c.status, c.c.action_type, c.c.user_id, grouping.label("g"), func.sum(c.c.count))
+        .group_by(func.grouping_sets(c.c.status, c.c.action_type, c.c.user_id))
+    )
+    user_counts: Dict[Any, int] = {}
+    action_counts: Dict[str, int] = {}
+    for status, action_type, user_id, g, count in result.all():
+        count = int(count)
+        if g == _BY_STATUS:
+            stats.total_actions += count
+            if status == TicketStatus.SUCCESS:
+                stats.success_count += count
+            elif status == TicketStatus.FAILED:
+                stats.failed_count += count
+        elif g == _BY_ACTION:
+            action_counts[action_type] = count
+        elif g == _BY_USER:
+            user_counts[user_id] = count
+    stats.by_action_type = dict(sorted(action_counts.items(), key=lambda kv: kv[1], reverse=True))
+
+    top = sorted(user_counts.items(), key=lambda kv: kv[1], reverse=True)[:TOP_USERS]
+    ids = [user_id for user_id, _ in top if user_id is not None]
+    users = {}
+    if ids:
+        result = await db.execute(
+            select(User.id, User.email, Entity.name)
+            .outerjoin(Entity, User.entity_id == Entity.id)
+            .where(User.id.in_(ids))
+        )
+        users = {user_id: (email, company) for user_id, email, company in result.all()}
+    stats.by_user = [
+        {
+            "user_id": str(user_id) if user_id else None,
+            "email": users.get(user_id, (None, None))[0],
+            "company_name": users.get(user_id, (None, None))[1],
+            "action_count": count,
+        }
+        for user_id, count in top
+    ]
+
+    # Daily series: last 30 days unless a start date is given
+    series_start = start_date or _utcnow() - timedelta(days=DEFAULT_SERIES_DAYS)
+    s = _counts(series_start, end_date, watermark)
+    result = await db.execute(
+        select(s.c.day, func.sum(s.c.count)).group_by(s.c.day).order_by(s.c.day)
+    )
+    stats.actions_over_time = [
+        {"date": day.isoformat(), "count": int(count)} for day, count in result.all()
+    ]
+    return stats
+
+
+async def compact_ticket_rollups(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Roll up every closed day after the watermark; returns the number of days added."""
+    cutoff = ((now or _utcnow()) - COMPACTION_GRACE).date()  # Days before this are closed
+    watermark = await rollup_watermark(db)
+    if watermark is None:
+        oldest = (await db.execute(select(func.min(TicketLog.timestamp)))).scalar()
+        if oldest is None:
+            return 0
+        watermark = oldest.date()
+
+    t, r = TicketLog, TicketLogRollup
+    day = func.date(t.timestamp)
+    start = watermark
+    while start < cutoff:
+        end = min(start + timedelta(days=COMPACTION_CHUNK_DAYS), cutoff)
+        await db.execute(
+            insert(r).from_select(
+                ["day", "action_type", "status", "user_id", "count"],
+                select(day, t.action_type, t.status, t.user_id, func.count())
+                .where(t.timestamp >= _midnight(start), t.timestamp < _midnight(end))
+                .group_by(day, t.action_type, t.status, t.user_id),
+            )
+        )
+        await db.commit()
+        start = end
+    return max((cutoff - watermark).days, 0)
+
+
+async def remove_from_rollups(db: AsyncSession, condition: ColumnElement) -> None:
+    """Subtract tickets matching `condition` from the rollups; call before deleting them."""
+    watermark = await rollup_watermark(db)
+    if watermark is None:
+        return
+    t, r = TicketLog, TicketLogRollup
+    day = func.date(t.timestamp)
+    removed = (
+        select(
+            day.label("day"),
+            t.action_type,
+            t.status,
+            t.user_id,
+            func.count().label("count"),
+        )
+        .where(condition, t.timestamp < _midnight(watermark))
+        .group_by(day, t.action_type, t.status, t.user_id)
+        .subquery()
+    )
+    await db.execute(
+        update(r)
+        .where(
+            r.day == removed.c.day,
+            r.action_type == removed.c.action_type,
+            r.status == removed.c.status,
+            r.user_id.is_not_distinct_from(removed.c.user_id),
+        )
+        .values(count=r.count - removed.c.count)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(r).where(r.count <= 0).execution_options(synchronize_session=False)
+    )
+
+
+async def run_ticket_rollup_compaction() -> None:
+    """Scheduler job: append closed days to ticket_log_rollups."""
+    async with AsyncSessionLocal() as db:
+        try:
+            days = await compact_ticket_rollups(db)
+        except IntegrityError as e:
+            # Another run rolled up the same days; the next run continues after them
+            await db.rollback()
+            logger.warning(f"Ticket rollup compaction skipped: {e}")
+            return
+    if days:
+        logger.info(f"Ticket rollups: compacted {days} day(s)")
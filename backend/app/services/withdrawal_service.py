@@ -26,7 +26,12 @@ from ..models.models import (
     Withdrawal,
     WithdrawalStatus,
 )
-from .balance_utils import get_entity_balance, update_entity_balance
+from .balance_utils import (
+    InsufficientBalanceError,
+    debit_available_balance,
+    get_available_balance,
+    update_entity_balance,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +43,17 @@ def generate_withdrawal_reference() -> str:
     return f"WD-{timestamp}-{unique_id}"
 
 
+def _insufficient_balance(asset_type: AssetType, available_balance: Decimal) -> dict:
+    return {
+        "success": False,
+        "error": (
+            f"Insufficient balance. Available: {available_balance} "
+            f"{asset_type.value}"
+        ),
+        "available_balance": str(available_balance),
+    }
+
+
 async def request_withdrawal(
     db: AsyncSession,
     entity_id: UUID,
@@ -68,17 +84,10 @@ async def request_withdrawal(
     if not entity:
         return {"success": False, "error": "Entity not found"}
 
-    # Check balance
-    current_balance = await get_entity_balance(db, entity_id, asset_type)
-    if current_balance < amount:
-        return {
-            "success": False,
-            "error": (
-                f"Insufficient balance. Available: {current_balance} "
-                f"{asset_type.value}"
-            ),
-            "available_balance": str(current_balance),
-        }
+    # Check balance (EUR reserved by open BUY orders is not available)
+    available_balance = await get_available_balance(db, entity_id, asset_type)
+    if available_balance < amount:
+        return _insufficient_balance(asset_type, available_balance)
 
     # Validate destination based on asset type
     if asset_type == AssetType.EUR:
@@ -98,6 +107,22 @@ async def request_withdrawal(
     # Generate internal reference
     internal_reference = generate_withdrawal_reference()
 
+    # Debit balance immediately (reserve funds); re-checked atomically in case
+    # an order reserved EUR since the check above
+    try:
+        await debit_available_balance(
+            db=db,
+            entity_id=entity_id,
+            asset_type=asset_type,
+            amount=amount,
+            transaction_type=TransactionType.WITHDRAWAL,
+            created_by=user_id,
+            reference=internal_reference,
+            notes="Withdrawal request - pending approval",
+        )
+    except InsufficientBalanceError as e:
+        return _insufficient_balance(asset_type, e.available)
+
     # Create withdrawal record
     withdrawal = Withdrawal(
         entity_id=entity_id,
@@ -116,19 +141,6 @@ async def request_withdrawal(
         requested_at=datetime.now(timezone.utc).replace(tzinfo=None),
     )
     db.add(withdrawal)
-
-    # Debit balance immediately (reserve funds)
-    await update_entity_balance(
-        db=db,
-        entity_id=entity_id,
-        asset_type=asset_type,
-        amount=-amount,  # Negative for debit
-        transaction_type=TransactionType.WITHDRAWAL,
-        created_by=user_id,
-        reference=internal_reference,
-        notes="Withdrawal request - pending approval",
-    )
-
     await db.flush()
 
     logger.info(
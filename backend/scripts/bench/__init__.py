@@ -0,0 +1 @@
+# Benchmarks, run by hand (python -m scripts.bench.<name>); not part of the test suite
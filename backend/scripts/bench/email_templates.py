@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: precompiled email templates with memoized layouts vs the
+per-send FileSystemLoader lookup and full render they replaced.
+Run: docker compose exec backend python -m scripts.bench.email_templates
+"""
+
+import timeit
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.services.email_service import TEMPLATE_DIR, TEMPLATE_SAMPLE_DATA
+from app.services.email_templates import TemplateRenderer
+
+TEMPLATE = "settlement_status_update.html"
+RECIPIENTS = 200
+
+
+def main() -> None:
+    # Previous EmailService setup: default Environment (auto_reload stats the file on every lookup)
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(["html"]))
+    renderer = TemplateRenderer(TEMPLATE_DIR)
+    renderer.precompile()
+    context = TEMPLATE_SAMPLE_DATA[TEMPLATE]
+    contexts = [{**context, "name": f"User {i}"} for i in range(RECIPIENTS)]
+    runs = 20
+
+    def baseline():
+        return [env.get_template(TEMPLATE).render(**c) for c in contexts]
+
+    def precompiled():
+        return [renderer.render(TEMPLATE, **c) for c in contexts]
+
+    def bulk():
+        return renderer.render_many(TEMPLATE, contexts)
+
+    assert baseline() == precompiled() == bulk()
+
+    before = timeit.timeit(baseline, number=runs) / runs
+    single = timeit.timeit(precompiled, number=runs) / runs
+    many = timeit.timeit(bulk, number=runs) / runs
+
+    compile_all = timeit.timeit(
+        lambda: TemplateRenderer(TEMPLATE_DIR, bytecode_cache=False).precompile(), number=3
+    ) / 3
+    cached_compile = timeit.timeit(lambda: TemplateRenderer(TEMPLATE_DIR).precompile(), number=3) / 3
+
+    print(f"{TEMPLATE}, {RECIPIENTS} recipients")
+    print(f"lookup + full render:     {before * 1000:8.2f} ms  ({RECIPIENTS / before:,.0f} emails/s)")
+    print(f"precompiled render:       {single * 1000:8.2f} ms  ({before / single:.1f}x)")
+    print(f"render_many:              {many * 1000:8.2f} ms  ({before / many:.1f}x)")
+    print(f"startup compile (Jinja):  {compile_all * 1000:8.2f} ms")
+    print(f"startup (bytecode cache): {cached_compile * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
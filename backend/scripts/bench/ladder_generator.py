@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: vectorized LadderGenerator vs the per-order random/Decimal loop
+it replaced in build_ladder.
+Run: docker compose exec backend python -m scripts.bench.ladder_generator
+"""
+
+import random
+import timeit
+from decimal import Decimal
+
+from app.services.ladder_generator import LadderGenerator, LadderParams
+
+START = Decimal("12.0")
+STEP = Decimal("0.1")
+PARAMS = LadderParams(
+    target_liquidity_eur=Decimal("90000000"),
+    min_volume_eur=Decimal("20000"),
+    max_volume_eur=Decimal("80000"),
+    max_orders=4000,
+    max_orders_per_level=3,
+)
+
+
+def per_order_ladder(params: LadderParams, rng: random.Random):
+    """The previous build_ladder loop: one random draw and Decimal division per order."""
+    orders = []
+    current_price = START
+    orders_at_level = 0
+    max_at_this_level = rng.randint(1, params.max_orders_per_level)
+    liquidity_eur = Decimal("0")
+    for _ in range(params.max_orders):
+        if liquidity_eur >= params.target_liquidity_eur:
+            break
+        if orders_at_level >= max_at_this_level:
+            current_price = (current_price + STEP).quantize(STEP)
+            orders_at_level = 0
+            max_at_this_level = rng.randint(1, params.max_orders_per_level)
+        remaining = params.target_liquidity_eur - liquidity_eur
+        effective_max = min(params.max_volume_eur, remaining)
+        if effective_max < params.min_volume_eur:
+            break
+        value = Decimal(str(round(rng.uniform(float(params.min_volume_eur), float(effective_max)), 2)))
+        quantity = max((value / current_price).quantize(Decimal("1")), Decimal("1"))
+        orders.append((current_price, quantity))
+        orders_at_level += 1
+        liquidity_eur += quantity * current_price
+    return orders
+
+
+def main() -> None:
+    rng = random.Random(42)
+    gen = LadderGenerator(seed=42)
+    runs = 20
+
+    baseline = timeit.timeit(lambda: per_order_ladder(PARAMS, rng), number=runs) / runs
+    vectorized = timeit.timeit(lambda: gen.ladder(START, STEP, PARAMS), number=runs) / runs
+
+    def ladder_as_decimals():
+        arrays = gen.ladder(START, STEP, PARAMS)
+        return list(zip(arrays.prices(), arrays.quantities.tolist()))
+
+    with_decimals = timeit.timeit(ladder_as_decimals, number=runs) / runs
+
+    n = len(gen.ladder(START, STEP, PARAMS))
+    print(f"orders per ladder:        {n}")
+    print(f"per-order loop:           {baseline * 1000:8.2f} ms")
+    print(f"vectorized (arrays):      {vectorized * 1000:8.2f} ms  ({baseline / vectorized:.1f}x)")
+    print(f"vectorized (+ Decimal):   {with_decimals * 1000:8.2f} ms  ({baseline / with_decimals:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
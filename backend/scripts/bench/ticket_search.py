@@ -0,0 +1,127 @@
+"""
+Benchmark: ticket search before and after the trigram / tsvector / JSONB GIN
+indexes, on a generated multi-million-row copy of ticket_logs. Needs the app
+database with migrations applied; the copy lives in a scratch schema that is
+dropped at the end.
+Run: docker compose exec backend python -m scripts.bench.ticket_search [rows]
+"""
+
+import asyncio
+import hashlib
+import statistics
+import sys
+import time
+
+from sqlalchemy import select, text
+
+from app.core.database import engine
+from app.models.models import TicketLog
+from app.services.ticket_search import payload_filter, search_filter
+
+SCHEMA = "bench_ticket_search"
+DEFAULT_ROWS = 2_000_000
+RUNS = 5
+
+FILL = f"""
+INSERT INTO {SCHEMA}.ticket_logs (
+    id, ticket_id, timestamp, action_type, entity_type, status,
+    request_payload, response_data, related_ticket_ids, tags
+)
+SELECT
+    gen_random_uuid(),
+    'TKT-2026-' || lpad(i::text, 8, '0'),
+    localtimestamp - i * interval '1 second',
+    (ARRAY['ORDER_PLACED', 'ORDER_CANCELLED', 'TRADE_EXECUTED', 'LOGIN', 'DEPOSIT_CONFIRMED',
+           'SETTLEMENT_ADVANCED', 'MM_CREATED', 'ASSET_ADJUSTED'])[1 + i % 8],
+    (ARRAY['Order', 'User', 'Deposit', 'SettlementBatch', 'MarketMaker'])[1 + i % 5],
+    (CASE WHEN i % 20 = 0 THEN 'FAILED' ELSE 'SUCCESS' END)::ticketstatus,
+    jsonb_build_object(
+        'order_id', md5(i::text),
+        'certificate_type', (ARRAY['CEA', 'EUA'])[1 + i % 2],
+        'quantity', i % 5000
+    ),
+    jsonb_build_object('buyer_mm_id', md5((i % 40)::text), 'price', 60 + i % 30),
+    '{{}}',
+    ARRAY['bench']
+FROM generate_series(1, :rows) AS i
+"""
+
+INDEXES = [
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (ticket_id gin_trgm_ops)",
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (action_type gin_trgm_ops)",
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (entity_type gin_trgm_ops)",
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (search_vector)",
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (request_payload)",
+    "CREATE INDEX ON {schema}.ticket_logs USING gin (response_data)",
+]
+
+
+def _cases(rows: int):
+    needle = rows // 2
+    return [
+        ("contains ticket id", search_filter(f"{needle:08d}", "contains")),
+        ("prefix ticket id", search_filter(f"TKT-2026-{needle:08d}"[:-1], "prefix")),
+        ("fuzzy 'setlment advanced'", search_filter("setlment advanced", "fuzzy")),
+        ("text payload value", search_filter(_md5_of(needle), "text")),
+        ("payload key/value", payload_filter("order_id", _md5_of(needle))),
+        ("payload key present", payload_filter("no_such_key")),
+    ]
+
+
+def _md5_of(i: int) -> str:
+    return hashlib.md5(str(i).encode()).hexdigest()
+
+
+async def _time(conn, condition) -> float:
+    query = select(TicketLog.id).where(condition).order_by(TicketLog.timestamp.desc()).limit(50)
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await conn.execute(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+async def main(rows: int) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(
+            text(
+                f"CREATE TABLE {SCHEMA}.ticket_logs "
+                "(LIKE public.ticket_logs INCLUDING DEFAULTS INCLUDING GENERATED)"
+            )
+        )
+        start = time.perf_counter()
+        await conn.execute(text(FILL), {"rows": rows})
+        # Listing order index, present before this change
+        await conn.execute(text(f"CREATE INDEX ON {SCHEMA}.ticket_logs (timestamp, id)"))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.ticket_logs"))
+        await conn.commit()
+        print(f"{rows:,} tickets generated in {time.perf_counter() - start:.1f} s")
+
+        # Unqualified ticket_logs now resolves to the scratch table
+        await conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+        cases = _cases(rows)
+        before = [await _time(conn, condition) for _, condition in cases]
+
+        start = time.perf_counter()
+        for statement in INDEXES:
+            await conn.execute(text(statement.format(schema=SCHEMA)))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.ticket_logs"))
+        await conn.commit()
+        print(f"search indexes built in {time.perf_counter() - start:.1f} s")
+
+        after = [await _time(conn, condition) for _, condition in cases]
+        for (label, _), b, a in zip(cases, before, after):
+            print(f"{label:28s} {b * 1000:10.2f} ms -> {a * 1000:8.2f} ms  ({b / a:.1f}x)")
+
+        await conn.execute(text("RESET search_path"))
+        await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+        await conn.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS))
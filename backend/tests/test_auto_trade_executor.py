@@ -0,0 +1,234 @@
+"""
+Unit tests for the auto-trade executor cycle (rules partitioned by order book,
+books isolated from each other's failures, per-book MarketContext shared by
+rules and rebuilt when stale). Mocks sessions, order placement and matching.
+
+Run: docker compose exec backend pytest tests/test_auto_trade_executor.py -v
+"""
+
+import asyncio
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import (
+    AutoTradePriceMode,
+    AutoTradeQuantityMode,
+    AutoTradeRule,
+    CertificateType,
+    MarketMakerClient,
+    MarketMakerType,
+    MarketType,
+    OrderSide,
+)
+from app.services import auto_trade_executor
+from app.services.auto_trade_executor import AutoTradeExecutor, MarketContext
+
+ADMIN = uuid.uuid4()
+
+
+# Fixed 5 @ 10.0 SELL, at most one open order per market maker
+RULE = dict(
+    side=OrderSide.SELL,
+    order_type="LIMIT",
+    price_mode=AutoTradePriceMode.FIXED,
+    fixed_price=Decimal("10.0"),
+    quantity_mode=AutoTradeQuantityMode.FIXED,
+    fixed_quantity=Decimal("5"),
+    interval_mode="fixed",
+    interval_seconds=60,
+    max_active_orders=1,
+)
+
+
+def _rule(market_maker, name):
+    return AutoTradeRule(
+        id=uuid.uuid4(), market_maker=market_maker, market_maker_id=market_maker.id, name=name, **RULE
+    )
+
+
+def _context():
+    return MarketContext(
+        certificate_type=CertificateType.CEA,
+        market_type=MarketType.CEA_CASH,
+        best_bid=Decimal("9.5"),
+        best_ask=Decimal("10.5"),
+        market_price=Decimal("10.0"),
+        eua_eur_price=None,
+        liquidity={OrderSide.BUY: Decimal("0"), OrderSide.SELL: Decimal("0")},
+        market_settings={"CEA_ASK": None},
+    )
+
+
+def _session_factory(rules):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rules
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=db)
+    session.__aexit__ = AsyncMock(return_value=False)
+    return db, lambda: session
+
+
+@pytest.fixture
+def seller():
+    return MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.CEA_SELLER, is_active=True)
+
+
+@pytest.fixture
+def mocked(monkeypatch):
+    mocks = SimpleNamespace(
+        build=AsyncMock(side_effect=lambda *args: _context()),
+        place=AsyncMock(side_effect=lambda *args: (SimpleNamespace(id=uuid.uuid4()), "TKT-1")),
+        match=AsyncMock(return_value=0),
+    )
+    monkeypatch.setattr(AutoTradeExecutor, "build_market_context", mocks.build)
+    monkeypatch.setattr(AutoTradeExecutor, "place_order", mocks.place)
+    monkeypatch.setattr(AutoTradeExecutor, "try_match_orders", mocks.match)
+    return mocks
+
+
+def test_record_order_updates_the_snapshot():
+    mm_id = uuid.uuid4()
+    context = _context()
+
+    context.record_order(mm_id, OrderSide.SELL, Decimal("10.2"), Decimal("5"))
+    context.record_order(mm_id, OrderSide.BUY, Decimal("9.8"), Decimal("10"))
+
+    assert context.active_orders == {mm_id: 2}
+    assert context.orders_at_price == {(OrderSide.SELL, Decimal("10.2")): 1, (OrderSide.BUY, Decimal("9.8")): 1}
+    assert context.liquidity == {OrderSide.BUY: Decimal("98.0"), OrderSide.SELL: Decimal("51.0")}
+    assert (context.best_bid, context.best_ask) == (Decimal("9.8"), Decimal("10.2"))
+
+
+def test_record_order_values_swap_liquidity_in_eua_price():
+    context = _context()
+    context.market_type = MarketType.SWAP
+    context.eua_eur_price = Decimal("70")
+
+    context.record_order(uuid.uuid4(), OrderSide.SELL, Decimal("0.5"), Decimal("100"))
+
+    assert context.liquidity[OrderSide.SELL] == Decimal("7000")
+
+
+@pytest.mark.asyncio
+async def test_second_rule_sees_first_rules_order(monkeypatch, mocked, seller):
+    rules = [_rule(seller, "first"), _rule(seller, "second")]
+    _, factory = _session_factory(rules)
+    monkeypatch.setattr(auto_trade_executor, "AsyncSessionLocal", factory)
+
+    results = await AutoTradeExecutor.execute_market_rules(
+        "CEA_CASH", [rule.id for rule in rules], ADMIN
+    )
+
+    # One snapshot for the book; the first order counts against the shared max_active_orders
+    assert mocked.build.await_count == 1
+    assert mocked.place.await_count == 1
+    assert results[0]["success"]
+    assert not results[1]["success"]
+    assert results[1]["reason"] == "validation_failed: max_active_orders_reached (1/1)"
+
+
+@pytest.mark.asyncio
+async def test_stale_context_is_rebuilt_before_next_rule(monkeypatch, mocked, seller):
+    rules = [_rule(seller, "first"), _rule(seller, "second")]
+    _, factory = _session_factory(rules)
+    monkeypatch.setattr(auto_trade_executor, "AsyncSessionLocal", factory)
+    # The first order matched: the book changed in ways the snapshot doesn't track
+    mocked.match.side_effect = [1, 0]
+
+    results = await AutoTradeExecutor.execute_market_rules(
+        "CEA_CASH", [rule.id for rule in rules], ADMIN
+    )
+
+    assert mocked.build.await_count == 2
+    # The rebuilt snapshot no longer counts against max_active_orders
+    assert [r["success"] for r in results] == [True, True]
+    assert mocked.build.await_args_list[1].args[2:] == (
+        MarketType.CEA_CASH, ["CEA_ASK"], [seller.id]
+    )
+
+
+@pytest.mark.asyncio
+async def test_ready_rules_are_partitioned_by_order_book(monkeypatch):
+    buyer = MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.CEA_BUYER, is_active=True)
+    seller = MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.CEA_SELLER, is_active=True)
+    swapper = MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.EUA_OFFER, is_active=True)
+    rules = [_rule(buyer, "bid"), _rule(swapper, "swap"), _rule(seller, "ask")]
+    monkeypatch.setattr(AutoTradeExecutor, "get_rules_ready_for_execution", AsyncMock(return_value=rules))
+    groups = {}
+
+    async def execute_market_rules(book_key, rule_ids, admin_user_id):
+        groups[book_key] = rule_ids
+        return [{"market": book_key, "rule_id": str(rule_id)} for rule_id in rule_ids]
+
+    monkeypatch.setattr(AutoTradeExecutor, "execute_market_rules", execute_market_rules)
+
+    results = await AutoTradeExecutor.execute_all_ready_rules(MagicMock(), ADMIN)
+
+    # BID and ASK share the CEA cash book and keep their ready order
+    assert groups == {"CEA_CASH": [rules[0].id, rules[2].id], "SWAP": [rules[1].id]}
+    assert len(results) == 3
+
+
+@pytest.mark.asyncio
+async def test_failing_market_does_not_abort_the_others(monkeypatch, seller):
+    swapper = MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.EUA_OFFER, is_active=True)
+    rules = [_rule(swapper, "swap"), _rule(seller, "ask")]
+    monkeypatch.setattr(AutoTradeExecutor, "get_rules_ready_for_execution", AsyncMock(return_value=rules))
+
+    async def execute_market_rules(book_key, rule_ids, admin_user_id):
+        if book_key == "SWAP":
+            raise ConnectionError("swap session lost")
+        return [{"market": book_key, "success": True}]
+
+    monkeypatch.setattr(AutoTradeExecutor, "execute_market_rules", execute_market_rules)
+
+    results = await AutoTradeExecutor.execute_all_ready_rules(MagicMock(), ADMIN)
+
+    assert results == [{"market": "CEA_CASH", "success": True}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit, expected", [(1, 1), (2, 2)])
+async def test_concurrent_markets_are_bounded(monkeypatch, seller, limit, expected):
+    swapper = MarketMakerClient(id=uuid.uuid4(), mm_type=MarketMakerType.EUA_OFFER, is_active=True)
+    rules = [_rule(swapper, "swap"), _rule(seller, "ask")]
+    monkeypatch.setattr(AutoTradeExecutor, "get_rules_ready_for_execution", AsyncMock(return_value=rules))
+    running = SimpleNamespace(now=0, peak=0)
+
+    async def execute_market_rules(book_key, rule_ids, admin_user_id):
+        running.now += 1
+        running.peak = max(running.peak, running.now)
+        await asyncio.sleep(0.01)
+        running.now -= 1
+        return []
+
+    monkeypatch.setattr(AutoTradeExecutor, "execute_market_rules", execute_market_rules)
+
+    await AutoTradeExecutor.execute_all_ready_rules(MagicMock(), ADMIN, max_concurrent_markets=limit)
+
+    assert running.peak == expected
+
+
+@pytest.mark.asyncio
+async def test_failed_rule_rolls_back_and_the_book_continues(monkeypatch, mocked, seller):
+    rules = [_rule(seller, "first"), _rule(seller, "second")]
+    db, factory = _session_factory(rules)
+    monkeypatch.setattr(auto_trade_executor, "AsyncSessionLocal", factory)
+    mocked.place.side_effect = [RuntimeError("flush failed"), (SimpleNamespace(id=uuid.uuid4()), "TKT-2")]
+
+    results = await AutoTradeExecutor.execute_market_rules(
+        "CEA_CASH", [rule.id for rule in rules], ADMIN
+    )
+
+    assert results[0]["reason"] == "exception: flush failed"
+    db.rollback.assert_awaited_once()
+    assert results[1]["success"]
+    assert all(r["market"] == "CEA_CASH" for r in results)
@@ -0,0 +1,96 @@
+"""
+Unit tests for the offline auto-trade simulator (in-memory book, virtual clock, grids).
+Run: docker compose exec backend pytest tests/test_auto_trade_simulator.py -v
+"""
+
+import random
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.models.models import MarketType, OrderSide
+from app.services.auto_trade_simulator import (
+    PriceSeries,
+    SimBook,
+    SimulationConfig,
+    apply_overrides,
+    expand_grid,
+    run_simulation,
+)
+
+A, B = uuid.uuid4(), uuid.uuid4()
+
+
+@pytest.fixture
+def config() -> SimulationConfig:
+    return SimulationConfig(
+        rules=[
+            {"name": "bid", "market_maker": "buyer", "mm_type": "CEA_BUYER", "side": "BUY", "interval_seconds": 15},
+            {"name": "ask", "market_maker": "seller", "mm_type": "CEA_SELLER", "side": "SELL", "interval_seconds": 15},
+        ],
+        market_settings={
+            "CEA_BID": {"target_liquidity": Decimal("500000"), "min_order_volume_eur": Decimal("20000")},
+            "CEA_ASK": {"target_liquidity": Decimal("500000"), "min_order_volume_eur": Decimal("20000")},
+        },
+        prices=PriceSeries.synthetic(Decimal("12.5"), duration_seconds=3600, seed=1),
+        initial_book=[("buyer", "BUY", "12.3", "500"), ("seller", "SELL", "12.7", "500")],
+        seed=7,
+    )
+
+
+def test_book_matches_crossing_orders_at_sell_price():
+    book = SimBook(MarketType.CEA_CASH)
+    book.place(A, OrderSide.SELL, Decimal("12.0"), Decimal("10"))
+    book.place(B, OrderSide.BUY, Decimal("12.2"), Decimal("4"))
+    trades = book.match()
+    assert [(t.price, t.quantity) for t in trades] == [(Decimal("12.0"), Decimal("4"))]
+    assert book.best_bid is None
+    assert book.remaining_qty[OrderSide.SELL] == Decimal("6")
+    assert book.level_counts[(OrderSide.SELL, Decimal("12.0"))] == 1
+
+
+def test_book_never_matches_same_market_maker():
+    book = SimBook(MarketType.CEA_CASH)
+    book.place(A, OrderSide.SELL, Decimal("12.0"), Decimal("10"))
+    book.place(A, OrderSide.BUY, Decimal("12.2"), Decimal("4"))
+    assert book.match() == []
+    assert book.internal_trade() is None  # Crossed book, no spread to trade in
+
+
+def test_internal_trade_prices_inside_spread():
+    book = SimBook(MarketType.CEA_CASH)
+    book.place(A, OrderSide.BUY, Decimal("12.0"), Decimal("5"))
+    book.place(B, OrderSide.SELL, Decimal("12.5"), Decimal("8"))
+    trade = book.internal_trade()
+    assert Decimal("12.0") < trade.price < Decimal("12.5")
+    assert trade.quantity == Decimal("5")
+    assert book.liquidity(OrderSide.SELL, None) == Decimal("12.5") * 3
+
+
+def test_price_series_is_a_step_function():
+    series = PriceSeries.synthetic(Decimal("10"), duration_seconds=600, step_seconds=60, seed=4)
+    assert len(series.times) == 11
+    assert series.at(series.start) == Decimal("10.00")
+    assert series.at(series.times[3]) == series.at(series.times[3].replace(second=30))
+
+
+def test_same_seed_same_report(config):
+    global_state = random.getstate()
+    first = run_simulation(config)
+    second = run_simulation(config)
+    assert random.getstate() == global_state  # Seeded per run, not process-wide
+    assert first.cycles == 720
+    assert first.rule_executions > 0
+    assert first.outcomes == second.outcomes
+    assert first.traded_value_eur == second.traded_value_eur
+    assert first.liquidity_eur == second.liquidity_eur
+
+
+def test_grid_overrides(config):
+    combos = expand_grid({"CEA_BID.price_deviation_pct": [Decimal("0.2"), Decimal("1")], "cycle_seconds": [5, 10]})
+    assert len(combos) == 4
+    tuned = apply_overrides(config, {"CEA_BID.price_deviation_pct": Decimal("1"), "rule:ask.interval_seconds": 60})
+    assert tuned.market_settings["CEA_BID"]["price_deviation_pct"] == Decimal("1")
+    assert [r["interval_seconds"] for r in tuned.rules] == [15, 60]
+    assert tuned.params == {"CEA_BID.price_deviation_pct": "1", "rule:ask.interval_seconds": "60"}
@@ -1,5 +1,5 @@
 """
-Unit tests for balance_utils.get_entity_eur_balance.
+Unit tests for balance_utils (get_entity_eur_balance, batch balance updates).
 Run from backend container: pytest tests/test_balance_utils.py -v
 """
 
@@ -10,8 +10,14 @@ import pytest
 from sqlalchemy import select
 
 from app.core.database import AsyncSessionLocal
-from app.models.models import AssetType, Entity, EntityHolding, Jurisdiction
-from app.services.balance_utils import get_entity_eur_balance
+from app.models.models import AssetType, Entity, EntityHolding, Jurisdiction, TransactionType
+from app.services.balance_utils import (
+    BalanceChange,
+    InsufficientBalanceError,
+    _running_balances,
+    debit_available_balance,
+    get_entity_eur_balance,
+)
 
 
 @pytest.mark.asyncio
@@ -116,3 +122,81 @@ async def test_get_entity_eur_balance_no_holding_no_balance_amount_returns_zero(
         assert result == Decimal("0")
 
         await db.rollback()
+
+
+@pytest.mark.asyncio
+async def test_debit_available_balance_excludes_reserved_eur():
+    """EUR reserved for open BUY orders can't be debited (e.g. withdrawn)."""
+    entity_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add(Entity(id=entity_id, name="Test EUR Reserved", jurisdiction=Jurisdiction.OTHER))
+        await db.flush()
+        db.add(
+            EntityHolding(
+                entity_id=entity_id,
+                asset_type=AssetType.EUR,
+                quantity=Decimal("1000.00"),
+                reserved=Decimal("800.00"),
+            )
+        )
+        await db.flush()
+
+        with pytest.raises(InsufficientBalanceError) as exc:
+            await debit_available_balance(
+                db, entity_id, AssetType.EUR, Decimal("300"), TransactionType.WITHDRAWAL, None
+            )
+        assert exc.value.available == Decimal("200.00")
+
+        balance = await debit_available_balance(
+            db, entity_id, AssetType.EUR, Decimal("200"), TransactionType.WITHDRAWAL, None
+        )
+        assert balance == Decimal("800.00")
+
+        await db.rollback()
+
+
+def test_running_balances_chain_changes_to_same_holding():
+    """Audit rows of one batch chain before/after per holding from the upserted totals."""
+    a, b, admin = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    def change(entity_id, amount):
+        return BalanceChange(entity_id, AssetType.EUR, Decimal(amount), TransactionType.DEPOSIT, admin)
+
+    changes = [change(a, "100"), change(b, "50"), change(a, "-30.005")]
+    # After the upsert: a = 20 + 100 - 30.01, b = 50 (new holding)
+    totals = {(a, AssetType.EUR): Decimal("89.99"), (b, AssetType.EUR): Decimal("50")}
+    assert _running_balances(changes, totals) == [
+        (Decimal("20.00"), Decimal("120.00")),
+        (Decimal("0"), Decimal("50")),
+        (Decimal("120.00"), Decimal("89.99")),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_balance_loader_batches_and_matches_single_lookups():
+    """EntityBalanceLoader resolves many entities at once with the same EUR rules."""
+    from app.services.balance_loader import EntityBalanceLoader
+
+    seeded, funded = uuid.uuid4(), uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            Entity(id=seeded, name="Loader Seeded", jurisdiction=Jurisdiction.OTHER,
+                   balance_amount=Decimal("1000.00")),
+            Entity(id=funded, name="Loader Funded", jurisdiction=Jurisdiction.OTHER,
+                   balance_amount=Decimal("999.00")),
+        ])
+        await db.flush()
+        db.add_all([
+            EntityHolding(entity_id=funded, asset_type=AssetType.EUR,
+                          quantity=Decimal("500.00"), reserved=Decimal("120.00")),
+            EntityHolding(entity_id=funded, asset_type=AssetType.CEA, quantity=Decimal("42")),
+        ])
+        await db.flush()
+
+        loader = EntityBalanceLoader(db)
+        a, b = await loader.load_many([seeded, funded])
+        assert a.eur == Decimal("1000.00") == await get_entity_eur_balance(db, seeded)
+        assert b.eur == Decimal("380.00") == await get_entity_eur_balance(db, funded)
+        assert (b.cea, b.eua, b.eur_reserved) == (Decimal("42"), Decimal("0"), Decimal("120.00"))
+
+        await db.rollback()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the business-day calendar (weekends, TARGET2 holidays, index lookups).
+Run: docker compose exec backend pytest tests/test_business_calendar.py -v
+"""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from app.models.models import CertificateType, Jurisdiction
+from app.services.business_calendar import (
+    BusinessCalendar,
+    _easter_sunday,
+    add_business_days,
+    business_days_between,
+    jurisdiction_for_certificate,
+)
+from app.services.settlement_monitoring import SettlementMonitoring
+
+
+def _loop_add(start: datetime, days: int) -> datetime:
+    """Reference: the day-by-day loop the calendar replaces (weekends only)."""
+    current = start
+    while days > 0:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            days -= 1
+    return current
+
+
+def test_matches_weekend_loop_without_holidays():
+    calendar = BusinessCalendar(Jurisdiction.OTHER, holidays=[])
+    start = datetime(2026, 10, 1, 9, 45)
+    for offset in range(14):
+        for days in range(0, 8):
+            day = start + timedelta(days=offset)
+            assert calendar.add_business_days(day, days) == _loop_add(day, days)
+
+
+def test_easter_dates():
+    assert _easter_sunday(2026) == date(2026, 4, 5)
+    assert _easter_sunday(2027) == date(2027, 3, 28)
+
+
+def test_eu_skips_target_holidays():
+    # Thursday before Easter 2026: Good Friday and Easter Monday are closed
+    assert add_business_days(datetime(2026, 4, 2, 15, 0), 1) == datetime(2026, 4, 7, 15, 0)
+    assert add_business_days(datetime(2026, 12, 24), 1) == datetime(2026, 12, 28)
+    assert business_days_between(date(2026, 4, 2), date(2026, 4, 7)) == 1
+
+
+def test_configured_holidays_and_counts():
+    calendar = BusinessCalendar(Jurisdiction.CN, holidays=[date(2026, 10, 19)])
+    # Friday + 1 skips the weekend and the Monday holiday
+    assert calendar.add_business_days(datetime(2026, 10, 16), 1) == datetime(2026, 10, 20)
+    assert calendar.business_days_between(date(2026, 10, 16), date(2026, 10, 23)) == 4
+    assert not calendar.is_business_day(date(2026, 10, 19))
+
+
+def test_certificate_jurisdictions():
+    assert jurisdiction_for_certificate(CertificateType.CEA) == Jurisdiction.CN
+    assert jurisdiction_for_certificate(CertificateType.EUA) == Jurisdiction.EU
+
+
+def test_monitoring_counts_overdue_settlements_in_business_days():
+    # Expected Friday, checked Monday: one business day late, not three
+    settlement = SimpleNamespace(
+        expected_settlement_date=datetime(2026, 10, 16, 12), asset_type=CertificateType.EUA
+    )
+    assert SettlementMonitoring.business_days_overdue(settlement, datetime(2026, 10, 19, 9)) == 1
@@ -0,0 +1,85 @@
+"""
+Unit tests for the shared on-commit hooks: values collected at flush are
+published once after the outer commit and dropped on rollback. Uses an
+in-memory SQLite session with a throwaway model.
+
+Run: docker compose exec backend pytest tests/test_commit_hooks.py -v
+"""
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core import commit_hooks
+from app.core.commit_hooks import on_commit
+
+Base = declarative_base()
+
+
+class Widget(Base):
+    __tablename__ = "widgets"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+@pytest.fixture
+def published(monkeypatch):
+    # Only the test hooks are registered while a test runs
+    monkeypatch.setattr(commit_hooks, "_hooks", {})
+    monkeypatch.setattr(commit_hooks, "_hooks_by_class", {})
+    calls = []
+    on_commit(
+        "test_widgets",
+        Widget,
+        collect=lambda new, dirty, deleted: [w.name for w in new + dirty + deleted],
+        publish=calls.append,
+    )
+    on_commit("test_widgets_signal", Widget, publish=lambda: calls.append("signal"))
+    return calls
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_flushes_are_published_once_after_commit(published, session):
+    session.add(Widget(name="a"))
+    session.flush()
+    session.add(Widget(name="b"))
+    assert published == []
+
+    session.commit()
+
+    assert published == [["a", "b"], "signal"]
+
+
+def test_rollback_publishes_nothing(published, session):
+    session.add(Widget(name="a"))
+    session.flush()
+    session.rollback()
+    session.commit()
+
+    assert published == []
+
+
+def test_rolled_back_savepoint_is_not_published(published, session):
+    session.add(Widget(name="kept"))
+    session.flush()
+    savepoint = session.begin_nested()
+    session.add(Widget(name="inner"))
+    session.flush()
+    inner = session.begin_nested()
+    session.add(Widget(name="innermost"))
+    session.flush()
+    inner.commit()  # Released into the savepoint rolled back below
+    savepoint.rollback()
+    with session.begin_nested():
+        session.add(Widget(name="released"))
+    session.commit()
+
+    assert published == [["kept", "released"], "signal"]
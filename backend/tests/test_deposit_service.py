@@ -0,0 +1,57 @@
+"""
+Unit tests for auto-clearing expired deposit holds (batch with per-deposit
+fallback). Mocks the session and the clearing helpers.
+
+Run: docker compose exec backend pytest tests/test_deposit_service.py -v
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import deposit_service
+
+
+@asynccontextmanager
+async def _savepoint():
+    yield
+
+
+def _session():
+    db = MagicMock()
+    db.begin_nested = MagicMock(side_effect=lambda: _savepoint())
+    return db
+
+
+@pytest.mark.asyncio
+async def test_expired_holds_are_cleared_in_one_batch(monkeypatch):
+    expired = [SimpleNamespace(id=uuid.uuid4()) for _ in range(3)]
+    monkeypatch.setattr(deposit_service, "get_expired_holds", AsyncMock(return_value=expired))
+    clear_batch = AsyncMock()
+    monkeypatch.setattr(deposit_service, "_clear_deposits", clear_batch)
+
+    assert await deposit_service.process_expired_holds(_session(), uuid.uuid4()) == 3
+    clear_batch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bad_deposit_does_not_block_the_others(monkeypatch):
+    expired = [SimpleNamespace(id=uuid.uuid4()) for _ in range(3)]
+    bad_id = expired[1].id
+    monkeypatch.setattr(deposit_service, "get_expired_holds", AsyncMock(return_value=expired))
+    monkeypatch.setattr(
+        deposit_service, "_clear_deposits", AsyncMock(side_effect=RuntimeError("bad row"))
+    )
+
+    async def clear_one(db, deposit_id, **kwargs):
+        if deposit_id == bad_id:
+            raise RuntimeError("bad row")
+
+    clear_one_mock = AsyncMock(side_effect=clear_one)
+    monkeypatch.setattr(deposit_service, "clear_deposit", clear_one_mock)
+
+    assert await deposit_service.process_expired_holds(_session(), uuid.uuid4()) == 2
+    assert clear_one_mock.await_count == 3
@@ -0,0 +1,74 @@
+"""
+Unit tests for the email outbox (queueing, Resend batch delivery, backoff).
+Mocks the session and the Resend call — nothing is sent, no database needed.
+
+Run: docker compose exec backend pytest tests/test_email_outbox.py -v
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from resend.exceptions import ApplicationError, ValidationError
+
+from app.models.models import EmailOutbox
+from app.services.email_outbox import _deliver_resend, retry_delay
+from app.services.email_service import EmailService
+
+
+def _row(to="user@test.com"):
+    return SimpleNamespace(
+        id=uuid4(), to_email=to, from_email=None, subject="Hi", html="<p>Hi</p>", attempts=1
+    )
+
+
+@pytest.mark.asyncio
+async def test_send_inside_outbox_joins_callers_session():
+    svc = EmailService()
+    db = MagicMock()
+    with svc.outbox(db):
+        assert await svc.send_account_approved("user@test.com", "John") is True
+    [row] = db.add_all.call_args.args[0]
+    assert isinstance(row, EmailOutbox)
+    assert row.to_email == "user@test.com"
+    assert "John" in row.html
+
+
+@pytest.mark.asyncio
+async def test_resend_batch_is_one_call():
+    rows = [_row(f"u{i}@test.com") for i in range(3)]
+    with patch.object(EmailService, "send_resend", new_callable=AsyncMock) as send:
+        outcomes = await _deliver_resend(rows, "re_key", None)
+    send.assert_awaited_once()
+    assert len(send.call_args.args[1]) == 3
+    assert all(o.sent for o in outcomes)
+
+
+@pytest.mark.asyncio
+async def test_invalid_message_in_batch_fails_alone():
+    rows = [_row("ok@test.com"), _row("bad"), _row("ok2@test.com")]
+
+    async def fake_send(self, api_key, messages):
+        if len(messages) > 1 or messages[0]["to"] == ["bad"]:
+            raise ValidationError("Invalid `to` field", "validation_error", 422)
+
+    with patch.object(EmailService, "send_resend", fake_send):
+        outcomes = await _deliver_resend(rows, "re_key", None)
+    assert [o.sent for o in outcomes] == [True, False, True]
+    assert outcomes[1].permanent
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried():
+    rows = [_row(), _row()]
+    error = ApplicationError("Internal server error", "application_error", 500)
+    with patch.object(EmailService, "send_resend", new_callable=AsyncMock, side_effect=error):
+        outcomes = await _deliver_resend(rows, "re_key", None)
+    assert not any(o.sent or o.permanent for o in outcomes)
+
+
+def test_retry_delay_backs_off_and_caps():
+    assert 24 <= retry_delay(1).total_seconds() <= 36
+    assert 96 <= retry_delay(3).total_seconds() <= 144
+    assert retry_delay(20).total_seconds() <= 3600 * 1.2
@@ -0,0 +1,29 @@
+"""
+Tests for precompiled email template rendering: memoized layouts must produce
+exactly what a plain Jinja render of the same template produces.
+
+Run: docker compose exec backend pytest tests/test_email_templates.py -v
+"""
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.services.email_service import TEMPLATE_DIR, TEMPLATE_SAMPLE_DATA
+from app.services.email_templates import TemplateRenderer
+
+
+def test_renders_match_plain_jinja():
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(["html"]))
+    renderer = TemplateRenderer(TEMPLATE_DIR, bytecode_cache=False)
+    assert renderer.precompile() > 0
+    for name in renderer.template_names():
+        context = TEMPLATE_SAMPLE_DATA.get(name, {})
+        assert renderer.render(name, **context) == env.get_template(name).render(**context), name
+
+
+def test_render_many_matches_render():
+    renderer = TemplateRenderer(TEMPLATE_DIR, bytecode_cache=False)
+    name = "settlement_status_update.html"
+    contexts = [{**TEMPLATE_SAMPLE_DATA[name], "name": f"<User {i}>"} for i in range(3)]
+    rendered = renderer.render_many(name, contexts)
+    assert rendered == [renderer.render(name, **c) for c in contexts]
+    assert "&lt;User 2&gt;" in rendered[2]
@@ -0,0 +1,109 @@
+"""
+Unit tests for EUR reservations of client BUY orders (amounts, fill consumption).
+Run: docker compose exec backend pytest tests/test_eur_reservations.py -v
+"""
+
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import AssetTransaction, AssetType, Order, OrderSide, TransactionType
+from app.services.eur_reservations import (
+    consume_fill,
+    ensure_eur_holding,
+    reprice_reservation,
+    reservation_amount,
+)
+
+
+@pytest.fixture
+def order() -> Order:
+    """Open BUY of 100 @ 10.0 holding its full reservation (0.5% fee)"""
+    return Order(
+        id=uuid.uuid4(),
+        entity_id=uuid.uuid4(),
+        side=OrderSide.BUY,
+        price=Decimal("10.0"),
+        quantity=Decimal("100"),
+        filled_quantity=Decimal("0"),
+        reserved_eur=reservation_amount(Decimal("10.0"), Decimal("100"), Decimal("0.005")),
+    )
+
+
+def test_reservation_includes_fee_and_rounds_up():
+    assert reservation_amount(Decimal("10.0"), Decimal("100"), Decimal("0.005")) == Decimal("1005.00")
+    assert reservation_amount(Decimal("9.9"), Decimal("3"), Decimal("0.0015")) == Decimal("29.75")
+
+
+def test_partial_fill_at_better_price_releases_the_difference(order):
+    change = consume_fill(order, Decimal("40"), Decimal("9.5"), created_by=uuid.uuid4())
+    assert change.asset_type == AssetType.EUR
+    assert change.transaction_type == TransactionType.TRADE_BUY
+    assert change.reserved == Decimal("-402.00")  # 40% of the reservation
+    assert change.amount == Decimal("-381.90")  # 40 x 9.5 x 1.005
+    assert order.reserved_eur == Decimal("603.00")
+
+
+def test_last_fill_consumes_the_rest(order):
+    order.filled_quantity, order.reserved_eur = Decimal("40"), Decimal("603.00")
+    change = consume_fill(order, Decimal("60"), Decimal("10.0"), created_by=uuid.uuid4())
+    assert change.reserved == Decimal("-603.00")
+    assert change.amount == Decimal("-603.00")
+    assert order.reserved_eur == Decimal("0")
+
+
+def test_orders_without_reservation_are_untouched():
+    entity_id = uuid.uuid4()
+    unreserved = Order(entity_id=entity_id, side=OrderSide.BUY, reserved_eur=None)
+    sell = Order(entity_id=entity_id, side=OrderSide.SELL, reserved_eur=Decimal("1005.00"))
+    market_maker = Order(entity_id=None, side=OrderSide.BUY, reserved_eur=Decimal("1005.00"))
+    for order in (unreserved, sell, market_maker):
+        assert consume_fill(order, Decimal("10"), Decimal("10"), None) is None
+
+
+@pytest.mark.asyncio
+async def test_quantity_reduction_shrinks_the_reservation(order):
+    order.filled_quantity, order.reserved_eur = Decimal("20"), Decimal("804.00")
+    db = MagicMock()
+    db.execute = AsyncMock()
+
+    await reprice_reservation(
+        db, order, Decimal("10.0"), Decimal("0.005"), uuid.uuid4(), new_quantity=Decimal("50")
+    )
+
+    # 30 remaining x 10 x 1.005; the 502.50 difference is released in one UPDATE
+    assert order.reserved_eur == Decimal("301.50")
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_legacy_holding_opens_with_a_ledger_row():
+    balance_amount = MagicMock(scalar=MagicMock(return_value=Decimal("2500")))
+    holding_created = MagicMock(first=MagicMock(return_value=(uuid.uuid4(),)))
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[balance_amount, holding_created, None])
+    created_by = uuid.uuid4()
+
+    await ensure_eur_holding(db, uuid.uuid4(), created_by)
+
+    statement, [row] = db.execute.await_args_list[2].args
+    assert statement.table.name == AssetTransaction.__tablename__
+    assert row["transaction_type"] == TransactionType.ADJUSTMENT
+    assert (row["amount"], row["balance_before"], row["balance_after"]) == (
+        Decimal("2500.00"), Decimal("0"), Decimal("2500.00")
+    )
+    assert row["created_by"] == created_by
+
+
+@pytest.mark.asyncio
+async def test_existing_holding_gets_no_opening_row():
+    balance_amount = MagicMock(scalar=MagicMock(return_value=Decimal("2500")))
+    already_there = MagicMock(first=MagicMock(return_value=None))
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[balance_amount, already_there])
+
+    await ensure_eur_holding(db, uuid.uuid4(), uuid.uuid4())
+
+    assert db.execute.await_count == 2
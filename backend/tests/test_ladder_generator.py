@@ -0,0 +1,120 @@
+"""
+Unit tests for the vectorized MM ladder generator.
+Run: docker compose exec backend pytest tests/test_ladder_generator.py -v
+"""
+
+import uuid
+from collections import Counter
+from dataclasses import replace
+from decimal import Decimal
+
+from app.models.models import OrderSide
+from app.services.ladder_generator import LadderGenerator, LadderParams
+from app.services.ladder_service import build_ladder
+
+MMS = [uuid.uuid4() for _ in range(3)]
+PARAMS = LadderParams(
+    target_liquidity_eur=Decimal("5000000"),
+    min_volume_eur=Decimal("20000"),
+    max_volume_eur=Decimal("60000"),
+    max_orders=400,
+    max_orders_per_level=3,
+)
+
+
+def test_same_seed_same_ladder():
+    a = LadderGenerator(seed=7).ladder(Decimal("12.3"), Decimal("0.1"), PARAMS)
+    b = LadderGenerator(seed=7).ladder(Decimal("12.3"), Decimal("0.1"), PARAMS)
+    assert a.prices() == b.prices()
+    assert a.quantities.tolist() == b.quantities.tolist()
+
+
+def test_levels_are_contiguous_and_capped():
+    ladder = LadderGenerator(seed=1).ladder(Decimal("12.3"), Decimal("-0.1"), PARAMS)
+    prices = ladder.prices()
+    assert prices[0] == Decimal("12.3")
+    assert all(p > q or p == q for p, q in zip(prices, prices[1:]))
+    assert all(p - q in (Decimal("0"), Decimal("0.1")) for p, q in zip(prices, prices[1:]))
+    assert max(Counter(prices).values()) <= 3
+
+
+def test_stops_at_target_liquidity():
+    target = Decimal("1000000")
+    ladder = LadderGenerator(seed=3).ladder(
+        Decimal("12.0"), Decimal("0.1"), replace(PARAMS, target_liquidity_eur=target)
+    )
+    filled = sum(Decimal(int(q)) * p for q, p in zip(ladder.quantities, ladder.prices()))
+    assert filled >= target - Decimal("20000")  # Short by less than one min-size order
+    assert filled < target + Decimal("60000")
+    assert (ladder.volumes_eur >= 20000).all() and (ladder.volumes_eur <= 60000).all()
+
+
+def test_respects_min_price_and_max_orders():
+    ladder = LadderGenerator(seed=5).ladder(
+        Decimal("0.5"), Decimal("-0.1"), PARAMS, min_price=Decimal("0.2")
+    )
+    assert min(ladder.prices()) >= Decimal("0.2")
+
+    ladder = LadderGenerator(seed=5).ladder(Decimal("12.0"), Decimal("0.1"), replace(PARAMS, max_orders=10))
+    assert len(ladder) == 10
+
+
+def test_swap_ladder_quantities_use_unit_price():
+    ladder = LadderGenerator(seed=9).ladder(
+        Decimal("0.2000"),
+        Decimal("-0.0001"),
+        replace(PARAMS, min_volume_eur=Decimal("200000"), max_volume_eur=Decimal("5000000")),
+        unit_price_eur=Decimal("75"),
+    )
+    assert ladder.prices()[0] == Decimal("0.2000")
+    for q, volume in zip(ladder.quantities, ladder.volumes_eur):
+        assert abs(int(q) - volume / 75) <= 0.5
+
+
+def test_build_ladder_assigns_mms_round_robin():
+    orders = build_ladder(
+        side=OrderSide.SELL,
+        start_price=Decimal("12.0"),
+        price_step=Decimal("0.1"),
+        target_liquidity_eur=Decimal("500000"),
+        min_volume_eur=Decimal("20000"),
+        max_volume_eur=Decimal("60000"),
+        max_orders=50,
+        market_maker_ids=MMS,
+        generator=LadderGenerator(seed=11),
+    )
+    assert orders
+    assert [o.market_maker_id for o in orders[:6]] == MMS * 2
+    assert all(o.side == OrderSide.SELL and o.quantity >= 1 for o in orders)
+
+
+def test_volumes_with_variety_bounds():
+    gen = LadderGenerator(seed=2)
+    volumes = gen.volumes_with_variety(
+        1000, Decimal("10000"), 10, Decimal("1000000"), Decimal("0"), 50,
+        max_volume_eur=Decimal("40000"),
+    )
+    assert volumes.min() >= 10000 and volumes.max() <= 40000
+
+    volumes = gen.volumes_with_variety(
+        1000, Decimal("10000"), 1, None, Decimal("0"), 50, variation_pct=Decimal("20")
+    )
+    assert volumes.min() >= 10000 and volumes.max() <= 12000
+
+
+def test_prices_with_deviation_stay_on_the_grid_and_side():
+    gen = LadderGenerator(seed=4)
+    bids = gen.prices_with_deviation(500, Decimal("12.0"), Decimal("5"), OrderSide.BUY)
+    assert all(Decimal("11.4") <= p <= Decimal("12.0") and p % Decimal("0.1") == 0 for p in bids)
+    asks = gen.prices_with_deviation(500, Decimal("12.0"), Decimal("5"), OrderSide.SELL)
+    assert all(Decimal("12.0") <= p <= Decimal("12.6") for p in asks)
+    assert len(set(asks)) > 1
+
+    ratios = gen.prices_with_deviation(100, Decimal("0.1500"), Decimal("2"), OrderSide.BUY, is_swap_market=True)
+    assert all(Decimal("0.1470") <= p <= Decimal("0.1500") and p == p.quantize(Decimal("0.0001")) for p in ratios)
+
+
+def test_spread_levels():
+    levels = LadderGenerator.spread_levels(Decimal("9.8"), Decimal("10.3"), Decimal("0.1"))
+    assert levels == [Decimal("9.9"), Decimal("10.0"), Decimal("10.1"), Decimal("10.2")]
+    assert LadderGenerator.spread_levels(Decimal("9.9"), Decimal("10.0"), Decimal("0.1")) == []
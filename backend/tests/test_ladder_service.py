@@ -0,0 +1,194 @@
+"""
+Unit tests for the set-based MM ladder rebuild (cancelled and created rows,
+explicit lock deltas, per-side diff). Mocks the session and tickets.
+
+Run: docker compose exec backend pytest tests/test_ladder_service.py -v
+"""
+
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import (
+    AssetType,
+    CertificateType,
+    MarketType,
+    Order,
+    OrderSide,
+    OrderStatus,
+)
+from app.services import ladder_service
+from app.services.ladder_service import LadderOrder, LadderService, ladder_diff
+
+MM_A = uuid.uuid4()
+MM_B = uuid.uuid4()
+ADMIN = uuid.uuid4()
+
+# Open MM orders returned by the cancel UPDATE ... RETURNING
+OLD_SELL = SimpleNamespace(
+    id=uuid.uuid4(),
+    market_maker_id=MM_A,
+    certificate_type=CertificateType.CEA,
+    side=OrderSide.SELL,
+    price=Decimal("10.0"),
+    quantity=Decimal("100"),
+    filled_quantity=Decimal("40"),
+    ticket_id="TKT-OLD",
+)
+OLD_BUY = SimpleNamespace(
+    id=uuid.uuid4(),
+    market_maker_id=MM_A,
+    certificate_type=CertificateType.CEA,
+    side=OrderSide.BUY,
+    price=Decimal("9.0"),
+    quantity=Decimal("50"),
+    filled_quantity=None,
+    ticket_id=None,
+)
+
+LADDER = [
+    LadderOrder(market_maker_id=MM_A, side=OrderSide.SELL, price=Decimal("10.0"), quantity=Decimal("30")),
+    LadderOrder(market_maker_id=MM_B, side=OrderSide.SELL, price=Decimal("10.5"), quantity=Decimal("20")),
+    LadderOrder(market_maker_id=MM_B, side=OrderSide.BUY, price=Decimal("9.5"), quantity=Decimal("10")),
+]
+
+
+@pytest.fixture
+def mocked(monkeypatch):
+    mocks = SimpleNamespace(
+        tickets_bulk=AsyncMock(side_effect=lambda db, tickets: [f"TKT-{i}" for i in range(len(tickets))]),
+        ticket=AsyncMock(),
+        deltas=AsyncMock(),
+    )
+    monkeypatch.setattr(ladder_service.TicketService, "create_tickets_bulk", mocks.tickets_bulk)
+    monkeypatch.setattr(ladder_service.TicketService, "create_ticket", mocks.ticket)
+    monkeypatch.setattr(ladder_service, "apply_balance_deltas", mocks.deltas)
+    return mocks
+
+
+def _session(cancel_rows):
+    cancel_result = MagicMock()
+    cancel_result.all.return_value = cancel_rows
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[cancel_result, MagicMock()])
+    return db
+
+
+@pytest.mark.asyncio
+async def test_rebuild_cancels_and_inserts_in_two_statements(mocked):
+    db = _session([OLD_SELL, OLD_BUY])
+
+    result = await LadderService.rebuild(
+        db, MarketType.CEA_CASH, CertificateType.CEA, LADDER, ADMIN
+    )
+
+    assert result["orders_cancelled"] == 2
+    assert result["orders_created"] == 3
+    assert db.execute.await_count == 2
+
+    cancel_stmt = db.execute.await_args_list[0].args[0]
+    assert cancel_stmt.table.name == Order.__tablename__
+    assert cancel_stmt.compile().params["status"] == OrderStatus.CANCELLED
+
+    # Cancellation tickets first, then one per new order
+    tickets = mocked.tickets_bulk.await_args.args[1]
+    assert [t["action_type"] for t in tickets] == ["ORDER_CANCELLED"] * 2 + ["AUTO_TRADE_ORDER_PLACED"] * 3
+    assert [t["entity_id"] for t in tickets[:2]] == [OLD_SELL.id, OLD_BUY.id]
+    assert tickets[0]["related_ticket_ids"] == ["TKT-OLD"]
+    assert tickets[1]["related_ticket_ids"] == []
+    assert tickets[0]["response_data"]["remaining_quantity"] == "60"
+
+    insert_stmt, rows = db.execute.await_args_list[1].args
+    assert insert_stmt.table.name == Order.__tablename__
+    assert [(r["market_maker_id"], r["side"], r["price"], r["quantity"]) for r in rows] == [
+        (o.market_maker_id, o.side, o.price, o.quantity) for o in LADDER
+    ]
+    assert [r["ticket_id"] for r in rows] == ["TKT-2", "TKT-3", "TKT-4"]
+    assert [r["id"] for r in rows] == [t["entity_id"] for t in tickets[2:]]
+    assert all(r["status"] == OrderStatus.OPEN and r["filled_quantity"] == 0 for r in rows)
+    assert all(r["market"] == MarketType.CEA_CASH for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_releases_cancelled_locks_and_locks_new_orders(mocked):
+    db = _session([OLD_SELL, OLD_BUY])
+
+    await LadderService.rebuild(db, MarketType.CEA_CASH, CertificateType.CEA, LADDER, ADMIN)
+
+    deltas = mocked.deltas.await_args.args[1]
+    assert deltas == {
+        # -60 remaining of the old SELL, +30 new SELL
+        (MM_A, AssetType.CEA): [Decimal("0"), Decimal("-30")],
+        # 9.0 x 50 released
+        (MM_A, AssetType.EUR): [Decimal("0"), Decimal("-450.0")],
+        (MM_B, AssetType.CEA): [Decimal("0"), Decimal("20")],
+        # 9.5 x 10 locked
+        (MM_B, AssetType.EUR): [Decimal("0"), Decimal("95.0")],
+    }
+
+
+@pytest.mark.asyncio
+async def test_rebuild_of_empty_market_only_inserts(mocked):
+    db = _session([])
+
+    result = await LadderService.rebuild(
+        db, MarketType.CEA_CASH, CertificateType.CEA, LADDER[:1], ADMIN, summary={"seed": 7}
+    )
+
+    assert result["orders_cancelled"] == 0
+    assert result["diff"]["SELL"]["orders_before"] == 0
+    assert "BUY" not in result["diff"]
+    assert mocked.deltas.await_args.args[1] == {(MM_A, AssetType.CEA): [Decimal("0"), Decimal("30")]}
+    summary = mocked.ticket.await_args.kwargs
+    assert summary["action_type"] == "LADDER_REBUILT"
+    assert summary["request_payload"] == {"market": "CEA_CASH", "seed": 7}
+    assert summary["response_data"]["diff"] == result["diff"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_returns_per_side_diff(mocked):
+    db = _session([OLD_SELL, OLD_BUY])
+
+    result = await LadderService.rebuild(db, MarketType.CEA_CASH, CertificateType.CEA, LADDER, ADMIN)
+
+    assert result["diff"] == {
+        "BUY": {
+            "orders_before": 1,
+            "orders_after": 1,
+            "levels_before": 1,
+            "levels_after": 1,
+            "levels_added": 1,
+            "levels_removed": 1,
+            "liquidity_eur_before": "450",
+            "liquidity_eur_after": "95",
+            "best_price_before": "9.0",
+            "best_price_after": "9.5",
+        },
+        "SELL": {
+            "orders_before": 1,
+            "orders_after": 2,
+            "levels_before": 1,
+            "levels_after": 2,
+            "levels_added": 1,
+            "levels_removed": 0,
+            "liquidity_eur_before": "600",
+            "liquidity_eur_after": "510",
+            "best_price_before": "10.0",
+            "best_price_after": "10.0",
+        },
+    }
+
+
+def test_ladder_diff_values_liquidity_at_unit_price():
+    # SWAP: price is a CEA/EUA ratio, liquidity is valued at the EUA unit price
+    before = [{"side": OrderSide.SELL, "price": Decimal("0.5"), "remaining": Decimal("100")}]
+    after = [{"side": OrderSide.SELL, "price": Decimal("0.4"), "remaining": Decimal("100")}]
+
+    diff = ladder_diff(before, after, unit_price_eur=Decimal("70"))
+
+    assert diff["SELL"]["liquidity_eur_before"] == "7000"
+    assert diff["SELL"]["liquidity_eur_after"] == "7000"
+    assert diff["SELL"]["best_price_after"] == "0.4"
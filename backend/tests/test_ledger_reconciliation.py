@@ -0,0 +1,82 @@
+"""
+Unit tests for incremental ledger reconciliation (checkpoint advance, drift detection).
+Run: docker compose exec backend pytest tests/test_ledger_reconciliation.py -v
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.models import AssetType, LedgerCheckpoint
+from app.services.ledger_reconciliation import (
+    ENTITY,
+    MARKET_MAKER,
+    LedgerActivity,
+    apply_activity,
+    reset_checkpoints,
+)
+
+NOW = datetime(2026, 10, 18, 12, 0)
+TX_AT = datetime(2026, 10, 18, 11, 30)
+
+
+def _checkpoint(ledger_balance="100", balance="100", drift="0"):
+    return LedgerCheckpoint(
+        owner_type=ENTITY,
+        owner_id=uuid.uuid4(),
+        asset_type=AssetType.EUR,
+        ledger_balance=Decimal(ledger_balance),
+        balance=Decimal(balance),
+        drift=Decimal(drift),
+    )
+
+
+def test_settled_activity_advances_checkpoint():
+    checkpoint = _checkpoint()
+    tx_id = uuid.uuid4()
+    activity = LedgerActivity(
+        settled=Decimal("50"), last_transaction_at=TX_AT, last_transaction_id=tx_id
+    )
+    assert apply_activity(checkpoint, activity, Decimal("150"), NOW) is None
+    assert checkpoint.ledger_balance == Decimal("150")
+    assert (checkpoint.last_transaction_at, checkpoint.last_transaction_id) == (TX_AT, tx_id)
+    assert checkpoint.drift == Decimal("0")
+
+
+def test_pending_activity_is_compared_but_not_folded():
+    checkpoint = _checkpoint()
+    activity = LedgerActivity(pending=Decimal("-30"))
+    assert apply_activity(checkpoint, activity, Decimal("70"), NOW) is None
+    assert checkpoint.ledger_balance == Decimal("100")
+    assert checkpoint.last_transaction_at is None
+
+
+def test_drift_detected_once_then_resolved():
+    checkpoint = _checkpoint()
+    assert apply_activity(checkpoint, None, Decimal("90"), NOW) == Decimal("0")
+    assert checkpoint.drift == Decimal("-10")
+    assert checkpoint.drift_detected_at == NOW
+    # Same drift on the next run is not reported again
+    assert apply_activity(checkpoint, None, Decimal("90"), NOW) is None
+    assert apply_activity(checkpoint, None, Decimal("100"), NOW) == Decimal("-10")
+    assert checkpoint.drift == Decimal("0")
+    assert checkpoint.drift_detected_at is None
+
+
+@pytest.mark.asyncio
+async def test_reset_checkpoints_restarts_the_ledger_at_zero():
+    db = MagicMock()
+    db.execute = AsyncMock()
+    mm_id = uuid.uuid4()
+
+    await reset_checkpoints(db, MARKET_MAKER, [mm_id])
+
+    compiled = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("UPDATE ledger_checkpoints SET ledger_balance=")
+    params = compiled.params
+    assert params["owner_type_1"] == MARKET_MAKER and params["owner_id_1"] == [mm_id]
+    assert params["ledger_balance"] == 0 and params["last_transaction_at"] is None
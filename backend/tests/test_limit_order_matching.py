@@ -0,0 +1,130 @@
+"""
+Unit tests for paying and settling client limit BUY fills (reservation
+slice debited, role transition, one CEA purchase settlement per fill).
+Mocks the session, tickets and settlement creation.
+
+Run: docker compose exec backend pytest tests/test_limit_order_matching.py -v
+"""
+
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import (
+    CertificateType,
+    MarketType,
+    Order,
+    OrderSide,
+    OrderStatus,
+    TransactionType,
+)
+from app.services import limit_order_matching
+from app.services.eur_reservations import reservation_amount
+from app.services.limit_order_matching import LimitOrderMatcher
+
+
+@pytest.fixture
+def mocked(monkeypatch):
+    mocks = SimpleNamespace(
+        balances=AsyncMock(return_value=[Decimal("0")]),
+        transition=AsyncMock(return_value=1),
+        settlement=AsyncMock(),
+    )
+    monkeypatch.setattr(limit_order_matching, "update_entity_balances", mocks.balances)
+    monkeypatch.setattr(limit_order_matching, "transition_cea_to_cea_settle_if_eur_zero", mocks.transition)
+    monkeypatch.setattr(
+        limit_order_matching.SettlementService, "create_cea_purchase_settlement", mocks.settlement
+    )
+    monkeypatch.setattr(
+        limit_order_matching.TicketService,
+        "create_ticket",
+        AsyncMock(return_value=SimpleNamespace(ticket_id="TKT-1")),
+    )
+    return mocks
+
+
+def _session():
+    db = MagicMock()
+    db.flush = AsyncMock()
+    db.commit = AsyncMock()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_client_buy_fill_is_debited_and_settled(monkeypatch, mocked):
+    user_id = uuid.uuid4()
+    buy = Order(
+        id=uuid.uuid4(),
+        market=MarketType.CEA_CASH,
+        entity_id=uuid.uuid4(),
+        certificate_type=CertificateType.CEA,
+        side=OrderSide.BUY,
+        price=Decimal("10.0"),
+        quantity=Decimal("100"),
+        filled_quantity=Decimal("0"),
+        reserved_eur=reservation_amount(Decimal("10.0"), Decimal("100"), Decimal("0.005")),
+        status=OrderStatus.OPEN,
+    )
+    mm_sell = Order(
+        id=uuid.uuid4(),
+        market=MarketType.CEA_CASH,
+        market_maker_id=uuid.uuid4(),
+        certificate_type=CertificateType.CEA,
+        side=OrderSide.SELL,
+        price=Decimal("9.5"),
+        quantity=Decimal("100"),
+        filled_quantity=Decimal("0"),
+        status=OrderStatus.OPEN,
+    )
+    monkeypatch.setattr(LimitOrderMatcher, "_get_matchable_orders", AsyncMock(return_value=[mm_sell]))
+
+    result = await LimitOrderMatcher.match_incoming_order(_session(), buy, user_id=user_id)
+
+    assert result.total_filled == Decimal("100") and buy.status == OrderStatus.FILLED
+    # The whole reservation is released; the debit is the fill at the maker's price + fee
+    [change] = mocked.balances.await_args.args[1]
+    assert change.transaction_type == TransactionType.TRADE_BUY
+    assert change.reserved == Decimal("-1005.00")
+    assert change.amount == Decimal("-954.75")
+    assert mocked.transition.await_args.args[1:] == (buy.entity_id, Decimal("0"))  # EUR spent
+    settlement = mocked.settlement.await_args.kwargs
+    assert settlement["entity_id"] == buy.entity_id
+    assert settlement["order_id"] == buy.id
+    assert settlement["quantity"] == Decimal("100")
+    assert settlement["price"] == Decimal("9.5")
+    assert settlement["created_by"] == user_id
+
+
+@pytest.mark.asyncio
+async def test_mm_only_fill_creates_no_settlement(monkeypatch, mocked):
+    mm_buy = Order(
+        id=uuid.uuid4(),
+        market=MarketType.CEA_CASH,
+        market_maker_id=uuid.uuid4(),
+        certificate_type=CertificateType.CEA,
+        side=OrderSide.BUY,
+        price=Decimal("10.0"),
+        quantity=Decimal("10"),
+        filled_quantity=Decimal("0"),
+        status=OrderStatus.OPEN,
+    )
+    mm_sell = Order(
+        id=uuid.uuid4(),
+        market=MarketType.CEA_CASH,
+        market_maker_id=uuid.uuid4(),
+        certificate_type=CertificateType.CEA,
+        side=OrderSide.SELL,
+        price=Decimal("9.5"),
+        quantity=Decimal("10"),
+        filled_quantity=Decimal("0"),
+        status=OrderStatus.OPEN,
+    )
+    monkeypatch.setattr(LimitOrderMatcher, "_get_matchable_orders", AsyncMock(return_value=[mm_sell]))
+
+    await LimitOrderMatcher.match_incoming_order(_session(), mm_buy)
+
+    mocked.balances.assert_not_awaited()
+    mocked.settlement.assert_not_awaited()
@@ -0,0 +1,62 @@
+"""
+Unit tests for materialized MM balance deltas (order locks, delta accumulation).
+Run: docker compose exec backend pytest tests/test_market_maker_balances.py -v
+"""
+
+import uuid
+from decimal import Decimal
+
+from app.models.models import AssetType, CertificateType, OrderSide, OrderStatus
+from app.services.market_maker_balances import add_delta, add_order_lock, order_lock
+
+MM = uuid.uuid4()
+
+# Column values of an open, partially filled MM SELL order
+SELL = dict(
+    market_maker_id=MM,
+    certificate_type=CertificateType.CEA,
+    side=OrderSide.SELL,
+    status=OrderStatus.OPEN,
+    price=Decimal("12.5"),
+    quantity=Decimal("100"),
+    filled_quantity=Decimal("40"),
+)
+
+
+def test_sell_locks_remaining_certificates():
+    assert order_lock(**SELL) == (MM, AssetType.CEA, Decimal("60"))
+    assert order_lock(**dict(SELL, status=None, filled_quantity=None)) == (MM, AssetType.CEA, Decimal("100"))
+
+
+def test_buy_locks_eur():
+    assert order_lock(**dict(SELL, side=OrderSide.BUY)) == (MM, AssetType.EUR, Decimal("750.0"))
+
+
+def test_inactive_and_non_mm_orders_lock_nothing():
+    assert order_lock(**dict(SELL, status=OrderStatus.FILLED)) is None
+    assert order_lock(**dict(SELL, status=OrderStatus.CANCELLED)) is None
+    assert order_lock(**dict(SELL, market_maker_id=None)) is None
+
+
+def test_partial_fill_then_cancel_releases_lock():
+    deltas = {}
+    add_order_lock(deltas, 1, **dict(SELL, filled_quantity=Decimal("0")))
+    # Fill of 40: old lock released, new lock added
+    add_order_lock(deltas, -1, **dict(SELL, filled_quantity=Decimal("0")))
+    add_order_lock(deltas, 1, **dict(SELL, status=OrderStatus.PARTIALLY_FILLED))
+    assert deltas[(MM, AssetType.CEA)] == [Decimal("0"), Decimal("60")]
+    # Cancel
+    add_order_lock(deltas, -1, **dict(SELL, status=OrderStatus.PARTIALLY_FILLED))
+    add_order_lock(deltas, 1, **dict(SELL, status=OrderStatus.CANCELLED))
+    assert deltas[(MM, AssetType.CEA)] == [Decimal("0"), Decimal("0")]
+
+
+def test_add_delta_accumulates_per_asset():
+    deltas = {}
+    add_delta(deltas, MM, AssetType.EUA, total=Decimal("500"))
+    add_delta(deltas, MM, AssetType.EUA, total=Decimal("-200"), locked=Decimal("50"))
+    add_delta(deltas, MM, AssetType.EUR, total=Decimal("1000"))
+    assert deltas == {
+        (MM, AssetType.EUA): [Decimal("300"), Decimal("50")],
+        (MM, AssetType.EUR): [Decimal("1000"), Decimal("0")],
+    }
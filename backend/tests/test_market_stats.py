@@ -0,0 +1,91 @@
+"""
+Unit tests for the rolling 24h market statistics window.
+Run: docker compose exec backend pytest tests/test_market_stats.py -v
+"""
+
+from datetime import datetime, timedelta
+
+from app.services.market_stats import RollingWindowStats
+
+T0 = datetime(2026, 2, 10, 12, 0, 0)
+
+
+def test_empty_window():
+    stats = RollingWindowStats().snapshot(T0)
+    assert stats.trade_count == 0
+    assert stats.high is None and stats.low is None
+    assert stats.volume == 0.0
+    assert stats.change_pct == 0.0
+
+
+def test_high_low_volume_and_change():
+    window = RollingWindowStats()
+    window.add_fill(10.0, 100, T0)
+    window.add_fill(12.5, 50, T0 + timedelta(minutes=5))
+    window.add_fill(9.0, 25, T0 + timedelta(minutes=5, seconds=30))
+    window.add_fill(11.0, 10, T0 + timedelta(hours=1))
+
+    stats = window.snapshot(T0 + timedelta(hours=2))
+    assert stats.high == 12.5
+    assert stats.low == 9.0
+    assert stats.volume == 185
+    assert stats.trade_count == 4
+    assert stats.last_price == 11.0
+    assert stats.change_pct == 10.0  # 10.0 -> 11.0
+
+
+def test_single_trade_has_no_change():
+    window = RollingWindowStats()
+    window.add_fill(10.0, 100, T0)
+    assert window.snapshot(T0).change_pct == 0.0
+
+
+def test_expired_buckets_leave_window():
+    window = RollingWindowStats()
+    window.add_fill(20.0, 100, T0)  # Drops out first
+    window.add_fill(8.0, 40, T0 + timedelta(hours=2))
+    window.add_fill(10.0, 60, T0 + timedelta(hours=3))
+
+    stats = window.snapshot(T0 + timedelta(hours=24, minutes=1))
+    assert stats.high == 10.0
+    assert stats.low == 8.0
+    assert stats.volume == 100
+    assert stats.trade_count == 2
+    assert stats.change_pct == 25.0
+
+    stats = window.snapshot(T0 + timedelta(hours=28))
+    assert stats.trade_count == 0
+    assert stats.volume == 0.0
+
+
+def test_late_fill_for_earlier_minute():
+    window = RollingWindowStats()
+    window.add_fill(10.0, 10, T0 + timedelta(minutes=10))
+    window.add_fill(7.0, 10, T0)  # Arrives after a newer fill
+    stats = window.snapshot(T0 + timedelta(minutes=11))
+    assert stats.low == 7.0
+    assert stats.high == 10.0
+    assert stats.last_price == 10.0
+    assert stats.trade_count == 2
+
+
+def test_matches_naive_recompute():
+    window = RollingWindowStats()
+    fills = [
+        (10 + (i * 7919 % 23) / 10, 1 + i % 5, T0 + timedelta(minutes=i * 17))
+        for i in range(300)
+    ]
+    for price, qty, ts in fills:
+        window.add_fill(price, qty, ts)
+
+    now = fills[-1][2]
+    cutoff = now - timedelta(minutes=24 * 60 - 1)
+    live = [
+        f for f in fills
+        if f[2].replace(second=0) >= cutoff.replace(second=0)
+    ]
+    stats = window.snapshot(now)
+    assert stats.high == max(f[0] for f in live)
+    assert stats.low == min(f[0] for f in live)
+    assert stats.volume == sum(f[1] for f in live)
+    assert stats.trade_count == len(live)
@@ -0,0 +1,59 @@
+"""
+Unit tests for market buy execution when the EUR debit is refused (EUR
+reserved or spent since the preview). Mocks the session and balance helpers.
+
+Run: docker compose exec backend pytest tests/test_order_matching.py -v
+"""
+
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import AssetType
+from app.services import order_matching
+from app.services.balance_utils import InsufficientBalanceError
+from app.services.order_matching import OrderPreviewResult, execute_market_buy_order
+
+
+@pytest.mark.asyncio
+async def test_debit_refused_after_preview_fails_the_order(monkeypatch):
+    preview = OrderPreviewResult(
+        fills=[],
+        total_quantity=Decimal("100"),
+        total_cost_gross=Decimal("1000.00"),
+        weighted_avg_price=Decimal("10.0"),
+        best_price=Decimal("10.0"),
+        worst_price=Decimal("10.0"),
+        platform_fee_amount=Decimal("5.00"),
+        total_cost_net=Decimal("1005.00"),
+        net_price_per_unit=Decimal("10.05"),
+        can_execute=True,
+        execution_message="OK",
+        partial_fill=False,
+    )
+    monkeypatch.setattr(order_matching, "preview_buy_order", AsyncMock(return_value=preview))
+    # A limit order reserved the EUR between the preview and the debit
+    refused = InsufficientBalanceError(AssetType.EUR, Decimal("1005.00"), Decimal("200.00"))
+    debit = AsyncMock(side_effect=refused)
+    monkeypatch.setattr(order_matching, "debit_available_balance", debit)
+    monkeypatch.setattr(order_matching.eur_reservations, "ensure_eur_holding", AsyncMock())
+    monkeypatch.setattr(order_matching, "get_entity_eur_balance", AsyncMock(return_value=Decimal("200.00")))
+    monkeypatch.setattr(order_matching, "get_entity_balance", AsyncMock(return_value=Decimal("0")))
+    settlement = AsyncMock()
+    monkeypatch.setattr(order_matching.SettlementService, "create_cea_purchase_settlement", settlement)
+    db = MagicMock()
+    db.flush = AsyncMock()
+    db.rollback = AsyncMock()
+    db.commit = AsyncMock()
+
+    result = await execute_market_buy_order(db, uuid.uuid4(), uuid.uuid4(), amount_eur=Decimal("1005"))
+
+    assert not result.success
+    assert result.message == str(refused)
+    assert result.eur_balance == Decimal("200.00")
+    assert debit.await_args.kwargs["amount"] == Decimal("1005.00")
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
+    settlement.assert_not_awaited()
@@ -0,0 +1,80 @@
+"""
+Unit tests for keyset pagination (cursor round trip, next-page cursor) and
+the count modes. Mocks the session — no database needed.
+
+Run: docker compose exec backend pytest tests/test_pagination.py -v
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from app.models.models import TicketLog
+from app.services import pagination
+from app.services.pagination import decode_cursor, encode_cursor, paginate
+
+
+def _result(rows):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    return result
+
+
+def _tickets(n):
+    start = datetime(2026, 10, 18, 12)
+    return [
+        TicketLog(id=uuid.uuid4(), timestamp=start - timedelta(seconds=i)) for i in range(n)
+    ]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    ts, row_id = datetime(2026, 10, 18, 9, 30, 1, 250), uuid.uuid4()
+    assert decode_cursor(encode_cursor(ts, row_id)) == (ts, row_id)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_cursor_page_filters_on_timestamp_and_id():
+    rows = _tickets(3)
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=_result(rows))
+    cursor = encode_cursor(datetime(2026, 10, 18, 13), uuid.uuid4())
+
+    page = await paginate(
+        db, select(TicketLog), TicketLog.timestamp, TicketLog.id,
+        per_page=2, cursor=cursor, count="none",
+    )
+
+    sql = str(db.execute.call_args.args[0])
+    assert "(ticket_logs.timestamp, ticket_logs.id) <" in sql
+    assert "OFFSET" not in sql
+    assert page.items == rows[:2]
+    assert decode_cursor(page.next_cursor) == (rows[1].timestamp, rows[1].id)
+    assert page.total is None
+
+
+@pytest.mark.asyncio
+async def test_last_page_has_no_cursor():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=_result(_tickets(2)))
+    page = await paginate(
+        db, select(TicketLog), TicketLog.timestamp, TicketLog.id, per_page=2, count="none"
+    )
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_auto_count_uses_estimate_for_broad_filters():
+    query = select(TicketLog)
+    with patch.object(pagination, "estimate_count", AsyncMock(return_value=2_000_000)), \
+            patch.object(pagination, "exact_count", AsyncMock(return_value=5)) as exact:
+        assert await pagination.count_rows(MagicMock(), query) == (2_000_000, True)
+        exact.assert_not_awaited()
+
+    with patch.object(pagination, "estimate_count", AsyncMock(return_value=40)), \
+            patch.object(pagination, "exact_count", AsyncMock(return_value=37)):
+        assert await pagination.count_rows(MagicMock(), query) == (37, False)
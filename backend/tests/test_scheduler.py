@@ -0,0 +1,53 @@
+"""
+Unit tests for due-time scheduling (due-time re-reads after runs and wake events).
+No Redis needed: the scheduler holds no lease, so nothing is recorded.
+
+Run: docker compose exec backend pytest tests/test_scheduler.py -v
+"""
+
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import RESYNC_SECONDS, Scheduler
+
+
+@pytest.fixture
+def sched(monkeypatch):
+    sched = Scheduler()
+    sched.lease.token = 1
+    sched.lease._valid_until = float("inf")
+    monkeypatch.setattr(sched, "_record", AsyncMock())
+    return sched
+
+
+def _pending_since(sched: Scheduler, name: str, minutes: int):
+    due = scheduler_module._utcnow() - timedelta(minutes=minutes)
+    sched.add_job(name, AsyncMock(), interval_seconds=60, next_due=AsyncMock(return_value=due))
+    return due
+
+
+@pytest.mark.asyncio
+async def test_run_leaving_its_due_item_waits_for_resync(sched):
+    _pending_since(sched, "holds", minutes=5)
+    await sched._run_scheduled(sched.jobs["holds"])  # Runs, but the item stays due
+    await sched._refresh_stale()
+    wait = sched._due["holds"] - scheduler_module._utcnow()
+    assert wait > timedelta(seconds=RESYNC_SECONDS - 5)
+
+
+@pytest.mark.asyncio
+async def test_wake_or_failed_run_keeps_the_due_time(sched):
+    _pending_since(sched, "holds", minutes=5)
+    await sched._run_scheduled(sched.jobs["holds"])
+    sched._wake(["holds"])  # A commit touched the job's models
+    await sched._refresh_stale()
+    assert sched._due["holds"] == sched._not_before["holds"]  # Next run after interval_seconds
+
+    _pending_since(sched, "rates", minutes=5)
+    sched.jobs["rates"].func.side_effect = RuntimeError("source down")
+    await sched._run_scheduled(sched.jobs["rates"])
+    await sched._refresh_stale()
+    assert sched._due["rates"] == sched._not_before["rates"]
@@ -0,0 +1,57 @@
+"""
+Unit tests for bulk settlement finalization (chunking, per-chunk rollback, results).
+Mocks the session and the per-chunk work — no database needed.
+
+Run: docker compose exec backend pytest tests/test_settlement_finalizer.py -v
+"""
+
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.models.models import SettlementStatus
+from app.services import settlement_finalizer
+from app.services.settlement_finalizer import FinalizeResult, settle_batches
+
+
+@pytest.fixture
+def db():
+    return AsyncMock()
+
+
+@pytest.mark.asyncio
+async def test_chunks_commit_separately_and_failures_are_isolated(db):
+    ids = [uuid4() for _ in range(5)]
+    chunks = []
+
+    async def fake_chunk(session, chunk, finalized_by, notes, now):
+        chunks.append(chunk)
+        if len(chunks) == 2:
+            raise RuntimeError("deadlock detected")
+        return [FinalizeResult(b, "settled", old_status=SettlementStatus.AT_CUSTODY) for b in chunk], 1
+
+    with patch.object(settlement_finalizer, "_settle_chunk", side_effect=fake_chunk), \
+            patch.object(settlement_finalizer, "invalidate_metrics_cache", new_callable=AsyncMock) as inv:
+        results, roles = await settle_batches(db, ids + ids[:1], None, chunk_size=2)
+
+    assert chunks == [ids[0:2], ids[2:4], ids[4:5]]  # Duplicate id dropped
+    assert [r.batch_id for r in results] == ids
+    assert [r.result for r in results] == ["settled", "settled", "error", "error", "settled"]
+    assert roles == 2
+    assert db.commit.await_count == 2
+    assert db.rollback.await_count == 1
+    inv.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_nothing_settled_keeps_metrics_cache(db):
+    async def fake_chunk(session, chunk, finalized_by, notes, now):
+        return [FinalizeResult(b, "not_found") for b in chunk], 0
+
+    with patch.object(settlement_finalizer, "_settle_chunk", side_effect=fake_chunk), \
+            patch.object(settlement_finalizer, "invalidate_metrics_cache", new_callable=AsyncMock) as inv:
+        results, _ = await settle_batches(db, [uuid4()], None)
+
+    assert results[0].as_dict()["result"] == "not_found"
+    inv.assert_not_awaited()
@@ -0,0 +1,157 @@
+"""
+Unit tests for settlement metrics (one aggregate query; counts and sums for a
+small fixture set) and their Redis cache, which a committed settlement status
+change invalidates. The aggregate test runs against the app's database; the
+cache tests use an in-memory SQLite session and a dict-backed Redis.
+
+Run: docker compose exec backend pytest tests/test_settlement_monitoring.py -v
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import (
+    CertificateType,
+    Entity,
+    Jurisdiction,
+    SettlementBatch,
+    SettlementStatus,
+    SettlementType,
+)
+from app.services import settlement_monitoring
+from app.services.settlement_monitoring import METRICS_CACHE_KEY, SettlementMonitoring, SettlementMetrics
+
+METRICS = SettlementMetrics(
+    total_pending=1,
+    total_in_progress=2,
+    total_settled_today=3,
+    total_failed=0,
+    total_overdue=1,
+    avg_settlement_time_hours=10.5,
+    total_value_pending_eur=Decimal("1500.00"),
+    total_value_settled_today_eur=Decimal("300.00"),
+    oldest_pending_days=4,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(settlement_monitoring.RedisManager, "get_redis", AsyncMock(return_value=fake))
+    return fake
+
+
+def _batch(entity_id, status, value, created_at, expected, actual=None):
+    return SettlementBatch(
+        batch_reference=f"SET-TEST-{uuid.uuid4().hex[:12]}",
+        entity_id=entity_id,
+        settlement_type=SettlementType.CEA_PURCHASE,
+        status=status,
+        asset_type=CertificateType.CEA,
+        quantity=Decimal("1"),
+        price=value,
+        total_value_eur=value,
+        created_at=created_at,
+        updated_at=created_at,
+        expected_settlement_date=expected,
+        actual_settlement_date=actual,
+    )
+
+
+@pytest.mark.asyncio
+async def test_compute_metrics_counts_and_sums():
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    entity_id = uuid.uuid4()
+    async with AsyncSessionLocal() as db:
+        before = await SettlementMonitoring._compute_metrics(db)
+
+        db.add(Entity(id=entity_id, name="Test settlement metrics", jurisdiction=Jurisdiction.OTHER))
+        await db.flush()
+        db.add_all(
+            [
+                # Open and overdue
+                _batch(entity_id, SettlementStatus.PENDING, Decimal("100"), now - timedelta(days=5), now - timedelta(days=2)),
+                # Open, not yet due
+                _batch(entity_id, SettlementStatus.IN_TRANSIT, Decimal("200"), now - timedelta(days=1), now + timedelta(days=2)),
+                # Settled today
+                _batch(entity_id, SettlementStatus.SETTLED, Decimal("300"), now - timedelta(days=3), now, actual=today_start),
+                # Settled yesterday, row touched today: not "settled today"
+                _batch(entity_id, SettlementStatus.SETTLED, Decimal("400"), now, now, actual=today_start - timedelta(hours=1)),
+                _batch(entity_id, SettlementStatus.FAILED, Decimal("500"), now - timedelta(days=3), now - timedelta(days=2)),
+            ]
+        )
+        await db.flush()
+
+        after = await SettlementMonitoring._compute_metrics(db)
+        await db.rollback()
+
+    assert after.total_pending - before.total_pending == 1
+    assert after.total_in_progress - before.total_in_progress == 1
+    assert after.total_settled_today - before.total_settled_today == 1
+    assert after.total_failed - before.total_failed == 1
+    assert after.total_overdue - before.total_overdue == 1
+    assert after.total_value_pending_eur - before.total_value_pending_eur == Decimal("300")
+    assert after.total_value_settled_today_eur - before.total_value_settled_today_eur == Decimal("300")
+    assert after.oldest_pending_days >= 5
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_served_from_cache(monkeypatch, redis):
+    compute = AsyncMock(return_value=METRICS)
+    monkeypatch.setattr(SettlementMonitoring, "_compute_metrics", compute)
+
+    first = await SettlementMonitoring.get_system_metrics(None)
+    second = await SettlementMonitoring.get_system_metrics(None)
+
+    assert first == second == METRICS
+    assert compute.await_count == 1
+    assert METRICS_CACHE_KEY in redis.values
+
+
+@pytest.mark.asyncio
+async def test_status_change_commit_invalidates_cache(monkeypatch, redis):
+    compute = AsyncMock(return_value=METRICS)
+    monkeypatch.setattr(SettlementMonitoring, "_compute_metrics", compute)
+    engine = create_engine("sqlite://")
+    SettlementBatch.__table__.create(engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with Session(engine) as session:
+        batch = _batch(uuid.uuid4(), SettlementStatus.PENDING, Decimal("100"), now, now)
+        session.add(batch)
+        session.commit()
+        await asyncio.sleep(0)
+
+        await SettlementMonitoring.get_system_metrics(None)
+        assert METRICS_CACHE_KEY in redis.values
+
+        batch.status = SettlementStatus.TRANSFER_INITIATED
+        session.commit()
+        await asyncio.sleep(0)  # The invalidation is scheduled on the running loop
+
+    assert METRICS_CACHE_KEY not in redis.values
+    await SettlementMonitoring.get_system_metrics(None)
+    assert compute.await_count == 2
@@ -0,0 +1,33 @@
+"""
+Unit tests for settlement transition scheduling (next_transition_at).
+Run: docker compose exec backend pytest tests/test_settlement_processor.py -v
+"""
+
+from datetime import datetime
+
+from app.models.models import CertificateType, SettlementStatus, SettlementType
+from app.services.settlement_processor import SettlementProcessor
+
+FRIDAY = datetime(2026, 10, 16, 15, 30)
+FAR = datetime(2026, 12, 31)
+
+
+def _due(status, settlement_type=SettlementType.CEA_PURCHASE, asset=CertificateType.CEA, expected=FAR):
+    return SettlementProcessor.next_transition_at(status, settlement_type, asset, FRIDAY, expected)
+
+
+def test_business_days_skip_weekend():
+    assert _due(SettlementStatus.PENDING) == datetime(2026, 10, 19)
+    assert _due(SettlementStatus.TRANSFER_INITIATED) == datetime(2026, 10, 20)
+    assert _due(SettlementStatus.IN_TRANSIT) == datetime(2026, 10, 21)
+    assert _due(SettlementStatus.IN_TRANSIT, SettlementType.SWAP_CEA_TO_EUA) == datetime(2026, 10, 20)
+
+
+def test_expected_date_caps_and_custody_is_immediate():
+    assert _due(SettlementStatus.IN_TRANSIT, expected=datetime(2026, 10, 17)) == datetime(2026, 10, 17)
+    assert _due(SettlementStatus.AT_CUSTODY) == FRIDAY
+
+
+def test_final_statuses_never_advance():
+    assert _due(SettlementStatus.SETTLED) is None
+    assert _due(SettlementStatus.FAILED) is None
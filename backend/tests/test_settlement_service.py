@@ -0,0 +1,127 @@
+"""
+Unit tests for settlement batch references (per-year/asset sequence seeded
+past the highest existing reference, never rewound by a later seed).
+The seeding tests run against the app's database.
+
+Run: docker compose exec backend pytest tests/test_settlement_service.py -v
+"""
+
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, text
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import (
+    CertificateType,
+    Entity,
+    Jurisdiction,
+    SettlementBatch,
+    SettlementType,
+)
+from app.services import settlement_service
+from app.services.settlement_service import SettlementService
+
+# A year no real settlement uses, so seeding only sees this test's batches
+PREFIX = "SET-1999-"
+SUFFIX = "-CEA"
+
+
+@pytest_asyncio.fixture
+async def batches():
+    """Commit settlement batches with the given references; removed afterwards."""
+    entity_id = uuid.uuid4()
+    references = []
+
+    async def add(reference: str) -> None:
+        async with AsyncSessionLocal() as db:
+            db.add(
+                SettlementBatch(
+                    batch_reference=reference,
+                    entity_id=entity_id,
+                    settlement_type=SettlementType.CEA_PURCHASE,
+                    asset_type=CertificateType.CEA,
+                    quantity=Decimal("1"),
+                    price=Decimal("1"),
+                    total_value_eur=Decimal("1"),
+                    expected_settlement_date=datetime(1999, 1, 4),
+                )
+            )
+            await db.commit()
+        references.append(reference)
+
+    async with AsyncSessionLocal() as db:
+        db.add(Entity(id=entity_id, name="Test settlement references", jurisdiction=Jurisdiction.OTHER))
+        await db.commit()
+    yield add
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SettlementBatch).where(SettlementBatch.batch_reference.in_(references)))
+        await db.execute(delete(Entity).where(Entity.id == entity_id))
+        await db.commit()
+
+
+@pytest_asyncio.fixture
+async def sequence():
+    """A throwaway reference sequence name; dropped afterwards."""
+    name = f"settlement_ref_test_{uuid.uuid4().hex[:12]}"
+    yield name
+    settlement_service._reference_sequences.discard(name)
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(f"DROP SEQUENCE IF EXISTS {name}"))
+        await db.commit()
+
+
+async def _nextval(name: str) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text(f"SELECT nextval('{name}')"))
+        return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_sequence_is_seeded_past_highest_reference(batches, sequence):
+    await batches(f"{PREFIX}000007{SUFFIX}")
+    await batches(f"{PREFIX}000013{SUFFIX}")
+
+    await SettlementService._ensure_reference_sequence(sequence, PREFIX, SUFFIX, CertificateType.CEA)
+
+    assert sequence in settlement_service._reference_sequences
+    assert await _nextval(sequence) == 14
+
+
+@pytest.mark.asyncio
+async def test_lower_seed_does_not_rewind_sequence(batches, sequence):
+    await batches(f"{PREFIX}000013{SUFFIX}")
+    await SettlementService._ensure_reference_sequence(sequence, PREFIX, SUFFIX, CertificateType.CEA)
+    assert await _nextval(sequence) == 14
+
+    # Another process seeds later, when only a lower reference is visible
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SettlementBatch).where(SettlementBatch.batch_reference == f"{PREFIX}000013{SUFFIX}"))
+        await db.commit()
+    await batches(f"{PREFIX}000005{SUFFIX}")
+    await SettlementService._ensure_reference_sequence(sequence, PREFIX, SUFFIX, CertificateType.CEA)
+
+    assert await _nextval(sequence) == 15
+
+
+@pytest.mark.asyncio
+async def test_batch_reference_is_formatted_and_seeded_once(monkeypatch):
+    ensure = AsyncMock()
+    monkeypatch.setattr(SettlementService, "_ensure_reference_sequence", ensure)
+    monkeypatch.setattr(settlement_service, "_reference_sequences", set())
+    ensure.side_effect = lambda sequence, *args: settlement_service._reference_sequences.add(sequence)
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[MagicMock(scalar_one=lambda: 14), MagicMock(scalar_one=lambda: 15)])
+    year = datetime.now(timezone.utc).year
+
+    first = await SettlementService.generate_batch_reference(db, SettlementType.CEA_PURCHASE, CertificateType.CEA)
+    second = await SettlementService.generate_batch_reference(db, SettlementType.CEA_PURCHASE, CertificateType.CEA)
+
+    assert (first, second) == (f"SET-{year}-000014-CEA", f"SET-{year}-000015-CEA")
+    ensure.assert_awaited_once_with(
+        f"settlement_ref_{year}_cea", f"SET-{year}-", "-CEA", CertificateType.CEA
+    )
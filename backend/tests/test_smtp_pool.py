@@ -0,0 +1,115 @@
+"""
+Tests for pooled SMTP delivery against a local aiosmtpd server
+(connection reuse, reconnect after a dropped connection, failed sends,
+pool per config).
+
+Run: docker compose exec backend pytest tests/test_smtp_pool.py -v
+"""
+
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from app.services.email_service import EmailService  # noqa: E402
+from app.services.smtp_pool import SMTPPool, close_smtp_pool, get_smtp_pool, smtp_key  # noqa: E402
+
+
+class _Recorder:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(session.peer)  # Client address: one per connection
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos))
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = _Recorder()
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    config = {
+        "provider": "smtp",
+        "smtp_host": "127.0.0.1",
+        "smtp_port": port,
+        "smtp_use_tls": False,
+    }
+    yield handler, config
+    controller.stop()
+
+
+@pytest.mark.asyncio
+async def test_messages_share_one_connection(smtp_server):
+    handler, config = smtp_server
+    svc = EmailService()
+    for i in range(3):
+        await svc.send_smtp(f"u{i}@test.com", "Hi", "<p>Hi</p>", "noreply@test.com", config)
+    await close_smtp_pool()
+    assert [m[1] for m in handler.messages] == [["u0@test.com"], ["u1@test.com"], ["u2@test.com"]]
+    assert len(handler.sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_dropped_connection_is_replaced(smtp_server):
+    handler, config = smtp_server
+    pool = SMTPPool(smtp_key(config), size=1)
+    await pool.send("noreply@test.com", "a@test.com", "Subject: a\n\na")
+    pool._idle[0].smtp.sock.shutdown(socket.SHUT_RDWR)  # Dropped connection, noticed on the next send
+    await pool.send("noreply@test.com", "b@test.com", "Subject: b\n\nb")
+    await pool.close()
+    assert [m[1] for m in handler.messages] == [["a@test.com"], ["b@test.com"]]
+    assert len(handler.sessions) == 2
+
+
+@pytest.mark.asyncio
+async def test_config_change_replaces_pool(smtp_server):
+    _, config = smtp_server
+    pool = get_smtp_pool(config)
+    assert get_smtp_pool(dict(config)) is pool
+    assert get_smtp_pool({**config, "smtp_username": "other"}) is not pool
+    await close_smtp_pool()
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_drops_the_connection(smtp_server):
+    handler, config = smtp_server
+    pool = SMTPPool(smtp_key(config), size=1)
+    await pool.send("noreply@test.com", "a@test.com", "Subject: a\n\na")
+    conn = pool._idle[0]
+
+    def broken_sendmail(*args):
+        raise ValueError("unexpected")
+
+    conn.smtp.sendmail = broken_sendmail
+    with pytest.raises(ValueError):
+        await pool.send("noreply@test.com", "b@test.com", "Subject: b\n\nb")
+    assert conn.smtp.sock is None and pool._idle == []
+
+    # The slot was freed: the next send gets a fresh connection
+    await pool.send("noreply@test.com", "c@test.com", "Subject: c\n\nc")
+    await pool.close()
+    assert [m[1] for m in handler.messages] == [["a@test.com"], ["c@test.com"]]
+
+
+@pytest.mark.asyncio
+async def test_replaced_pool_quits_connections_still_sending(smtp_server):
+    _, config = smtp_server
+    old = get_smtp_pool(config)
+    conn = await old._acquire()  # A send in flight while the config changes
+    get_smtp_pool({**config, "smtp_username": "other"})
+    await close_smtp_pool()
+    await old._release(conn)
+    assert conn.smtp.sock is None and old._idle == []
@@ -0,0 +1,90 @@
+"""
+Unit tests for audit ticket enrichment: a page of tickets resolves users and
+market maker names with a constant number of queries, and MM names are
+served from the in-process cache on later pages. Mocks the session.
+
+Run: docker compose exec backend pytest tests/test_ticket_enrichment.py -v
+"""
+
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import TicketLog, TicketStatus, UserRole
+from app.services import ticket_enrichment
+from app.services.ticket_enrichment import enrich_tickets
+
+
+def _ticket(user_id=None, mm_id=None, response_data=None, action_type="ORDER_PLACED"):
+    return TicketLog(
+        id=uuid.uuid4(),
+        ticket_id=f"TKT-{uuid.uuid4().hex[:8]}",
+        timestamp=datetime(2026, 10, 18),
+        user_id=user_id,
+        market_maker_id=mm_id,
+        action_type=action_type,
+        entity_type="Order",
+        status=TicketStatus.SUCCESS,
+        response_data=response_data,
+        related_ticket_ids=[],
+        tags=[],
+    )
+
+
+def _result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    ticket_enrichment.clear_mm_name_cache()
+    yield
+    ticket_enrichment.clear_mm_name_cache()
+
+
+@pytest.mark.asyncio
+async def test_page_uses_one_user_and_one_mm_query():
+    user_id, buyer, seller = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    trades = [
+        _ticket(
+            user_id,
+            response_data={"buyer_mm_id": str(buyer), "seller_mm_id": str(seller)},
+            action_type="TRADE_EXECUTED",
+        )
+        for _ in range(50)
+    ]
+    user = SimpleNamespace(
+        id=user_id, email="a@test.com", role=UserRole.ADMIN,
+        first_name="Ann", last_name="Lee", company="Acme",
+    )
+    db = MagicMock()
+    db.execute = AsyncMock(
+        side_effect=[_result([user]), _result([(buyer, "MM-Buy"), (seller, "MM-Sell")])]
+    )
+
+    data = await enrich_tickets(db, trades + [_ticket(mm_id=buyer)])
+
+    assert db.execute.await_count == 2
+    assert data[0]["user_full_name"] == "Ann Lee"
+    assert data[0]["user_company"] == "Acme"
+    assert (data[0]["buyer_mm_name"], data[0]["seller_mm_name"]) == ("MM-Buy", "MM-Sell")
+    assert data[-1]["mm_name"] == "MM-Buy"
+    assert data[-1]["user_email"] is None and "buyer_mm_name" not in data[-1]
+
+
+@pytest.mark.asyncio
+async def test_cached_mm_names_skip_the_query():
+    mm_id = uuid.uuid4()
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=_result([(mm_id, "MM-Alpha")]))
+    await enrich_tickets(db, [_ticket(mm_id=mm_id)])
+    db.execute.reset_mock()
+
+    data = await enrich_tickets(db, [_ticket(mm_id=mm_id)])
+    db.execute.assert_not_awaited()
+    assert data[0]["mm_name"] == "MM-Alpha"
@@ -0,0 +1,49 @@
+"""
+Unit tests for the ticket search filters (SQL shape only, compiled for
+PostgreSQL; the index-backed behaviour is measured by scripts/bench/ticket_search.py).
+
+Run: docker compose exec backend pytest tests/test_ticket_search.py -v
+"""
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.ticket_search import (
+    escape_like,
+    payload_filter,
+    prefix_tsquery,
+    search_filter,
+)
+
+
+def _compile(clause):
+    compiled = clause.compile(dialect=postgresql.dialect())
+    return str(compiled), list(compiled.params.values())
+
+
+def test_like_wildcards_in_the_term_are_literal():
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+    sql, params = _compile(search_filter("TKT_1", "prefix"))
+    assert sql.count("ILIKE") == 3
+    assert params == ["TKT\\_1%"] * 3
+
+
+def test_text_mode_matches_every_word_as_prefix():
+    assert prefix_tsquery("Order 2026-01_x") == "order:* & 2026:* & 01:* & x:*"
+    assert prefix_tsquery(" -- ") is None
+    sql, params = _compile(search_filter("trade eua", "text"))
+    assert "search_vector @@ to_tsquery('simple'::regconfig" in sql
+    assert params == ["trade:* & eua:*"]
+
+
+def test_fuzzy_mode_uses_trigram_word_similarity():
+    sql, _ = _compile(search_filter("setlment", "fuzzy"))
+    assert sql.count("<%") == 3
+
+
+def test_payload_key_and_value():
+    sql, params = _compile(payload_filter("buyer_mm_id"))
+    assert sql.count(" ? ") == 2 and params == ["buyer_mm_id"] * 2
+
+    sql, params = _compile(payload_filter("quantity", "1500"))
+    assert sql.count("@>") == 4
+    assert {"quantity": "1500"} in params and {"quantity": 1500} in params
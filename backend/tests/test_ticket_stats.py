@@ -0,0 +1,101 @@
+"""
+Unit tests for the audit dashboard rollups: splitting a date range into
+rolled-up days and live ranges, folding the GROUPING SETS rows into the
+stats, and day-chunked compaction. Mocks the session.
+
+Run: docker compose exec backend pytest tests/test_ticket_stats.py -v
+"""
+
+import uuid
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.models import TicketStatus
+from app.services.ticket_stats import (
+    _BY_ACTION,
+    _BY_STATUS,
+    _BY_USER,
+    _split_range,
+    compact_ticket_rollups,
+    get_ticket_stats,
+)
+
+WATERMARK = date(2026, 10, 18)
+
+
+def _result(rows=None, scalar=None):
+    result = MagicMock()
+    result.all.return_value = rows or []
+    result.scalar.return_value = scalar
+    return result
+
+
+def test_unfiltered_range_is_rollups_plus_today():
+    days, live = _split_range(None, None, WATERMARK)
+    assert days == (None, WATERMARK)
+    assert live == [(datetime(2026, 10, 18), None)]
+
+
+def test_partial_edge_days_are_counted_live():
+    days, live = _split_range(
+        datetime(2026, 10, 1, 12), datetime(2026, 10, 10, 8), WATERMARK
+    )
+    assert days == (date(2026, 10, 2), date(2026, 10, 10))
+    assert live[0] == (datetime(2026, 10, 1, 12), datetime(2026, 10, 2))
+    assert live[1][0] == datetime(2026, 10, 10)
+
+
+def test_range_after_watermark_or_before_compaction_is_all_live():
+    start = datetime(2026, 10, 18, 6)
+    assert _split_range(start, None, WATERMARK) == (None, [(start, None)])
+    assert _split_range(None, None, None) == (None, [(None, None)])
+
+
+@pytest.mark.asyncio
+async def test_grouping_rows_fold_into_stats():
+    user_id = uuid.uuid4()
+    rows = [
+        (TicketStatus.SUCCESS, None, None, _BY_STATUS, 90),
+        (TicketStatus.FAILED, None, None, _BY_STATUS, 10),
+        (None, "LOGIN", None, _BY_ACTION, 30),
+        (None, "ORDER_PLACED", None, _BY_ACTION, 70),
+        (None, None, user_id, _BY_USER, 60),
+        (None, None, None, _BY_USER, 40),
+    ]
+    db = MagicMock()
+    db.execute = AsyncMock(
+        side_effect=[
+            _result(scalar=date(2026, 10, 17)),  # Newest rollup day
+            _result(rows),
+            _result([(user_id, "a@test.com", "Acme")]),
+            _result([(date(2026, 10, 17), 80), (date(2026, 10, 18), 20)]),
+        ]
+    )
+
+    stats = await get_ticket_stats(db)
+
+    assert (stats.total_actions, stats.success_count, stats.failed_count) == (100, 90, 10)
+    assert list(stats.by_action_type) == ["ORDER_PLACED", "LOGIN"]
+    assert stats.by_user[0] == {
+        "user_id": str(user_id), "email": "a@test.com", "company_name": "Acme", "action_count": 60,
+    }
+    assert stats.by_user[1]["user_id"] is None
+    assert stats.actions_over_time[-1] == {"date": "2026-10-18", "count": 20}
+
+
+@pytest.mark.asyncio
+async def test_compaction_rolls_up_closed_days_in_chunks():
+    db = MagicMock()
+    db.commit = AsyncMock()
+    db.execute = AsyncMock(
+        side_effect=[_result(scalar=None), _result(scalar=datetime(2026, 8, 1, 9))]
+        + [_result()] * 10
+    )
+
+    days = await compact_ticket_rollups(db, now=datetime(2026, 10, 18, 0, 30))
+
+    # Grace period keeps 2026-10-17 open until 01:00
+    assert days == (date(2026, 10, 17) - date(2026, 8, 1)).days
+    assert db.commit.await_count == 3  # 31-day chunks